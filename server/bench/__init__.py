@@ -0,0 +1 @@
+"""Benchmarks and load tools. Run from the server/ directory, e.g. `python -m bench.sizing`."""
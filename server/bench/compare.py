@@ -0,0 +1,58 @@
+"""
+Diff two benchmark result files.
+
+    python -m bench.compare bench/results/old.json bench/results/new.json --threshold 0.15
+
+Prints the change in p50/p95/p99 per case and exits 1 when any case's p95 grew by more
+than --threshold (a fraction) so it can gate CI.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def _delta(old: float, new: float) -> float:
+    return (new - old) / old if old else 0.0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    old = json.loads(Path(args.old).read_text())
+    new = json.loads(Path(args.new).read_text())
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+
+    regressions = []
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        a, b = old["results"].get(name), new["results"].get(name)
+        if not a or not b or "error" in a or "error" in b:
+            print(f"{name:<26} {'missing or failed in one run':>40}")
+            continue
+        cells = []
+        for metric in METRICS:
+            change = _delta(a[metric], b[metric])
+            cells.append(f"{metric[:3]} {a[metric]:>8.2f} -> {b[metric]:>8.2f} ({change:+.0%})")
+        flag = ""
+        if _delta(a["p95_ms"], b["p95_ms"]) > args.threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<26} " + "  ".join(cells) + flag)
+
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
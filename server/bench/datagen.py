@@ -0,0 +1,497 @@
+"""
+Seeded synthetic dataset for benchmarks.
+
+    python -m bench.datagen --scale 1m --database resonate_bench
+
+Creates (or, with --reset, recreates) the target database with the app's schema and
+migrations, then bulk-loads a catalog plus users, favorites, ratings, playlists and
+follows. Song popularity and user activity are Zipf-skewed so hot and cold keys behave
+like production. The same --scale/--seed always produces the same rows.
+
+A manifest with counts and sample ids (hot/cold users, songs, playlists, search terms)
+is written to bench/data/<database>.json for bench.dbbench and bench.loadtest.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+DATA_DIR = BENCH_DIR / "data"
+
+BENCH_PASSWORD = "bench-password"
+PLAYLIST_POSITION_GAP = 1024
+BATCH_ROWS = 5_000
+
+# Total rows come out at roughly 20 x users.
+SCALES = {"10k": 500, "100k": 5_000, "1m": 50_000, "10m": 500_000}
+
+VOCABULARY = (
+    "love night heart baby dream fire summer rain blue girl boy time life dance light "
+    "world home star moon sun road city river shadow gold wild free young forever "
+    "midnight morning angel ghost hero party island ocean paradise storm thunder winter "
+    "echo electric neon velvet silver crystal broken lonely golden sweet bitter happy "
+    "crazy lost found run fly fall rise burn shine sing cry hold stay wait call "
+    "kiss touch tears smile memory story song letter secret promise wonder magic "
+    "highway train window door mirror garden forest mountain desert valley horizon"
+).split()
+HOBBIES = ("music", "reading", "running", "gaming", "cooking", "travel", "hiking", "painting")
+MBTI = ("INTJ", "INTP", "ENTJ", "ENTP", "INFJ", "INFP", "ENFJ", "ENFP",
+        "ISTP", "ISFP", "ESTP", "ESFP", "ISTJ", "ISFJ", "ESTJ", "ESFJ")
+GENDERS = ("male", "female", "nonbinary", "other")
+_BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+@dataclass
+class Plan:
+    scale: str
+    seed: int
+    users: int
+    artists: int
+    albums: int
+    songs: int
+    favorites_per_user: float = 8.0
+    ratings_per_user: float = 3.0
+    playlists_per_user: float = 0.5
+    songs_per_playlist: float = 20.0
+    playlist_follows_per_user: float = 2.0
+    artist_follows_per_user: float = 3.0
+    vip_fraction: float = 0.05
+    zipf_s: float = 1.1
+
+    @classmethod
+    def for_scale(cls, scale: str, seed: int, users: Optional[int] = None) -> "Plan":
+        n = users or SCALES[scale]
+        artists = max(50, n // 20)
+        return cls(
+            scale=scale,
+            seed=seed,
+            users=n,
+            artists=artists,
+            albums=artists * 3,
+            songs=max(1_000, n),
+        )
+
+
+class Zipf:
+    """Draw 0-based ranks where rank r has weight 1 / (r + 1) ** s."""
+
+    def __init__(self, n: int, s: float, rng: random.Random) -> None:
+        self._cum = list(accumulate(1.0 / (r + 1) ** s for r in range(n)))
+        self._rng = rng
+
+    def __call__(self) -> int:
+        return bisect_left(self._cum, self._rng.random() * self._cum[-1])
+
+    def distinct(self, k: int) -> List[int]:
+        k = min(k, len(self._cum))
+        seen: Dict[int, None] = {}
+        attempts = 0
+        while len(seen) < k and attempts < k * 20:
+            seen[self()] = None
+            attempts += 1
+        return list(seen)
+
+
+def _activity(rng: random.Random, mean: float) -> int:
+    # Heavy-tailed per-user counts with the requested mean.
+    return int(rng.paretovariate(2.0) * mean / 2.0)
+
+
+def _ids(rng: random.Random, n: int) -> List[str]:
+    out: Dict[str, None] = {}
+    while len(out) < n:
+        out["".join(rng.choice(_BASE62) for _ in range(22))] = None
+    return list(out)
+
+
+def _title(rng: random.Random, words: Zipf, lo: int = 1, hi: int = 4) -> str:
+    return " ".join(VOCABULARY[words() % len(VOCABULARY)] for _ in range(rng.randint(lo, hi))).title()
+
+
+def _timestamp(rng: random.Random, now: datetime, days: int) -> datetime:
+    return now - timedelta(seconds=rng.randint(0, days * 86_400))
+
+
+class Generator:
+    def __init__(self, plan: Plan, now: Optional[datetime] = None) -> None:
+        self.plan = plan
+        self.now = (now or datetime.now(timezone.utc).replace(tzinfo=None)).replace(microsecond=0)
+        rng = random.Random(plan.seed)
+        self.artist_ids = _ids(rng, plan.artists)
+        self.album_ids = _ids(rng, plan.albums)
+        self.song_ids = _ids(rng, plan.songs)
+        self.playlist_ids: List[int] = []
+
+    def rng(self, stream: str) -> random.Random:
+        # Independent stream per table so changing one table's shape leaves others intact.
+        return random.Random(f"{self.plan.seed}:{stream}")
+
+    def artists(self) -> Iterator[Tuple]:
+        rng = self.rng("artists")
+        words = Zipf(len(VOCABULARY), 0.8, rng)
+        for artid in self.artist_ids:
+            yield artid, _title(rng, words, 1, 3)
+
+    def albums(self) -> Iterator[Tuple]:
+        rng = self.rng("albums")
+        words = Zipf(len(VOCABULARY), 0.8, rng)
+        for alid in self.album_ids:
+            released = self.now.date() - timedelta(days=rng.randint(0, 3 * 365))
+            yield alid, _title(rng, words), released
+
+    def album_artists(self) -> Iterator[Tuple]:
+        for i, alid in enumerate(self.album_ids):
+            yield alid, self.artist_ids[i % len(self.artist_ids)]
+
+    def songs(self) -> Iterator[Tuple]:
+        rng = self.rng("songs")
+        words = Zipf(len(VOCABULARY), 1.0, rng)
+        for sid in self.song_ids:
+            yield (
+                sid,
+                _title(rng, words),
+                self.now.date() - timedelta(days=rng.randint(0, 3 * 365)),
+                round(rng.random(), 3),
+                round(rng.random(), 3),
+                round(rng.random(), 3),
+                round(rng.uniform(50, 190), 2),
+                round(rng.uniform(-25, 0), 2),
+                rng.randint(0, 1),
+                round(rng.random(), 4),
+                round(rng.random() * 0.5, 4),
+            )
+
+    def album_songs(self) -> Iterator[Tuple]:
+        per_album: Dict[str, int] = {}
+        for i, sid in enumerate(self.song_ids):
+            alid = self.album_ids[i % len(self.album_ids)]
+            per_album[alid] = per_album.get(alid, 0) + 1
+            yield alid, sid, 1, per_album[alid]
+
+    def users(self, password_hash: str) -> Iterator[Tuple]:
+        rng = self.rng("users")
+        for uid in range(1, self.plan.users + 1):
+            yield (
+                uid,
+                f"bench_user_{uid}",
+                f"user{uid}@bench.test",
+                password_hash,
+                rng.choice(GENDERS),
+                rng.randint(16, 70),
+                rng.choice(MBTI),
+                _timestamp(rng, self.now, 730),
+            )
+
+    def hobbies(self) -> Iterator[Tuple]:
+        rng = self.rng("hobbies")
+        for uid in range(1, self.plan.users + 1):
+            for hobby in rng.sample(HOBBIES, rng.randint(0, 2)):
+                yield uid, hobby
+
+    def vip_users(self) -> Iterator[Tuple]:
+        rng = self.rng("vip")
+        for uid in range(1, self.plan.users + 1):
+            if rng.random() < self.plan.vip_fraction:
+                yield uid, self.now.date() - timedelta(days=rng.randint(0, 365)), None, True
+
+    def favorites(self) -> Iterator[Tuple]:
+        rng = self.rng("favorites")
+        songs = Zipf(len(self.song_ids), self.plan.zipf_s, rng)
+        for uid in range(1, self.plan.users + 1):
+            for rank in songs.distinct(_activity(rng, self.plan.favorites_per_user)):
+                yield uid, self.song_ids[rank], _timestamp(rng, self.now, 60)
+
+    def ratings(self) -> Iterator[Tuple[Tuple, Tuple]]:
+        """Yields (ratings row, user_rates row) pairs sharing one rid."""
+        rng = self.rng("ratings")
+        songs = Zipf(len(self.song_ids), self.plan.zipf_s, rng)
+        rid = 0
+        for uid in range(1, self.plan.users + 1):
+            for rank in songs.distinct(_activity(rng, self.plan.ratings_per_user)):
+                rid += 1
+                yield (rid, rng.choices((1, 2, 3, 4, 5), (1, 1, 3, 5, 4))[0], None), (
+                    rid, uid, self.song_ids[rank], _timestamp(rng, self.now, 365))
+
+    def playlists(self, first_plstid: int) -> Iterator[Tuple]:
+        rng = self.rng("playlists")
+        words = Zipf(len(VOCABULARY), 1.0, rng)
+        plstid = first_plstid
+        for uid in range(1, self.plan.users + 1):
+            for _ in range(_activity(rng, self.plan.playlists_per_user)):
+                self.playlist_ids.append(plstid)
+                yield (
+                    plstid,
+                    uid,
+                    _title(rng, words, 1, 3),
+                    None,
+                    "public" if rng.random() < 0.8 else "private",
+                    _timestamp(rng, self.now, 365),
+                )
+                plstid += 1
+
+    def playlist_songs(self) -> Iterator[Tuple]:
+        rng = self.rng("playlist_songs")
+        songs = Zipf(len(self.song_ids), self.plan.zipf_s, rng)
+        for plstid in self.playlist_ids:
+            ranks = songs.distinct(max(1, _activity(rng, self.plan.songs_per_playlist)))
+            for i, rank in enumerate(ranks, start=1):
+                yield plstid, self.song_ids[rank], i * PLAYLIST_POSITION_GAP, _timestamp(rng, self.now, 180)
+
+    def playlist_follows(self) -> Iterator[Tuple]:
+        if not self.playlist_ids:
+            return
+        rng = self.rng("playlist_follows")
+        playlists = Zipf(len(self.playlist_ids), self.plan.zipf_s, rng)
+        for uid in range(1, self.plan.users + 1):
+            for rank in playlists.distinct(_activity(rng, self.plan.playlist_follows_per_user)):
+                yield uid, self.playlist_ids[rank], _timestamp(rng, self.now, 180)
+
+    def artist_follows(self) -> Iterator[Tuple]:
+        rng = self.rng("artist_follows")
+        artists = Zipf(len(self.artist_ids), self.plan.zipf_s, rng)
+        for uid in range(1, self.plan.users + 1):
+            for rank in artists.distinct(_activity(rng, self.plan.artist_follows_per_user)):
+                yield uid, self.artist_ids[rank], _timestamp(rng, self.now, 365)
+
+
+def bulk_insert(conn: Any, table: str, columns: Sequence[str], rows: Iterable[Tuple]) -> int:
+    """Multi-row INSERTs in batches of BATCH_ROWS, committed per batch."""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    total = 0
+    batch: List[Tuple] = []
+    with conn.cursor() as cur:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_ROWS:
+                cur.executemany(sql, batch)
+                conn.commit()
+                total += len(batch)
+                batch.clear()
+        if batch:
+            cur.executemany(sql, batch)
+            conn.commit()
+            total += len(batch)
+    return total
+
+
+def _load_ratings(conn: Any, pairs: Iterable[Tuple[Tuple, Tuple]]) -> int:
+    """Loads the legacy ratings + user_rates pair and the same rows into song_ratings."""
+    ratings: List[Tuple] = []
+    rates: List[Tuple] = []
+    n = 0
+
+    def flush() -> None:
+        bulk_insert(conn, "ratings", ("rid", "rate_value", "comment"), ratings)
+        bulk_insert(conn, "user_rates", ("rid", "uid", "sid", "rated_at"), rates)
+        bulk_insert(
+            conn, "song_ratings", ("uid", "sid", "rate_value", "comment", "rated_at"),
+            [(uid, sid, rate_value, comment, rated_at)
+             for (_, rate_value, comment), (_, uid, sid, rated_at) in zip(ratings, rates)],
+        )
+
+    for rating, rate in pairs:
+        ratings.append(rating)
+        rates.append(rate)
+        if len(ratings) >= BATCH_ROWS:
+            flush()
+            n += len(ratings)
+            ratings.clear()
+            rates.clear()
+    if ratings:
+        flush()
+        n += len(ratings)
+    return n
+
+
+def prepare_database(database: str, reset: bool) -> Any:
+    """Create the database and schema with the app's own scripts; returns a connected DB."""
+    import pymysql
+
+    from src.db import get_db, primary_config
+    from src.manage import migrate
+    from src.tool import load_sql
+
+    config = primary_config()
+    server = pymysql.connect(
+        host=config["host"], port=config["port"], user=config["user"], password=config["password"]
+    )
+    with server.cursor() as cur:
+        if reset:
+            cur.execute(f"DROP DATABASE IF EXISTS `{database}`")
+        cur.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+        cur.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = %s AND table_name = 'users'",
+            (database,),
+        )
+        exists = cur.fetchone()[0] > 0
+    server.close()
+
+    os.environ["MYSQL_DB"] = database
+    db = get_db()
+    if exists:
+        conn = db.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT COUNT(*) AS n FROM users")
+                has_users = cur.fetchone()["n"] > 0
+        finally:
+            conn.close()
+        if has_users:
+            raise SystemExit(f"{database} already has users; pass --reset to regenerate it")
+    else:
+        db.execute_script(load_sql("schema.sql"))
+        migrate(db)
+        for script in ("src/sql/tags.sql", "src/sql/virtual_tags.sql",
+                       "src/sql/weekly-ranking-view.sql", "src/sql/create_trigger.sql"):
+            db.execute_script(load_sql(script))
+    return db
+
+
+def load(db: Any, gen: Generator) -> Dict[str, int]:
+    from werkzeug.security import generate_password_hash
+
+    counts: Dict[str, int] = {}
+    conn = db.get_connection(autocommit=False)
+    with conn.cursor() as cur:
+        cur.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+
+    def step(name: str, columns: Sequence[str], rows: Iterable[Tuple], table: Optional[str] = None) -> None:
+        start = time.perf_counter()
+        counts[name] = bulk_insert(conn, table or name, columns, rows)
+        print(f"  {name:<22} {counts[name]:>10,} rows  {time.perf_counter() - start:6.1f}s")
+
+    step("artists", ("artid", "name"), gen.artists())
+    step("albums", ("alid", "title", "release_date"), gen.albums())
+    step("album_owned_by_artist", ("alid", "artid"), gen.album_artists())
+    step("songs", ("sid", "name", "release_date", "danceability", "energy", "valence", "tempo",
+                   "loudness", "`mode`", "acousticness", "speechiness"), gen.songs())
+    step("album_song", ("alid", "sid", "disc_no", "track_no"), gen.album_songs())
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    step("users", ("uid", "username", "email", "password_hash", "gender", "age", "mbti", "created_at"),
+         gen.users(password_hash))
+    step("user_hobbies", ("uid", "hobby"), gen.hobbies())
+    step("vip_users", ("uid", "start_date", "end_date", "special_effect"), gen.vip_users())
+    step("user_favorite_song", ("uid", "sid", "favored_at"), gen.favorites())
+
+    start = time.perf_counter()
+    counts["ratings"] = counts["user_rates"] = counts["song_ratings"] = _load_ratings(conn, gen.ratings())
+    print(f"  {'ratings+user_rates':<22} {counts['ratings']:>10,} rows  {time.perf_counter() - start:6.1f}s")
+
+    # The users trigger already created one default playlist per user.
+    with conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(MAX(plstid), 0) AS last FROM playlists")
+        first_plstid = int(cur.fetchone()["last"]) + 1
+    step("playlists", ("plstid", "uid", "name", "description", "visibility", "created_at"),
+         gen.playlists(first_plstid))
+    step("playlist_song", ("plstid", "sid", "position", "added_at"), gen.playlist_songs())
+    step("user_follow_playlist", ("uid", "plstid", "followed_at"), gen.playlist_follows())
+    step("user_follows_artist", ("uid", "artid", "followed_at"), gen.artist_follows())
+
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE playlists p SET p.tail_position = "
+            "(SELECT COALESCE(MAX(ps.position), 0) FROM playlist_song ps WHERE ps.plstid = p.plstid)"
+        )
+        conn.commit()
+        print("  refreshing song_display and statistics...")
+        cur.execute("CALL refresh_song_display_all()")
+        conn.commit()
+        print("  splitting favorite_events into monthly partitions...")
+        db.add_favorite_partitions()
+        for table in ("songs", "song_display", "users", "user_favorite_song", "favorite_events", "user_rates",
+                      "ratings", "song_ratings", "playlists", "playlist_song", "user_follow_playlist", "user_follows_artist"):
+            cur.execute(f"ANALYZE TABLE {table}")
+            cur.fetchall()
+    conn.close()
+
+    try:
+        from src.tool import load_sql
+        db.execute_script(load_sql("src/sql/weekly-ranking-refresh.sql"))
+        db.execute_script(load_sql("src/sql/weekly-ranking-event.sql"))
+    except Exception as e:
+        print(f"  weekly snapshot event skipped: {e}")
+    return counts
+
+
+def manifest(gen: Generator, counts: Dict[str, int], database: str) -> Dict[str, Any]:
+    """Sample ids for the benchmarks: Zipf heads are 'hot', uniform draws are 'cold'."""
+    rng = gen.rng("manifest")
+    n_users = gen.plan.users
+    hot_users = list(range(1, min(n_users, 50) + 1))
+    return {
+        "database": database,
+        "plan": asdict(gen.plan),
+        "generated_at": gen.now.isoformat(),
+        "counts": counts,
+        "password": BENCH_PASSWORD,
+        "users": {"hot": hot_users, "cold": rng.sample(range(1, n_users + 1), min(n_users, 200))},
+        "songs": {"hot": gen.song_ids[:50], "cold": rng.sample(gen.song_ids, min(len(gen.song_ids), 200))},
+        "albums": rng.sample(gen.album_ids, min(len(gen.album_ids), 100)),
+        "artists": {"hot": gen.artist_ids[:20], "cold": rng.sample(gen.artist_ids, min(len(gen.artist_ids), 100))},
+        "playlists": {
+            "hot": gen.playlist_ids[:50],
+            "cold": rng.sample(gen.playlist_ids, min(len(gen.playlist_ids), 200)),
+        },
+        # Frequent words match many rows, rare ones few; prefixes exercise partial matches.
+        "search_terms": {
+            "common": VOCABULARY[:10],
+            "rare": VOCABULARY[-10:],
+            "prefix": [w[:3] for w in VOCABULARY[:10]],
+            "miss": ["zzzqx", "qwxyz"],
+        },
+    }
+
+
+def generate(database: str, plan: Plan, reset: bool = False) -> Dict[str, Any]:
+    """Create, load and describe a dataset; returns the manifest it also writes to bench/data/."""
+    db = prepare_database(database, reset)
+    gen = Generator(plan)
+    counts = load(db, gen)
+    result = manifest(gen, counts, database)
+    DATA_DIR.mkdir(exist_ok=True)
+    manifest_path(database).write_text(json.dumps(result, indent=2, default=str))
+    return result
+
+
+def manifest_path(database: str) -> Path:
+    return DATA_DIR / f"{database}.json"
+
+
+def load_manifest(database: str) -> Dict[str, Any]:
+    path = manifest_path(database)
+    if not path.exists():
+        raise SystemExit(f"No manifest at {path}; run `python -m bench.datagen --database {database}` first")
+    return json.loads(path.read_text())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    parser.add_argument("--users", type=int, help="override the user count implied by --scale")
+    parser.add_argument("--seed", type=int, default=348)
+    parser.add_argument("--database", default=os.getenv("BENCH_DB", "resonate_bench"))
+    parser.add_argument("--reset", action="store_true", help="drop and recreate the database first")
+    args = parser.parse_args(argv)
+
+    plan = Plan.for_scale(args.scale, args.seed, args.users)
+    print(f"Generating {args.scale} dataset (users={plan.users:,}, songs={plan.songs:,}) into {args.database}")
+    start = time.perf_counter()
+    result = generate(args.database, plan, args.reset)
+    print(f"Loaded {sum(result['counts'].values()):,} rows in {time.perf_counter() - start:.0f}s; "
+          f"manifest at {manifest_path(args.database)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
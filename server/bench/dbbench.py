@@ -0,0 +1,210 @@
+"""
+DB-layer benchmark against a generated dataset (see bench.datagen).
+
+    python -m bench.dbbench --database resonate_bench
+    python -m bench.dbbench --database resonate_bench --case search_common --iterations 500
+
+Each case calls one DB method with parameters drawn from the dataset manifest (hot and
+cold users, common/rare/prefix search terms, ...), records per-call latency, and runs
+EXPLAIN on every SELECT the method issued. Results go to bench/results/ as JSON; diff two
+runs with `python -m bench.compare old.json new.json`.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .datagen import load_manifest
+from .results import base_meta, write_report
+from .stats import latency_summary
+
+
+@dataclass
+class Case:
+    name: str
+    call: Callable[[Any, Dict[str, Any], random.Random], Any]
+    # Expensive cases run a fraction of --iterations.
+    weight: float = 1.0
+
+
+def _pick(rng: random.Random, items: List[Any]) -> Any:
+    return rng.choice(items)
+
+
+CASES = [
+    Case("search_common", lambda db, m, r: db.search(_pick(r, m["search_terms"]["common"]), 20, 0)),
+    Case("search_rare", lambda db, m, r: db.search(_pick(r, m["search_terms"]["rare"]), 20, 0)),
+    Case("search_prefix", lambda db, m, r: db.search(_pick(r, m["search_terms"]["prefix"]), 20, 0)),
+    Case("search_deep_page", lambda db, m, r: db.search(_pick(r, m["search_terms"]["common"]), 20, 200)),
+    Case("search_miss", lambda db, m, r: db.search(_pick(r, m["search_terms"]["miss"]), 20, 0)),
+    Case("search_count_common", lambda db, m, r: db.search_count(_pick(r, m["search_terms"]["common"]))),
+    Case("get_song_by_id", lambda db, m, r: db.get_song_by_id(_pick(r, m["songs"]["cold"]))),
+    Case("get_songs_by_ids", lambda db, m, r: db.get_songs_by_ids(
+        r.sample(m["songs"]["cold"], 20), _pick(r, m["users"]["hot"]))),
+    Case("recommendations_hot", lambda db, m, r: db.get_recommendations(_pick(r, m["users"]["hot"])), 0.2),
+    Case("recommendations_cold", lambda db, m, r: db.get_recommendations(_pick(r, m["users"]["cold"])), 0.2),
+    Case("list_favorites_hot", lambda db, m, r: db.list_favorites(_pick(r, m["users"]["hot"]))),
+    Case("list_favorites_cold", lambda db, m, r: db.list_favorites(_pick(r, m["users"]["cold"]))),
+    Case("rating_averages", lambda db, m, r: db.get_rating_averages(), 0.05),
+    Case("weekly_ranking", lambda db, m, r: db.get_weekly_ranking()),
+    Case("user_profile", lambda db, m, r: db.get_user_profile(_pick(r, m["users"]["cold"]))),
+    Case("list_playlist_songs_hot", lambda db, m, r: db.list_playlist_songs(_pick(r, m["playlists"]["hot"]))),
+    Case("followed_playlists", lambda db, m, r: db.list_followed_playlists(_pick(r, m["users"]["hot"]))),
+    Case("feed_hot", lambda db, m, r: db.get_feed(_pick(r, m["users"]["hot"]), 20)),
+    Case("artist_songs", lambda db, m, r: db.get_artist_songs(_pick(r, m["artists"]["hot"]))),
+    Case("album_songs", lambda db, m, r: db.get_album_songs(_pick(r, m["albums"]))),
+]
+
+
+@contextmanager
+def db_session(db: Any) -> Iterator[None]:
+    """
+    Run DB calls inside a bare Flask app context so they reuse one pooled connection, as
+    they would inside a request, instead of opening a connection per call.
+    """
+    from flask import Flask, g
+
+    with Flask("bench").app_context():
+        try:
+            yield
+        finally:
+            for attr, read in (("db_conn", False), ("db_read_conn", True)):
+                conn = g.pop(attr, None)
+                if conn is not None:
+                    db.release(conn, read=read)
+
+
+def _rows(result: Any) -> Optional[int]:
+    if isinstance(result, (list, tuple, dict)):
+        return len(result)
+    return None
+
+
+def explain(db: Any, statements: List[Any]) -> List[Dict[str, Any]]:
+    """EXPLAIN each captured SELECT and keep the fields that matter when reading a plan."""
+    summaries = []
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cur:
+            for sql, args in statements:
+                head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+                if head not in ("SELECT", "WITH"):
+                    continue
+                cur.execute("EXPLAIN " + sql.strip().rstrip(";"), args)
+                plan = [
+                    {
+                        "table": row.get("table"),
+                        "type": row.get("type"),
+                        "key": row.get("key"),
+                        "rows": row.get("rows"),
+                        "filtered": row.get("filtered"),
+                        "extra": row.get("Extra"),
+                    }
+                    for row in cur.fetchall()
+                ]
+                extras = " ".join(str(step["extra"] or "") for step in plan)
+                summaries.append({
+                    "statement": _statement_label(sql),
+                    "full_scans": [step["table"] for step in plan if step["type"] == "ALL"],
+                    "filesort": "filesort" in extras,
+                    "temporary": "temporary" in extras,
+                    "estimated_rows": sum(int(step["rows"] or 0) for step in plan),
+                    "plan": plan,
+                })
+    finally:
+        conn.close()
+    return summaries
+
+
+def _statement_label(sql: str) -> str:
+    from src import metrics
+
+    return metrics.known_statement(sql) or " ".join(sql.split())[:80]
+
+
+def run_case(db: Any, case: Case, manifest: Dict[str, Any], iterations: int, warmup: int, seed: int) -> Dict[str, Any]:
+    from src import metrics
+
+    rng = random.Random(f"{seed}:{case.name}")
+    n = max(3, int(iterations * case.weight))
+    for _ in range(min(warmup, n)):
+        case.call(db, manifest, rng)
+
+    latencies: List[float] = []
+    rows: List[int] = []
+    for _ in range(n):
+        start = time.perf_counter()
+        result = case.call(db, manifest, rng)
+        latencies.append((time.perf_counter() - start) * 1000)
+        count = _rows(result)
+        if count is not None:
+            rows.append(count)
+
+    with metrics.capture_statements() as statements:
+        case.call(db, manifest, rng)
+    return {
+        "iterations": n,
+        **latency_summary(latencies),
+        "rows_mean": round(sum(rows) / len(rows), 1) if rows else None,
+        "explain": explain(db, statements),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=os.getenv("BENCH_DB", "resonate_bench"))
+    parser.add_argument("--case", action="append", dest="cases", help="run only these cases")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="result file (default bench/results/dbbench-<db>-<commit>-<time>.json)")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.database)
+    os.environ["MYSQL_DB"] = args.database
+    os.environ.setdefault("SLOW_QUERY_MS", "0")
+    from src.db import get_db
+
+    db = get_db()
+    cases = [c for c in CASES if not args.cases or c.name in args.cases]
+    results: Dict[str, Any] = {}
+    with db_session(db):
+        for case in cases:
+            try:
+                results[case.name] = run_case(db, case, manifest, args.iterations, args.warmup, args.seed)
+            except Exception as e:
+                results[case.name] = {"error": repr(e)}
+                print(f"{case.name:<26} ERROR {e!r}")
+                continue
+            r = results[case.name]
+            scans = sorted({t for e in r["explain"] for t in e["full_scans"]})
+            print(
+                f"{case.name:<26} p50={r['p50_ms']:>8.2f}ms p95={r['p95_ms']:>8.2f}ms "
+                f"p99={r['p99_ms']:>8.2f}ms rows={r['rows_mean']} "
+                f"{'full scan: ' + ','.join(scans) if scans else ''}"
+            )
+
+    report = {
+        "meta": {
+            **base_meta(),
+            "database": args.database,
+            "plan": manifest.get("plan"),
+            "counts": manifest.get("counts"),
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    out = write_report("dbbench", args.database, report, args.out)
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Compare MySQL drivers (src.drivers) on the DB calls behind the widest endpoints.
+
+    python -m bench.drivers --database resonate_bench
+    python -m bench.drivers --database resonate_bench --driver pymysql --driver mysqlclient
+
+For every installed driver each case runs through the real DB method (dict rows, what the
+endpoint serializes) and, where it reads one statement, again through a tuple cursor to
+show how much of the time is row decoding and dict building. Reports p50/p95/p99 and
+decoded rows per second.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from .datagen import load_manifest
+from .dbbench import db_session
+from .results import base_meta, write_report
+from .stats import latency_summary
+
+
+@dataclass
+class Case:
+    name: str
+    call: Callable[[Any, Dict[str, Any], random.Random], Any]
+    # (sql file, params) for the tuple-cursor variant, when the call is a single statement.
+    raw: Optional[Callable[[Dict[str, Any], random.Random], tuple]] = None
+
+
+def _like(m: Dict[str, Any], r: random.Random) -> str:
+    return f"%{r.choice(m['search_terms']['common'])}%"
+
+
+CASES = [
+    Case("ratings_average", lambda db, m, r: db.get_rating_averages(),
+         lambda m, r: ("rating_averages.sql", None)),
+    Case("users", lambda db, m, r: db.list_users(), lambda m, r: ("list_users.sql", None)),
+    Case("search_page", lambda db, m, r: db.search(r.choice(m["search_terms"]["common"]), 100, 0),
+         lambda m, r: ("search.sql", (_like(m, r),) * 4 + (100, 0))),
+    Case("songs_batch", lambda db, m, r: db.get_songs_by_ids(r.sample(m["songs"]["cold"], 50), None)),
+    Case("playlist_songs", lambda db, m, r: db.list_playlist_songs(r.choice(m["playlists"]["hot"])),
+         lambda m, r: ("list_playlist_songs.sql", (r.choice(m["playlists"]["hot"]),))),
+]
+
+
+def _time(fn: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    rows = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+        rows += len(result[1] if isinstance(result, tuple) else result)
+    total_seconds = sum(latencies) / 1000
+    return {
+        "iterations": iterations,
+        **latency_summary(latencies),
+        "rows_per_call": round(rows / iterations, 1),
+        "rows_per_second": round(rows / total_seconds) if total_seconds else None,
+    }
+
+
+def run_driver(driver: Any, manifest: Dict[str, Any], cases: List[Case], iterations: int, seed: int) -> Dict[str, Any]:
+    from src.db import DB
+
+    db = DB(driver=driver)
+    db.connect()
+    results: Dict[str, Any] = {}
+    try:
+        with db_session(db):
+            for case in cases:
+                rng = random.Random(f"{seed}:{case.name}")
+                case.call(db, manifest, rng)
+                entry = {"dict": _time(lambda: case.call(db, manifest, rng), iterations)}
+                if case.raw is not None:
+                    entry["tuple"] = _time(lambda: db.fetch_tuples(*case.raw(manifest, rng)), iterations)
+                results[case.name] = entry
+                print(f"{driver.name:<12} {case.name:<16} " + "  ".join(
+                    f"{kind}: p50={r['p50_ms']:>7.2f}ms p95={r['p95_ms']:>7.2f}ms {r['rows_per_second'] or 0:>9,} rows/s"
+                    for kind, r in entry.items()
+                ))
+    finally:
+        db.close_pool()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=os.getenv("BENCH_DB", "resonate_bench"))
+    parser.add_argument("--driver", action="append", dest="drivers", help="default: every installed driver")
+    parser.add_argument("--case", action="append", dest="cases")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.database)
+    os.environ["MYSQL_DB"] = args.database
+    os.environ.setdefault("SLOW_QUERY_MS", "0")
+    # Playlist reads are cached in-process; the driver comparison wants the query every time.
+    os.environ["PLAYLIST_CACHE_SIZE"] = "0"
+    from src.drivers import available_drivers, get_driver
+
+    drivers = {name: get_driver(name) for name in args.drivers} if args.drivers else available_drivers()
+    cases = [c for c in CASES if not args.cases or c.name in args.cases]
+    results = {name: run_driver(driver, manifest, cases, args.iterations, args.seed) for name, driver in drivers.items()}
+
+    report = {
+        "meta": {**base_meta(), "database": args.database, "iterations": args.iterations, "drivers": list(drivers)},
+        "results": results,
+    }
+    out = write_report("drivers", args.database, report, args.out)
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Small stdlib-only HTTP load client shared by the benchmark tools."""
+from __future__ import annotations
+
+import http.client
+import json
+import multiprocessing
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+from .stats import latency_summary
+
+
+@dataclass
+class RunResult:
+    duration: float
+    requests: int = 0
+    errors: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+
+    def merge(self, other: "RunResult") -> None:
+        self.requests += other.requests
+        self.errors += other.errors
+        self.latencies_ms.extend(other.latencies_ms)
+
+    def summary(self) -> Dict[str, Any]:
+        ok = self.requests - self.errors
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0.0,
+            "rps": round(ok / self.duration, 1) if self.duration else 0.0,
+            **latency_summary(self.latencies_ms),
+        }
+
+
+class Client:
+    """One keep-alive connection; reconnects after errors."""
+
+    def __init__(self, base_url: str, timeout: float = 10.0) -> None:
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> int:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        payload = None
+        all_headers = dict(headers or {})
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            all_headers["Content-Type"] = "application/json"
+        try:
+            self._conn.request(method, path, body=payload, headers=all_headers)
+            response = self._conn.getresponse()
+            response.read()
+            return response.status
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _closed_loop_threads(base_url: str, paths: Sequence[str], duration: float, threads: int) -> RunResult:
+    result = RunResult(duration=duration)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(offset: int) -> None:
+        client = Client(base_url)
+        local = RunResult(duration=duration)
+        i = offset
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                status = client.request("GET", path)
+                failed = status >= 500
+            except Exception:
+                failed = True
+            local.latencies_ms.append((time.perf_counter() - start) * 1000)
+            local.requests += 1
+            local.errors += int(failed)
+        client.close()
+        with lock:
+            result.merge(local)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return result
+
+
+def _process_entry(args: tuple) -> RunResult:
+    return _closed_loop_threads(*args)
+
+
+def run_closed_loop(
+    base_url: str,
+    paths: Sequence[str],
+    duration: float,
+    concurrency: int,
+    processes: int = 1,
+) -> RunResult:
+    """
+    Keep `concurrency` requests in flight for `duration` seconds, cycling through `paths`.
+    Client work is spread over `processes` so the GIL doesn't cap the measured rate.
+    """
+    processes = max(1, min(processes, concurrency))
+    per_process = [concurrency // processes + (1 if n < concurrency % processes else 0) for n in range(processes)]
+    total = RunResult(duration=duration)
+    if processes == 1:
+        total.merge(_closed_loop_threads(base_url, paths, duration, concurrency))
+        return total
+    with multiprocessing.Pool(processes) as pool:
+        for part in pool.map(_process_entry, [(base_url, paths, duration, n) for n in per_process]):
+            total.merge(part)
+    return total
+
+
+def wait_until_healthy(base_url: str, path: str = "/health/db", timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    client = Client(base_url, timeout=2.0)
+    while time.monotonic() < deadline:
+        try:
+            if client.request("GET", path) == 200:
+                client.close()
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{base_url}{path} did not become healthy within {timeout}s")
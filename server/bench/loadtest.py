@@ -0,0 +1,306 @@
+"""
+HTTP load test with a production-like traffic mix and a stepped arrival rate.
+
+    python -m bench.loadtest --url http://127.0.0.1:8080 --database resonate_bench \\
+        --rates 10 20 40 80 160 320 --stage-seconds 30
+
+Requests arrive open-loop (Poisson at the stage's rate, plus periodic login bursts), so a
+slow server shows up as latency instead of quietly lowering the offered load; latency is
+measured from each request's scheduled start. Ids and search terms come from the dataset
+manifest written by bench.datagen, so point the server at that database.
+
+For every stage the report gives throughput, p50/p95/p99 and error rate per endpoint, and
+at the end the saturation knee: the last rate before p99 blew past --knee-p99-factor x the
+first stage's p99, errors exceeded --knee-error-rate, or throughput fell behind the offered
+rate.
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from .datagen import load_manifest
+from .http import Client, wait_until_healthy
+from .results import base_meta, write_report
+from .stats import latency_summary
+
+Request = Tuple[str, str, Optional[Dict[str, Any]], Dict[str, str]]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    weight: float
+    build: Callable[[random.Random, Dict[str, Any]], Request]
+
+
+def _uid(r: random.Random, m: Dict[str, Any]) -> int:
+    # Active users generate most traffic.
+    return r.choice(m["users"]["hot"] if r.random() < 0.6 else m["users"]["cold"])
+
+
+def _sid(r: random.Random, m: Dict[str, Any]) -> str:
+    return r.choice(m["songs"]["hot"] if r.random() < 0.7 else m["songs"]["cold"])
+
+
+def _term(r: random.Random, m: Dict[str, Any]) -> str:
+    kind = r.choices(("common", "rare", "prefix", "miss"), (60, 20, 15, 5))[0]
+    return r.choice(m["search_terms"][kind])
+
+
+def _user_headers(uid: int) -> Dict[str, str]:
+    return {"X-User-Id": str(uid)}
+
+
+ENDPOINTS = {
+    "search": Endpoint("search", 30, lambda r, m: (
+        "GET", f"/search?q={quote(_term(r, m))}&page={r.choice((1, 1, 1, 2, 3))}", None, _user_headers(_uid(r, m)))),
+    "song": Endpoint("song", 15, lambda r, m: ("GET", f"/songs/{_sid(r, m)}", None, _user_headers(_uid(r, m)))),
+    "profile": Endpoint("profile", 8, lambda r, m: ("GET", f"/users/{_uid(r, m)}", None, {})),
+    "favorites": Endpoint("favorites", 8, lambda r, m: ("GET", f"/users/{_uid(r, m)}/favorites", None, {})),
+    "playlist": Endpoint("playlist", 8, lambda r, m: (
+        "GET", f"/playlists/{r.choice(m['playlists']['hot'] or [1])}", None, {})),
+    "feed": Endpoint("feed", 6, lambda r, m: ("GET", f"/users/{_uid(r, m)}/feed?limit=20", None, {})),
+    "ranking": Endpoint("ranking", 6, lambda r, m: ("GET", "/weekly-ranking", None, {})),
+    "favorite": Endpoint("favorite", 6, lambda r, m: (
+        "POST", "/favorites", {"uid": _uid(r, m), "sid": _sid(r, m)}, {})),
+    "rate": Endpoint("rate", 5, lambda r, m: (
+        "POST", f"/songs/{_sid(r, m)}/rate", {"uid": _uid(r, m), "rate_value": r.randint(1, 5)}, {})),
+    "playlist_add": Endpoint("playlist_add", 4, lambda r, m: (
+        "POST", f"/playlists/{r.choice(m['playlists']['cold'] or [1])}/songs", {"sid": _sid(r, m)}, {})),
+    "login": Endpoint("login", 4, lambda r, m: (
+        "POST", "/auth/login", {"email": f"user{_uid(r, m)}@bench.test", "password": m["password"]}, {})),
+}
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """'search=40,song=20,login=5' -> weights; unspecified endpoints are left out."""
+    if not spec:
+        return {name: e.weight for name, e in ENDPOINTS.items()}
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def schedule(
+    rng: random.Random,
+    manifest: Dict[str, Any],
+    mix: Dict[str, float],
+    rate: float,
+    duration: float,
+    burst_size: int,
+    burst_every: float,
+) -> List[Tuple[float, str, Request]]:
+    """Arrival times (seconds from stage start) with the request to send at each."""
+    names, weights = list(mix), list(mix.values())
+    arrivals = []
+    t = rng.expovariate(rate) if rate > 0 else duration
+    while t < duration:
+        name = rng.choices(names, weights)[0]
+        arrivals.append((t, name, ENDPOINTS[name].build(rng, manifest)))
+        t += rng.expovariate(rate)
+    if burst_size and burst_every:
+        t = burst_every / 2
+        while t < duration:
+            for _ in range(burst_size):
+                arrivals.append((t + rng.random() * 0.2, "login", ENDPOINTS["login"].build(rng, manifest)))
+            t += burst_every
+    arrivals.sort(key=lambda a: a[0])
+    return arrivals
+
+
+def _run_stage_process(args: Tuple) -> Dict[str, List[Tuple[float, int]]]:
+    base_url, manifest, mix, rate, duration, seed, max_in_flight, burst_size, burst_every = args
+    arrivals = schedule(random.Random(seed), manifest, mix, rate, duration, burst_size, burst_every)
+    samples: Dict[str, List[Tuple[float, int]]] = {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(scheduled: float, name: str, req: Request) -> None:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = Client(base_url)
+        method, path, body, headers = req
+        try:
+            status = client.request(method, path, body=body, headers=headers)
+        except Exception:
+            status = 0
+        latency_ms = (time.monotonic() - scheduled) * 1000
+        with lock:
+            samples.setdefault(name, []).append((latency_ms, status))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        start = time.monotonic()
+        futures = []
+        for offset, name, req in arrivals:
+            due = start + offset
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(send, due, name, req))
+        wait(futures)
+    return samples
+
+
+def _summarize(samples: List[Tuple[float, int]], seconds: float) -> Dict[str, Any]:
+    errors = sum(1 for _, status in samples if status == 0 or status >= 500)
+    rejected = sum(1 for _, status in samples if 400 <= status < 500)
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / seconds, 2) if seconds else 0.0,
+        "errors": errors,
+        "rejected_4xx": rejected,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        **latency_summary(latency for latency, _ in samples),
+    }
+
+
+def run_stage(
+    base_url: str,
+    manifest: Dict[str, Any],
+    mix: Dict[str, float],
+    rate: float,
+    duration: float,
+    processes: int,
+    max_in_flight: int,
+    burst_size: int,
+    burst_every: float,
+    seed: int,
+) -> Dict[str, Any]:
+    # Client load is split across processes so the generator itself isn't GIL-bound.
+    jobs = [
+        (base_url, manifest, mix, rate / processes, duration, f"{seed}:{rate}:{n}",
+         max(1, max_in_flight // processes), burst_size if n == 0 else 0, burst_every)
+        for n in range(processes)
+    ]
+    start = time.monotonic()
+    if processes == 1:
+        parts = [_run_stage_process(jobs[0])]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            parts = pool.map(_run_stage_process, jobs)
+    elapsed = max(time.monotonic() - start, duration)
+
+    merged: Dict[str, List[Tuple[float, int]]] = {}
+    for part in parts:
+        for name, samples in part.items():
+            merged.setdefault(name, []).extend(samples)
+    everything = [s for samples in merged.values() for s in samples]
+    return {
+        "offered_rps": rate,
+        "seconds": round(elapsed, 1),
+        "overall": _summarize(everything, elapsed),
+        "endpoints": {name: _summarize(samples, elapsed) for name, samples in sorted(merged.items())},
+    }
+
+
+def find_knee(
+    stages: List[Dict[str, Any]],
+    key: Optional[str],
+    p99_factor: float,
+    max_error_rate: float,
+    min_efficiency: float,
+) -> Dict[str, Any]:
+    """Last healthy offered rate for the whole mix (key=None) or one endpoint."""
+    def stats(stage: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return stage["overall"] if key is None else stage["endpoints"].get(key)
+
+    baseline = next((stats(s) for s in stages if stats(s) and stats(s)["requests"]), None)
+    if baseline is None:
+        return {"knee_rps": None, "reason": "no samples"}
+    last_ok = None
+    for stage in stages:
+        s = stats(stage)
+        if not s or not s["requests"]:
+            continue
+        reasons = []
+        if s["p99_ms"] > p99_factor * max(baseline["p99_ms"], 1.0):
+            reasons.append(f"p99 {s['p99_ms']:.0f}ms > {p99_factor:g}x baseline {baseline['p99_ms']:.0f}ms")
+        if s["error_rate"] > max_error_rate:
+            reasons.append(f"error rate {s['error_rate']:.1%}")
+        overall = stage["overall"]
+        if overall["rps"] < min_efficiency * stage["offered_rps"]:
+            reasons.append(f"throughput {overall['rps']:.0f}/{stage['offered_rps']:g} rps")
+        if reasons:
+            return {"knee_rps": last_ok, "saturated_at_rps": stage["offered_rps"], "reason": "; ".join(reasons)}
+        last_ok = stage["offered_rps"]
+    return {"knee_rps": None, "reason": f"not saturated up to {last_ok:g} rps"}
+
+
+def _print_stage(stage: Dict[str, Any], slo_p99_ms: float, slo_error_rate: float) -> None:
+    o = stage["overall"]
+    print(f"\n== offered {stage['offered_rps']:g} rps: achieved {o['rps']:.1f} rps, "
+          f"p50={o['p50_ms']:.1f} p95={o['p95_ms']:.1f} p99={o['p99_ms']:.1f}ms errors={o['error_rate']:.2%}")
+    for name, s in stage["endpoints"].items():
+        slo = "ok" if s["p99_ms"] <= slo_p99_ms and s["error_rate"] <= slo_error_rate else "SLO MISS"
+        print(f"   {name:<14} {s['rps']:>8.1f} rps  p50={s['p50_ms']:>8.1f}  p95={s['p95_ms']:>8.1f}  "
+              f"p99={s['p99_ms']:>8.1f}ms  err={s['error_rate']:.2%}  4xx={s['rejected_4xx']:<5} {slo}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--database", default="resonate_bench", help="dataset whose manifest supplies ids")
+    parser.add_argument("--mix", help="endpoint weights, e.g. search=40,song=20,favorite=5 (default: built-in mix)")
+    parser.add_argument("--rates", type=float, nargs="+", default=[10, 20, 40, 80, 160, 320])
+    parser.add_argument("--stage-seconds", type=float, default=30)
+    parser.add_argument("--processes", type=int, default=max(1, (multiprocessing.cpu_count() or 2) // 2))
+    parser.add_argument("--max-in-flight", type=int, default=512)
+    parser.add_argument("--login-burst", type=int, default=20, help="logins per burst (0 disables bursts)")
+    parser.add_argument("--login-burst-every", type=float, default=15.0, help="seconds between bursts")
+    parser.add_argument("--slo-p99-ms", type=float, default=500)
+    parser.add_argument("--slo-error-rate", type=float, default=0.01)
+    parser.add_argument("--knee-p99-factor", type=float, default=3.0)
+    parser.add_argument("--knee-error-rate", type=float, default=0.01)
+    parser.add_argument("--knee-efficiency", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.database)
+    mix = parse_mix(args.mix)
+    wait_until_healthy(args.url)
+
+    stages = []
+    for rate in args.rates:
+        stage = run_stage(
+            args.url, manifest, mix, rate, args.stage_seconds, args.processes, args.max_in_flight,
+            args.login_burst, args.login_burst_every, args.seed,
+        )
+        stages.append(stage)
+        _print_stage(stage, args.slo_p99_ms, args.slo_error_rate)
+
+    knees = {"overall": find_knee(stages, None, args.knee_p99_factor, args.knee_error_rate, args.knee_efficiency)}
+    for name in mix:
+        knees[name] = find_knee(stages, name, args.knee_p99_factor, args.knee_error_rate, args.knee_efficiency)
+    print("\nSaturation knee (last healthy offered rate):")
+    for name, knee in knees.items():
+        print(f"   {name:<14} {knee['knee_rps'] if knee['knee_rps'] is not None else '-':>8}  {knee['reason']}")
+
+    report = {
+        "meta": {**base_meta(), "url": args.url, "database": args.database, "mix": mix,
+                 "stage_seconds": args.stage_seconds, "login_burst": [args.login_burst, args.login_burst_every],
+                 "slo": {"p99_ms": args.slo_p99_ms, "error_rate": args.slo_error_rate}},
+        "stages": stages,
+        "knees": knees,
+    }
+    out = write_report("loadtest", args.database, report, args.out)
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
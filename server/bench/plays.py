@@ -0,0 +1,196 @@
+"""
+Sustained throughput of play-event ingestion (POST /events/plays) and of the aggregator.
+
+    python -m bench.plays --threads 8 --batch 100 --duration 30
+    python -m bench.plays --database resonate_bench --aggregate
+    python -m bench.plays --url http://127.0.0.1:8080 --database resonate_bench --threads 32
+
+Without --url, threads append batches straight to a PlayLog in a scratch directory, which
+is the endpoint's whole write path minus HTTP; segments seal at the
+configured PLAYS_SEGMENT_BYTES/PLAYS_SEGMENT_SECONDS as they would in a worker. With
+--aggregate (needs --database) the sealed segments are then folded into MySQL by one
+PlayAggregator.run_once, timed separately. With --url, the same batches are POSTed with
+keep-alive connections and the server's own aggregator picks them up.
+
+Song and user ids come from the bench.datagen manifest when --database is given, otherwise
+they are synthetic (fine for the log-only run, which never looks them up).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .http import Client
+from .results import base_meta, write_report
+from .stats import latency_summary
+
+Ids = Tuple[List[int], List[str]]
+
+
+def load_ids(database: Optional[str]) -> Ids:
+    if not database:
+        return list(range(1, 10_001)), [f"bench{n:017d}" for n in range(50_000)]
+    from .datagen import load_manifest
+    manifest = load_manifest(database)
+    return (
+        manifest["users"]["hot"] + manifest["users"]["cold"],
+        manifest["songs"]["hot"] + manifest["songs"]["cold"],
+    )
+
+
+def make_batch(rng: random.Random, sids: List[str], size: int) -> List[Dict[str, Any]]:
+    now = int(time.time())
+    return [
+        {"sid": rng.choice(sids), "played_at": now - rng.randint(0, 3600), "ms_played": rng.randint(5_000, 300_000)}
+        for _ in range(size)
+    ]
+
+
+def run_threads(threads: int, duration: float, work: Callable[[random.Random], int]) -> Dict[str, Any]:
+    """Call work(rng) in a loop on each thread; it returns events sent (0 on error)."""
+    lock = threading.Lock()
+    totals = {"batches": 0, "events": 0, "errors": 0}
+    latencies: List[float] = []
+    deadline = time.monotonic() + duration
+
+    def loop(seed: int) -> None:
+        rng = random.Random(seed)
+        local: List[float] = []
+        batches = events = errors = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            sent = work(rng)
+            local.append((time.perf_counter() - started) * 1000)
+            batches += 1
+            events += sent
+            errors += sent == 0
+        with lock:
+            totals["batches"] += batches
+            totals["events"] += events
+            totals["errors"] += errors
+            latencies.extend(local)
+
+    started = time.monotonic()
+    workers = [threading.Thread(target=loop, args=(seed,)) for seed in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.monotonic() - started
+    return {
+        **totals,
+        "seconds": round(elapsed, 2),
+        "events_per_s": round(totals["events"] / elapsed, 1),
+        "batch_latency": latency_summary(latencies),
+    }
+
+
+def bench_log(args: argparse.Namespace, ids: Ids, directory: Path) -> Dict[str, Any]:
+    from src.plays import PlayLog, parse_plays
+
+    uids, sids = ids
+    log = PlayLog(directory)
+    log.start()
+
+    def work(rng: random.Random) -> int:
+        plays = parse_plays(make_batch(rng, sids, args.batch))
+        log.append(rng.choice(uids), plays)
+        return len(plays)
+
+    try:
+        result = run_threads(args.threads, args.duration, work)
+    finally:
+        log.stop()
+    segments = list(directory.glob("plays-*.seg"))
+    result["mb_per_s"] = round(sum(p.stat().st_size for p in segments) / result["seconds"] / 1e6, 2)
+    result["segments"] = len(segments)
+    return result
+
+
+def bench_aggregate(directory: Path) -> Dict[str, Any]:
+    from src.db import get_db
+    from src.plays import PlayAggregator
+
+    started = time.perf_counter()
+    segments, events = PlayAggregator(get_db(), directory).run_once()
+    seconds = time.perf_counter() - started
+    return {
+        "segments": segments,
+        "events": events,
+        "seconds": round(seconds, 2),
+        "events_per_s": round(events / seconds, 1) if seconds else None,
+    }
+
+
+def bench_http(args: argparse.Namespace, ids: Ids) -> Dict[str, Any]:
+    uids, sids = ids
+    clients = threading.local()
+
+    def work(rng: random.Random) -> int:
+        client = getattr(clients, "client", None)
+        if client is None:
+            client = clients.client = Client(args.url)
+        try:
+            status = client.request(
+                "POST", "/events/plays", {"plays": make_batch(rng, sids, args.batch)},
+                {"X-User-Id": str(rng.choice(uids))},
+            )
+        except Exception:
+            return 0
+        return args.batch if status == 202 else 0
+
+    return run_threads(args.threads, args.duration, work)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="POST to a running server instead of appending in-process")
+    parser.add_argument("--database", default=os.getenv("BENCH_DB"), help="dataset for ids, and for --aggregate")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=100, help="plays per request")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--aggregate", action="store_true", help="fold the written segments into MySQL afterwards")
+    parser.add_argument("--out", help="result file (default bench/results/plays-<label>-<commit>-<time>.json)")
+    args = parser.parse_args(argv)
+    if args.aggregate and (args.url or not args.database):
+        parser.error("--aggregate needs --database and no --url")
+
+    if args.database:
+        os.environ["MYSQL_DB"] = args.database
+    ids = load_ids(args.database)
+    report: Dict[str, Any] = {
+        "meta": {**base_meta(), "database": args.database, "url": args.url,
+                 "threads": args.threads, "batch": args.batch, "duration": args.duration},
+    }
+    if args.url:
+        report["http"] = r = bench_http(args, ids)
+        print(f"http  {r['events_per_s']:>12} events/s  p99={r['batch_latency']['p99_ms']}ms  errors={r['errors']}")
+    else:
+        directory = Path(tempfile.mkdtemp(prefix="bench-plays-"))
+        try:
+            report["log"] = r = bench_log(args, ids, directory)
+            print(
+                f"log   {r['events_per_s']:>12} events/s  {r['mb_per_s']} MB/s  "
+                f"p99={r['batch_latency']['p99_ms']}ms  segments={r['segments']}"
+            )
+            if args.aggregate:
+                report["aggregate"] = r = bench_aggregate(directory)
+                print(f"aggr  {r['events_per_s']:>12} events/s  {r['segments']} segment(s) in {r['seconds']}s")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    out = write_report("plays", "http" if args.url else "log", report, args.out)
+    print(f"Report written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
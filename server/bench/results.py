@@ -0,0 +1,42 @@
+"""Where benchmark reports go, and the metadata every report carries."""
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def base_meta() -> Dict[str, Any]:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "host": platform.node(),
+    }
+
+
+def write_report(kind: str, label: str, report: Dict[str, Any], out: Optional[str] = None) -> Path:
+    """Write to `out`, or bench/results/<kind>-<label>-<commit>-<time>.json."""
+    if out:
+        path = Path(out)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        commit = report.get("meta", {}).get("commit") or "nogit"
+        path = RESULTS_DIR / f"{kind}-{label}-{commit}-{stamp}.json"
+    path.write_text(json.dumps(report, indent=2, default=str))
+    return path
@@ -0,0 +1,99 @@
+"""
+Deployment sizing: requests/sec as the number of gunicorn workers grows.
+
+    python -m bench.sizing --workers 1 2 4 8 --path /health/db --path /weekly-ranking
+
+For each worker count this starts `gunicorn -c gunicorn.conf.py src.wsgi:app` on a spare
+port, waits for /health/db, applies a closed-loop load proportional to the worker count,
+stops the server with SIGTERM (exercising the graceful drain), and prints one row per run.
+Run the database on the same box you size, and the client elsewhere if cores are scarce.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from .http import run_closed_loop, wait_until_healthy
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+
+def start_server(workers: int, threads: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "WEB_THREADS": str(threads),
+        "RUN_STARTUP_TASKS": env.get("RUN_STARTUP_TASKS", "0"),
+        # One client address would hit the anonymous rate limit; measure the server, not the limiter.
+        "ADMISSION": env.get("ADMISSION", "0"),
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "src.wsgi:app"],
+        cwd=SERVER_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def stop_server(proc: subprocess.Popen, timeout: float = 40.0) -> None:
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 8])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--path", action="append", dest="paths", help="endpoint(s) to request, cycled")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--concurrency-per-worker", type=int, default=8)
+    parser.add_argument("--client-processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or ["/health/db"]
+    base_url = f"http://127.0.0.1:{args.port}"
+    rows = []
+    for workers in args.workers:
+        proc = start_server(workers, args.threads, args.port)
+        try:
+            wait_until_healthy(base_url)
+            concurrency = workers * args.concurrency_per_worker
+            if args.warmup:
+                run_closed_loop(base_url, paths, args.warmup, concurrency, args.client_processes)
+            result = run_closed_loop(base_url, paths, args.duration, concurrency, args.client_processes)
+        finally:
+            stop_server(proc)
+        row = {"workers": workers, "threads": args.threads, "concurrency": concurrency, **result.summary()}
+        rows.append(row)
+        print(
+            f"workers={workers:<3} threads={args.threads:<3} conc={concurrency:<4} "
+            f"rps={row['rps']:<9} p50={row['p50_ms']}ms p99={row['p99_ms']}ms errors={row['errors']}"
+        )
+        time.sleep(1)
+
+    base = rows[0]["rps"] if rows and rows[0]["rps"] else None
+    for row in rows:
+        row["speedup"] = round(row["rps"] / base, 2) if base else None
+    if args.out:
+        Path(args.out).write_text(json.dumps({"paths": paths, "cpu_count": os.cpu_count(), "runs": rows}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
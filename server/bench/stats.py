@@ -0,0 +1,23 @@
+"""Percentile helpers shared by the benchmark tools."""
+from __future__ import annotations
+
+from typing import Dict, Iterable, Sequence
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence (0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return float(sorted_values[min(rank, len(sorted_values) - 1)])
+
+
+def latency_summary(latencies_ms: Iterable[float]) -> Dict[str, float]:
+    ordered = sorted(latencies_ms)
+    return {
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
@@ -0,0 +1,54 @@
+"""
+Gunicorn settings for the production server:
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+
+or, with the asyncio endpoints (src/asgi.py):
+
+    WEB_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py src.asgi:app
+
+Every knob can be overridden from the environment; see "Production server" in README.md.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1)))
+worker_class = os.getenv("WEB_WORKER_CLASS", "gthread")
+threads = int(os.getenv("WEB_THREADS", "4"))
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+# On SIGTERM workers stop accepting and get this long to finish in-flight requests.
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "0"))
+# Workers must import the app themselves so pools and schedulers are created post-fork.
+preload_app = False
+accesslog = os.getenv("WEB_ACCESS_LOG", None)
+# Startup tasks belong to the master (on_starting). Workers inherit this environment, so
+# they never repeat them, and migrations never run concurrently.
+os.environ["WORKER_STARTUP_TASKS"] = "0"
+
+
+def on_starting(server):
+    """Create/migrate the schema once, in the master, before any worker starts."""
+    if os.getenv("RUN_STARTUP_TASKS", "1") != "1":
+        return
+    from src.app import connect_db, run_startup_tasks
+
+    run_startup_tasks(connect_db())
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %s forked; it builds its own DB pool and scheduler", worker.pid)
+
+
+def worker_exit(server, worker):
+    """Runs after the worker drained its requests: stop jobs and close pooled connections."""
+    app = getattr(worker, "wsgi", None)
+    if app is None or not hasattr(app, "extensions"):
+        # ASGI workers clean up in the app's lifespan shutdown instead.
+        return
+    from src.app import shutdown_app
+
+    shutdown_app(app)
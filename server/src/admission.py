@@ -0,0 +1,249 @@
+"""
+Admission control for the Flask app: which requests run, in what order they get DB
+connections, and which are turned away when a worker is overloaded. On by default;
+ADMISSION=0 turns it off.
+
+Every request gets a tier: "vip" (an unexpired vip_users row), "member" (any other
+identified user) or "anonymous". Identity is the same unverified uid the routes use:
+X-User-Id, "uid" in a JSON body, or a <uid> in the path. Then, in order:
+
+- Rate limit: a token bucket per user (per client address for anonymous requests) with
+  the tier's ADMISSION_RATES. An empty bucket is answered 429 with Retry-After.
+- Expensive endpoints (ADMISSION_EXPENSIVE) share ADMISSION_EXPENSIVE_LIMIT slots. A
+  non-VIP request for one is shed at once (503) when the slots are full or requests are
+  already waiting for DB connections, so cheap requests keep getting through.
+- Concurrency: each tier may have ADMISSION_LIMITS requests in flight in this worker.
+  Past that a request waits up to ADMISSION_QUEUE_MS in the tier's queue, then gets 503.
+- DB pool checkout is by tier priority (ConnectionPool priorities): VIP first.
+
+VIP status is never queried per request. VipCache holds the set of VIP uids, reloaded
+every ADMISSION_VIP_REFRESH_SECONDS; a promotion on this worker applies at once, on
+other workers after their next reload.
+
+Limits are per worker process. Under src/asgi.py the routes it serves natively are
+admitted by its admit_native middleware against the same Admission as the Flask app.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
+
+TIERS = ("vip", "member", "anonymous")
+# Pool checkout priority per tier; lower is served first.
+PRIORITIES = {"vip": 0, "member": 1, "anonymous": 2}
+
+_THREADS = int(os.getenv("WEB_THREADS", "4"))
+
+
+def parse_tiers(name: str, default: str) -> Dict[str, str]:
+    """'vip=50:100,member=20:40' -> {"vip": "50:100", ...}; ValueError names the variable."""
+    spec = os.getenv(name, default)
+    values = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        tier, _, value = part.partition("=")
+        if tier not in TIERS or not value:
+            raise ValueError(f"{name}: expected tier=value for tiers {', '.join(TIERS)}, got {part!r}")
+        values[tier] = value
+    return values
+
+
+ADMISSION = os.getenv("ADMISSION", "1") == "1"
+# Concurrent requests per tier in one worker; 0 means no limit. The defaults leave member
+# and anonymous traffic short of the worker's threads so VIP requests find room.
+ADMISSION_LIMITS = {
+    tier: int(value)
+    for tier, value in parse_tiers(
+        "ADMISSION_LIMITS", f"vip=0,member={max(_THREADS - 1, 1)},anonymous={max(_THREADS // 2, 1)}"
+    ).items()
+}
+# Token bucket per tier: refill rate (requests/s) and burst; a rate of 0 means no limit.
+ADMISSION_RATES = {
+    tier: (float(rate), float(burst or rate))
+    for tier, (rate, _, burst) in (
+        (tier, value.partition(":"))
+        for tier, value in parse_tiers("ADMISSION_RATES", "vip=50:100,member=20:40,anonymous=10:20").items()
+    )
+}
+ADMISSION_QUEUE_MS = int(os.getenv("ADMISSION_QUEUE_MS", "250"))
+# URL rules, as Flask registers them.
+ADMISSION_EXPENSIVE: FrozenSet[str] = frozenset(filter(None, os.getenv(
+    "ADMISSION_EXPENSIVE", "/search,/ratings/average,/recommendations/<int:uid>"
+).split(",")))
+ADMISSION_EXPENSIVE_LIMIT = int(os.getenv("ADMISSION_EXPENSIVE_LIMIT", str(max(_THREADS // 2, 1))))
+ADMISSION_VIP_REFRESH_SECONDS = float(os.getenv("ADMISSION_VIP_REFRESH_SECONDS", "60"))
+# Clients with a token bucket; the least recently seen are forgotten past this.
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "100000"))
+# Never limited or shed: probes, scrapes and the profiler switch.
+EXEMPT_RULES = frozenset({"/health/db", "/metrics", "/admin/profiling"})
+
+
+class VipCache:
+    """The set of VIP uids, reloaded in the background."""
+
+    def __init__(self, db: Any) -> None:
+        self._db = db
+        self._uids: Set[int] = set()
+        self._loaded = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __contains__(self, uid: int) -> bool:
+        return uid in self._uids
+
+    def __len__(self) -> int:
+        return len(self._uids)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="vip-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def reload(self) -> None:
+        self._uids = self._db.get_active_vip_uids()
+        self._loaded = True
+
+    def add(self, uid: int) -> None:
+        self._uids = self._uids | {uid}
+
+    def _run(self) -> None:
+        # Until the first load succeeds everyone is treated as non-VIP, so retry quickly.
+        while True:
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"VIP cache reload failed: {e}")
+            if self._stop.wait(ADMISSION_VIP_REFRESH_SECONDS if self._loaded else 5):
+                return
+
+
+class TokenBuckets:
+    """Token bucket per client key, bounded to the most recently seen ADMISSION_MAX_CLIENTS."""
+
+    def __init__(self, max_clients: int = ADMISSION_MAX_CLIENTS) -> None:
+        self._max_clients = max_clients
+        # key -> (tokens, updated_at)
+        self._buckets: "OrderedDict[Tuple[str, Any], Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: Tuple[str, Any], rate: float, burst: float, now: Optional[float] = None) -> float:
+        """Take one token; returns 0 on success, else seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self._max_clients:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+@dataclass
+class Ticket:
+    tier: str
+    expensive: bool
+    waited: float  # seconds spent in the tier's queue
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Admission:
+    """One worker's tier gates, expensive-endpoint slots and rate limits."""
+
+    def __init__(self, db: Any, vips: Optional[VipCache] = None) -> None:
+        self._db = db
+        self.vips = vips if vips is not None else VipCache(db)
+        self.buckets = TokenBuckets()
+        self._cond = threading.Condition()
+        self._in_flight = {tier: 0 for tier in TIERS}
+        self._queued = {tier: 0 for tier in TIERS}
+        self._expensive = 0
+
+    def start(self) -> None:
+        self.vips.start()
+
+    def stop(self) -> None:
+        self.vips.stop()
+
+    def tier_of(self, uid: Optional[int]) -> str:
+        if uid is None:
+            return "anonymous"
+        return "vip" if uid in self.vips else "member"
+
+    def admit(self, tier: str, client: Any, rule: Optional[str]) -> Ticket:
+        """Ticket to pass to release(), or Rejected(status, reason, retry_after)."""
+        rate, burst = ADMISSION_RATES.get(tier, (0.0, 0.0))
+        if rate > 0:
+            wait = self.buckets.take((tier, client), rate, burst)
+            if wait:
+                raise Rejected(429, "rate_limit", wait)
+
+        expensive = rule in ADMISSION_EXPENSIVE
+        pool_busy = expensive and tier != "vip" and self._db.pool_waiting() > 0
+        with self._cond:
+            if expensive and tier != "vip" and (pool_busy or self._expensive >= ADMISSION_EXPENSIVE_LIMIT):
+                raise Rejected(503, "expensive", 1)
+            limit = ADMISSION_LIMITS.get(tier, 0)
+            started = time.monotonic()
+            deadline = started + ADMISSION_QUEUE_MS / 1000
+            self._queued[tier] += 1
+            try:
+                # VIP expensive requests queue for a slot instead of being shed.
+                while (limit and self._in_flight[tier] >= limit) or (
+                    expensive and self._expensive >= ADMISSION_EXPENSIVE_LIMIT
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Rejected(503, "queue_timeout", 1)
+                    self._cond.wait(remaining)
+            finally:
+                self._queued[tier] -= 1
+            self._in_flight[tier] += 1
+            self._expensive += expensive
+        return Ticket(tier, expensive, time.monotonic() - started)
+
+    def release(self, ticket: Ticket) -> None:
+        with self._cond:
+            self._in_flight[ticket.tier] -= 1
+            self._expensive -= ticket.expensive
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "in_flight": dict(self._in_flight),
+                "queued": dict(self._queued),
+                "limits": {tier: ADMISSION_LIMITS.get(tier, 0) for tier in TIERS},
+                "expensive_in_flight": self._expensive,
+                "expensive_limit": ADMISSION_EXPENSIVE_LIMIT,
+                "vip_users": len(self.vips),
+                "clients": len(self.buckets),
+            }
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
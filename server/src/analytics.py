@@ -0,0 +1,207 @@
+"""
+Columnar analytics backend, used when DB_BACKEND=duckdb.
+
+The aggregate reads (/ratings/average, /weekly-ranking) scan every rating or favorite,
+which is the wrong shape for the OLTP primary. With this backend a scheduler job exports
+songs, album credits, favorites and ratings from one consistent MySQL snapshot to Parquet
+under ANALYTICS_DIR, and those endpoints query the newest export with DuckDB instead.
+Writes and per-user reads stay on MySQL.
+
+Layout of ANALYTICS_DIR:
+
+    snapshot-20250106T000500/{songs,song_artists,favorites,ratings}.parquet
+    current.json        {"snapshot": "snapshot-...", "as_of": "2025-01-06T00:05:00.123456+00:00"}
+
+`as_of` is the primary's UTC clock just before the snapshot was opened, so everything
+committed before it is in the export. The export therefore runs on the primary, even
+with a replica configured: a lagging replica's snapshot would miss commits its `as_of`
+claims. The snapshot is a non-locking read, so writers are not blocked. current.json is replaced atomically after the
+files are written; every worker sharing the directory picks the new export up on its
+next query. duckdb is only imported by this module, so DB_BACKEND=mysql needs neither it
+nor a writable export directory.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .tool import load_sql, resolve_path
+
+try:
+    import duckdb
+except ImportError:  # only needed with DB_BACKEND=duckdb
+    duckdb = None
+
+SQL_DIR = Path(__file__).resolve().parent / "sql" / "analytics"
+
+ANALYTICS_DIR = resolve_path(os.getenv("ANALYTICS_DIR", "data/analytics"))
+ANALYTICS_KEEP_SNAPSHOTS = int(os.getenv("ANALYTICS_KEEP_SNAPSHOTS", "2"))
+ANALYTICS_EXPORT_BATCH = int(os.getenv("ANALYTICS_EXPORT_BATCH", "50000"))
+# How often a worker re-reads current.json to notice a newer export.
+ANALYTICS_RELOAD_SECONDS = float(os.getenv("ANALYTICS_RELOAD_SECONDS", "5"))
+
+# table -> (export statement, DuckDB column types). Explicit types keep the Parquet
+# schema stable when a table is empty and pandas cannot infer one.
+TABLES: Dict[str, Tuple[str, str]] = {
+    "songs": ("export_songs.sql", "sid VARCHAR, song_name VARCHAR, album_title VARCHAR"),
+    "song_artists": ("export_song_artists.sql", "sid VARCHAR, artid VARCHAR, artist_name VARCHAR"),
+    "favorites": ("export_favorites.sql", "uid UBIGINT, sid VARCHAR, favored_at TIMESTAMP"),
+    "ratings": ("export_ratings.sql", "uid UBIGINT, sid VARCHAR, rate_value TINYINT, rated_at TIMESTAMP"),
+}
+CURRENT = "current.json"
+
+
+def _require_duckdb() -> Any:
+    if duckdb is None:
+        raise RuntimeError("DB_BACKEND=duckdb needs the duckdb package (pip install duckdb)")
+    return duckdb
+
+
+def _quote(path: Path) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def export_snapshot(db: Any, directory: Path = ANALYTICS_DIR) -> datetime:
+    """
+    Copy the analytics tables out of MySQL into a new Parquet snapshot and make it current.
+    Returns the snapshot's as_of watermark.
+    """
+    engine = _require_duckdb()
+    directory.mkdir(parents=True, exist_ok=True)
+    # Primary, not replica: as_of and the snapshot must come from the same server.
+    conn = db.get_connection(autocommit=False)
+    duck = engine.connect()
+    staging: Optional[Path] = None
+    try:
+        with conn.cursor(db.driver.tuple_cursor) as cur:
+            cur.execute("SELECT UTC_TIMESTAMP(6)")
+            as_of = cur.fetchone()[0].replace(tzinfo=timezone.utc)
+            cur.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+            name = "snapshot-" + as_of.strftime("%Y%m%dT%H%M%S")
+            staging = directory / f".{name}.tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir()
+            for table, (filename, columns) in TABLES.items():
+                if table == "ratings" and db.reads_song_ratings:
+                    filename = "export_song_ratings.sql"
+                duck.execute(f"CREATE TABLE {table} ({columns})")
+                # Unbuffered, so only one batch of the table is in memory at a time.
+                with conn.cursor(db.driver.stream_cursor) as stream:
+                    stream.execute(load_sql(SQL_DIR / filename))
+                    while True:
+                        rows = stream.fetchmany(ANALYTICS_EXPORT_BATCH)
+                        if not rows:
+                            break
+                        batch = pd.DataFrame(list(rows), columns=[d[0] for d in stream.description])
+                        duck.register("batch", batch)
+                        duck.execute(f"INSERT INTO {table} SELECT * FROM batch")
+                        duck.unregister("batch")
+                duck.execute(f"COPY {table} TO {_quote(staging / f'{table}.parquet')} (FORMAT PARQUET)")
+        conn.rollback()
+        final = directory / name
+        shutil.rmtree(final, ignore_errors=True)
+        staging.rename(final)
+        staging = None
+        pointer = directory / f".{CURRENT}.tmp"
+        pointer.write_text(json.dumps({"snapshot": name, "as_of": as_of.isoformat()}), encoding="utf-8")
+        os.replace(pointer, directory / CURRENT)
+        _prune_snapshots(directory, keep=name)
+        return as_of
+    finally:
+        duck.close()
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _prune_snapshots(directory: Path, keep: str) -> None:
+    # Keep a few older exports: a worker may still be scanning one it loaded earlier.
+    old = sorted((p for p in directory.glob("snapshot-*") if p.is_dir() and p.name != keep), reverse=True)
+    for path in old[max(ANALYTICS_KEEP_SNAPSHOTS - 1, 0):]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def last_week() -> Tuple[int, datetime, datetime]:
+    """YEARWEEK(CURDATE() - INTERVAL 1 WEEK, 3) and that ISO week's [Monday, next Monday)."""
+    day = date.today() - timedelta(weeks=1)
+    iso = day.isocalendar()
+    start = datetime.combine(day - timedelta(days=iso[2] - 1), datetime.min.time())
+    return iso[0] * 100 + iso[1], start, start + timedelta(weeks=1)
+
+
+class Analytics:
+    """Read side of the Parquet snapshots: one in-memory DuckDB per process, with a view per table."""
+
+    def __init__(self, directory: Path = ANALYTICS_DIR) -> None:
+        _require_duckdb()
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._duck: Any = None
+        self._snapshot: Optional[str] = None
+        self._as_of: Optional[datetime] = None
+        self._checked = float("-inf")
+        self._sql: Dict[str, str] = {}
+
+    def _current(self) -> Tuple[Any, Optional[datetime]]:
+        now = time.monotonic()
+        if now - self._checked < ANALYTICS_RELOAD_SECONDS:
+            return self._duck, self._as_of
+        with self._lock:
+            if now - self._checked >= ANALYTICS_RELOAD_SECONDS:
+                self._checked = now
+                self._load()
+            return self._duck, self._as_of
+
+    def _load(self) -> None:
+        try:
+            pointer = json.loads((self._directory / CURRENT).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        if pointer["snapshot"] == self._snapshot:
+            return
+        snapshot = self._directory / pointer["snapshot"]
+        duck = duckdb.connect()
+        for table in TABLES:
+            duck.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet({_quote(snapshot / f'{table}.parquet')})")
+        # Swap whole connections so a query already running keeps its own snapshot.
+        self._duck = duck
+        self._snapshot = pointer["snapshot"]
+        self._as_of = datetime.fromisoformat(pointer["as_of"])
+        print(f"Analytics snapshot {self._snapshot} loaded (as of {self._as_of.isoformat()}).")
+
+    def as_of(self) -> Optional[datetime]:
+        """Watermark of the snapshot queries currently read, or None before the first export."""
+        return self._current()[1]
+
+    def _query(self, filename: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        duck, _ = self._current()
+        if duck is None:
+            raise RuntimeError(f"no analytics snapshot in {self._directory}")
+        sql = self._sql.get(filename)
+        if sql is None:
+            sql = self._sql[filename] = load_sql(SQL_DIR / filename)
+        cur = duck.cursor()
+        try:
+            cur.execute(sql, params or {})
+            columns = [d[0] for d in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    def rating_averages(self) -> List[Dict[str, Any]]:
+        return self._query("rating_averages.sql")
+
+    def weekly_ranking(self) -> List[Dict[str, Any]]:
+        yearweek, start, end = last_week()
+        return self._query("weekly_ranking.sql", {"yearweek": yearweek, "start": start, "end": end})
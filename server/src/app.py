@@ -6,16 +6,43 @@ from datetime import datetime, timedelta, timezone
 
 import jwt
 from apscheduler.schedulers.background import BackgroundScheduler
-from flask import Flask, jsonify, request, g
+from flask import Flask, Response, jsonify, request, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
+from . import metrics
+from .admission import ADMISSION, EXEMPT_RULES, PRIORITIES, Admission, Rejected, retry_after_header
+from .profiling import ProfilingControl, write_profile
+from .browse import BROWSE_REFRESH_MINUTES, Browser, parse_query as parse_browse_query
+from .suggest import KINDS as SUGGEST_KINDS, SUGGEST_REBUILD_MINUTES, SUGGEST_REFRESH_SECONDS, Suggester
 from .db import get_db, DB
-from .manage import import_data, init_db
-from .tool import load_sql
+from .manage import import_data, init_db, migrate
+from .tool import decode_cursor, encode_cursor, load_sql
+from .writebehind import WRITE_BEHIND
+from .plays import PlayAggregator, PlayLog, parse_plays
 
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-change-me")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_TTL_MINUTES = int(os.getenv("JWT_TTL_MINUTES", "60"))
+MAX_BATCH_SONGS = 100
+MAX_BATCH_PLAYLIST_SONGS = 500
+PLAYLIST_CHANGES_LIMIT = 500
+FEED_RETENTION_DAYS = int(os.getenv("FEED_RETENTION_DAYS", "30"))
+ANALYTICS_EXPORT_MINUTES = int(os.getenv("ANALYTICS_EXPORT_MINUTES", "15"))
+# Neighbours kept per song by the nightly build (src/neighbors.py); caps ?limit= on the
+# similar-songs endpoints.
+NEIGHBORS_K = int(os.getenv("NEIGHBORS_K", "50"))
+# After a successful write, the client's reads go to the primary for this long so it
+# sees its own change even when the replica lags.
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "resonate_read_primary"
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+# POST routes that only read (a body carries the query) and may use the replica.
+READ_ONLY_POST_ENDPOINTS = frozenset({"get_songs_batch"})
+# Reverse proxies in front of the app that append to X-Forwarded-For. Only then is the
+# client address taken from that header (see ProxyFix); a client can forge any hops
+# beyond these, so this must match the deployment.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
 
 def _make_access_token(user: dict) -> str:
     now = datetime.now(timezone.utc)
@@ -28,10 +55,15 @@ def _make_access_token(user: dict) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
-def create_app() -> Flask:
-    app = Flask(__name__)
-    CORS(app)
+def reads_pinned_to_primary(cookie_value: str | None) -> bool:
+    """True while a client's read-your-writes window (see READ_PRIMARY_COOKIE) is open."""
+    try:
+        return cookie_value is not None and float(cookie_value) > time.time()
+    except ValueError:
+        return False
 
+
+def connect_db() -> DB:
     max_retries = 30
     retry_delay = 1
     db = None
@@ -51,7 +83,11 @@ def create_app() -> Flask:
     
     if db is None:
         raise RuntimeError("Database connection failed")
-    
+    return db
+
+
+def run_startup_tasks(db: DB) -> None:
+    """Create/migrate the schema and refresh derived tables. Runs once per deployment start."""
     try:
         temp_conn = db.get_connection()
         try:
@@ -62,6 +98,10 @@ def create_app() -> Flask:
                     print("Database initialization complete.")
                     import_data()
                     print("Data imported!")
+            migrate(db)
+            added = db.add_favorite_partitions()
+            if added:
+                print(f"favorite_events partitions added: {', '.join(added)}.")
             db.execute_script(load_sql("src/sql/weekly-ranking-view.sql"))
             db.execute_script(load_sql("src/sql/weekly-ranking-refresh.sql"))
             print("Weekly ranking snapshot refreshed.")
@@ -75,31 +115,281 @@ def create_app() -> Flask:
     except Exception as e:
         print(f"Error: {e}")
 
+
+def start_scheduler(
+    db: DB, suggester: Suggester | None = None, browser: Browser | None = None
+) -> BackgroundScheduler:
+    """
+    Start this process's background jobs. Every worker runs a scheduler; each job takes a
+    MySQL named lock so it executes once even when several workers fire at the same time.
+    """
     def refresh_weekly_view():
+        with db.named_lock("resonate:weekly-refresh") as acquired:
+            if not acquired:
+                return
+            try:
+                db.execute_script(load_sql("src/sql/weekly-ranking-refresh.sql"))
+                print("Weekly ranking snapshot refreshed.")
+            except Exception as e:
+                print(f"Weekly view refresh failed: {e}")
+
+    def prune_feed():
+        with db.named_lock("resonate:prune-feed") as acquired:
+            if not acquired:
+                return
+            try:
+                removed = db.prune_feed_items(FEED_RETENTION_DAYS)
+                print(f"Pruned {removed} feed items.")
+            except Exception as e:
+                print(f"Feed prune failed: {e}")
+
+    def maintain_favorite_partitions():
+        with db.named_lock("resonate:favorite-partitions") as acquired:
+            if not acquired:
+                return
+            try:
+                added = db.add_favorite_partitions()
+                archived = db.archive_favorite_partitions()
+                if added or archived:
+                    print(f"favorite_events partitions: added {added}, archived {archived}.")
+            except Exception as e:
+                print(f"favorite_events partition maintenance failed: {e}")
+
+    def export_analytics():
+        with db.named_lock("resonate:analytics-export") as acquired:
+            if not acquired:
+                return
+            try:
+                as_of = db.export_analytics()
+                print(f"Analytics snapshot exported (as of {as_of.isoformat()}).")
+            except Exception as e:
+                print(f"Analytics export failed: {e}")
+
+    def rebuild_neighbors():
+        with db.named_lock("resonate:song-neighbors") as acquired:
+            if not acquired:
+                return
+            try:
+                from .neighbors import build_song_neighbors
+                build = build_song_neighbors(db)
+                print(f"Song neighbours rebuilt: {build.rows_written} rows for {build.songs} songs in {build.seconds:.1f}s.")
+            except Exception as e:
+                print(f"Song neighbours rebuild failed: {e}")
+
+    def refresh_suggest():
         try:
-            db.execute_script(load_sql("src/sql/weekly-ranking-refresh.sql"))
-            print("Weekly ranking snapshot refreshed.")
+            suggester.refresh()
         except Exception as e:
-            print(f"Weekly view refresh failed: {e}")
+            print(f"Suggest refresh failed: {e}")
 
     scheduler = BackgroundScheduler(timezone="UTC", daemon=True)
     scheduler.add_job(refresh_weekly_view, "cron", day_of_week="mon", hour=0, minute=5)
+    scheduler.add_job(prune_feed, "cron", hour=3, minute=15)
+    scheduler.add_job(maintain_favorite_partitions, "cron", hour=3, minute=30)
+    scheduler.add_job(rebuild_neighbors, "cron", hour=4, minute=0)
+    if suggester is not None:
+        # Per process: each worker holds its own index. The rebuild takes a named lock and
+        # the other workers load the snapshot it writes.
+        scheduler.add_job(refresh_suggest, "interval", seconds=SUGGEST_REFRESH_SECONDS)
+        # Half the interval as the freshness bound: the first worker to tick rebuilds, the
+        # rest find its snapshot new enough to load.
+        scheduler.add_job(suggester.load_or_build, "interval", minutes=SUGGEST_REBUILD_MINUTES,
+                          kwargs={"max_age": SUGGEST_REBUILD_MINUTES * 30})
+    if browser is not None:
+        # Same scheme as the suggest rebuild: one worker rebuilds, the rest map its files.
+        scheduler.add_job(browser.load_or_build, "interval", minutes=BROWSE_REFRESH_MINUTES,
+                          kwargs={"max_age": BROWSE_REFRESH_MINUTES * 30})
+    if db.backend == "duckdb":
+        # First export right away so the aggregate reads leave MySQL soon after a deploy.
+        scheduler.add_job(export_analytics, "interval", minutes=ANALYTICS_EXPORT_MINUTES,
+                          next_run_time=datetime.now(timezone.utc))
     scheduler.start()
+    return scheduler
+
+
+def shutdown_app(app: Flask) -> None:
+    """Stop background jobs and close pooled connections (called on worker exit)."""
+    state = app.extensions.get("resonate", {})
+    scheduler = state.get("scheduler")
+    if scheduler is not None:
+        try:
+            scheduler.shutdown(wait=False)
+        except Exception:
+            pass
+    for name in ("play_log", "play_aggregator", "admission"):
+        if state.get(name) is not None:
+            state[name].stop()
+    db = state.get("db")
+    if db is not None:
+        db.stop_write_behind()
+        db.close_pool()
+
+
+def create_app(run_startup: bool = True, with_scheduler: bool = True) -> Flask:
+    """
+    Build the Flask app. Production servers call this in each worker after fork
+    (see src/wsgi.py) with run_startup=False, since schema setup already ran once.
+    """
+    app = Flask(__name__)
+    CORS(app)
+    if TRUSTED_PROXY_HOPS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+    db = connect_db()
+    if run_startup:
+        run_startup_tasks(db)
+    if WRITE_BEHIND:
+        db.start_write_behind()
+    suggester = Suggester(db)
+    suggester.start()
+    browser = Browser(db)
+    browser.start()
+    play_log = PlayLog()
+    play_log.start()
+    play_aggregator = PlayAggregator(db)
+    play_aggregator.start()
+    admission = Admission(db) if ADMISSION else None
+    if admission is not None:
+        admission.start()
+        metrics.register_admission(admission)
+    scheduler = start_scheduler(db, suggester, browser) if with_scheduler else None
+    profiling = ProfilingControl()
+    app.extensions["resonate"] = {
+        "db": db, "scheduler": scheduler, "profiling": profiling, "suggester": suggester, "browser": browser,
+        "play_log": play_log, "play_aggregator": play_aggregator, "admission": admission,
+    }
+
+    # Registered first so the profiler is started before, and stopped after, every other hook.
+    @app.before_request
+    def start_profiler():
+        g.profiler = None
+        if profiling.should_profile(request.headers.get("X-Profile")):
+            g.profile_start = time.perf_counter()
+            g.profiler = profiling.start()
+
+    @app.after_request
+    def finish_profiler(response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        profiler.stop()
+        elapsed_ms = (time.perf_counter() - g.profile_start) * 1000
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        try:
+            path = write_profile(profiler, route, request.method, response.status_code, elapsed_ms)
+            response.headers["X-Profile-File"] = path.name
+            response.headers["X-Profile-Samples"] = str(profiler.samples)
+        except OSError as e:
+            print(f"Profile write failed: {e}")
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exception=None):
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.stop()
+
+    @app.before_request
+    def admit_request():
+        """Rate-limit, queue or shed the request by its user's tier (see admission.py)."""
+        g.admission = None
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        if admission is None or rule is None or rule in EXEMPT_RULES:
+            return None
+        payload = request.get_json(silent=True) if request.is_json else None
+        uid = _get_uid_from_request(payload if isinstance(payload, dict) else None)
+        if uid is None and isinstance((request.view_args or {}).get("uid"), int):
+            uid = request.view_args["uid"]
+        tier = admission.tier_of(uid)
+        g.db_priority = PRIORITIES[tier]
+        # remote_addr, not X-Forwarded-For: a forged header would get a fresh bucket per request.
+        client = uid if uid is not None else request.remote_addr
+        try:
+            g.admission = admission.admit(tier, client, rule)
+        except Rejected as e:
+            metrics.admission_rejected.inc(tier, e.reason)
+            response = jsonify({"error": "Too many requests" if e.status == 429 else "Server busy, retry shortly"})
+            response.status_code = e.status
+            response.headers["Retry-After"] = retry_after_header(e.retry_after)
+            return response
+        if g.admission.waited:
+            metrics.admission_wait_seconds.observe(g.admission.waited, tier)
+        return None
+
+    @app.teardown_request
+    def release_admission(exception=None):
+        ticket = g.pop("admission", None)
+        if ticket is not None:
+            admission.release(ticket)
     
+    def _is_write_request() -> bool:
+        return request.method in WRITE_METHODS and request.endpoint not in READ_ONLY_POST_ENDPOINTS
+
     @app.before_request
     def before_request():
-        """Get a fresh database connection for this request"""
-        g.db_conn = db.get_connection()
+        """Route this request's reads; connections are checked out of the pools on first use"""
+        g.metrics_start = time.perf_counter() if metrics.sampled() else None
+        g.db_read_primary = _is_write_request() or reads_pinned_to_primary(
+            request.cookies.get(READ_PRIMARY_COOKIE)
+        )
+
+    @app.after_request
+    def mark_recent_write(response):
+        if _is_write_request() and response.status_code < 400 and READ_YOUR_WRITES_SECONDS > 0:
+            response.set_cookie(
+                READ_PRIMARY_COOKIE,
+                str(int(time.time()) + READ_YOUR_WRITES_SECONDS),
+                max_age=READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get("metrics_start")
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            metrics.http_request_seconds.observe(
+                time.perf_counter() - start, route, request.method, str(response.status_code)
+            )
+            size = response.calculate_content_length()
+            if size is not None:
+                metrics.http_response_bytes.observe(size, route, request.method)
+        return response
     
     @app.teardown_appcontext
     def teardown_db(exception=None):
-        """Close the database connection after each request"""
+        """Return the request's connections to their pools"""
         conn = g.pop('db_conn', None)
         if conn is not None:
-            try:
-                conn.close()
-            except:
-                pass
+            db.release(conn, discard=exception is not None)
+        read_conn = g.pop('db_read_conn', None)
+        if read_conn is not None:
+            db.release(read_conn, discard=exception is not None, read=True)
+
+    @app.route("/admin/profiling", methods=["GET", "POST"])
+    def admin_profiling():
+        """Show or change this worker's request sampling; requires X-Profile: <PROFILE_TOKEN>."""
+        if not profiling.enabled:
+            return jsonify({"error": "Profiling is disabled (PROFILE_TOKEN not set)"}), 404
+        if not profiling.authorized(request.headers.get("X-Profile")):
+            return jsonify({"error": "Forbidden"}), 403
+        if request.method == "GET":
+            return jsonify(profiling.status())
+
+        payload = request.get_json(silent=True) or {}
+        try:
+            sample_rate = float(payload.get("sample_rate", 0))
+            remaining = payload.get("requests")
+            remaining = int(remaining) if remaining is not None else None
+        except (TypeError, ValueError):
+            return jsonify({"error": "sample_rate must be a number and requests an integer"}), 400
+        return jsonify(profiling.configure(sample_rate, remaining))
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
 
     @app.get("/health/db")
     def health_db():
@@ -168,6 +458,23 @@ def create_app() -> Flask:
             print(f"Get song error: {e}")
             return jsonify({"error": "Failed to fetch song"}), 500
 
+    @app.post("/songs/batch")
+    def get_songs_batch():
+        payload = request.get_json(silent=True) or {}
+        sids = payload.get("sids")
+        if not isinstance(sids, list) or not all(isinstance(sid, str) for sid in sids):
+            return jsonify({"error": "sids must be a list of strings"}), 400
+        if len(sids) > MAX_BATCH_SONGS:
+            return jsonify({"error": f"at most {MAX_BATCH_SONGS} sids per request"}), 400
+
+        uid = _get_uid_from_request(payload)
+        try:
+            songs = db.get_songs_by_ids(sids, uid)
+            return jsonify({"count": len(songs), "songs": songs})
+        except Exception as e:
+            print(f"Batch songs error: {e}")
+            return jsonify({"error": "Failed to fetch songs"}), 500
+
     @app.get("/users/<int:uid>")
     def get_user(uid: int):
         try:
@@ -183,6 +490,8 @@ def create_app() -> Flask:
     def make_user_vip(uid: int):
         try:
             db.upsert_vip_user(uid, special_effect=True)
+            if admission is not None:
+                admission.vips.add(uid)
             return jsonify({"isvip": 1}), 201
         except ValueError as e:
             if "not found" in str(e).lower():
@@ -256,10 +565,12 @@ def create_app() -> Flask:
         except ValueError:
             return jsonify({"error": "page and page_size must be integers"}), 400
 
+        uid = _get_uid_from_request()
         try:
             total = db.search_count(query)
             offset = (page - 1) * page_size
             results = db.search(query, limit=page_size, offset=offset)
+            _embed_song_flags(results, uid)
             return jsonify(
                 {
                     "query": query,
@@ -275,10 +586,60 @@ def create_app() -> Flask:
             print(f"Search endpoint error: {e}")
             return jsonify({"error": "Failed to search"}), 500
 
+    @app.get("/suggest")
+    def suggest():
+        query = request.args.get("q", "")
+        try:
+            limit = min(max(int(request.args.get("limit", 10)), 1), 20)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        kinds = [k for k in request.args.get("types", "").split(",") if k] or None
+        if kinds and not set(kinds) <= set(SUGGEST_KINDS):
+            return jsonify({"error": f"types must be a subset of {', '.join(SUGGEST_KINDS)}"}), 400
+
+        suggestions = suggester.suggest(query, limit, kinds)
+        if suggestions is None:
+            return jsonify({"error": "suggestions are still loading"}), 503
+        return jsonify({"query": query, "count": len(suggestions), "suggestions": suggestions})
+
+    @app.get("/browse")
+    def browse():
+        columns = browser.columns
+        if columns is None:
+            return jsonify({"error": "browse index is still loading"}), 503
+        try:
+            query = parse_browse_query(request.args, columns.tag_names)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        uid = _get_uid_from_request()
+        try:
+            page = columns.query(query)
+            songs = {song["sid"]: song for song in db.get_songs_by_ids(page.sids, uid)}
+            results = []
+            for sid, features in zip(page.sids, page.features):
+                song = songs.get(sid)
+                if song is not None:
+                    results.append({**song, **features})
+            return jsonify({
+                "count": len(results),
+                "total": page.total,
+                "page": query.offset // query.limit + 1,
+                "page_size": query.limit,
+                "has_next": query.offset + query.limit < page.total,
+                "results": results,
+                "facets": page.facets,
+            })
+        except Exception as e:
+            print(f"Browse endpoint error: {e}")
+            return jsonify({"error": "Failed to browse"}), 500
+
     @app.get("/albums/<album_id>/songs")
     def get_album_songs(album_id: str):
+        uid = _get_uid_from_request()
         try:
             songs = db.get_album_songs(album_id)
+            _embed_song_flags(songs, uid)
             return jsonify({
                 "album_id": album_id,
                 "count": len(songs),
@@ -319,10 +680,12 @@ def create_app() -> Flask:
     @app.get("/ratings/average")
     def rating_averages():
         try:
+            as_of = db.analytics_as_of()
             ratings = db.get_rating_averages()
             return jsonify({
                 "count": len(ratings),
-                "ratings": ratings
+                "ratings": ratings,
+                "as_of": as_of.isoformat(),
             })
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -340,6 +703,33 @@ def create_app() -> Flask:
             print(f"Recommendations endpoint error: {e}")
             return jsonify({"error": "Failed to fetch recommendations"}), 500
 
+    @app.get("/songs/<sid>/similar")
+    def similar_songs(sid: str):
+        try:
+            limit = min(max(int(request.args.get("limit", 20)), 1), NEIGHBORS_K)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        try:
+            songs = db.get_similar_songs(sid, limit)
+            return jsonify({"sid": sid, "count": len(songs), "songs": songs})
+        except Exception as e:
+            print(f"Similar songs error: {e}")
+            return jsonify({"error": "Failed to fetch similar songs"}), 500
+
+    @app.get("/users/<int:uid>/because-you-liked")
+    def because_you_liked(uid: int):
+        try:
+            seeds = min(max(int(request.args.get("seeds", 3)), 1), 10)
+            limit = min(max(int(request.args.get("limit", 10)), 1), NEIGHBORS_K // 2)
+        except ValueError:
+            return jsonify({"error": "seeds and limit must be integers"}), 400
+        try:
+            groups = db.get_because_you_liked(uid, seeds, limit)
+            return jsonify({"uid": uid, "count": len(groups), "groups": groups})
+        except Exception as e:
+            print(f"Because-you-liked error: {e}")
+            return jsonify({"error": "Failed to fetch recommendations"}), 500
+
     @app.get("/songs/<sid>/rating")
     def get_song_rating(sid: str):
         uid_param = request.args.get("uid")
@@ -390,16 +780,41 @@ def create_app() -> Flask:
 
     @app.get("/weekly-ranking")
     def weekly_ranking():
+        by = request.args.get("by", "favorites")
+        if by not in ("favorites", "plays"):
+            return jsonify({"error": "by must be favorites or plays"}), 400
         try:
+            if by == "plays":
+                rankings = db.get_weekly_play_ranking()
+                return jsonify({"count": len(rankings), "rankings": rankings, "as_of": datetime.now(timezone.utc).isoformat()})
+            as_of = db.analytics_as_of()
             rankings = db.get_weekly_ranking()
             return jsonify({
                 "count": len(rankings),
-                "rankings": rankings
+                "rankings": rankings,
+                "as_of": as_of.isoformat(),
             })
         except Exception as e:
             print(f"Weekly ranking error: {e}")
             return jsonify({"error": str(e)}), 500
 
+    @app.post("/events/plays")
+    def ingest_plays():
+        """Append a batch of listening events; counts show up after the next aggregation."""
+        payload = request.get_json(silent=True) or {}
+        uid = _get_uid_from_request(payload)
+        if uid is None:
+            return jsonify({"error": "uid required"}), 401
+        try:
+            plays = parse_plays(payload.get("plays"))
+            play_log.append(uid, plays)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except OSError as e:
+            print(f"Play ingest error: {e}")
+            return jsonify({"error": "Failed to record plays"}), 503
+        return jsonify({"accepted": len(plays)}), 202
+
     def _get_uid_from_request(payload: dict | None = None) -> int | None:
         header_uid = request.headers.get("X-User-Id")
         if header_uid and header_uid.isdigit():
@@ -408,6 +823,16 @@ def create_app() -> Flask:
             return int(payload["uid"])
         return None
 
+    def _embed_song_flags(songs: list, uid: int | None) -> None:
+        """Attach is_favorite/user_rating to song rows with a single lookup."""
+        if uid is None or not songs:
+            return
+        flags = db.get_song_flags(uid, [song["sid"] for song in songs if song.get("sid")])
+        for song in songs:
+            song_flags = flags.get(song.get("sid"))
+            song["is_favorite"] = bool(song_flags and song_flags["is_favorite"])
+            song["user_rating"] = song_flags["user_rating"] if song_flags else None
+
     @app.post("/playlists")
     def create_playlist():
         payload = request.get_json(silent=True) or {}
@@ -448,7 +873,7 @@ def create_app() -> Flask:
         if uid is not None and int(playlist.get("uid", -1)) != uid:
             return jsonify({"error": "forbidden"}), 403
         try:
-            db.add_song_to_playlist(plstid, str(sid), int(position) if position is not None else None)
+            position = db.add_song_to_playlist(plstid, str(sid), int(position) if position is not None else None)
             return jsonify({"playlist_id": plstid, "sid": sid, "position": position}), 201
         except ValueError as ve:
             return jsonify({"error": str(ve)}), 400
@@ -456,6 +881,58 @@ def create_app() -> Flask:
             print(f"Add song to playlist error: {e}")
             return jsonify({"error": str(e)}), 500
 
+    @app.post("/playlists/<int:plstid>/songs:batch")
+    def add_playlist_songs_batch(plstid: int):
+        payload = request.get_json(silent=True) or {}
+        sids = payload.get("sids")
+        uid = _get_uid_from_request(payload)
+
+        if not isinstance(sids, list) or not all(isinstance(sid, str) for sid in sids):
+            return jsonify({"error": "sids must be a list of strings"}), 400
+        if len(sids) > MAX_BATCH_PLAYLIST_SONGS:
+            return jsonify({"error": f"at most {MAX_BATCH_PLAYLIST_SONGS} sids per request"}), 400
+        playlist = db.get_playlist(plstid)
+        if not playlist:
+            return jsonify({"error": "playlist not found"}), 404
+        if uid is not None and int(playlist.get("uid", -1)) != uid:
+            return jsonify({"error": "forbidden"}), 403
+        try:
+            result = db.add_songs_to_playlist(plstid, sids)
+            return jsonify({"playlist_id": plstid, **result}), 201
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            print(f"Batch add to playlist error: {e}")
+            return jsonify({"error": "Failed to add songs to playlist"}), 500
+
+    @app.post("/playlists/<int:plstid>/songs/<sid>/move")
+    def move_playlist_song(plstid: int, sid: str):
+        payload = request.get_json(silent=True) or {}
+        before_sid = payload.get("before_sid")
+        after_sid = payload.get("after_sid")
+        uid = _get_uid_from_request(payload)
+
+        if before_sid is not None and after_sid is not None:
+            return jsonify({"error": "provide only one of before_sid and after_sid"}), 400
+        playlist = db.get_playlist(plstid)
+        if not playlist:
+            return jsonify({"error": "playlist not found"}), 404
+        if uid is not None and int(playlist.get("uid", -1)) != uid:
+            return jsonify({"error": "forbidden"}), 403
+        try:
+            position = db.move_playlist_song(
+                plstid,
+                sid,
+                before_sid=str(before_sid) if before_sid is not None else None,
+                after_sid=str(after_sid) if after_sid is not None else None,
+            )
+            return jsonify({"playlist_id": plstid, "sid": sid, "position": position})
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            print(f"Move playlist song error: {e}")
+            return jsonify({"error": "Failed to move song"}), 500
+
     @app.get("/users/<int:uid>/playlists")
     def list_user_playlists(uid: int):
         auth_uid = _get_uid_from_request()
@@ -478,13 +955,53 @@ def create_app() -> Flask:
         playlist_owner_uid = int(playlist.get("uid", -1))
         if playlist_visibility != "public" and (auth_uid is None or auth_uid != playlist_owner_uid):
             return jsonify({"error": "forbidden"}), 403
+        # Per-user flags can change without a playlist write, so only anonymous reads get an ETag.
+        etag = f"playlist-{plstid}-v{playlist.get('version', 0)}"
+        if auth_uid is None and etag in request.if_none_match:
+            return "", 304
         try:
-            songs = db.list_playlist_songs(plstid)
-            return jsonify({"playlist": playlist, "songs": songs})
+            songs = db.list_playlist_songs(plstid, version=playlist.get("version"))
+            _embed_song_flags(songs, auth_uid)
+            response = jsonify({"playlist": playlist, "songs": songs})
+            if auth_uid is None:
+                response.set_etag(etag)
+            return response
         except Exception as e:
             print(f"Get playlist error: {e}")
             return jsonify({"error": str(e)}), 500
 
+    @app.get("/playlists/<int:plstid>/changes")
+    def get_playlist_changes(plstid: int):
+        playlist = db.get_playlist(plstid)
+        if not playlist:
+            return jsonify({"error": "playlist not found"}), 404
+        auth_uid = _get_uid_from_request()
+        if playlist.get("visibility") != "public" and (auth_uid is None or auth_uid != int(playlist.get("uid", -1))):
+            return jsonify({"error": "forbidden"}), 403
+        try:
+            since = int(request.args.get("since", 0))
+        except ValueError:
+            return jsonify({"error": "since must be an integer"}), 400
+        if since < 0:
+            return jsonify({"error": "since must be >= 0"}), 400
+
+        current = int(playlist.get("version") or 0)
+        try:
+            changes = db.list_playlist_changes(plstid, since, PLAYLIST_CHANGES_LIMIT + 1) if since < current else []
+            has_more = len(changes) > PLAYLIST_CHANGES_LIMIT
+            changes = changes[:PLAYLIST_CHANGES_LIMIT]
+            return jsonify({
+                "playlist_id": plstid,
+                "since": since,
+                "version": changes[-1]["version"] if has_more else max(current, since),
+                "has_more": has_more,
+                "count": len(changes),
+                "changes": changes,
+            })
+        except Exception as e:
+            print(f"Playlist changes error: {e}")
+            return jsonify({"error": "Failed to load playlist changes"}), 500
+
     @app.delete("/playlists/<int:plstid>")
     def delete_playlist(plstid: int):
         playlist = db.get_playlist(plstid)
@@ -552,6 +1069,64 @@ def create_app() -> Flask:
             print(f"List followed playlists error: {e}")
             return jsonify({"error": "Failed to load followed playlists"}), 500
 
+    @app.get("/users/<int:uid>/feed")
+    def get_feed(uid: int):
+        auth_uid = _get_uid_from_request()
+        if auth_uid is not None and auth_uid != uid:
+            return jsonify({"error": "forbidden"}), 403
+        try:
+            limit = min(max(int(request.args.get("limit", 20)), 1), 100)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+
+        before_ts, before_key = None, ""
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+                before_ts, before_key = str(position["ts"]), str(position["key"])
+            except (ValueError, KeyError):
+                return jsonify({"error": "invalid cursor"}), 400
+
+        try:
+            items = db.get_feed(uid, limit, before_ts, before_key)
+            next_cursor = None
+            if len(items) == limit:
+                last = items[-1]
+                next_cursor = encode_cursor({"ts": str(last["created_at"]), "key": last["item_key"]})
+            return jsonify({"count": len(items), "items": items, "next_cursor": next_cursor})
+        except Exception as e:
+            print(f"Feed error: {e}")
+            return jsonify({"error": "Failed to load feed"}), 500
+
+    @app.post("/artist/<artist_id>/follow")
+    def follow_artist(artist_id: str):
+        uid = _get_uid_from_request()
+        if uid is None:
+            return jsonify({"error": "uid required"}), 401
+        try:
+            db.follow_artist(uid, artist_id)
+            return jsonify({"uid": uid, "artist_id": artist_id, "following": True}), 201
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 404
+        except Exception as e:
+            print(f"Follow artist error: {e}")
+            return jsonify({"error": "Failed to follow artist"}), 500
+
+    @app.delete("/artist/<artist_id>/follow")
+    def unfollow_artist(artist_id: str):
+        uid = _get_uid_from_request()
+        if uid is None:
+            return jsonify({"error": "uid required"}), 401
+        try:
+            removed = db.unfollow_artist(uid, artist_id)
+            if not removed:
+                return jsonify({"error": "follow not found"}), 404
+            return jsonify({"uid": uid, "artist_id": artist_id, "following": False}), 200
+        except Exception as e:
+            print(f"Unfollow artist error: {e}")
+            return jsonify({"error": "Failed to unfollow artist"}), 500
+
     @app.post("/favorites")
     def favorite_song():
         payload = request.get_json(silent=True) or {}
@@ -602,11 +1177,29 @@ def create_app() -> Flask:
     def search_playlists():
         q = request.args.get("q", "").strip()
         if not q:
-            return jsonify({"count": 0, "playlists": []})
-        uid = _get_uid_from_request()
+            return jsonify({"count": 0, "playlists": [], "next_cursor": None})
         try:
-            playlists = db.search_playlists(q, uid)
-            return jsonify({"count": len(playlists), "playlists": playlists})
+            limit = min(max(int(request.args.get("limit", 50)), 1), 100)
+            owner = int(request.args["owner"]) if request.args.get("owner") else None
+        except ValueError:
+            return jsonify({"error": "limit and owner must be integers"}), 400
+
+        before = None
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+                before = (float(position["score"]), int(position["id"]))
+            except (ValueError, KeyError, TypeError):
+                return jsonify({"error": "invalid cursor"}), 400
+
+        try:
+            playlists = db.search_playlists(q, owner=owner, limit=limit, before=before)
+            next_cursor = None
+            if len(playlists) == limit:
+                last = playlists[-1]
+                next_cursor = encode_cursor({"score": last["score"], "id": last["plstid"]})
+            return jsonify({"count": len(playlists), "playlists": playlists, "next_cursor": next_cursor})
         except Exception as e:
             print(f"Search playlists error: {e}")
             return jsonify({"error": "Failed to search playlists"}), 500
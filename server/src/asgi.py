@@ -0,0 +1,250 @@
+"""
+ASGI entry point. The I/O-bound read endpoints below are served natively on the event
+loop by AsyncDB; every other route falls through to the Flask app, which a2wsgi runs
+on a small thread pool. Serve with
+
+    WEB_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py src.asgi:app
+
+A slow client then costs one idle socket on the event loop instead of a pinned thread.
+The native routes go through the same admission control as Flask's (admit_native), with
+limits shared by both halves of the worker.
+"""
+from __future__ import annotations
+
+import dataclasses
+import decimal
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Any, Optional
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Match, Mount, Route
+from werkzeug.http import http_date
+
+from . import metrics
+from .admission import EXEMPT_RULES, Rejected, retry_after_header
+from .app import READ_PRIMARY_COOKIE, TRUSTED_PROXY_HOPS, create_app, reads_pinned_to_primary, shutdown_app
+from .async_db import get_async_db, read_from_primary
+
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "8"))
+
+
+def _json_default(o: Any) -> Any:
+    # Same conversions as Flask's JSON provider, so both halves of the API serialize alike.
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class JSON(JSONResponse):
+    def __init__(self, content: Any, status_code: int = 200) -> None:
+        # Flask-CORS answers preflights (OPTIONS falls through to Flask); native routes
+        # only need the same allow-origin header on the actual response.
+        super().__init__(content, status_code=status_code, headers={"Access-Control-Allow-Origin": "*"})
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def _get_uid_from_request(request: Request) -> Optional[int]:
+    header_uid = request.headers.get("X-User-Id")
+    if header_uid and header_uid.isdigit():
+        return int(header_uid)
+    return None
+
+
+async def health_db(request: Request) -> JSON:
+    if await request.app.state.adb.ping():
+        return JSON({"db": "ok"})
+    return JSON({"db": "down"}, status_code=500)
+
+
+async def get_song(request: Request) -> JSON:
+    song_id = request.path_params["song_id"]
+    uid = _get_uid_from_request(request)
+    try:
+        song = await request.app.state.adb.get_song(song_id, uid)
+        if not song:
+            return JSON({"error": "Song not found"}, status_code=404)
+        return JSON(song)
+    except Exception as e:
+        print(f"Get song error: {e}")
+        return JSON({"error": "Failed to fetch song"}, status_code=500)
+
+
+async def get_user(request: Request) -> JSON:
+    uid = request.path_params["uid"]
+    try:
+        user = await request.app.state.adb.get_user_profile(uid)
+        if not user:
+            return JSON({"error": "User not found"}, status_code=404)
+        return JSON(user)
+    except Exception as e:
+        print(f"Get user endpoint error: {e}")
+        return JSON({"error": "Failed to fetch user profile"}, status_code=500)
+
+
+async def search(request: Request) -> JSON:
+    query = request.query_params.get("q", "").strip()
+    if not query:
+        return JSON({"query": "", "count": 0, "page": 1, "page_size": 0, "results": []})
+
+    try:
+        page = max(int(request.query_params.get("page", 1)), 1)
+        page_size = min(max(int(request.query_params.get("page_size", 20)), 1), 100)
+    except ValueError:
+        return JSON({"error": "page and page_size must be integers"}, status_code=400)
+
+    uid = _get_uid_from_request(request)
+    try:
+        offset = (page - 1) * page_size
+        total, results = await request.app.state.adb.search_page(query, page_size, offset, uid)
+        return JSON(
+            {
+                "query": query,
+                "count": len(results),
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "has_next": (page * page_size) < total,
+                "results": results,
+            }
+        )
+    except Exception as e:
+        print(f"Search endpoint error: {e}")
+        return JSON({"error": "Failed to search"}, status_code=500)
+
+
+NATIVE_ROUTES = [
+    Route("/health/db", health_db, methods=["GET"]),
+    Route("/songs/{song_id}", get_song, methods=["GET"]),
+    Route("/users/{uid:int}", get_user, methods=["GET"]),
+    Route("/search", search, methods=["GET"]),
+]
+_NATIVE_ROUTE_PATHS = {route.endpoint: route.path for route in NATIVE_ROUTES}
+# The Flask rule each native route stands in for, so ADMISSION_EXPENSIVE and EXEMPT_RULES
+# name a route the same way under either entry point.
+_ADMISSION_RULES = {
+    health_db: "/health/db",
+    get_song: "/songs/<song_id>",
+    get_user: "/users/<int:uid>",
+    search: "/search",
+}
+
+
+def _client_address(request: Request) -> Optional[str]:
+    """The address admission keys anonymous clients on; the same one ProxyFix gives Flask."""
+    if TRUSTED_PROXY_HOPS:
+        hops = [hop.strip() for hop in request.headers.get("X-Forwarded-For", "").split(",")]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else None
+
+
+async def admit_native(request: Request, call_next):
+    # Rate-limit, queue or shed a native route by tier, as admit_request does for Flask's.
+    admission = request.app.state.admission
+    rule = uid = None
+    if admission is not None:
+        for route in NATIVE_ROUTES:
+            match, child_scope = route.matches(request.scope)
+            if match is Match.FULL:
+                rule = _ADMISSION_RULES[route.endpoint]
+                uid = _get_uid_from_request(request)
+                if uid is None:
+                    uid = child_scope["path_params"].get("uid")
+                break
+    if rule is None or rule in EXEMPT_RULES:
+        return await call_next(request)
+
+    tier = admission.tier_of(uid)
+    try:
+        # admit() may wait in the tier's queue, which must not block the event loop.
+        ticket = await run_in_threadpool(
+            admission.admit, tier, uid if uid is not None else _client_address(request), rule
+        )
+    except Rejected as e:
+        metrics.admission_rejected.inc(tier, e.reason)
+        response = JSON(
+            {"error": "Too many requests" if e.status == 429 else "Server busy, retry shortly"},
+            status_code=e.status,
+        )
+        response.headers["Retry-After"] = retry_after_header(e.retry_after)
+        return response
+    if ticket.waited:
+        metrics.admission_wait_seconds.observe(ticket.waited, tier)
+    try:
+        return await call_next(request)
+    finally:
+        admission.release(ticket)
+
+
+async def pin_reads_after_write(request: Request, call_next):
+    # Honour the read-your-writes cookie Flask sets after a write.
+    token = read_from_primary.set(reads_pinned_to_primary(request.cookies.get(READ_PRIMARY_COOKIE)))
+    try:
+        return await call_next(request)
+    finally:
+        read_from_primary.reset(token)
+
+
+async def record_request_metrics(request: Request, call_next):
+    # Routes mounted from Flask are timed by Flask's own hooks.
+    start = time.perf_counter() if metrics.sampled() else None
+    response = await call_next(request)
+    route = _NATIVE_ROUTE_PATHS.get(request.scope.get("endpoint"))
+    if start is not None and route is not None:
+        metrics.http_request_seconds.observe(
+            time.perf_counter() - start, route, request.method, str(response.status_code)
+        )
+        size = response.headers.get("content-length")
+        if size is not None:
+            metrics.http_response_bytes.observe(int(size), route, request.method)
+    return response
+
+
+def create_asgi_app(run_startup: bool = False, with_scheduler: bool = True) -> Starlette:
+    flask_app = create_app(run_startup=run_startup, with_scheduler=with_scheduler)
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        # The aiomysql pool is bound to the running loop, so it is built here and not at import.
+        # The Flask half's write-behind overlay, so native reads see this worker's own writes.
+        app.state.adb = await get_async_db(pending=flask_app.extensions["resonate"]["db"]._pending)
+        try:
+            yield
+        finally:
+            await app.state.adb.close()
+            shutdown_app(flask_app)
+
+    routes = [*NATIVE_ROUTES, Mount("/", app=WSGIMiddleware(flask_app, workers=ASGI_WSGI_THREADS))]
+    app = Starlette(
+        routes=routes,
+        middleware=[
+            Middleware(BaseHTTPMiddleware, dispatch=record_request_metrics),
+            Middleware(BaseHTTPMiddleware, dispatch=pin_reads_after_write),
+            Middleware(BaseHTTPMiddleware, dispatch=admit_native),
+        ],
+        lifespan=lifespan,
+    )
+    # Flask's Admission, so both halves draw on one worker's limits.
+    app.state.admission = flask_app.extensions["resonate"]["admission"]
+    return app
+
+
+# WORKER_STARTUP_TASKS as in src/wsgi.py; under gunicorn the master does the setup.
+app = create_asgi_app(run_startup=os.getenv("WORKER_STARTUP_TASKS", "0") == "1")
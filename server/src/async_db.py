@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiomysql
+
+from . import metrics
+from .db import RATINGS_MODE, RATINGS_MODES, SQL_DIR, primary_config, replica_config
+from .tool import load_sql
+
+ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", "1"))
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+ASYNC_DB_POOL_RECYCLE = int(os.getenv("ASYNC_DB_POOL_RECYCLE", "3600"))
+
+_ROLES = {"display_user": "display_role", "admin_user": "admin_role"}
+
+# Set per request (and inherited by tasks started with asyncio.gather) when the client
+# is inside its read-your-writes window and must not read from the replica.
+read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+
+
+class AsyncDB:
+    """
+    asyncio counterpart of DB for read-mostly, I/O-bound endpoints.
+
+    Every query checks its own connection out of an aiomysql pool, so independent
+    queries issued with asyncio.gather run on separate connections at the same time.
+    SQL is shared with DB through the files in src/sql. Like DB, reads go to the replica
+    when MYSQL_REPLICA_HOST is set, unless read_from_primary is set for the request.
+    Ratings are read from the tables RATINGS_MODE selects, as in DB. `pending` is the
+    sync DB's write-behind overlay (DB._pending) in the same process, so favorites taken
+    by the Flask half show up here before they are flushed.
+    """
+
+    def __init__(
+        self,
+        ratings_mode: Optional[str] = None,
+        pending: Optional[Callable[[str, Optional[int]], Dict[Any, bool]]] = None,
+    ) -> None:
+        ratings_mode = ratings_mode or RATINGS_MODE
+        if ratings_mode not in RATINGS_MODES:
+            raise ValueError(f"unknown RATINGS_MODE {ratings_mode!r}; expected one of {', '.join(RATINGS_MODES)}")
+        self.ratings_mode = ratings_mode
+        self._pending = pending or (lambda kind, uid: {})
+        self._pool: Optional[aiomysql.Pool] = None
+        self._read_pool: Optional[aiomysql.Pool] = None
+        self._sql_cache: Dict[str, str] = {}
+
+    def _sql(self, filename: str) -> str:
+        sql = self._sql_cache.get(filename)
+        if sql is None:
+            sql = self._sql_cache[filename] = load_sql(SQL_DIR / filename)
+            metrics.name_statement(sql, filename[:-4] if filename.endswith(".sql") else filename)
+        return sql
+
+    @property
+    def reads_song_ratings(self) -> bool:
+        return self.ratings_mode in ("cutover", "song_ratings")
+
+    def _ratings_sql(self, filename: str) -> str:
+        """A statement that reads ratings, in its song_ratings (sr_) form once reads have moved."""
+        return self._sql("sr_" + filename if self.reads_song_ratings else filename)
+
+    @staticmethod
+    async def _create_pool(config: Dict[str, Any]) -> aiomysql.Pool:
+        role = _ROLES.get(config["user"])
+        return await aiomysql.create_pool(
+            host=config["host"],
+            port=config["port"],
+            user=config["user"],
+            password=config["password"],
+            db=config["database"],
+            minsize=ASYNC_DB_POOL_MIN,
+            maxsize=ASYNC_DB_POOL_SIZE,
+            pool_recycle=ASYNC_DB_POOL_RECYCLE,
+            autocommit=True,
+            cursorclass=aiomysql.DictCursor,
+            init_command=f"SET ROLE {role}" if role else None,
+        )
+
+    async def connect(self) -> None:
+        self._pool = await self._create_pool(primary_config())
+        read_config = replica_config()
+        if read_config is not None:
+            self._read_pool = await self._create_pool(read_config)
+
+    async def close(self) -> None:
+        for pool in (self._pool, self._read_pool):
+            if pool is not None:
+                pool.close()
+                await pool.wait_closed()
+        self._pool = self._read_pool = None
+
+    def stats(self) -> Dict[str, int]:
+        if self._pool is None:
+            return {"size": 0, "free": 0, "max_size": ASYNC_DB_POOL_SIZE}
+        return {"size": self._pool.size, "free": self._pool.freesize, "max_size": self._pool.maxsize}
+
+    async def _fetchall(self, sql: str, args: Any = None) -> List[Dict[str, Any]]:
+        # Every AsyncDB method is a read, so the replica is used whenever it may be.
+        if self._pool is None:
+            raise RuntimeError("AsyncDB not initialized. Call connect() first.")
+        pool = self._pool if self._read_pool is None or read_from_primary.get() else self._read_pool
+        record = metrics.sampled()
+        wait_start = time.perf_counter()
+        async with pool.acquire() as conn:
+            if record:
+                metrics.db_pool_wait_seconds.observe(time.perf_counter() - wait_start, "async")
+            async with conn.cursor() as cur:
+                start = time.perf_counter()
+                await cur.execute(sql, args)
+                rows = list(await cur.fetchall())
+                elapsed = time.perf_counter() - start
+        if record or (metrics.SLOW_QUERY_MS and elapsed * 1000 >= metrics.SLOW_QUERY_MS):
+            metrics.observe_query(metrics.statement_name(sql), elapsed, len(rows), None, args, record)
+        return rows
+
+    async def _fetchone(self, sql: str, args: Any = None) -> Optional[Dict[str, Any]]:
+        rows = await self._fetchall(sql, args)
+        return rows[0] if rows else None
+
+    async def ping(self) -> bool:
+        try:
+            return await self._fetchone("SELECT 1 AS ok") is not None
+        except Exception as e:
+            print("ASYNC PING ERROR:", repr(e))
+            return False
+
+    async def get_song_by_id(self, song_id: str) -> Optional[Dict[str, Any]]:
+        return await self._fetchone(self._ratings_sql("get_song_by_id.sql"), (song_id,))
+
+    async def is_song_favorite(self, uid: int, sid: str) -> bool:
+        pending = self._pending("favorite", uid).get(sid)
+        if pending is not None:
+            return pending
+        row = await self._fetchone(
+            "SELECT 1 AS fav FROM user_favorite_song WHERE uid = %s AND sid = %s LIMIT 1", (uid, sid)
+        )
+        return row is not None
+
+    async def get_song(self, song_id: str, uid: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Song row plus, for a known user, its favorite flag; both queries run concurrently."""
+        if uid is None:
+            return await self.get_song_by_id(song_id)
+        song, is_favorite = await asyncio.gather(
+            self.get_song_by_id(song_id), self.is_song_favorite(uid, song_id)
+        )
+        if song is not None:
+            song["is_favorite"] = is_favorite
+        return song
+
+    async def get_song_flags(self, uid: int, sids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        sids = tuple(dict.fromkeys(sids))
+        if not sids:
+            return {}
+        rows = await self._fetchall(self._ratings_sql("song_flags.sql"), {"uid": uid, "sids": sids})
+        pending = self._pending("favorite", uid)
+        return {
+            row["sid"]: {
+                "is_favorite": bool(pending.get(row["sid"], row["is_favorite"])),
+                "user_rating": row["user_rating"],
+            }
+            for row in rows
+        }
+
+    async def search(self, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        pattern = f"%{query}%"
+        return await self._fetchall(
+            self._sql("search.sql"), (pattern, pattern, pattern, pattern, int(limit), int(offset))
+        )
+
+    async def search_count(self, query: str) -> int:
+        pattern = f"%{query}%"
+        row = await self._fetchone(self._sql("search_count.sql"), (pattern, pattern, pattern, pattern))
+        return int(row["total"]) if row and "total" in row else 0
+
+    async def search_page(
+        self, query: str, limit: int, offset: int, uid: Optional[int] = None
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Total and one page of results fetched concurrently, with per-user song flags."""
+        total, results = await asyncio.gather(
+            self.search_count(query), self.search(query, limit, offset)
+        )
+        if uid is not None and results:
+            flags = await self.get_song_flags(uid, [song["sid"] for song in results if song.get("sid")])
+            for song in results:
+                song_flags = flags.get(song.get("sid"))
+                song["is_favorite"] = bool(song_flags and song_flags["is_favorite"])
+                song["user_rating"] = song_flags["user_rating"] if song_flags else None
+        return total, results
+
+    async def get_vip_status(self, uid: int) -> Optional[Dict[str, Any]]:
+        return await self._fetchone(self._sql("get_vip_status.sql"), (uid,))
+
+    async def get_user_profile(self, uid: int) -> Optional[Dict[str, Any]]:
+        """Profile, hobbies and VIP status are independent, so they are fetched concurrently."""
+        user_row, hobby_rows, vip_row = await asyncio.gather(
+            self._fetchone(self._sql("get_user_profile.sql"), (uid,)),
+            self._fetchall(self._sql("list_user_hobbies.sql"), (uid,)),
+            self.get_vip_status(uid),
+        )
+        if not user_row:
+            return None
+        user_row["hobbies"] = [row["hobby"] for row in hobby_rows]
+        user_row["isvip"] = 1 if vip_row else 0
+        return user_row
+
+
+async def get_async_db(pending: Optional[Callable[[str, Optional[int]], Dict[Any, bool]]] = None) -> AsyncDB:
+    db = AsyncDB(pending=pending)
+    await db.connect()
+    return db
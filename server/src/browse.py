@@ -0,0 +1,340 @@
+"""
+In-memory column store behind GET /browse.
+
+Every song's audio features are held as NumPy arrays (float32, NaN for NULL) next to its
+virtual tag. A request turns each filter into a vectorized boolean mask, ANDs them, and
+pages through a sort order computed once at build time, so the only SQL it issues is
+DB.get_songs_by_ids for the songs on the returned page. Every range feature has a
+precomputed bucket number per song, which makes facet counts one np.bincount per
+dimension.
+
+Facets are "drill sideways": a dimension's counts apply every filter except its own, so a
+client can show how many songs each other tag or tempo bucket would give.
+
+The arrays (roughly 100 MB at 1M songs) are built by one worker under a named lock and
+saved as .npy files under BROWSE_SNAPSHOT; every worker memory-maps them, so a host holds
+one copy in its page cache however many workers it runs. Workers check for a newer build
+every BROWSE_REFRESH_MINUTES, and the first to find it stale rebuilds it.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .tool import resolve_path
+
+BROWSE_REFRESH_MINUTES = int(os.getenv("BROWSE_REFRESH_MINUTES", "30"))
+BROWSE_SNAPSHOT = resolve_path(os.getenv("BROWSE_SNAPSHOT", "data/browse"))
+
+# feature -> (facet bucket lower bound, upper bound, bucket count)
+RANGE_FEATURES: Dict[str, Tuple[float, float, int]] = {
+    "danceability": (0.0, 1.0, 10),
+    "energy": (0.0, 1.0, 10),
+    "valence": (0.0, 1.0, 10),
+    "acousticness": (0.0, 1.0, 10),
+    "speechiness": (0.0, 1.0, 10),
+    "tempo": (40.0, 220.0, 18),
+    "loudness": (-60.0, 0.0, 12),
+}
+FEATURES = tuple(RANGE_FEATURES)
+SORTS = ("name",) + FEATURES
+NO_VALUE = -1
+
+
+@dataclass
+class Query:
+    ranges: Dict[str, Tuple[Optional[float], Optional[float]]]
+    mode: Optional[int] = None
+    tags: Optional[List[int]] = None
+    sort: str = "name"
+    descending: bool = False
+    offset: int = 0
+    limit: int = 20
+
+
+@dataclass
+class Page:
+    sids: List[str]
+    total: int
+    features: List[Dict[str, Any]]
+    facets: Dict[str, List[Dict[str, Any]]]
+
+
+class SongColumns:
+    """
+    Immutable column arrays for the whole catalogue. Built from rows with from_rows, or
+    memory-mapped from a directory written by save.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], tag_names: Dict[int, str]) -> None:
+        self.arrays = arrays
+        # Fixed-width UTF-8 bytes rather than str objects, so the column can be mapped.
+        self.sids = arrays["sids"]
+        self.size = len(self.sids)
+        self.columns = {feature: arrays[feature] for feature in FEATURES}
+        self.mode = arrays["mode"]
+        self.tag = arrays["tag"]
+        self.tag_names = tag_names
+        self.buckets = {feature: arrays[f"bucket_{feature}"] for feature in RANGE_FEATURES}
+        self.orders = {sort: arrays[f"order_{sort}"] for sort in SORTS}
+        # Ascending orders put NaN last; this many entries of each come before them.
+        self.valid = {"name": self.size}
+        for feature in RANGE_FEATURES:
+            self.valid[feature] = int(np.count_nonzero(~np.isnan(self.columns[feature])))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple], tags: Sequence[Tuple[int, str]]) -> "SongColumns":
+        n = len(rows)
+        arrays: Dict[str, np.ndarray] = {
+            "sids": np.array([str(r[0]).encode("utf-8") for r in rows] or [b""], dtype=np.bytes_)[:n],
+        }
+        for i, feature in enumerate(("danceability", "energy", "valence", "tempo", "loudness"), start=2):
+            arrays[feature] = _floats(rows, i)
+        arrays["acousticness"] = _floats(rows, 8)
+        arrays["speechiness"] = _floats(rows, 9)
+        arrays["mode"] = np.array([NO_VALUE if r[7] is None else int(r[7]) for r in rows], dtype=np.int8)
+        arrays["tag"] = np.array([0 if r[10] is None else int(r[10]) for r in rows], dtype=np.int16)
+
+        for feature, (lo, hi, count) in RANGE_FEATURES.items():
+            values = arrays[feature]
+            # Out-of-range values land in the first/last bucket.
+            bucket = np.clip(np.nan_to_num(np.floor((values - lo) / (hi - lo) * count)), 0, count - 1)
+            bucket[np.isnan(values)] = NO_VALUE
+            arrays[f"bucket_{feature}"] = bucket.astype(np.int8)
+
+        # Ascending orders; NaN sorts last. Descending reverses the non-NaN part.
+        names = [str(r[1]).casefold() for r in rows]
+        arrays["order_name"] = np.array(sorted(range(n), key=names.__getitem__), dtype=np.int32)
+        for feature in RANGE_FEATURES:
+            arrays[f"order_{feature}"] = np.argsort(arrays[feature], kind="stable").astype(np.int32)
+        return cls(arrays, {int(tid): name for tid, name in tags})
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True)
+        for name, values in self.arrays.items():
+            np.save(directory / f"{name}.npy", values)
+        (directory / "tags.json").write_text(json.dumps(self.tag_names), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Path) -> "SongColumns":
+        arrays = {path.stem: np.load(path, mmap_mode="r") for path in directory.glob("*.npy")}
+        tags = json.loads((directory / "tags.json").read_text(encoding="utf-8"))
+        return cls(arrays, {int(tid): name for tid, name in tags.items()})
+
+    def _masks(self, query: Query) -> Dict[str, np.ndarray]:
+        masks: Dict[str, np.ndarray] = {}
+        for feature, (lo, hi) in query.ranges.items():
+            values = self.columns[feature]
+            mask = ~np.isnan(values)
+            if lo is not None:
+                mask &= values >= lo
+            if hi is not None:
+                mask &= values <= hi
+            masks[feature] = mask
+        if query.mode is not None:
+            masks["mode"] = self.mode == query.mode
+        if query.tags:
+            masks["tag"] = np.isin(self.tag, query.tags)
+        return masks
+
+    def _order(self, sort: str, descending: bool) -> np.ndarray:
+        order = self.orders[sort]
+        if not descending:
+            return order
+        valid = self.valid[sort]
+        return np.concatenate((order[:valid][::-1], order[valid:]))
+
+    def query(self, query: Query) -> Page:
+        masks = self._masks(query)
+        everything = np.ones(self.size, dtype=bool)
+        selected = everything.copy()
+        for mask in masks.values():
+            selected &= mask
+
+        order = self._order(query.sort, query.descending)
+        matches = order[selected[order]]
+        rows = matches[query.offset:query.offset + query.limit]
+
+        facets: Dict[str, List[Dict[str, Any]]] = {}
+        for dimension in ("tag", "mode", *RANGE_FEATURES):
+            if dimension in masks:
+                base = everything.copy()
+                for other, mask in masks.items():
+                    if other != dimension:
+                        base &= mask
+            else:
+                base = selected
+            facets[dimension] = self._facet(dimension, base)
+
+        return Page(
+            sids=[self.sids[i].decode("utf-8") for i in rows],
+            total=int(matches.size),
+            features=[self._features(i) for i in rows],
+            facets=facets,
+        )
+
+    def _facet(self, dimension: str, base: np.ndarray) -> List[Dict[str, Any]]:
+        if dimension == "tag":
+            counts = np.bincount(self.tag[base], minlength=max(self.tag_names, default=0) + 1)
+            return [{"id": tid, "name": name, "count": int(counts[tid])} for tid, name in self.tag_names.items()]
+        if dimension == "mode":
+            counts = np.bincount(self.mode[base & (self.mode >= 0)], minlength=2)
+            return [{"value": value, "count": int(counts[value])} for value in (0, 1)]
+        lo, hi, count = RANGE_FEATURES[dimension]
+        buckets = self.buckets[dimension]
+        counts = np.bincount(buckets[base & (buckets >= 0)], minlength=count)
+        width = (hi - lo) / count
+        return [
+            {"min": round(lo + b * width, 3), "max": round(lo + (b + 1) * width, 3), "count": int(counts[b])}
+            for b in range(count)
+        ]
+
+    def _features(self, i: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for feature, values in self.columns.items():
+            value = values[i]
+            out[feature] = None if np.isnan(value) else round(float(value), 4)
+        out["mode"] = None if self.mode[i] == NO_VALUE else int(self.mode[i])
+        tid = int(self.tag[i])
+        out["tag"] = self.tag_names.get(tid) if tid else None
+        return out
+
+
+def parse_query(args: Any, tag_names: Dict[int, str], max_limit: int = 100) -> Query:
+    """Build a Query from /browse query-string args; ValueError names the bad parameter."""
+    ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+    for feature in RANGE_FEATURES:
+        bounds = []
+        for suffix in ("min", "max"):
+            raw = args.get(f"{feature}_{suffix}")
+            try:
+                bounds.append(None if raw in (None, "") else float(raw))
+            except ValueError:
+                raise ValueError(f"{feature}_{suffix} must be a number")
+        if bounds != [None, None]:
+            ranges[feature] = (bounds[0], bounds[1])
+
+    mode = args.get("mode")
+    if mode not in (None, "", "0", "1"):
+        raise ValueError("mode must be 0 or 1")
+
+    tags = None
+    if args.get("tag"):
+        by_name = {name.casefold(): tid for tid, name in tag_names.items()}
+        tags = []
+        for value in args["tag"].split(","):
+            value = value.strip()
+            tid = int(value) if value.isdigit() else by_name.get(value.casefold())
+            if tid not in tag_names:
+                raise ValueError(f"unknown tag {value!r}")
+            tags.append(tid)
+
+    sort = args.get("sort", "name")
+    descending = sort.startswith("-")
+    sort = sort.lstrip("-")
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)} (prefix - for descending)")
+
+    try:
+        page = max(int(args.get("page", 1)), 1)
+        page_size = min(max(int(args.get("page_size", 20)), 1), max_limit)
+    except ValueError:
+        raise ValueError("page and page_size must be integers")
+
+    return Query(
+        ranges=ranges,
+        mode=None if mode in (None, "") else int(mode),
+        tags=tags,
+        sort=sort,
+        descending=descending,
+        offset=(page - 1) * page_size,
+        limit=page_size,
+    )
+
+
+def _floats(rows: Sequence[tuple], i: int) -> np.ndarray:
+    return np.array([np.nan if r[i] is None else float(r[i]) for r in rows], dtype=np.float32)
+
+
+class Browser:
+    """The process's current SongColumns, mapped from the newest snapshot on this host."""
+
+    def __init__(self, db: Any, snapshot: Path = BROWSE_SNAPSHOT) -> None:
+        self._db = db
+        self._snapshot = snapshot
+        self._columns: Optional[SongColumns] = None
+        self._build: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def columns(self) -> Optional[SongColumns]:
+        """None until the first load finishes."""
+        return self._columns
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.load_or_build, name="browse-load", daemon=True)
+        thread.start()
+        return thread
+
+    def load_or_build(self, max_age: Optional[float] = None) -> None:
+        """
+        Map the current snapshot if it is younger than `max_age` seconds (default
+        BROWSE_REFRESH_MINUTES), otherwise rebuild it. The named lock makes one worker
+        build while the others wait and then map its files.
+        """
+        max_age = BROWSE_REFRESH_MINUTES * 60 if max_age is None else max_age
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            with self._db.named_lock("resonate:browse-build", timeout=600) as acquired:
+                # Without the lock, settle for whatever snapshot there is.
+                if not self._load_snapshot(max_age if acquired else float("inf")) and acquired:
+                    self.rebuild()
+        except Exception as e:
+            print(f"Browse columns load failed: {e}")
+        finally:
+            self._lock.release()
+
+    def _load_snapshot(self, max_age: float) -> bool:
+        pointer = self._snapshot / "current"
+        try:
+            if time.time() - pointer.stat().st_mtime > max_age:
+                return False
+            build = pointer.read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return False
+        if build != self._build:
+            self._columns, self._build = SongColumns.load(self._snapshot / build), build
+            print(f"Browse columns mapped from {self._snapshot / build} ({self._columns.size} songs).")
+        return True
+
+    def rebuild(self) -> None:
+        """Build from MySQL, write a new snapshot and map it; call under the named lock."""
+        started = time.perf_counter()
+        _, tags = self._db.fetch_tuples("browse_tags.sql")
+        _, rows = self._db.fetch_tuples("browse_songs.sql")
+        columns = SongColumns.from_rows(rows, tags)
+        del rows
+
+        build = f"{time.time_ns():020d}-{os.getpid()}"
+        tmp = self._snapshot / f".{build}.tmp"
+        columns.save(tmp)
+        os.replace(tmp, self._snapshot / build)
+        pointer = self._snapshot / f".current.{os.getpid()}.tmp"
+        pointer.write_text(build, encoding="utf-8")
+        os.replace(pointer, self._snapshot / "current")
+        # Keep the previous build too: a worker may have just read the old pointer. Workers
+        # still mapping older files keep them alive until they switch.
+        for old in sorted(p for p in self._snapshot.iterdir() if p.is_dir() and not p.name.startswith("."))[:-2]:
+            shutil.rmtree(old, ignore_errors=True)
+
+        self._columns, self._build = SongColumns.load(self._snapshot / build), build
+        print(f"Browse columns built: {columns.size} songs in {time.perf_counter() - started:.1f}s.")
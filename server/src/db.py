@@ -1,16 +1,24 @@
 from __future__ import annotations
 
 import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import pandas as pd
 import pymysql
 from dotenv import load_dotenv
-from pymysql.cursors import DictCursor
 from sqlalchemy import create_engine
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from . import metrics
+from .cache import LRUCache
+from .drivers import Driver, get_driver
+from .pool import ConnectionPool
+from .sqlscript import ScriptResult, Statement, run_script
 from .tool import load_sql
 
 load_dotenv()
@@ -26,13 +34,142 @@ print(
 
 SQL_DIR = Path(__file__).resolve().parent / "sql"
 
+# Playlist positions are sparse so a move can land between two neighbours
+# without renumbering the rest of the playlist.
+PLAYLIST_POSITION_GAP = 1024
+PLAYLIST_POSITION_SHIFT = 2 ** 31
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+PLAYLIST_CACHE_SIZE = int(os.getenv("PLAYLIST_CACHE_SIZE", "256"))
+
+# Playlists with more followers than this are not fanned out on write; their
+# additions are merged into followers' feeds at read time instead.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv("FEED_FANOUT_MAX_FOLLOWERS", "1000"))
+FEED_RELEASE_WINDOW_DAYS = int(os.getenv("FEED_RELEASE_WINDOW_DAYS", "90"))
+
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", str(DB_POOL_SIZE)))
+
+# Where the aggregate reads (rating averages, weekly ranking) run: "mysql" queries the
+# primary/replica directly, "duckdb" queries Parquet exports of it (see analytics.py).
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+DB_BACKENDS = ("mysql", "duckdb")
+
+# Cutover from ratings + user_rates to song_ratings (migration 006), one step at a time:
+#   legacy        read and write the old tables only
+#   dual          write both in one transaction, read the old tables; run the backfill now
+#   cutover       write both, read song_ratings (switch back to dual to roll back)
+#   song_ratings  read and write song_ratings only
+RATINGS_MODE = os.getenv("RATINGS_MODE", "legacy")
+RATINGS_MODES = ("legacy", "dual", "cutover", "song_ratings")
+RATINGS_BACKFILL_BATCH = int(os.getenv("RATINGS_BACKFILL_BATCH", "5000"))
+
+# favorite_events (migration 007) keeps monthly partitions this far ahead of now, and
+# folds months older than FAVORITE_EVENTS_KEEP_MONTHS into favorite_weekly_counts.
+FAVORITE_PARTITIONS_AHEAD = int(os.getenv("FAVORITE_PARTITIONS_AHEAD", "3"))
+FAVORITE_EVENTS_KEEP_MONTHS = int(os.getenv("FAVORITE_EVENTS_KEEP_MONTHS", "13"))
+_MONTH_PARTITION = re.compile(r"p(\d{4})(\d{2})")
+
+# Playlist search ranks by FULLTEXT relevance x (1 + w_f * ln(1 + followers) + w_s * ln(1 + songs)).
+PLAYLIST_SEARCH_FOLLOWER_WEIGHT = float(os.getenv("PLAYLIST_SEARCH_FOLLOWER_WEIGHT", "0.5"))
+PLAYLIST_SEARCH_SONG_WEIGHT = float(os.getenv("PLAYLIST_SEARCH_SONG_WEIGHT", "0.1"))
+# innodb_ft_min_token_size does not apply to the ngram parser; ngram_token_size does.
+NGRAM_TOKEN_SIZE = int(os.getenv("NGRAM_TOKEN_SIZE", "2"))
+_FULLTEXT_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+def _month_of(partition: str) -> date:
+    match = _MONTH_PARTITION.fullmatch(partition)
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _fulltext_terms(query: str) -> str:
+    """
+    A BOOLEAN MODE expression requiring every word of a user query. Operator characters
+    are dropped, and so are words shorter than one n-gram, which can never match.
+    """
+    words = _FULLTEXT_OPERATORS.sub(" ", query).split()
+    return " ".join(f"+{word}" for word in words if len(word) >= NGRAM_TOKEN_SIZE)
+
+
+def primary_config() -> Dict[str, Any]:
+    return {
+        'host': os.getenv("MYSQL_HOST", "127.0.0.1"),
+        'port': int(os.getenv("MYSQL_PORT", "3306")),
+        'user': os.getenv("MYSQL_USER", "root"),
+        'password': os.getenv("MYSQL_PASS", ""),
+        'database': os.getenv("MYSQL_DB", ""),
+    }
+
+
+def replica_config() -> Optional[Dict[str, Any]]:
+    """Read-only replica DSN; reads fall back to the primary when MYSQL_REPLICA_HOST is unset."""
+    host = os.getenv("MYSQL_REPLICA_HOST")
+    if not host:
+        return None
+    return {
+        'host': host,
+        'port': int(os.getenv("MYSQL_REPLICA_PORT", os.getenv("MYSQL_PORT", "3306"))),
+        'user': os.getenv("MYSQL_REPLICA_USER", "display_user"),
+        'password': os.getenv("MYSQL_REPLICA_PASS", ""),
+        'database': os.getenv("MYSQL_REPLICA_DB", os.getenv("MYSQL_DB", "")),
+    }
+
 class DB:
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        driver: Optional[Driver] = None,
+        backend: Optional[str] = None,
+        ratings_mode: Optional[str] = None,
+    ) -> None:
+        backend = backend or DB_BACKEND
+        if backend not in DB_BACKENDS:
+            raise ValueError(f"unknown DB_BACKEND {backend!r}; expected one of {', '.join(DB_BACKENDS)}")
+        ratings_mode = ratings_mode or RATINGS_MODE
+        if ratings_mode not in RATINGS_MODES:
+            raise ValueError(f"unknown RATINGS_MODE {ratings_mode!r}; expected one of {', '.join(RATINGS_MODES)}")
+        self._driver = driver or get_driver()
+        self.backend = backend
+        self.ratings_mode = ratings_mode
+        self._analytics: Any = None
+        if backend == "duckdb":
+            from .analytics import Analytics
+            self._analytics = Analytics()
         self._config: Dict[str, Any] = {}
+        self._playlist_songs_cache = LRUCache(PLAYLIST_CACHE_SIZE)
+        self._pool: Optional[ConnectionPool] = None
+        self._read_config: Optional[Dict[str, Any]] = None
+        self._read_pool: Optional[ConnectionPool] = None
+        self._sql_cache: Dict[str, str] = {}
+        self._write_behind: Any = None
+        metrics.register_cache("playlist_songs", self._playlist_songs_cache)
     
+    @property
+    def driver(self) -> Driver:
+        return self._driver
+
     def _sql(self, filename: str) -> str:
-        return load_sql(SQL_DIR / filename)
+        sql = self._sql_cache.get(filename)
+        if sql is None:
+            sql = self._sql_cache[filename] = load_sql(SQL_DIR / filename)
+            metrics.name_statement(sql, filename[:-4] if filename.endswith(".sql") else filename)
+        return sql
+
+    @property
+    def reads_song_ratings(self) -> bool:
+        return self.ratings_mode in ("cutover", "song_ratings")
+
+    def _ratings_sql(self, filename: str) -> str:
+        """A statement that reads ratings, in its song_ratings (sr_) form once reads have moved."""
+        return self._sql("sr_" + filename if self.reads_song_ratings else filename)
 
     def import_csv(self, file_path: str, table_name: str, sample=False) -> int | None:
         df = pd.read_csv(file_path)
@@ -47,30 +184,191 @@ class DB:
 
     def connect(self) -> None:
         """Initialize connection config (called once at startup)"""
-        self._config = {
-            'host': os.getenv("MYSQL_HOST", "127.0.0.1"),
-            'port': int(os.getenv("MYSQL_PORT", "3306")),
-            'user': os.getenv("MYSQL_USER", "root"),
-            'password': os.getenv("MYSQL_PASS", ""),
-            'database': os.getenv("MYSQL_DB", ""),
-        }
+        self._config = primary_config()
         self.connection_string = f"mysql+pymysql://{self._config['user']}:{self._config['password']}@{self._config['host']}:{self._config['port']}/{self._config['database']}"
+        self._pool = ConnectionPool(
+            self.get_connection,
+            max_size=DB_POOL_SIZE,
+            timeout=DB_POOL_TIMEOUT,
+            recycle=DB_POOL_RECYCLE,
+            on_wait=lambda seconds: metrics.db_pool_wait_seconds.observe(seconds, "primary"),
+        )
+        metrics.register_pool("primary", self._pool)
+        self._read_config = replica_config()
+        if self._read_config is not None:
+            self._read_pool = ConnectionPool(
+                lambda: self.get_connection(read=True),
+                max_size=DB_READ_POOL_SIZE,
+                timeout=DB_POOL_TIMEOUT,
+                recycle=DB_POOL_RECYCLE,
+                on_wait=lambda seconds: metrics.db_pool_wait_seconds.observe(seconds, "replica"),
+            )
+            metrics.register_pool("replica", self._read_pool)
+
+    def acquire(self, read: bool = False, priority: int = 0) -> pymysql.connections.Connection:
+        """Check a connection out of this process's primary (or replica) pool; lower priority values go first."""
+        if self._pool is None:
+            raise RuntimeError("DB not initialized. Call connect() first.")
+        if read and self._read_pool is not None:
+            return self._read_pool.acquire(priority)
+        return self._pool.acquire(priority)
+
+    def pool_waiting(self) -> int:
+        """Callers in this process currently waiting for a pooled connection."""
+        return sum(pool.stats()["waiting"] for pool in (self._pool, self._read_pool) if pool is not None)
+
+    def release(self, conn: pymysql.connections.Connection, discard: bool = False, read: bool = False) -> None:
+        pool = self._read_pool if read and self._read_pool is not None else self._pool
+        if pool is not None:
+            pool.release(conn, discard=discard)
+
+    def start_write_behind(self) -> None:
+        """Queue favorite/follow writes in a local log and apply them in batches (see writebehind.py)."""
+        from .writebehind import WriteBehindLog
+        self._write_behind = WriteBehindLog(self)
+        self._write_behind.start()
+
+    def stop_write_behind(self) -> None:
+        if self._write_behind is not None:
+            self._write_behind.stop()
+
+    def _pending(self, kind: str, uid: Optional[int]) -> Dict[Any, bool]:
+        """This worker's unflushed write-behind events for a user: {sid or plstid: added}."""
+        if self._write_behind is None or uid is None:
+            return {}
+        return self._write_behind.pending(kind, int(uid))
+
+    def apply_write_behind(self, events: List[Any]) -> None:
+        """
+        Apply coalesced write-behind events in one transaction. Rows whose song or playlist
+        has since been deleted are dropped one by one; any other error propagates so the
+        segment is retried.
+        """
+        statements = {
+            ("favorite", True): "wb_favorite_add.sql",
+            ("favorite", False): "wb_favorite_remove.sql",
+            ("follow", True): "wb_follow_add.sql",
+            ("follow", False): "wb_follow_remove.sql",
+        }
+        groups: Dict[str, List[tuple]] = {}
+        for event in events:
+            # Whole seconds in the app's local time, like the TIMESTAMP columns hold; a
+            # remove in the same second as its add still matches it.
+            stamp = datetime.fromtimestamp(int(event.ts))
+            groups.setdefault(statements[(event.kind, event.added)], []).append((event.uid, event.key, stamp))
+        if not groups:
+            return
+        conn = self.get_connection(autocommit=False)
+        try:
+            try:
+                with conn.cursor() as cur:
+                    for filename, rows in groups.items():
+                        cur.executemany(self._sql(filename), rows)
+                conn.commit()
+            except self._driver.IntegrityError:
+                conn.rollback()
+                for filename, rows in groups.items():
+                    for row in rows:
+                        try:
+                            with conn.cursor() as cur:
+                                cur.execute(self._sql(filename), row)
+                            conn.commit()
+                        except self._driver.IntegrityError as e:
+                            conn.rollback()
+                            print(f"Write-behind dropped {filename[:-4]} {row[:2]}: {e}")
+        finally:
+            conn.close()
+
+    def apply_play_counts(self, segment: str, counts: Any) -> bool:
+        """
+        Add one play segment's SegmentCounts (see plays.py) to the roll-ups, recording the
+        segment in the same transaction. Returns False if it was already applied; raises
+        ValueError if MySQL rejects the segment's data, which no retry would fix.
+        """
+        conn = self.get_connection(autocommit=False)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT IGNORE INTO play_segments (name, events) VALUES (%s, %s)",
+                    (segment, counts.events),
+                )
+                if cur.rowcount == 0:
+                    conn.rollback()
+                    return False
+                # Sorted, so concurrent aggregators lock shared rows in the same order.
+                song_days = [(day, sid, n, ms) for (day, sid), (n, ms) in sorted(counts.song_days.items())]
+                user_songs = [
+                    (uid, sid, n, datetime.fromtimestamp(last))
+                    for (uid, sid), (n, last) in sorted(counts.user_songs.items())
+                ]
+                if song_days:
+                    cur.executemany(self._sql("play_song_daily_add.sql"), song_days)
+                if user_songs:
+                    cur.executemany(self._sql("play_user_song_add.sql"), user_songs)
+            conn.commit()
+            return True
+        except (self._driver.DataError, self._driver.IntegrityError) as e:
+            conn.rollback()
+            raise ValueError(f"play segment {segment} rejected: {e}") from e
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def prune_play_segments(self, days: int = 7) -> int:
+        """Forget applied segment names; their files are long gone."""
+        conn = self._ensure_conn()
+        with conn.cursor() as cur:
+            cur.execute(self._sql("prune_play_segments.sql"), (days,))
+            return cur.rowcount
 
-    def get_connection(self, autocommit: bool = True) -> pymysql.connections.Connection:
+    def get_weekly_play_ranking(self, limit: int = 10) -> List[Dict[str, Any]]:
+        sql = self._sql("weekly_play_ranking.sql")
+        conn = self._read_conn()
+        with conn.cursor() as cur:
+            cur.execute(sql, (limit,))
+            rows = cur.fetchall()
+        return list(rows)
+
+    def close_pool(self) -> None:
+        for pool in (self._pool, self._read_pool):
+            if pool is not None:
+                pool.close()
+
+    @contextmanager
+    def named_lock(self, name: str, timeout: int = 0) -> Iterator[bool]:
+        """
+        Hold a MySQL GET_LOCK for the duration of the block. Yields False when another
+        process already holds it, so periodic jobs run once per cluster, not once per worker.
+        """
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT GET_LOCK(%s, %s) AS acquired", (name, timeout))
+                acquired = bool(cur.fetchone()["acquired"])
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT RELEASE_LOCK(%s)", (name,))
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def get_connection(
+        self, autocommit: bool = True, read: bool = False, multi_statements: bool = False
+    ) -> pymysql.connections.Connection:
         if not self._config:
             raise RuntimeError("DB not initialized. Call connect() first.")
+        config = self._read_config if read and self._read_config else self._config
         
-        conn = pymysql.connect(
-            host=self._config['host'],
-            port=self._config['port'],
-            user=self._config['user'],
-            password=self._config['password'],
-            database=self._config['database'],
-            cursorclass=DictCursor,
-            autocommit=autocommit,
-        )
+        conn = self._driver.connect(config, autocommit=autocommit, multi_statements=multi_statements)
         
-        user = self._config['user']
+        user = config['user']
         try:
             with conn.cursor() as cur:
                 if user == 'display_user':
@@ -83,13 +381,52 @@ class DB:
         return conn
     
     def get_song_by_id(self, song_id: str) -> Optional[Dict[str, Any]]:
-        sql = self._sql("get_song_by_id.sql")
-        conn = self._ensure_conn()
+        sql = self._ratings_sql("get_song_by_id.sql")
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql, (song_id,))
             row = cur.fetchone()
         return row
 
+    def get_songs_by_ids(self, sids: List[str], uid: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Fetch many songs in one query, in request order, with the user's favorite/rating flags."""
+        sids = list(dict.fromkeys(str(sid) for sid in sids if sid))
+        if not sids:
+            return []
+        sql = self._ratings_sql("get_songs_by_ids.sql")
+        conn = self._read_conn()
+        with conn.cursor() as cur:
+            cur.execute(sql, {"sids": tuple(sids), "uid": uid})
+            rows = {row["sid"]: row for row in cur.fetchall()}
+        pending = self._pending("favorite", uid)
+        songs = []
+        for sid in sids:
+            row = rows.get(sid)
+            if row is None:
+                continue
+            row["is_favorite"] = bool(pending.get(sid, row["is_favorite"]))
+            songs.append(row)
+        return songs
+
+    def get_song_flags(self, uid: int, sids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {sid: {"is_favorite", "user_rating"}} for many songs in one query."""
+        sids = list(dict.fromkeys(str(sid) for sid in sids if sid))
+        if not sids:
+            return {}
+        sql = self._ratings_sql("song_flags.sql")
+        conn = self._read_conn()
+        with conn.cursor() as cur:
+            cur.execute(sql, {"sids": tuple(sids), "uid": uid})
+            rows = cur.fetchall()
+        pending = self._pending("favorite", uid)
+        return {
+            row["sid"]: {
+                "is_favorite": bool(pending.get(row["sid"], row["is_favorite"])),
+                "user_rating": row["user_rating"],
+            }
+            for row in rows
+        }
+
     def _ensure_conn(self) -> pymysql.connections.Connection:
         try:
             from flask import has_app_context, g
@@ -98,27 +435,72 @@ class DB:
 
         if has_app_context():
             if not hasattr(g, 'db_conn') or g.db_conn is None:
-                g.db_conn = self.get_connection()
+                g.db_conn = self.acquire(priority=g.get('db_priority', 0))
             return g.db_conn
         return self.get_connection()
 
-    def execute_script(self, sql_text: str) -> None:
+    def _read_conn(self) -> pymysql.connections.Connection:
+        """
+        Connection for read-only queries: a replica when one is configured, unless the
+        request was marked to read from the primary (it writes, or the client wrote recently).
+        """
+        if self._read_pool is None:
+            return self._ensure_conn()
+        try:
+            from flask import has_app_context, g
+        except Exception:
+            return self.get_connection(read=True)
+
+        if has_app_context():
+            if g.get('db_read_primary') or g.get('db_conn') is not None:
+                return self._ensure_conn()
+            if g.get('db_read_conn') is None:
+                g.db_read_conn = self.acquire(read=True, priority=g.get('db_priority', 0))
+            return g.db_read_conn
+        return self.get_connection(read=True)
+
+    def fetch_tuples(self, filename: str, params: Any = None) -> Tuple[List[str], List[tuple]]:
+        """
+        Column names and plain tuple rows for a sql/ statement; skips dict building for bulk
+        reads. Background jobs (suggest, browse, VIP cache) call this outside a request, where
+        the connection is their own and is closed here.
+        """
+        sql = self._sql(filename)
+        try:
+            from flask import has_app_context
+            close_after = not has_app_context()
+        except Exception:
+            close_after = True
+        conn = self._read_conn()
+        try:
+            with conn.cursor(self._driver.tuple_cursor) as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+                columns = [d[0] for d in cur.description or ()]
+        finally:
+            if close_after:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        return columns, list(rows)
+
+    def execute_script(
+        self,
+        sql_text: str,
+        start: int = 0,
+        progress: Optional[Callable[[Statement, int, float], None]] = None,
+    ) -> ScriptResult:
+        """
+        Run a multi-statement script (see sqlscript). Outside a request it gets its own
+        multi-statement connection so statements go to the server in batches; raises
+        ScriptError naming the statement index to pass back as `start` after a fix.
+        """
         from flask import has_app_context
-        conn = self._ensure_conn()
         close_after = not has_app_context()
+        conn = self.get_connection(multi_statements=True) if close_after else self._ensure_conn()
         try:
-            lines = []
-            for line in sql_text.split('\n'):
-                if '--' in line:
-                    line = line.split('--')[0]
-                if line.strip():
-                    lines.append(line)
-            cleaned_sql = '\n'.join(lines)
-
-            statements = [s.strip() for s in cleaned_sql.split(";") if s.strip()]
-            with conn.cursor() as cur:
-                for stmt in statements:
-                    cur.execute(stmt)
+            return run_script(conn, sql_text, start=start, progress=progress, multi=close_after)
         finally:
             if close_after:
                 try:
@@ -126,9 +508,20 @@ class DB:
                 except Exception:
                     pass
     
+    def list_applied_migrations(self) -> set[str]:
+        conn = self._ensure_conn()
+        with conn.cursor() as cur:
+            cur.execute("SELECT name FROM schema_migrations")
+            return {row["name"] for row in cur.fetchall()}
+
+    def record_migration(self, name: str) -> None:
+        conn = self._ensure_conn()
+        with conn.cursor() as cur:
+            cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+
     def list_users(self) -> List[Dict[str, Any]]:
         sql = self._sql("list_users.sql")
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql)
             rows = cur.fetchall()
@@ -138,7 +531,7 @@ class DB:
         search_pattern = f"%{query}%"
         sql = self._sql("search.sql")
         
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(
                 sql,
@@ -158,7 +551,7 @@ class DB:
         search_pattern = f"%{query}%"
         sql = self._sql("search_count.sql")
 
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(
                 sql,
@@ -172,9 +565,16 @@ class DB:
             row = cur.fetchone()
         return int(row["total"]) if row and "total" in row else 0
     
+    def refresh_song_display(self) -> None:
+        """Rebuild the song_display projection; triggers keep it fresh between rebuilds."""
+        sql = self._sql("refresh_song_display.sql")
+        conn = self._ensure_conn()
+        with conn.cursor() as cur:
+            cur.execute(sql)
+
     def get_album_songs(self, album_id: str) -> List[Dict[str, Any]]:
         sql = self._sql("get_album_songs.sql")
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql, (album_id,))
             rows = cur.fetchall()
@@ -183,7 +583,7 @@ class DB:
     def get_artist_songs(self, artist_id: str) -> List[Dict[str, Any]]:
         sql = self._sql("artist_songs.sql")
         
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql, (artist_id,))
             rows = cur.fetchall()
@@ -197,17 +597,37 @@ class DB:
             rows = cur.fetchall()
         return list(rows)
     
+    def _use_analytics(self) -> bool:
+        # Until the first export lands, the aggregate reads stay on MySQL.
+        return self._analytics is not None and self._analytics.as_of() is not None
+
+    def analytics_as_of(self) -> datetime:
+        """
+        Freshness watermark for get_rating_averages/get_weekly_ranking: the Parquet export's
+        as_of with DB_BACKEND=duckdb, otherwise now (MySQL reads are live). Read it before
+        the query; a newer export can only make the rows fresher than it says.
+        """
+        as_of = self._analytics.as_of() if self._analytics is not None else None
+        return as_of or datetime.now(timezone.utc)
+
+    def export_analytics(self) -> datetime:
+        """Write a new Parquet snapshot for the duckdb backend and return its as_of."""
+        from .analytics import export_snapshot
+        return export_snapshot(self)
+
     def get_rating_averages(self) -> List[Dict[str, Any]]:
-        sql = self._sql("rating_averages.sql")
-        conn = self._ensure_conn()
+        if self._use_analytics():
+            return self._analytics.rating_averages()
+        sql = self._ratings_sql("rating_averages.sql")
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql)
             rows = cur.fetchall()
         return list(rows)
 
     def get_recommendations(self, uid: int, limit: int = 10) -> List[Dict[str, Any]]:
-        sql = self._sql("recommendations.sql")
-        conn = self._ensure_conn()
+        sql = self._ratings_sql("recommendations.sql")
+        conn = self._read_conn()
         with conn.cursor() as cur:
             params = {"uid": uid, "limit": limit}
             cur.execute(sql, params)
@@ -224,11 +644,18 @@ class DB:
         if rate_value < 1 or rate_value > 5:
             raise ValueError("rate_value must be between 1 and 5")
 
+        if self.ratings_mode == "song_ratings":
+            conn = self._ensure_conn()
+            with conn.cursor() as cur:
+                cur.execute(self._sql("sr_rate_song.sql"), (uid, sid, rate_value, comment))
+            return {"uid": uid, "sid": sid, "rate_value": rate_value, "comment": comment}
+
         conn = self.get_connection(autocommit=False)
         try:
             with conn.cursor() as cur:
+                # Lowest rid: the row the backfill copies when a user has several.
                 cur.execute(
-                    "SELECT rid FROM user_rates WHERE uid = %s AND sid = %s LIMIT 1",
+                    "SELECT rid FROM user_rates WHERE uid = %s AND sid = %s ORDER BY rid LIMIT 1",
                     (uid, sid),
                 )
                 existing = cur.fetchone()
@@ -249,6 +676,8 @@ class DB:
                         "INSERT INTO user_rates (rid, uid, sid) VALUES (%s, %s, %s)",
                         (rid, uid, sid),
                     )
+                if self.ratings_mode != "legacy":
+                    cur.execute(self._sql("sr_rate_song.sql"), (uid, sid, rate_value, comment))
 
             conn.commit()
             return {
@@ -268,24 +697,68 @@ class DB:
                 pass
 
     def get_user_song_rating(self, uid: int, sid: str) -> Optional[Dict[str, Any]]:
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT ur.rid, ur.uid, ur.sid, r.rate_value, r.comment, ur.rated_at
-                FROM user_rates ur
-                JOIN ratings r ON ur.rid = r.rid
-                WHERE ur.uid = %s AND ur.sid = %s
-                LIMIT 1
-                """,
-                (uid, sid),
-            )
+            if self.reads_song_ratings:
+                cur.execute(self._sql("sr_get_user_song_rating.sql"), (uid, sid))
+            else:
+                cur.execute(
+                    """
+                    SELECT ur.rid, ur.uid, ur.sid, r.rate_value, r.comment, ur.rated_at
+                    FROM user_rates ur
+                    JOIN ratings r ON ur.rid = r.rid
+                    WHERE ur.uid = %s AND ur.sid = %s
+                    ORDER BY ur.rid
+                    LIMIT 1
+                    """,
+                    (uid, sid),
+                )
             row = cur.fetchone()
         return row
 
+    def backfill_song_ratings(
+        self, batch_size: int = RATINGS_BACKFILL_BATCH, pause: float = 0.0
+    ) -> Tuple[int, int]:
+        """
+        Copy ratings + user_rates into song_ratings in rid ranges of `batch_size`, one
+        short transaction each, so it runs beside live traffic. Needs RATINGS_MODE=dual
+        (or cutover) first, otherwise ratings written behind the backfill are missed.
+        Returns (rows affected, as MySQL counts them for upserts, and legacy ratings still
+        missing or different afterwards).
+        """
+        if self.ratings_mode not in ("dual", "cutover"):
+            raise ValueError("set RATINGS_MODE=dual on every worker before backfilling song_ratings")
+        conn = self.get_connection(autocommit=False)
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT COALESCE(MAX(rid), 0) AS max_rid FROM user_rates")
+                max_rid = cur.fetchone()["max_rid"]
+            conn.commit()
+            sql = self._sql("sr_backfill.sql")
+            affected = 0
+            for start in range(0, max_rid, batch_size):
+                with conn.cursor() as cur:
+                    cur.execute(sql, (start, start + batch_size))
+                    affected += cur.rowcount
+                conn.commit()
+                if pause:
+                    time.sleep(pause)
+            with conn.cursor() as cur:
+                cur.execute(self._sql("sr_backfill_check.sql"))
+                mismatched = cur.fetchone()["mismatched"]
+            conn.commit()
+            return affected, mismatched
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
     def get_weekly_ranking(self) -> List[Dict[str, Any]]:
+        if self._use_analytics():
+            return self._analytics.weekly_ranking()
         sql = self._sql("show-weekly-ranking.sql")
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql)
             rows = cur.fetchall()
@@ -298,33 +771,260 @@ class DB:
             cur.execute(sql, (uid, name, description, visibility))
             return int(cur.lastrowid)
 
-    def _next_playlist_position(self, plstid: int) -> int:
-        sql = self._sql("playlist_next_position.sql")
+    def _reserve_playlist_positions(self, cur: Any, plstid: int, count: int) -> int:
+        """Atomically reserve `count` gap-spaced positions; returns the highest one."""
+        sql = self._sql("playlist_reserve_positions.sql")
+        cur.execute(sql, (count * PLAYLIST_POSITION_GAP, plstid))
+        if cur.rowcount == 0:
+            raise ValueError("Playlist not found")
+        return int(cur.lastrowid)
+
+    @staticmethod
+    def _playlist_song_error(exc: Exception) -> ValueError:
+        if exc.args and exc.args[0] == 1452:
+            return ValueError("Song not found")
+        return ValueError("Song already exists in playlist")
+
+    def _log_playlist_changes(
+        self,
+        cur: Any,
+        plstid: int,
+        changes: List[tuple[str, str, Optional[int]]],
+        fanned_out: bool = True,
+    ) -> int:
+        """Bump the playlist version once per change and append them to playlist_changes."""
+        cur.execute(self._sql("playlist_bump_version.sql"), (len(changes), plstid))
+        version = int(cur.lastrowid)
+        first = version - len(changes) + 1
+        rows = [
+            (plstid, first + i, op, sid, position, 1 if fanned_out else 0)
+            for i, (op, sid, position) in enumerate(changes)
+        ]
+        cur.executemany(self._sql("log_playlist_change.sql"), rows)
+        return version
+
+    def _fan_out_playlist_adds(self, cur: Any, plstid: int, sids: List[str]) -> bool:
+        """
+        Write feed rows for every follower of a small public playlist. Returns False when the
+        playlist has too many followers, in which case readers pull its changes instead.
+        """
+        cur.execute(self._sql("playlist_follower_sample.sql"), (plstid, FEED_FANOUT_MAX_FOLLOWERS + 1))
+        followers = int(cur.fetchone()["followers"])
+        if followers > FEED_FANOUT_MAX_FOLLOWERS:
+            return False
+        if followers:
+            cur.execute(self._sql("fan_out_playlist_adds.sql"), {"plstid": plstid, "sids": tuple(sids)})
+        return True
+
+    def add_song_to_playlist(self, plstid: int, sid: str, position: Optional[int] = None) -> int:
+        """Append (or insert at `position`) without reading MAX(position); returns the position."""
+        sql = self._sql("add_playlist_song.sql")
         conn = self._ensure_conn()
-        with conn.cursor() as cur:
-            cur.execute(sql, (plstid,))
-            row = cur.fetchone()
-            return int(row["next_pos"] if row and row.get("next_pos") is not None else 1)
+        conn.begin()
+        try:
+            with conn.cursor() as cur:
+                target = None
+                for _ in range(2):
+                    candidate = position
+                    if candidate is None:
+                        candidate = self._reserve_playlist_positions(cur, plstid, 1)
+                    try:
+                        cur.execute(sql, (plstid, sid, candidate))
+                        target = candidate
+                        break
+                    except self._driver.IntegrityError as exc:
+                        if "uk_playlist_position" not in str(exc):
+                            raise self._playlist_song_error(exc) from exc
+                        if position is not None:
+                            raise ValueError("Position already taken") from exc
+                        # Rows were written behind the counter's back (e.g. a fixture load).
+                        cur.execute(self._sql("playlist_sync_tail.sql"), (plstid,))
+                if target is None:
+                    raise ValueError("Could not allocate a playlist position")
+                fanned_out = self._fan_out_playlist_adds(cur, plstid, [sid])
+                self._log_playlist_changes(cur, plstid, [("add", sid, target)], fanned_out=fanned_out)
+            conn.commit()
+            return target
+        except Exception:
+            conn.rollback()
+            raise
+
+    def add_songs_to_playlist(self, plstid: int, sids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Append many songs with a constant number of round trips, skipping unknown/duplicate sids."""
+        requested = list(dict.fromkeys(str(sid) for sid in sids if sid))
+        added: List[Dict[str, Any]] = []
+        skipped: List[Dict[str, Any]] = []
+        if not requested:
+            return {"added": added, "skipped": skipped}
 
-    def add_song_to_playlist(self, plstid: int, sid: str, position: Optional[int] = None) -> None:
+        status_sql = self._sql("playlist_song_status.sql")
+        insert_sql = self._sql("add_playlist_songs.sql")
         conn = self._ensure_conn()
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT 1 FROM playlist_song WHERE plstid = %s AND sid = %s LIMIT 1",
-                (plstid, sid),
-            )
-            if cur.fetchone():
-                raise ValueError("Song already exists in playlist")
+        conn.begin()
+        try:
+            with conn.cursor() as cur:
+                # Lock the playlist row first so the status read below can't race another writer.
+                cur.execute(self._sql("playlist_lock.sql"), (plstid,))
+                if cur.fetchone() is None:
+                    raise ValueError("Playlist not found")
+
+                cur.execute(status_sql, {"plstid": plstid, "sids": tuple(requested)})
+                status = {row["sid"]: row["position"] for row in cur.fetchall()}
+                pending = []
+                for sid in requested:
+                    if sid not in status:
+                        skipped.append({"sid": sid, "reason": "song not found"})
+                    elif status[sid] is not None:
+                        skipped.append({"sid": sid, "reason": "already in playlist"})
+                    else:
+                        pending.append(sid)
+
+                for _ in range(2):
+                    if not pending:
+                        break
+                    tail = self._reserve_playlist_positions(cur, plstid, len(pending))
+                    first = tail - (len(pending) - 1) * PLAYLIST_POSITION_GAP
+                    rows = [(plstid, sid, first + i * PLAYLIST_POSITION_GAP) for i, sid in enumerate(pending)]
+                    cur.executemany(insert_sql, rows)
+                    if cur.rowcount == len(rows):
+                        added.extend({"sid": sid, "position": pos} for _, sid, pos in rows)
+                        pending = []
+                        break
+
+                    # Some positions were already taken by rows written outside the tail counter.
+                    cur.execute(status_sql, {"plstid": plstid, "sids": tuple(pending)})
+                    status = {row["sid"]: row["position"] for row in cur.fetchall()}
+                    retry = []
+                    for _, sid, pos in rows:
+                        if status.get(sid) == pos:
+                            added.append({"sid": sid, "position": pos})
+                        else:
+                            retry.append(sid)
+                    pending = retry
+                    cur.execute(self._sql("playlist_sync_tail.sql"), (plstid,))
+
+                skipped.extend({"sid": sid, "reason": "no position available"} for sid in pending)
+                if added:
+                    fanned_out = self._fan_out_playlist_adds(cur, plstid, [row["sid"] for row in added])
+                    self._log_playlist_changes(
+                        cur,
+                        plstid,
+                        [("add", row["sid"], row["position"]) for row in added],
+                        fanned_out=fanned_out,
+                    )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return {"added": added, "skipped": skipped}
 
-            if position is None:
-                position = self._next_playlist_position(plstid)
+    def _playlist_song_position(self, cur: Any, plstid: int, sid: str) -> Optional[int]:
+        cur.execute(self._sql("playlist_song_position.sql"), (plstid, sid))
+        row = cur.fetchone()
+        return int(row["position"]) if row else None
 
-            sql = self._sql("add_playlist_song.sql")
-            cur.execute(sql, (plstid, sid, position))
+    def _playlist_move_bounds(
+        self,
+        cur: Any,
+        plstid: int,
+        sid: str,
+        tail: int,
+        before_sid: Optional[str],
+        after_sid: Optional[str],
+    ) -> tuple[int, Optional[int]]:
+        """Return the (lo, hi) positions the moved song must land between; hi=None means the end."""
+        if before_sid is not None:
+            hi = self._playlist_song_position(cur, plstid, before_sid)
+            if hi is None:
+                raise ValueError("before_sid is not in playlist")
+            cur.execute(self._sql("playlist_prev_position.sql"), (plstid, hi, sid))
+            row = cur.fetchone()
+            lo = row["position"] if row and row["position"] is not None else 0
+            return int(lo), hi
+        if after_sid is not None:
+            lo = self._playlist_song_position(cur, plstid, after_sid)
+            if lo is None:
+                raise ValueError("after_sid is not in playlist")
+            cur.execute(self._sql("playlist_following_position.sql"), (plstid, lo, sid))
+            row = cur.fetchone()
+            hi = row["position"] if row else None
+            return lo, int(hi) if hi is not None else None
+        return tail, None
+
+    def _rebalance_playlist(self, cur: Any, plstid: int) -> List[Dict[str, Any]]:
+        """Respace every position by PLAYLIST_POSITION_GAP; returns the new (sid, position) rows."""
+        # Shift everything out of the way first so the renumber never trips uk_playlist_position.
+        cur.execute(self._sql("playlist_shift_positions.sql"), (PLAYLIST_POSITION_SHIFT, plstid))
+        cur.execute(self._sql("playlist_renumber_positions.sql"), (plstid, PLAYLIST_POSITION_GAP, plstid))
+        cur.execute(self._sql("playlist_reset_tail.sql"), (plstid,))
+        cur.execute(self._sql("playlist_positions.sql"), (plstid,))
+        return list(cur.fetchall())
+
+    def move_playlist_song(
+        self,
+        plstid: int,
+        sid: str,
+        before_sid: Optional[str] = None,
+        after_sid: Optional[str] = None,
+    ) -> int:
+        """
+        Move a song directly before `before_sid`, after `after_sid`, or to the end.
+        Only the moved row is rewritten unless its neighbours have no gap left.
+        """
+        if before_sid is not None and after_sid is not None:
+            raise ValueError("Provide only one of before_sid and after_sid")
+
+        conn = self.get_connection(autocommit=False)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(self._sql("playlist_lock.sql"), (plstid,))
+                row = cur.fetchone()
+                if row is None:
+                    raise ValueError("Playlist not found")
+                tail = int(row["tail_position"])
+
+                current = self._playlist_song_position(cur, plstid, sid)
+                if current is None:
+                    raise ValueError("Song not in playlist")
+                if sid in (before_sid, after_sid):
+                    conn.commit()
+                    return current
+
+                position = None
+                changes: List[tuple[str, str, Optional[int]]] = []
+                for _ in range(2):
+                    lo, hi = self._playlist_move_bounds(cur, plstid, sid, tail, before_sid, after_sid)
+                    if hi is None:
+                        position = self._reserve_playlist_positions(cur, plstid, 1)
+                        position = max(position, lo + PLAYLIST_POSITION_GAP)
+                        break
+                    if hi - lo > 1:
+                        position = (lo + hi) // 2
+                        break
+                    # Every position changes, so clients need a move entry for each song.
+                    respaced = self._rebalance_playlist(cur, plstid)
+                    changes = [("move", row["sid"], row["position"]) for row in respaced if row["sid"] != sid]
+                    tail = respaced[-1]["position"] if respaced else 0
+                if position is None:
+                    raise ValueError("Could not find a free position")
+
+                cur.execute(self._sql("update_playlist_song_position.sql"), (position, plstid, sid))
+                changes.append(("move", sid, position))
+                self._log_playlist_changes(cur, plstid, changes)
+            conn.commit()
+            return position
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
 
     def list_playlists(self, uid: int) -> List[Dict[str, Any]]:
         sql = self._sql("list_playlists.sql")
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql, (uid,))
             rows = cur.fetchall()
@@ -342,7 +1042,7 @@ class DB:
 
     def get_playlist(self, plstid: int) -> Optional[Dict[str, Any]]:
         sql = self._sql("get_playlist.sql")
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql, (plstid,))
             row = cur.fetchone()
@@ -356,53 +1056,245 @@ class DB:
             cur.execute(sql, (plstid, uid, uid))
             return cur.rowcount > 0
 
-    def list_playlist_songs(self, plstid: int) -> List[Dict[str, Any]]:
+    def list_playlist_songs(self, plstid: int, version: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Rendered track list. When the caller knows the playlist version, the list is served
+        from (and stored in) a per-process cache keyed by (plstid, version).
+        """
+        if version is not None:
+            cached = self._playlist_songs_cache.get((plstid, version))
+            if cached is not None:
+                return [dict(row) for row in cached]
+
         sql = self._sql("list_playlist_songs.sql")
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql, (plstid,))
+            rows = list(cur.fetchall())
+
+        # Only cache when no write landed between reading the version and the songs.
+        if version is not None and self.get_playlist_version(plstid) == version:
+            self._playlist_songs_cache.set((plstid, version), [dict(row) for row in rows])
+        return rows
+
+    def get_playlist_version(self, plstid: int) -> Optional[int]:
+        sql = self._sql("get_playlist_version.sql")
+        conn = self._read_conn()
+        with conn.cursor() as cur:
+            cur.execute(sql, (plstid,))
+            row = cur.fetchone()
+        return int(row["version"]) if row else None
+
+    def list_playlist_changes(self, plstid: int, since: int, limit: int) -> List[Dict[str, Any]]:
+        sql = self._sql("list_playlist_changes.sql")
+        conn = self._read_conn()
+        with conn.cursor() as cur:
+            cur.execute(sql, (plstid, since, limit))
             rows = cur.fetchall()
         return list(rows)
 
     def favorite_song(self, uid: int, sid: str) -> None:
+        if self._write_behind is not None:
+            self._write_behind.append("favorite", True, uid, sid)
+            return
         sql = self._sql("favorite_song.sql")
         conn = self._ensure_conn()
         with conn.cursor() as cur:
             cur.execute(sql, (uid, sid))
 
     def unfavorite_song(self, uid: int, sid: str) -> bool:
+        if self._write_behind is not None:
+            if not self.is_song_favorite(uid, sid):
+                return False
+            self._write_behind.append("favorite", False, uid, sid)
+            return True
         conn = self._ensure_conn()
         with conn.cursor() as cur:
             cur.execute("DELETE FROM user_favorite_song WHERE uid = %s AND sid = %s", (uid, sid))
             return cur.rowcount > 0
 
     def is_song_favorite(self, uid: int, sid: str) -> bool:
-        conn = self._ensure_conn()
+        pending = self._pending("favorite", uid).get(sid)
+        if pending is not None:
+            return pending
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute("SELECT 1 FROM user_favorite_song WHERE uid = %s AND sid = %s LIMIT 1", (uid, sid))
             return cur.fetchone() is not None
 
     def list_favorites(self, uid: int) -> List[Dict[str, Any]]:
         sql = self._sql("list_favorites.sql")
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql, (uid,))
             rows = cur.fetchall()
+        pending = self._pending("favorite", uid)
+        if not pending:
+            return list(rows)
+        rows = [row for row in rows if pending.get(row["sid"], True)]
+        listed = {row["sid"] for row in rows}
+        now = datetime.now()
+        added = [
+            {"sid": song["sid"], "song_title": song["name"], "album_title": song["album_title"] or "Unknown",
+             "artist_names": song["artist_names"], "favored_at": now}
+            for song in self.get_songs_by_ids([sid for sid, on in pending.items() if on and sid not in listed])
+        ]
+        return added + rows
+
+    def iter_cf_interactions(self, page_size: int = 50_000) -> Iterator[Tuple[str, List[tuple]]]:
+        """
+        Yield ("favorite", [(uid, sid), ...]), ("play", [(uid, sid, plays), ...]) and
+        ("rating", [(uid, sid, rate_value), ...]) pages for the neighbours build,
+        keyset-paged so no single result set holds them all.
+        """
+        conn = self.get_connection(read=True)
+        try:
+            with conn.cursor(self._driver.tuple_cursor) as cur:
+                sql = self._sql("cf_favorites_page.sql")
+                last: tuple = (0, "")
+                while True:
+                    cur.execute(sql, (*last, page_size))
+                    rows = list(cur.fetchall())
+                    if not rows:
+                        break
+                    yield "favorite", rows
+                    last = tuple(rows[-1])
+                sql = self._sql("cf_plays_page.sql")
+                last = (0, "")
+                while True:
+                    cur.execute(sql, (*last, page_size))
+                    rows = list(cur.fetchall())
+                    if not rows:
+                        break
+                    yield "play", rows
+                    last = tuple(rows[-1][:2])
+                if self.reads_song_ratings:
+                    sql = self._sql("sr_cf_ratings_page.sql")
+                    last = (0, "")
+                    while True:
+                        cur.execute(sql, (*last, page_size))
+                        rows = list(cur.fetchall())
+                        if not rows:
+                            break
+                        yield "rating", rows
+                        last = tuple(rows[-1][:2])
+                    return
+                sql = self._sql("cf_ratings_page.sql")
+                last_rid = 0
+                while True:
+                    cur.execute(sql, (last_rid, page_size))
+                    rows = list(cur.fetchall())
+                    if not rows:
+                        break
+                    yield "rating", [(uid, sid, rate) for _, uid, sid, rate in rows]
+                    last_rid = rows[-1][0]
+        finally:
+            conn.close()
+
+    def replace_song_neighbors(self, rows: Iterable[tuple], batch_size: int = 5_000) -> int:
+        """
+        Load (sid, rank_no, neighbor_sid, score) rows into a fresh song_neighbors_build and
+        swap it in atomically. Returns the number of rows written.
+        """
+        insert_sql = self._sql("insert_song_neighbors.sql")
+        conn = self.get_connection(autocommit=False)
+        total = 0
+        try:
+            with conn.cursor() as cur:
+                cur.execute("DROP TABLE IF EXISTS song_neighbors_build, song_neighbors_old")
+                cur.execute("CREATE TABLE song_neighbors_build LIKE song_neighbors")
+                batch: List[tuple] = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        cur.executemany(insert_sql, batch)
+                        conn.commit()
+                        total += len(batch)
+                        batch = []
+                if batch:
+                    cur.executemany(insert_sql, batch)
+                    conn.commit()
+                    total += len(batch)
+                cur.execute(
+                    "RENAME TABLE song_neighbors TO song_neighbors_old, song_neighbors_build TO song_neighbors"
+                )
+                cur.execute("DROP TABLE song_neighbors_old")
+            return total
+        finally:
+            conn.close()
+
+    def get_similar_songs(self, sid: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Songs most often favorited by the same users as `sid`, from the last neighbours build."""
+        sql = self._sql("similar_songs.sql")
+        conn = self._read_conn()
+        with conn.cursor() as cur:
+            cur.execute(sql, (sid, limit))
+            rows = cur.fetchall()
         return list(rows)
 
-    def search_playlists(self, query: str, uid: Optional[int] = None) -> List[Dict[str, Any]]:
+    def get_because_you_liked(self, uid: int, seeds: int = 3, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        [{"seed": {"sid", "name"}, "songs": [...]}] for the user's `seeds` newest favorites,
+        each with up to `limit` neighbours the user hasn't favorited yet.
         """
-        Search playlists by name. Only includes public playlists.
+        sql = self._sql("because_you_liked.sql")
+        conn = self._read_conn()
+        with conn.cursor() as cur:
+            # Read a few extra neighbours per seed to make up for ones already favorited.
+            cur.execute(sql, {"uid": uid, "seeds": seeds, "window": limit * 2})
+            rows = cur.fetchall()
+        groups: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            group = groups.setdefault(row["seed_sid"], {
+                "seed": {"sid": row["seed_sid"], "name": row["seed_name"]},
+                "songs": [],
+            })
+            if len(group["songs"]) < limit:
+                group["songs"].append({k: row[k] for k in ("sid", "name", "album_title", "artist_names", "score")})
+        return list(groups.values())
+
+    def search_playlists(
+        self,
+        query: str,
+        owner: Optional[int] = None,
+        limit: int = 50,
+        before: Optional[Tuple[float, int]] = None,
+    ) -> List[Dict[str, Any]]:
         """
-        pattern = f"%{query}%"
+        Public playlists whose name or description contains every word of `query`, best
+        first (see search_playlists.sql). `owner` limits them to one user's playlists;
+        pass the last row's (score, plstid) as `before` for the next page.
+        """
+        terms = _fulltext_terms(query)
+        if not terms:
+            return []
         sql = self._sql("search_playlists.sql")
-        conn = self._ensure_conn()
+        params = {
+            "terms": terms,
+            "owner": owner,
+            "follower_weight": PLAYLIST_SEARCH_FOLLOWER_WEIGHT,
+            "song_weight": PLAYLIST_SEARCH_SONG_WEIGHT,
+            "before_score": before[0] if before else None,
+            "before_id": before[1] if before else None,
+            "limit": int(limit),
+        }
+        conn = self._read_conn()
         with conn.cursor() as cur:
-            cur.execute(sql, (pattern,))
+            cur.execute(sql, params)
             rows = cur.fetchall()
         return list(rows)
 
+    def refresh_playlist_stats(self) -> None:
+        """Recount follower_count/song_count for every playlist; triggers keep them fresh between recounts."""
+        sql = self._sql("refresh_playlist_stats.sql")
+        conn = self._ensure_conn()
+        with conn.cursor() as cur:
+            cur.execute(sql)
+
     def follow_playlist(self, uid: int, plstid: int) -> None:
+        if self._write_behind is not None:
+            self._write_behind.append("follow", True, uid, plstid)
+            return
         conn = self._ensure_conn()
         with conn.cursor() as cur:
             cur.execute(
@@ -411,6 +1303,11 @@ class DB:
             )
 
     def unfollow_playlist(self, uid: int, plstid: int) -> bool:
+        if self._write_behind is not None:
+            if not self.is_playlist_followed(uid, plstid):
+                return False
+            self._write_behind.append("follow", False, uid, plstid)
+            return True
         conn = self._ensure_conn()
         with conn.cursor() as cur:
             cur.execute(
@@ -420,7 +1317,7 @@ class DB:
             return cur.rowcount > 0
 
     def list_followed_playlists(self, uid: int) -> List[Dict[str, Any]]:
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -440,10 +1337,169 @@ class DB:
                 (uid,),
             )
             rows = cur.fetchall()
+        pending = self._pending("follow", uid)
+        if not pending:
+            return list(rows)
+        rows = [row for row in rows if pending.get(row["plstid"], True)]
+        listed = {row["plstid"] for row in rows}
+        now = datetime.now()
+        added = []
+        for plstid, on in pending.items():
+            playlist = self.get_playlist(plstid) if on and plstid not in listed else None
+            if playlist and playlist["visibility"] == "public":
+                playlist.pop("version", None)
+                added.append({**playlist, "followed_at": now})
+        return added + rows
+
+    def follow_artist(self, uid: int, artid: str) -> None:
+        conn = self._ensure_conn()
+        with conn.cursor() as cur:
+            try:
+                # Not INSERT IGNORE: that would downgrade the unknown-artist FK error to a warning.
+                cur.execute(
+                    "INSERT INTO user_follows_artist (uid, artid) VALUES (%s, %s) "
+                    "ON DUPLICATE KEY UPDATE uid = uid",
+                    (uid, artid),
+                )
+            except self._driver.IntegrityError as exc:
+                raise ValueError("Artist not found") from exc
+
+    def unfollow_artist(self, uid: int, artid: str) -> bool:
+        conn = self._ensure_conn()
+        with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM user_follows_artist WHERE uid = %s AND artid = %s",
+                (uid, artid),
+            )
+            return cur.rowcount > 0
+
+    def get_feed(
+        self,
+        uid: int,
+        limit: int = 20,
+        before_ts: Optional[str] = None,
+        before_key: str = "",
+    ) -> List[Dict[str, Any]]:
+        """
+        One page of a user's "what's new" feed, newest first: fanned-out playlist rows,
+        changes pulled from high-follower playlists, and recent releases by followed artists.
+        Pass the last item's (created_at, item_key) as (before_ts, before_key) for the next page.
+        """
+        sql = self._sql("feed.sql")
+        params = {
+            "uid": uid,
+            "limit": int(limit),
+            "window": int(limit) * 2,
+            "before_ts": before_ts or "9999-12-31 23:59:59",
+            "before_key": before_key if before_ts else "",
+            "release_days": FEED_RELEASE_WINDOW_DAYS,
+        }
+        conn = self._read_conn()
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
         return list(rows)
 
-    def is_playlist_followed(self, uid: int, plstid: int) -> bool:
+    def prune_feed_items(self, days: int, batch_size: int = 10_000) -> int:
+        """Delete materialized feed rows older than `days`, in small batches."""
+        sql = self._sql("prune_feed_items.sql")
+        conn = self._ensure_conn()
+        total = 0
+        with conn.cursor() as cur:
+            while True:
+                cur.execute(sql, (days, batch_size))
+                total += cur.rowcount
+                if cur.rowcount < batch_size:
+                    return total
+
+    def favorite_partitions(self) -> List[Dict[str, Any]]:
+        """favorite_events partitions, oldest first: name, upper_bound (None = MAXVALUE), approx_rows."""
+        conn = self._ensure_conn()
+        with conn.cursor() as cur:
+            cur.execute(self._sql("favorite_partitions.sql"))
+            return list(cur.fetchall())
+
+    def add_favorite_partitions(self, months_ahead: int = FAVORITE_PARTITIONS_AHEAD) -> List[str]:
+        """
+        Split p_future into monthly partitions pYYYYMM up to `months_ahead` months past the
+        current one. The first split starts at the oldest event's month, so history lands
+        in its own months. Returns the partitions added.
+        """
+        names = [p["name"] for p in self.favorite_partitions()]
+        months = [_month_of(name) for name in names if _MONTH_PARTITION.fullmatch(name)]
+        if months:
+            start = _add_months(max(months), 1)
+        else:
+            conn = self._ensure_conn()
+            with conn.cursor() as cur:
+                cur.execute(self._sql("favorite_events_oldest.sql"))
+                oldest = cur.fetchone()["oldest"]
+            start = (oldest or datetime.now()).date().replace(day=1)
+        last = _add_months(datetime.now().date().replace(day=1), months_ahead)
+        added = []
+        month = start
+        while month <= last:
+            added.append(month)
+            month = _add_months(month, 1)
+        if not added:
+            return []
+        partitions = ",\n".join(
+            f"  PARTITION p{m:%Y%m} VALUES LESS THAN (UNIX_TIMESTAMP('{_add_months(m, 1):%Y-%m-%d} 00:00:00'))"
+            for m in added
+        )
         conn = self._ensure_conn()
+        with conn.cursor() as cur:
+            cur.execute(
+                f"ALTER TABLE favorite_events REORGANIZE PARTITION p_future INTO (\n{partitions},\n"
+                "  PARTITION p_future VALUES LESS THAN MAXVALUE\n)"
+            )
+        return [f"p{m:%Y%m}" for m in added]
+
+    def archive_favorite_partitions(self, keep_months: int = FAVORITE_EVENTS_KEEP_MONTHS) -> List[str]:
+        """
+        Fold monthly partitions that end before the last `keep_months` months into
+        favorite_weekly_counts and drop them, oldest first. The fold and its record in
+        favorite_archived_partitions commit together; DROP PARTITION is DDL and commits
+        on its own, so a rerun after a crash between the two only drops. The partition
+        left lowest keeps accepting late -1 events for archived weeks and folds them in
+        when its turn comes. Returns the partitions archived.
+        """
+        cutoff = _add_months(datetime.now().date().replace(day=1), -keep_months)
+        archived = []
+        for partition in self.favorite_partitions():
+            name, bound = partition["name"], partition["upper_bound"]
+            if not _MONTH_PARTITION.fullmatch(name) or bound is None or bound.date() > cutoff:
+                break
+            conn = self.get_connection(autocommit=False)
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT 1 FROM favorite_archived_partitions WHERE partition_name = %s FOR UPDATE",
+                        (name,),
+                    )
+                    if cur.fetchone() is None:
+                        cur.execute(self._sql("archive_favorite_partition.sql"), (bound,))
+                        cur.execute(
+                            "INSERT INTO favorite_archived_partitions (partition_name, upper_bound) VALUES (%s, %s)",
+                            (name, bound),
+                        )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            conn = self._ensure_conn()
+            with conn.cursor() as cur:
+                cur.execute(f"ALTER TABLE favorite_events DROP PARTITION {name}")
+            archived.append(name)
+        return archived
+
+    def is_playlist_followed(self, uid: int, plstid: int) -> bool:
+        pending = self._pending("follow", uid).get(plstid)
+        if pending is not None:
+            return pending
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(
                 "SELECT 1 FROM user_follow_playlist WHERE uid = %s AND plstid = %s LIMIT 1",
@@ -452,45 +1508,14 @@ class DB:
             return cur.fetchone() is not None
     
     def get_user_profile(self, uid: int) -> Optional[Dict[str, Any]]:
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT
-                    u.uid,
-                    u.username,
-                    u.email,
-                    u.gender,
-                    u.age,
-                    u.street,
-                    u.city,
-                    u.province,
-                    u.mbti,
-                    u.created_at,
-                    u.updated_at,
-                    (
-                        SELECT COUNT(DISTINCT pl.plstid)
-                        FROM playlists pl
-                        WHERE pl.uid = u.uid
-                    ) AS num_playlists,
-                    (
-                        SELECT COUNT(DISTINCT ufs.sid)
-                        FROM user_favorite_song ufs
-                        WHERE ufs.uid = u.uid
-                    ) AS num_favorites
-                FROM users u
-                WHERE u.uid = %s
-                """,
-                (uid,)
-            )
+            cur.execute(self._sql("get_user_profile.sql"), (uid,))
             user_row = cur.fetchone()
             if not user_row:
                 return None
 
-            cur.execute(
-                "SELECT hobby FROM user_hobbies WHERE uid = %s ORDER BY hobby ASC",
-                (uid,)
-            )
+            cur.execute(self._sql("list_user_hobbies.sql"), (uid,))
             hobbies = [row["hobby"] for row in cur.fetchall()]
             user_row["hobbies"] = hobbies
             vip_row = self.get_vip_status(uid)
@@ -499,7 +1524,7 @@ class DB:
 
     def get_vip_status(self, uid: int) -> Optional[Dict[str, Any]]:
         sql = self._sql("get_vip_status.sql")
-        conn = self._ensure_conn()
+        conn = self._read_conn()
         with conn.cursor() as cur:
             cur.execute(sql, (uid,))
             row = cur.fetchone()
@@ -606,6 +1631,11 @@ class DB:
             row = cur.fetchone()
         return row
 
+    def get_active_vip_uids(self) -> Set[int]:
+        """Every uid whose VIP entitlement has not ended; loaded in bulk for admission control."""
+        _, rows = self.fetch_tuples("active_vip_uids.sql")
+        return {int(uid) for uid, in rows}
+
     def upsert_vip_user(self, uid: int, special_effect: bool = True) -> Dict[str, Any]:
         conn = self._ensure_conn()
         try:
@@ -644,7 +1674,7 @@ class DB:
                 ON DUPLICATE KEY UPDATE {update_clause}
                 """
                 cur.execute(dynamic_sql, insert_vals)
-        except pymysql.err.IntegrityError as exc:
+        except self._driver.IntegrityError as exc:
             raise ValueError("Could not promote user to VIP") from exc
 
         vip_row = self.get_vip_status(uid)
@@ -663,7 +1693,7 @@ class DB:
         with conn.cursor() as cur:
             try:
                 cur.execute(insert_sql, (username, email, password_hash))
-            except pymysql.err.IntegrityError as exc:
+            except self._driver.IntegrityError as exc:
                 raise ValueError("User with this email already exists") from exc
 
             new_uid = cur.lastrowid
@@ -0,0 +1,117 @@
+"""
+MySQL client drivers behind one small interface, chosen with DB_DRIVER.
+
+- pymysql (default): pure Python; counts bytes read per statement for the metrics.
+- mysqlclient: the C extension (`pip install mysqlclient`, needs libmysqlclient headers).
+  Rows are decoded in C, which matters on wide results such as /ratings/average, /users
+  and search pages.
+
+Every driver hands out DB-API connections whose default cursor returns dict rows and
+records per-statement metrics; `tuple_cursor` skips the dict building for bulk paths.
+`stream_cursor` is unbuffered (rows are read as they are fetched) and uninstrumented,
+since its row count is unknown until the result is drained.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Type
+
+import pymysql
+import pymysql.cursors
+from pymysql.constants import CLIENT
+
+from .metrics import InstrumentedConnection, InstrumentedCursor, InstrumentedTupleCursor, TimedCursorMixin
+
+DB_DRIVER = os.getenv("DB_DRIVER", "pymysql")
+
+
+class Driver:
+    name = ""
+    dict_cursor: Type[Any]
+    tuple_cursor: Type[Any]
+    stream_cursor: Type[Any]
+    Error: Type[Exception]
+    IntegrityError: Type[Exception]
+    DataError: Type[Exception]
+
+    def connect(self, config: Dict[str, Any], autocommit: bool = True, multi_statements: bool = False) -> Any:
+        raise NotImplementedError
+
+
+class PyMySQLDriver(Driver):
+    name = "pymysql"
+    dict_cursor = InstrumentedCursor
+    tuple_cursor = InstrumentedTupleCursor
+    stream_cursor = pymysql.cursors.SSCursor
+    Error = pymysql.err.Error
+    IntegrityError = pymysql.err.IntegrityError
+    DataError = pymysql.err.DataError
+
+    def connect(self, config: Dict[str, Any], autocommit: bool = True, multi_statements: bool = False) -> Any:
+        return InstrumentedConnection(
+            host=config['host'],
+            port=config['port'],
+            user=config['user'],
+            password=config['password'],
+            database=config['database'],
+            cursorclass=self.dict_cursor,
+            autocommit=autocommit,
+            client_flag=CLIENT.MULTI_STATEMENTS if multi_statements else 0,
+        )
+
+
+class MySQLClientDriver(Driver):
+    name = "mysqlclient"
+
+    def __init__(self) -> None:
+        try:
+            import MySQLdb
+            import MySQLdb.cursors
+        except ImportError as e:
+            raise RuntimeError("DB_DRIVER=mysqlclient needs the mysqlclient package (pip install mysqlclient)") from e
+        self._module = MySQLdb
+        self.dict_cursor = type("MySQLdbInstrumentedCursor", (TimedCursorMixin, MySQLdb.cursors.DictCursor), {})
+        self.tuple_cursor = type("MySQLdbInstrumentedTupleCursor", (TimedCursorMixin, MySQLdb.cursors.Cursor), {})
+        self.stream_cursor = MySQLdb.cursors.SSCursor
+        self.Error = MySQLdb.Error
+        self.IntegrityError = MySQLdb.IntegrityError
+        self.DataError = MySQLdb.DataError
+
+    def connect(self, config: Dict[str, Any], autocommit: bool = True, multi_statements: bool = False) -> Any:
+        # mysqlclient turns multi-statements on by default; keep pooled connections
+        # single-statement like pymysql's.
+        return self._module.connect(
+            host=config['host'],
+            port=config['port'],
+            user=config['user'],
+            password=config['password'],
+            database=config['database'],
+            cursorclass=self.dict_cursor,
+            autocommit=autocommit,
+            charset="utf8mb4",
+            multi_statements=multi_statements,
+        )
+
+
+DRIVERS: Dict[str, Type[Driver]] = {
+    PyMySQLDriver.name: PyMySQLDriver,
+    MySQLClientDriver.name: MySQLClientDriver,
+}
+
+
+def get_driver(name: str = DB_DRIVER) -> Driver:
+    try:
+        return DRIVERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown DB_DRIVER {name!r}; choose from {', '.join(DRIVERS)}") from None
+
+
+def available_drivers() -> Dict[str, Driver]:
+    """Drivers whose client library is importable here."""
+    found = {}
+    for name in DRIVERS:
+        try:
+            found[name] = get_driver(name)
+        except RuntimeError:
+            continue
+    return found
@@ -9,14 +9,17 @@ import pandas as pd
 import kagglehub
 from kagglehub import KaggleDatasetAdapter
 
-from .db import get_db, DB
-from .tool import load_sql
+from .db import FAVORITE_EVENTS_KEEP_MONTHS, FAVORITE_PARTITIONS_AHEAD, RATINGS_BACKFILL_BATCH, get_db, DB
+from .sqlscript import ScriptError, print_progress
+from .tool import load_sql, resolve_path
 
 DATASET_FILE_NAME = "tracks_features.csv"
 
 
 PRODUCTION_DATA_SIZE = 100_000
 
+MIGRATIONS_DIR = "src/sql/migrations"
+
 def init_db() -> None:
     db: DB = get_db()
 
@@ -32,8 +35,11 @@ def init_db() -> None:
 
     sample_favorites = load_sql("src/sql/sample_favorites")
     
+    db.execute_script(schema_sql)
+    print("Executed schema.")
+    migrate(db)
+
     init_queries = {
-        "schema": schema_sql,
         "tags": tags_sql,
         "virtual_tags": virtual_tags_sql,
         "example": example_sql,
@@ -54,6 +60,23 @@ def init_db() -> None:
 
     print("Database initialized and exampleed.")
 
+def migrate(db: DB | None = None) -> List[str]:
+    """Apply pending src/sql/migrations/*.sql scripts in filename order."""
+    if db is None:
+        db = get_db()
+    db.execute_script(load_sql("src/sql/schema_migrations.sql"))
+    applied = db.list_applied_migrations()
+
+    ran = []
+    for path in sorted(resolve_path(MIGRATIONS_DIR).glob("*.sql")):
+        if path.stem in applied:
+            continue
+        db.execute_script(path.read_text(encoding="utf-8"))
+        db.record_migration(path.stem)
+        ran.append(path.stem)
+        print(f"Applied migration {path.stem}.")
+    return ran
+
 def import_data() -> None: 
     df = kagglehub.dataset_load(
         KaggleDatasetAdapter.PANDAS,
@@ -115,6 +138,9 @@ def import_data() -> None:
     album_owned_by_artist_df = album_owned_by_artist_df.rename(columns={"album_id": "alid", "artist_ids": "artid"})
     db.import_df(album_owned_by_artist_df, "album_owned_by_artist")
 
+    print("Refreshing song_display...")
+    db.refresh_song_display()
+
     print("Data imported to DB.")
 
     sample_favorites = load_sql("src/sql/sample_favorites")
@@ -127,15 +153,25 @@ def download_data() -> None:
     path = kagglehub.dataset_download("rodolfofigueroa/spotify-12m-songs")
     print(f"Data downloaded to {path}")
 
-def execute_sql_file(path: str) -> int:
+def execute_sql_file(path: str, start: int = 0) -> int:
     sql_path = Path(path)
     if not sql_path.exists():
         print(f"SQL file not found: {sql_path}")
         return 2
     sql_text = sql_path.read_text(encoding="utf-8")
     db: DB = get_db()
-    db.execute_script(sql_text)
-    print(f"Executed SQL from {sql_path}")
+    try:
+        result = db.execute_script(sql_text, start=start, progress=print_progress)
+    except ScriptError as e:
+        print(f"{sql_path}: {e}")
+        print(f"Resume with: python -m src.manage sql {sql_path} {e.statement.index}")
+        return 1
+    slowest = sorted(result.timings, reverse=True)[:1]
+    print(
+        f"Executed {result.executed} statement(s) from {sql_path} in {result.seconds:.2f}s"
+        + (f" (skipped {result.skipped})" if result.skipped else "")
+        + (f", slowest {slowest[0] * 1000:.0f}ms" if slowest else "")
+    )
     return 0
 
 def ping() -> int:
@@ -168,6 +204,66 @@ def main(argv: List[str]) -> int:
         init_db()
         import_data()
         return 0
+    if cmd == "migrate":
+        ran = migrate()
+        print(f"{len(ran)} migration(s) applied.")
+        return 0
+    if cmd == "refresh-song-display":
+        get_db().refresh_song_display()
+        print("song_display rebuilt.")
+        return 0
+    if cmd == "refresh-playlist-stats":
+        get_db().refresh_playlist_stats()
+        print("Playlist follower and song counts recomputed.")
+        return 0
+    if cmd == "prune-feed":
+        days = int(argv[2]) if len(argv) > 2 else 30
+        removed = get_db().prune_feed_items(days)
+        print(f"Removed {removed} feed items older than {days} days.")
+        return 0
+    if cmd == "build-neighbors":
+        from .neighbors import build_song_neighbors
+        build = build_song_neighbors(get_db())
+        print(
+            f"Wrote {build.rows_written} neighbour rows for {build.songs} songs "
+            f"({build.users} users, {build.interactions} interactions) in {build.seconds:.1f}s."
+        )
+        return 0
+    if cmd == "export-analytics":
+        as_of = get_db().export_analytics()
+        print(f"Analytics snapshot exported (as of {as_of.isoformat()}).")
+        return 0
+    if cmd == "rotate-favorite-partitions":
+        months = int(argv[2]) if len(argv) > 2 else FAVORITE_PARTITIONS_AHEAD
+        added = get_db().add_favorite_partitions(months)
+        print(f"Added {len(added)} favorite_events partition(s){': ' + ', '.join(added) if added else ''}.")
+        return 0
+    if cmd == "archive-favorites":
+        keep = int(argv[2]) if len(argv) > 2 else FAVORITE_EVENTS_KEEP_MONTHS
+        archived = get_db().archive_favorite_partitions(keep)
+        print(f"Archived {len(archived)} favorite_events partition(s){': ' + ', '.join(archived) if archived else ''}.")
+        return 0
+    if cmd == "backfill-song-ratings":
+        batch = int(argv[2]) if len(argv) > 2 else RATINGS_BACKFILL_BATCH
+        pause = float(argv[3]) if len(argv) > 3 else 0.0
+        affected, mismatched = get_db().backfill_song_ratings(batch, pause)
+        print(f"song_ratings backfill done: {affected} row(s) affected, {mismatched} legacy rating(s) still differ.")
+        return 0 if mismatched == 0 else 1
+    if cmd == "replay-write-behind":
+        # Applies segments left by stopped workers; segments of running workers are skipped.
+        from .writebehind import WRITE_BEHIND_DIR, WriteBehindLog
+        WRITE_BEHIND_DIR.mkdir(parents=True, exist_ok=True)
+        replayed = WriteBehindLog(get_db()).replay_orphans()
+        print(f"Replayed {replayed} write-behind event(s).")
+        return 0
+    if cmd == "aggregate-plays":
+        # Folds sealed segments (and those of stopped workers) now instead of waiting for a worker.
+        from .plays import PlayAggregator
+        segments, events = PlayAggregator(get_db()).run_once()
+        print(f"Aggregated {events} play(s) from {segments} segment(s).")
+        return 0
+    if cmd == "sql":
+        return execute_sql_file(argv[2], int(argv[3]) if len(argv) > 3 else 0)
     if cmd == "ping":
         return ping()
     if cmd == "list":
@@ -0,0 +1,313 @@
+"""
+In-process metrics: latency/size histograms per SQL statement and per route, pool wait
+time and cache hit ratios, rendered in the Prometheus text exposition format.
+
+Each worker process keeps its own registry; /metrics reports the worker that served the
+scrape and labels every sample with its pid.
+"""
+from __future__ import annotations
+
+import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pymysql
+from pymysql.connections import MysqlPacket
+from pymysql.cursors import Cursor, DictCursor
+
+# Fraction of queries/requests that are timed; 0 turns collection off.
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1"))
+# Queries at least this slow are logged (0 disables the slow-query log).
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_LE_INF = 'le="+Inf"'
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, _LE_INF)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Any] = []
+        self._collectors: Dict[str, Callable[[], Iterable[str]]] = {}
+
+    def register(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, key: str, collector: Callable[[], Iterable[str]]) -> None:
+        """Register (or replace) a callable that renders gauges computed at scrape time."""
+        self._collectors[key] = collector
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in list(self._collectors.values()):
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        pid = str(os.getpid())
+        return "\n".join(_with_pid(line, pid) for line in lines) + "\n"
+
+
+def _with_pid(line: str, pid: str) -> str:
+    if line.startswith("#"):
+        return line
+    name, _, value = line.rpartition(" ")
+    if name.endswith("}"):
+        return f'{name[:-1]},pid="{pid}"}} {value}'
+    return f'{name}{{pid="{pid}"}} {value}'
+
+
+REGISTRY = Registry()
+
+db_query_seconds = REGISTRY.register(Histogram(
+    "db_query_seconds", "SQL statement execution time.", LATENCY_BUCKETS, ("statement",)))
+db_query_rows = REGISTRY.register(Histogram(
+    "db_query_rows", "Rows returned or affected per SQL statement.", ROW_BUCKETS, ("statement",)))
+db_query_bytes = REGISTRY.register(Histogram(
+    "db_query_bytes", "Bytes read from the server per SQL statement.", BYTE_BUCKETS, ("statement",)))
+db_query_errors = REGISTRY.register(Counter(
+    "db_query_errors_total", "SQL statements that raised.", ("statement",)))
+db_pool_wait_seconds = REGISTRY.register(Histogram(
+    "db_pool_wait_seconds", "Time spent waiting to check a connection out of a pool.", LATENCY_BUCKETS, ("pool",)))
+http_request_seconds = REGISTRY.register(Histogram(
+    "http_request_seconds", "Request handling time per route.", LATENCY_BUCKETS, ("route", "method", "status")))
+http_response_bytes = REGISTRY.register(Histogram(
+    "http_response_bytes", "Response body size per route.", BYTE_BUCKETS, ("route", "method")))
+admission_rejected = REGISTRY.register(Counter(
+    "admission_rejected_total", "Requests refused by admission control.", ("tier", "reason")))
+admission_wait_seconds = REGISTRY.register(Histogram(
+    "admission_wait_seconds", "Time admitted requests spent in their tier's queue.", LATENCY_BUCKETS, ("tier",)))
+
+# SQL text -> statement name (the sql/ file it was loaded from).
+_statement_names: Dict[str, str] = {}
+
+
+def name_statement(sql: str, name: str) -> None:
+    _statement_names[sql] = name
+
+
+def known_statement(sql: Any) -> Optional[str]:
+    """Name of the sql/ file this text was loaded from, if any."""
+    return _statement_names.get(sql) if isinstance(sql, str) else None
+
+
+def statement_name(sql: Any) -> str:
+    """Name of a loaded SQL file, or db.<calling method> for inline SQL."""
+    name = _statement_names.get(sql) if isinstance(sql, str) else None
+    if name is not None:
+        return name
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get("__name__", "").startswith(("pymysql", "MySQLdb", "aiomysql", __name__)):
+        frame = frame.f_back
+    return f"db.{frame.f_code.co_name}" if frame is not None else "db.unknown"
+
+
+_capture = threading.local()
+
+
+@contextmanager
+def capture_statements() -> Iterator[List[Tuple[str, Any]]]:
+    """Collect (sql, args) for every statement this thread executes inside the block."""
+    previous = getattr(_capture, "statements", None)
+    _capture.statements = statements = []
+    try:
+        yield statements
+    finally:
+        _capture.statements = previous
+
+
+def sampled() -> bool:
+    if METRICS_SAMPLE_RATE >= 1:
+        return True
+    return METRICS_SAMPLE_RATE > 0 and random.random() < METRICS_SAMPLE_RATE
+
+
+def _params_shape(args: Any) -> Any:
+    # Log the shape of the parameters, never their values.
+    if args is None:
+        return None
+    if isinstance(args, dict):
+        return {k: _params_shape(v) if isinstance(v, (list, tuple, dict)) else type(v).__name__ for k, v in args.items()}
+    if isinstance(args, (list, tuple)):
+        return f"{type(args).__name__}[{len(args)}]"
+    return type(args).__name__
+
+
+def observe_query(name: str, seconds: float, rows: Optional[int], nbytes: Optional[int], args: Any, record: bool) -> None:
+    if record:
+        db_query_seconds.observe(seconds, name)
+        if rows is not None and rows >= 0:
+            db_query_rows.observe(rows, name)
+        if nbytes is not None:
+            db_query_bytes.observe(nbytes, name)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        print(
+            f"SLOW QUERY {name} {seconds * 1000:.1f}ms rows={rows} bytes={nbytes} "
+            f"params={_params_shape(args)}"
+        )
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """Export hit/miss counts and the hit ratio of an object with stats() -> {hits, misses, size}."""
+    def collect() -> Iterable[str]:
+        stats = cache.stats()
+        total = stats["hits"] + stats["misses"]
+        label = f'{{cache="{_escape(name)}"}}'
+        yield f"cache_hits_total{label} {stats['hits']}"
+        yield f"cache_misses_total{label} {stats['misses']}"
+        yield f"cache_hit_ratio{label} {stats['hits'] / total if total else 0.0}"
+        yield f"cache_entries{label} {stats.get('size', 0)}"
+    REGISTRY.add_collector(f"cache:{name}", collect)
+
+
+def register_pool(name: str, pool: Any) -> None:
+    def collect() -> Iterable[str]:
+        stats = pool.stats()
+        label = f'{{pool="{_escape(name)}"}}'
+        yield f"db_pool_connections{label} {stats['size']}"
+        yield f"db_pool_idle_connections{label} {stats['idle']}"
+        yield f"db_pool_max_connections{label} {stats['max_size']}"
+        yield f"db_pool_waiting{label} {stats['waiting']}"
+    REGISTRY.add_collector(f"pool:{name}", collect)
+
+
+def register_admission(admission: Any) -> None:
+    def collect() -> Iterable[str]:
+        stats = admission.stats()
+        for tier, queued in stats["queued"].items():
+            label = f'{{tier="{_escape(tier)}"}}'
+            yield f"admission_queue_depth{label} {queued}"
+            yield f"admission_in_flight{label} {stats['in_flight'][tier]}"
+            yield f"admission_limit{label} {stats['limits'][tier]}"
+        yield f"admission_expensive_in_flight {stats['expensive_in_flight']}"
+        yield f"admission_expensive_limit {stats['expensive_limit']}"
+        yield f"admission_vip_users {stats['vip_users']}"
+        yield f"admission_rate_limited_clients {stats['clients']}"
+    REGISTRY.add_collector("admission", collect)
+
+
+class InstrumentedConnection(pymysql.connections.Connection):
+    """pymysql connection that counts the bytes it reads from the server."""
+
+    bytes_received = 0
+
+    def _read_packet(self, packet_type=MysqlPacket):
+        packet = super()._read_packet(packet_type)
+        self.bytes_received += len(packet.get_all_data())
+        return packet
+
+
+class TimedCursorMixin:
+    """Cursor mixin (pymysql or MySQLdb) that records per-statement timings when sampled."""
+
+    def execute(self, query, args=None):
+        captured = getattr(_capture, "statements", None)
+        if captured is not None:
+            captured.append((query, args))
+        record = sampled()
+        if not record and not SLOW_QUERY_MS:
+            return super().execute(query, args)
+        conn = self.connection
+        # Only InstrumentedConnection counts bytes; other drivers report none.
+        start_bytes = getattr(conn, "bytes_received", None)
+        start = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        except Exception:
+            if record:
+                db_query_errors.inc(statement_name(query))
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            if record or elapsed * 1000 >= SLOW_QUERY_MS:
+                nbytes = conn.bytes_received - start_bytes if start_bytes is not None else None
+                observe_query(statement_name(query), elapsed, self.rowcount, nbytes, args, record)
+
+
+class InstrumentedCursor(TimedCursorMixin, DictCursor):
+    pass
+
+
+class InstrumentedTupleCursor(TimedCursorMixin, Cursor):
+    pass
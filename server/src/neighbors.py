@@ -0,0 +1,129 @@
+"""
+Item-item collaborative filtering over favorites, plays and ratings.
+
+The build reads user_favorite_song, user_song_plays and the ratings in keyset pages into
+a sparse user x song matrix, then computes shrunk cosine similarity between songs one
+block of columns at a time (X^T @ X[:, block]), keeping the top NEIGHBORS_K per song. Only the
+sparse matrix and one similarity block are in memory at once; nothing is ever densified.
+The result replaces song_neighbors in one swap (DB.replace_song_neighbors), and the
+/songs/<sid>/similar and /users/<uid>/because-you-liked endpoints read it by primary key.
+
+Weights: a favorite counts 1.0, a rating of 5/4/3 counts 1.0/0.6/0.2, lower ratings are
+ignored, and plays count log2(1 + plays) / log2(1 + NEIGHBORS_FULL_PLAYS), so that many
+plays weigh as much as a favorite; a user's weights for a song are summed and capped at 1.
+Each user's row is scaled by 1/log2(1 + n_songs) so a handful of users with huge libraries
+don't make every pair of songs look related.
+"""
+from __future__ import annotations
+
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+NEIGHBORS_K = int(os.getenv("NEIGHBORS_K", "50"))
+# Added to the cosine denominator: pairs with little overlap score lower.
+NEIGHBORS_SHRINK = float(os.getenv("NEIGHBORS_SHRINK", "10"))
+# Songs with fewer interacting users get no neighbours and are never suggested.
+NEIGHBORS_MIN_USERS = int(os.getenv("NEIGHBORS_MIN_USERS", "2"))
+# Songs per similarity block; bounds the memory of one X^T @ X[:, block] product.
+NEIGHBORS_BLOCK = int(os.getenv("NEIGHBORS_BLOCK", "1000"))
+
+RATING_WEIGHTS = {5: 1.0, 4: 0.6, 3: 0.2}
+NEIGHBORS_FULL_PLAYS = int(os.getenv("NEIGHBORS_FULL_PLAYS", "16"))
+
+
+@dataclass
+class NeighborBuild:
+    users: int
+    songs: int
+    interactions: int
+    rows_written: int
+    seconds: float
+
+
+def interaction_matrix(pages: Iterator[Tuple[str, List[tuple]]]) -> Tuple[sparse.csr_matrix, List[str]]:
+    """Sparse user x song weights from DB.iter_cf_interactions pages, and the song id per column."""
+    user_index: Dict[int, int] = {}
+    song_index: Dict[str, int] = {}
+    rows: List[np.ndarray] = []
+    cols: List[np.ndarray] = []
+    vals: List[np.ndarray] = []
+    for kind, page in pages:
+        if kind == "rating":
+            page = [(uid, sid, RATING_WEIGHTS[rate]) for uid, sid, rate in page if rate in RATING_WEIGHTS]
+        elif kind == "play":
+            full = math.log2(1 + NEIGHBORS_FULL_PLAYS)
+            page = [(uid, sid, math.log2(1 + plays) / full) for uid, sid, plays in page]
+        else:
+            page = [(uid, sid, 1.0) for uid, sid in page]
+        rows.append(np.fromiter((user_index.setdefault(u, len(user_index)) for u, _, _ in page), np.int32, len(page)))
+        cols.append(np.fromiter((song_index.setdefault(s, len(song_index)) for _, s, _ in page), np.int32, len(page)))
+        vals.append(np.fromiter((w for _, _, w in page), np.float32, len(page)))
+    if not song_index:
+        return sparse.csr_matrix((0, 0), dtype=np.float32), []
+    matrix = sparse.coo_matrix(
+        (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(len(user_index), len(song_index)),
+    ).tocsr()
+    matrix.sum_duplicates()
+    np.minimum(matrix.data, 1.0, out=matrix.data)
+    sids = [""] * len(song_index)
+    for sid, col in song_index.items():
+        sids[col] = sid
+    return matrix, sids
+
+
+def top_neighbors(matrix: sparse.csr_matrix, sids: List[str]) -> Iterator[tuple]:
+    """Yield (sid, rank_no, neighbor_sid, score) rows, best first per song."""
+    per_song = np.diff(matrix.tocsc().indptr)
+    keep = np.flatnonzero(per_song >= NEIGHBORS_MIN_USERS)
+    if keep.size < 2:
+        return
+    matrix = matrix[:, keep].tocsr()
+    sids = [sids[i] for i in keep]
+
+    per_user = np.diff(matrix.indptr)
+    damping = 1.0 / np.log2(1.0 + np.maximum(per_user, 1))
+    matrix = sparse.diags(damping.astype(np.float32)) @ matrix
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+
+    by_song = matrix.T.tocsr()
+    columns = matrix.tocsc()
+    for start in range(0, len(sids), NEIGHBORS_BLOCK):
+        stop = min(start + NEIGHBORS_BLOCK, len(sids))
+        block = (by_song @ columns[:, start:stop]).tocsc()
+        for offset in range(stop - start):
+            j = start + offset
+            lo, hi = block.indptr[offset], block.indptr[offset + 1]
+            idx = block.indices[lo:hi]
+            dots = block.data[lo:hi]
+            other = idx != j
+            idx, dots = idx[other], dots[other]
+            if idx.size == 0:
+                continue
+            scores = dots / (norms[idx] * norms[j] + NEIGHBORS_SHRINK)
+            if idx.size > NEIGHBORS_K:
+                best = np.argpartition(-scores, NEIGHBORS_K - 1)[:NEIGHBORS_K]
+                idx, scores = idx[best], scores[best]
+            order = np.argsort(-scores, kind="stable")
+            for rank, k in enumerate(order):
+                yield sids[j], rank, sids[idx[k]], float(scores[k])
+
+
+def build_song_neighbors(db: Any) -> NeighborBuild:
+    """Rebuild song_neighbors from the current favorites and ratings."""
+    started = time.perf_counter()
+    matrix, sids = interaction_matrix(db.iter_cf_interactions())
+    written = db.replace_song_neighbors(top_neighbors(matrix, sids))
+    return NeighborBuild(
+        users=matrix.shape[0],
+        songs=len(sids),
+        interactions=matrix.nnz,
+        rows_written=written,
+        seconds=time.perf_counter() - started,
+    )
@@ -0,0 +1,304 @@
+"""
+Listening-event ingestion behind POST /events/plays, and the aggregator that turns the
+events into play counts.
+
+Ingestion never touches MySQL. A batch is validated, packed into fixed-layout binary
+records and appended to this worker's open segment (plays-*.open, flock'd) with one
+write; the file is fsynced only with PLAYS_FSYNC=1, so a host crash can lose the last
+unsynced batches. A segment is sealed (renamed to .seg) once it reaches
+PLAYS_SEGMENT_BYTES or PLAYS_SEGMENT_SECONDS.
+
+The aggregator runs on its own thread in every worker. It takes each sealed segment
+(and any .open segment whose writer died) under an flock, sums it into per-song/per-day
+and per-user/per-song counts, and applies them in one transaction that also records the
+segment name in play_segments, so a segment is never counted twice. The file is deleted
+after the commit. A segment MySQL rejects for its data (DB.apply_play_counts raises
+ValueError) is renamed to .bad and skipped; any other failure leaves it for the next pass.
+
+Record layout: uid u64, played_at u32 (epoch seconds), ms_played u32, len(sid) u8, sid.
+"""
+from __future__ import annotations
+
+import fcntl
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+from .tool import resolve_path
+
+PLAYS_DIR = resolve_path(os.getenv("PLAYS_DIR", "data/plays"))
+PLAYS_SEGMENT_BYTES = int(os.getenv("PLAYS_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+PLAYS_SEGMENT_SECONDS = float(os.getenv("PLAYS_SEGMENT_SECONDS", "10"))
+PLAYS_FSYNC = os.getenv("PLAYS_FSYNC", "0") == "1"
+PLAYS_MAX_BATCH = int(os.getenv("PLAYS_MAX_BATCH", "1000"))
+PLAYS_MAX_AGE_DAYS = int(os.getenv("PLAYS_MAX_AGE_DAYS", "30"))
+PLAYS_AGGREGATE_SECONDS = float(os.getenv("PLAYS_AGGREGATE_SECONDS", "5"))
+# Segments from dead writers are only taken once they are this old, so a writer that is
+# merely slow to take its lock after creating the file is not mistaken for a dead one.
+PLAYS_ORPHAN_SECONDS = 60.0
+
+_HEADER = struct.Struct("<QIIB")
+# Width of songs.sid and of the sid columns of the roll-ups.
+_MAX_SID_CHARS = 35
+_MAX_UID = 2**64 - 1
+_FUTURE_SLACK_SECONDS = 300
+
+
+@dataclass
+class Play:
+    sid: str
+    played_at: int
+    ms_played: int
+
+
+def parse_plays(items: Any, now: Optional[float] = None) -> List[Play]:
+    """Validate a POST /events/plays body's "plays" array; ValueError names the bad item."""
+    if not isinstance(items, list) or not items:
+        raise ValueError("plays must be a non-empty array")
+    if len(items) > PLAYS_MAX_BATCH:
+        raise ValueError(f"at most {PLAYS_MAX_BATCH} plays per request")
+    now = time.time() if now is None else now
+    oldest = now - PLAYS_MAX_AGE_DAYS * 86400
+    plays = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"plays[{i}] must be an object")
+        sid = item.get("sid")
+        if not isinstance(sid, str) or not sid or len(sid) > _MAX_SID_CHARS:
+            raise ValueError(f"plays[{i}].sid must be a song id")
+        played_at = item.get("played_at", now)
+        try:
+            if isinstance(played_at, bool):
+                raise TypeError("bool")
+            if isinstance(played_at, str):
+                played_at = datetime.fromisoformat(played_at.replace("Z", "+00:00")).timestamp()
+            played_at = int(played_at)
+        except (TypeError, ValueError):
+            raise ValueError(f"plays[{i}].played_at must be epoch seconds or ISO 8601")
+        if not oldest <= played_at <= now + _FUTURE_SLACK_SECONDS:
+            raise ValueError(f"plays[{i}].played_at is outside the last {PLAYS_MAX_AGE_DAYS} days")
+        ms_played = item.get("ms_played", 0)
+        # bool is an int subclass: JSON true/false must not count as 1/0 ms.
+        if isinstance(ms_played, bool) or not isinstance(ms_played, int) or not 0 <= ms_played < 2**32:
+            raise ValueError(f"plays[{i}].ms_played must be a non-negative integer")
+        plays.append(Play(sid, played_at, ms_played))
+    return plays
+
+
+def encode_plays(uid: int, plays: List[Play]) -> bytes:
+    if not 0 <= uid <= _MAX_UID:
+        raise ValueError("uid is out of range")
+    out = bytearray()
+    for play in plays:
+        sid = play.sid.encode("utf-8")
+        out += _HEADER.pack(uid, play.played_at, play.ms_played, len(sid))
+        out += sid
+    return bytes(out)
+
+
+def read_plays(path: Path) -> Iterator[Tuple[int, str, int, int]]:
+    """(uid, sid, played_at, ms_played) per record; a torn final record is skipped."""
+    data = path.read_bytes()
+    offset, size = 0, _HEADER.size
+    while offset + size <= len(data):
+        uid, played_at, ms_played, sid_len = _HEADER.unpack_from(data, offset)
+        end = offset + size + sid_len
+        if end > len(data):
+            break
+        yield uid, data[offset + size:end].decode("utf-8"), played_at, ms_played
+        offset = end
+
+
+class PlayLog:
+    """This worker's append side: one open segment at a time."""
+
+    def __init__(self, directory: Path = PLAYS_DIR) -> None:
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._fh: Optional[IO[bytes]] = None
+        self._path: Optional[Path] = None
+        self._opened = 0.0
+        self._size = 0
+        self._segment_no = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="plays-seal", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.seal()
+
+    def append(self, uid: int, plays: List[Play]) -> int:
+        """Append one validated batch; returns the bytes written. ValueError for a bad uid."""
+        record = encode_plays(uid, plays)
+        with self._lock:
+            if self._fh is None:
+                self._open()
+            self._fh.write(record)
+            self._fh.flush()
+            if PLAYS_FSYNC:
+                os.fsync(self._fh.fileno())
+            self._size += len(record)
+            if self._size >= PLAYS_SEGMENT_BYTES:
+                self._seal_locked()
+        return len(record)
+
+    def seal(self) -> None:
+        with self._lock:
+            self._seal_locked()
+
+    def _open(self) -> None:
+        self._segment_no += 1
+        # Names sort by creation time, so segments are aggregated roughly in order.
+        name = f"plays-{int(time.time()):011d}-{os.getpid()}-{self._segment_no:06d}"
+        self._path = self._directory / f"{name}.open"
+        self._fh = self._path.open("ab")
+        fcntl.flock(self._fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._opened = time.monotonic()
+        self._size = 0
+
+    def _seal_locked(self) -> None:
+        if self._fh is None:
+            return
+        # Renamed while still locked, so the aggregator never sees a half-written .seg.
+        self._path.rename(self._path.with_suffix(".seg"))
+        self._fh.close()
+        self._fh = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(1.0):
+            with self._lock:
+                if self._fh is not None and time.monotonic() - self._opened >= PLAYS_SEGMENT_SECONDS:
+                    self._seal_locked()
+
+
+@dataclass
+class SegmentCounts:
+    events: int
+    # (day, sid) -> [plays, ms_played]
+    song_days: Dict[Tuple[date, str], List[int]]
+    # (uid, sid) -> [plays, last played_at]
+    user_songs: Dict[Tuple[int, str], List[int]]
+
+
+def count_segment(path: Path) -> SegmentCounts:
+    song_days: Dict[Tuple[date, str], List[int]] = {}
+    user_songs: Dict[Tuple[int, str], List[int]] = {}
+    # Local dates, like the TIMESTAMP columns elsewhere; [day_start, day_end) is the last
+    # local day seen, so most records skip the conversion.
+    day, day_start, day_end = date.min, 0.0, 0.0
+    events = 0
+    for uid, sid, played_at, ms_played in read_plays(path):
+        events += 1
+        if not day_start <= played_at < day_end:
+            day = date.fromtimestamp(played_at)
+            day_start = _local_midnight(day)
+            day_end = _local_midnight(day + timedelta(days=1))
+        counts = song_days.get((day, sid))
+        if counts is None:
+            song_days[(day, sid)] = [1, ms_played]
+        else:
+            counts[0] += 1
+            counts[1] += ms_played
+        counts = user_songs.get((uid, sid))
+        if counts is None:
+            user_songs[(uid, sid)] = [1, played_at]
+        else:
+            counts[0] += 1
+            counts[1] = max(counts[1], played_at)
+    return SegmentCounts(events, song_days, user_songs)
+
+
+class PlayAggregator:
+    """Folds sealed segments into song_plays_daily and user_song_plays."""
+
+    def __init__(self, db: Any, directory: Path = PLAYS_DIR) -> None:
+        self._db = db
+        self._directory = directory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pruned = 0.0
+
+    def start(self) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="plays-aggregate", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def run_once(self) -> Tuple[int, int]:
+        """Aggregate every segment that is ready; returns (segments, events)."""
+        segments = events = 0
+        now = time.time()
+        paths = sorted(self._directory.glob("plays-*.seg"))
+        paths += sorted(
+            p for p in self._directory.glob("plays-*.open") if now - _mtime(p) >= PLAYS_ORPHAN_SECONDS
+        )
+        for path in paths:
+            if self._stop.is_set():
+                break
+            applied = self._aggregate(path)
+            if applied is not None:
+                segments += 1
+                events += applied
+        return segments, events
+
+    def _aggregate(self, path: Path) -> Optional[int]:
+        try:
+            fh = path.open("rb")
+        except FileNotFoundError:
+            return None
+        try:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None  # being written, or another worker is aggregating it
+            if not path.exists():
+                return None  # done by another worker while we opened it
+            try:
+                counts = count_segment(path)
+                self._db.apply_play_counts(path.stem, counts)
+            except ValueError as e:
+                # Retrying would fail the same way and hold back every later segment.
+                path.rename(path.with_suffix(".bad"))
+                print(f"Play segment {path.name} rejected, moved aside: {e}")
+                return None
+            path.unlink(missing_ok=True)
+            return counts.events
+        finally:
+            fh.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(PLAYS_AGGREGATE_SECONDS):
+            try:
+                self.run_once()
+                if time.monotonic() - self._pruned >= 3600:
+                    self._pruned = time.monotonic()
+                    self._db.prune_play_segments()
+            except Exception as e:
+                print(f"Play aggregation failed, will retry: {e}")
+
+
+def _local_midnight(day: date) -> float:
+    return datetime(day.year, day.month, day.day).timestamp()
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return float("inf")
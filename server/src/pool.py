@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of DB-API connections.
+
+    The pool remembers the pid that created it; after a fork the child starts with an
+    empty pool instead of reusing sockets that belong to the parent process.
+
+    Checkouts carry a priority (lower is served first): while a higher-priority caller is
+    waiting, a freed connection goes to it, not to whichever waiter wakes first.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_size: int = 10,
+        timeout: float = 5.0,
+        recycle: float = 3600.0,
+        ping_after: float = 30.0,
+        on_wait: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self._factory = factory
+        # Called with the seconds each checkout spent waiting (including connect time).
+        self._on_wait = on_wait
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        # (connection, created_at, last_used_at)
+        self._idle: Deque[Tuple[Any, float, float]] = deque()
+        self._created: Dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+        # priority -> callers currently waiting for a connection
+        self._waiting: Dict[int, int] = {}
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            # Inherited connections share the parent's sockets: drop them without closing.
+            self._reset()
+
+    def acquire(self, priority: int = 0) -> Any:
+        self._check_pid()
+        start = time.monotonic()
+        conn = self._checkout(start + self.timeout, priority)
+        if self._on_wait is not None:
+            self._on_wait(time.monotonic() - start)
+        return conn
+
+    def _checkout(self, deadline: float, priority: int) -> Any:
+        with self._cond:
+            waiting = False
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("connection pool is closed")
+                    if not self._outranked(priority):
+                        if self._idle:
+                            conn, created, last_used = self._idle.pop()
+                            now = time.monotonic()
+                            if now - created > self.recycle or not self._is_alive(conn, now - last_used):
+                                self._discard(conn)
+                                continue
+                            return conn
+                        if self._size < self.max_size:
+                            self._size += 1
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"no DB connection available within {self.timeout}s")
+                    if not waiting:
+                        waiting = True
+                        self._waiting[priority] = self._waiting.get(priority, 0) + 1
+                    self._cond.wait(remaining)
+            finally:
+                if waiting:
+                    self._waiting[priority] -= 1
+                    if not self._waiting[priority]:
+                        del self._waiting[priority]
+                        # Lower-priority waiters held back by this caller may proceed now.
+                        if self._waiting:
+                            self._cond.notify_all()
+
+        try:
+            conn = self._factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._notify()
+            raise
+        with self._cond:
+            self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            created = self._created.get(id(conn))
+            if discard or self._closed or created is None or not getattr(conn, "open", True):
+                self._discard(conn)
+            else:
+                self._idle.append((conn, created, time.monotonic()))
+            self._notify()
+
+    def close(self) -> None:
+        """Close idle connections; checked-out ones are closed when released."""
+        with self._cond:
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._discard(conn)
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": self._size,
+            "idle": len(self._idle),
+            "max_size": self.max_size,
+            "waiting": sum(self._waiting.values()),
+        }
+
+    def _outranked(self, priority: int) -> bool:
+        # Caller holds self._cond.
+        return any(p < priority for p in self._waiting)
+
+    def _notify(self) -> None:
+        # Caller holds self._cond. With mixed priorities, wake everyone so the best one takes it.
+        if len(self._waiting) > 1:
+            self._cond.notify_all()
+        else:
+            self._cond.notify()
+
+    def _is_alive(self, conn: Any, idle_for: float) -> bool:
+        if idle_for < self.ping_after:
+            return True
+        try:
+            conn.ping()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn: Any) -> None:
+        # Caller holds self._cond.
+        if self._created.pop(id(conn), None) is not None:
+            self._size -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,135 @@
+"""
+On-demand sampling profiler for single requests.
+
+A profiled request's thread is sampled from a helper thread via sys._current_frames(), so
+the request itself runs unmodified. Samples are written as collapsed stacks (one
+"frame;frame;frame count" line per distinct stack), which flamegraph.pl, speedscope and
+inferno read directly.
+"""
+from __future__ import annotations
+
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "/tmp/resonate-profiles"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = Path(code.co_filename)
+    return f"{code.co_name} ({path.parent.name}/{path.name}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """Samples one thread's stack every `interval` seconds until stopped."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfilingControl:
+    """
+    Decides which requests are profiled. A request is profiled when it carries the
+    X-Profile header with PROFILE_TOKEN, or is picked by the sample rate (settable at
+    runtime from the admin endpoint, per worker process, optionally for a limited
+    number of requests).
+    """
+
+    def __init__(self, token: str = PROFILE_TOKEN, sample_rate: float = PROFILE_SAMPLE_RATE) -> None:
+        self.token = token
+        self.sample_rate = sample_rate
+        self.remaining: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    def authorized(self, presented: Optional[str]) -> bool:
+        # Constant-time, so response timing does not reveal how much of the token matched.
+        # Compared as bytes: compare_digest rejects non-ASCII str.
+        return self.enabled and hmac.compare_digest((presented or "").encode(), self.token.encode())
+
+    def configure(self, sample_rate: float, remaining: Optional[int] = None) -> Dict[str, object]:
+        with self._lock:
+            self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+            self.remaining = remaining
+        return self.status()
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "sample_rate": self.sample_rate,
+            "remaining": self.remaining,
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "directory": str(PROFILE_DIR),
+        }
+
+    def should_profile(self, header_token: Optional[str]) -> bool:
+        if header_token is not None and self.authorized(header_token):
+            return True
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            if self.remaining is None:
+                return True
+            if self.remaining <= 0:
+                self.sample_rate = 0.0
+                return False
+            self.remaining -= 1
+            return True
+
+    def start(self) -> SamplingProfiler:
+        return SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000.0).start()
+
+
+def write_profile(profiler: SamplingProfiler, route: str, method: str, status: int, elapsed_ms: float) -> Path:
+    """Write collapsed stacks to PROFILE_DIR; the file name carries route, status and timing."""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    route_name = _SAFE_NAME.sub("_", route).strip("_") or "root"
+    path = PROFILE_DIR / (
+        f"{stamp}_{method}_{route_name}_{status}_{elapsed_ms:.0f}ms_pid{os.getpid()}.collapsed"
+    )
+    path.write_text(profiler.collapsed(), encoding="utf-8")
+    return path
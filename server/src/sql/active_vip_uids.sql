@@ -0,0 +1,5 @@
+-- VIP entitlements for admission control (src/admission.py). start_date is not checked:
+-- promotion writes a placeholder there, and get_vip_status treats every row as VIP.
+SELECT uid
+FROM vip_users
+WHERE end_date IS NULL OR end_date >= CURRENT_DATE;
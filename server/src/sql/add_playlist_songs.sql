@@ -0,0 +1,2 @@
+INSERT IGNORE INTO playlist_song (plstid, sid, position)
+VALUES (%s, %s, %s);
@@ -0,0 +1,2 @@
+SELECT uid, sid, favored_at
+FROM user_favorite_song;
@@ -0,0 +1,3 @@
+SELECT ur.uid, ur.sid, rt.rate_value, ur.rated_at
+FROM user_rates AS ur
+JOIN ratings AS rt ON ur.rid = rt.rid;
@@ -0,0 +1,6 @@
+-- One row per album credit, like the album_song/album_owned_by_artist chain that
+-- rating_averages.sql joins through, so counts agree between the two backends.
+SELECT als.sid, a.artid, a.name AS artist_name
+FROM album_song AS als
+JOIN album_owned_by_artist AS aoa ON als.alid = aoa.alid
+JOIN artists AS a ON aoa.artid = a.artid;
@@ -0,0 +1,3 @@
+-- export_ratings.sql once reads have moved to song_ratings (RATINGS_MODE).
+SELECT uid, sid, rate_value, rated_at
+FROM song_ratings;
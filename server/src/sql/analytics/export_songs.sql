@@ -0,0 +1,2 @@
+SELECT sid, song_name, album_title
+FROM song_display;
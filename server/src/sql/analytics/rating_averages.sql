@@ -0,0 +1,11 @@
+-- DuckDB over the Parquet snapshot; same result shape as ../rating_averages.sql.
+SELECT
+  s.song_name,
+  sa.artist_name,
+  ROUND(AVG(r.rate_value), 2) AS avg_rating,
+  COUNT(*) AS rating_count
+FROM ratings AS r
+JOIN songs AS s ON r.sid = s.sid
+JOIN song_artists AS sa ON r.sid = sa.sid
+GROUP BY s.sid, sa.artid, s.song_name, sa.artist_name
+ORDER BY avg_rating DESC, rating_count DESC;
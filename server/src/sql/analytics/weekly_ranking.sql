@@ -0,0 +1,22 @@
+-- DuckDB over the Parquet snapshot; same result shape as ../show-weekly-ranking.sql,
+-- computed from favorites in [week start, week end) instead of the weekly MySQL snapshot.
+WITH weekly AS (
+  SELECT
+    s.sid,
+    s.song_name AS song_title,
+    s.album_title,
+    COUNT(*) AS fav_count
+  FROM favorites AS f
+  JOIN songs AS s ON s.sid = f.sid
+  WHERE f.favored_at >= $start AND f.favored_at < $end
+  GROUP BY s.sid, s.song_name, s.album_title
+)
+SELECT
+  $yearweek AS yearweek,
+  ROW_NUMBER() OVER (ORDER BY fav_count DESC, song_title) AS rank_in_week,
+  song_title,
+  album_title,
+  fav_count
+FROM weekly
+ORDER BY rank_in_week
+LIMIT 10;
@@ -0,0 +1,7 @@
+-- Fold the oldest partition (everything below its upper bound) into weekly counts.
+INSERT INTO favorite_weekly_counts (yearweek, sid, fav_count)
+SELECT YEARWEEK(fe.favored_at, 3) AS yearweek, fe.sid, SUM(fe.delta) AS delta
+FROM favorite_events fe
+WHERE fe.favored_at < %s
+GROUP BY yearweek, fe.sid
+ON DUPLICATE KEY UPDATE fav_count = fav_count + VALUES(fav_count);
@@ -1,6 +1,6 @@
 SELECT
-  s.sid,
-  s.name AS song_title,
+  sd.sid,
+  sd.song_name AS song_title,
   a.title AS album_title,
   ar.name AS artist_name
 FROM artists AS ar
@@ -10,8 +10,8 @@ JOIN albums AS a
   ON aoa.alid = a.alid
 JOIN album_song AS als
   ON a.alid = als.alid
-JOIN songs AS s
-  ON als.sid = s.sid
+JOIN song_display AS sd
+  ON als.sid = sd.sid
 WHERE ar.artid = %s
 ORDER BY als.track_no ASC
 LIMIT 50;
@@ -0,0 +1,26 @@
+-- Neighbours of the user's most recent favorites, minus songs they already favorite.
+-- Rows come back grouped by seed (newest first) and in neighbour rank within a seed.
+WITH seeds AS (
+  SELECT sid, favored_at
+  FROM user_favorite_song
+  WHERE uid = %(uid)s
+  ORDER BY favored_at DESC
+  LIMIT %(seeds)s
+)
+SELECT
+  seeds.sid AS seed_sid,
+  seed.song_name AS seed_name,
+  sd.sid,
+  sd.song_name AS name,
+  sd.album_title,
+  sd.artist_names,
+  sn.score
+FROM seeds
+JOIN song_display AS seed ON seed.sid = seeds.sid
+JOIN song_neighbors AS sn ON sn.sid = seeds.sid AND sn.rank_no < %(window)s
+JOIN song_display AS sd ON sd.sid = sn.neighbor_sid
+WHERE NOT EXISTS (
+  SELECT 1 FROM user_favorite_song AS f
+  WHERE f.uid = %(uid)s AND f.sid = sn.neighbor_sid
+)
+ORDER BY seeds.favored_at DESC, seeds.sid, sn.rank_no;
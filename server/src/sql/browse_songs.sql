@@ -0,0 +1,15 @@
+-- Column store for /browse (src/browse.py): every song's audio features and virtual tag.
+SELECT
+  s.sid,
+  s.name,
+  s.danceability,
+  s.energy,
+  s.valence,
+  s.tempo,
+  s.loudness,
+  s.`mode`,
+  s.acousticness,
+  s.speechiness,
+  vst.tag
+FROM songs AS s
+LEFT JOIN virt_song_tag AS vst ON vst.sid = s.sid;
@@ -0,0 +1 @@
+SELECT tid, name FROM tags ORDER BY tid;
@@ -0,0 +1,6 @@
+-- Keyset page over the primary key for the neighbours build.
+SELECT uid, sid
+FROM user_favorite_song
+WHERE (uid, sid) > (%s, %s)
+ORDER BY uid, sid
+LIMIT %s;
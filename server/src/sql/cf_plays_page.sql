@@ -0,0 +1,6 @@
+-- Keyset page over the user_song_plays primary key for the neighbours build.
+SELECT uid, sid, plays
+FROM user_song_plays
+WHERE (uid, sid) > (%s, %s)
+ORDER BY uid, sid
+LIMIT %s;
@@ -0,0 +1,7 @@
+-- Keyset page over user_rates for the neighbours build.
+SELECT ur.rid, ur.uid, ur.sid, rt.rate_value
+FROM user_rates AS ur
+JOIN ratings AS rt ON rt.rid = ur.rid
+WHERE ur.rid > %s
+ORDER BY ur.rid
+LIMIT %s;
@@ -0,0 +1,5 @@
+INSERT INTO feed_items (uid, plstid, sid)
+SELECT ufp.uid, ufp.plstid, s.sid
+FROM user_follow_playlist ufp
+JOIN songs s ON s.sid IN %(sids)s
+WHERE ufp.plstid = %(plstid)s;
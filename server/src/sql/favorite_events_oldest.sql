@@ -0,0 +1 @@
+SELECT MIN(favored_at) AS oldest FROM favorite_events;
@@ -0,0 +1,8 @@
+-- favorite_events partitions in order; upper_bound is NULL for the MAXVALUE partition.
+SELECT
+  PARTITION_NAME AS name,
+  IF(PARTITION_DESCRIPTION = 'MAXVALUE', NULL, FROM_UNIXTIME(PARTITION_DESCRIPTION)) AS upper_bound,
+  TABLE_ROWS AS approx_rows
+FROM information_schema.PARTITIONS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'favorite_events'
+ORDER BY PARTITION_ORDINAL_POSITION;
@@ -0,0 +1,8 @@
+-- Current favorite counts of the songs favorited since the typeahead's last refresh.
+-- Unfavorites leave no timestamp; the periodic full rebuild picks those up.
+SELECT ufs.sid, COUNT(*) AS favorites, MAX(ufs.favored_at) AS last_favored_at
+FROM user_favorite_song AS ufs
+WHERE ufs.sid IN (
+  SELECT recent.sid FROM user_favorite_song AS recent WHERE recent.favored_at >= %s
+)
+GROUP BY ufs.sid;
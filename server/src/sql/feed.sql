@@ -0,0 +1,84 @@
+-- Keyset page on (created_at, item_key). Each branch applies the same tuple predicate and
+-- tie-break before its LIMIT, so rows sharing a created_at (a fanned-out batch) are cut
+-- at the same place the outer ORDER BY would cut them. Numeric ids in item_key are
+-- zero-padded, so the key's string order is the branch's id order.
+SELECT
+  feed.item_key,
+  feed.kind,
+  feed.created_at,
+  feed.plstid,
+  p.name AS playlist_name,
+  feed.sid,
+  sd.song_name,
+  sd.artist_names,
+  feed.alid,
+  al.title AS album_title,
+  feed.artid,
+  ar.name AS artist_name
+FROM (
+  (
+    SELECT
+      CONCAT('f:', LPAD(fi.feed_id, 20, '0')) AS item_key,
+      'playlist_song' AS kind,
+      fi.created_at,
+      fi.plstid,
+      fi.sid,
+      NULL AS alid,
+      NULL AS artid
+    FROM feed_items fi
+    WHERE fi.uid = %(uid)s
+      AND fi.created_at <= %(before_ts)s
+      AND (fi.created_at < %(before_ts)s OR CONCAT('f:', LPAD(fi.feed_id, 20, '0')) < %(before_key)s)
+    ORDER BY fi.created_at DESC, fi.feed_id DESC
+    LIMIT %(window)s
+  )
+  UNION ALL
+  (
+    SELECT
+      CONCAT('p:', LPAD(pc.plstid, 20, '0'), ':', LPAD(pc.version, 20, '0')),
+      'playlist_song',
+      pc.changed_at,
+      pc.plstid,
+      pc.sid,
+      NULL,
+      NULL
+    FROM user_follow_playlist ufp
+    JOIN playlists pl        ON pl.plstid = ufp.plstid AND pl.visibility = 'public'
+    JOIN playlist_changes pc ON pc.plstid = ufp.plstid AND pc.fanned_out = 0
+    WHERE ufp.uid = %(uid)s
+      AND pc.op = 'add'
+      AND pc.changed_at >= ufp.followed_at
+      AND pc.changed_at <= %(before_ts)s
+      AND (pc.changed_at < %(before_ts)s
+           OR CONCAT('p:', LPAD(pc.plstid, 20, '0'), ':', LPAD(pc.version, 20, '0')) < %(before_key)s)
+    ORDER BY pc.changed_at DESC, pc.plstid DESC, pc.version DESC
+    LIMIT %(window)s
+  )
+  UNION ALL
+  (
+    SELECT
+      CONCAT('a:', rel.alid, ':', ufa.artid) AS item_key,
+      'artist_release',
+      CAST(rel.release_date AS DATETIME),
+      NULL,
+      NULL,
+      rel.alid,
+      ufa.artid
+    FROM user_follows_artist ufa
+    JOIN album_owned_by_artist aoa ON aoa.artid = ufa.artid
+    JOIN albums rel                ON rel.alid = aoa.alid
+    WHERE ufa.uid = %(uid)s
+      AND rel.release_date >= CURDATE() - INTERVAL %(release_days)s DAY
+      AND CAST(rel.release_date AS DATETIME) <= %(before_ts)s
+      AND (CAST(rel.release_date AS DATETIME) < %(before_ts)s
+           OR CONCAT('a:', rel.alid, ':', ufa.artid) < %(before_key)s)
+    ORDER BY rel.release_date DESC, item_key DESC
+    LIMIT %(window)s
+  )
+) AS feed
+LEFT JOIN playlists p     ON p.plstid = feed.plstid
+LEFT JOIN song_display sd ON sd.sid = feed.sid
+LEFT JOIN albums al       ON al.alid = feed.alid
+LEFT JOIN artists ar      ON ar.artid = feed.artid
+ORDER BY feed.created_at DESC, feed.item_key DESC
+LIMIT %(limit)s;
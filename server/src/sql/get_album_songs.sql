@@ -1,15 +1,14 @@
 SELECT
-    s.sid,
-    s.name AS song_name,
-    a.artid AS artist_id,
-    a.name AS artist_name,
+    sd.sid,
+    sd.song_name,
+    SUBSTRING_INDEX(sd.artist_ids, ',', 1) AS artist_id,
+    sd.artist_ids,
+    sd.artist_names AS artist_name,
     al.alid AS album_id,
     al.title AS album_title,
     als.track_no
 FROM album_song als
-JOIN songs s ON als.sid = s.sid
-JOIN albums al ON als.alid = al.alid
-JOIN album_owned_by_artist aoa ON al.alid = aoa.alid
-JOIN artists a ON aoa.artid = a.artid
+JOIN albums al       ON al.alid = als.alid
+JOIN song_display sd ON sd.sid = als.sid
 WHERE als.alid = %s
-ORDER BY als.track_no IS NULL, als.track_no, s.name;
+ORDER BY als.track_no IS NULL, als.track_no, sd.song_name;
@@ -4,6 +4,7 @@ SELECT
   name,
   description,
   visibility,
-  created_at
+  created_at,
+  version
 FROM playlists
 WHERE plstid = %s;
@@ -0,0 +1,3 @@
+SELECT version
+FROM playlists
+WHERE plstid = %s;
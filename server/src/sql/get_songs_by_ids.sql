@@ -0,0 +1,20 @@
+SELECT
+  sd.sid,
+  sd.song_name AS name,
+  sd.release_date,
+  sd.album_id,
+  sd.album_title,
+  sd.artist_names,
+  sd.artist_ids,
+  EXISTS (
+    SELECT 1 FROM user_favorite_song ufs
+    WHERE ufs.uid = %(uid)s AND ufs.sid = sd.sid
+  ) AS is_favorite,
+  (
+    SELECT MAX(r.rate_value)
+    FROM user_rates ur
+    JOIN ratings r ON r.rid = ur.rid
+    WHERE ur.uid = %(uid)s AND ur.sid = sd.sid
+  ) AS user_rating
+FROM song_display sd
+WHERE sd.sid IN %(sids)s;
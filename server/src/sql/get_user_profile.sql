@@ -0,0 +1,24 @@
+SELECT
+    u.uid,
+    u.username,
+    u.email,
+    u.gender,
+    u.age,
+    u.street,
+    u.city,
+    u.province,
+    u.mbti,
+    u.created_at,
+    u.updated_at,
+    (
+        SELECT COUNT(DISTINCT pl.plstid)
+        FROM playlists pl
+        WHERE pl.uid = u.uid
+    ) AS num_playlists,
+    (
+        SELECT COUNT(DISTINCT ufs.sid)
+        FROM user_favorite_song ufs
+        WHERE ufs.uid = u.uid
+    ) AS num_favorites
+FROM users u
+WHERE u.uid = %s;
@@ -0,0 +1,2 @@
+INSERT INTO song_neighbors_build (sid, rank_no, neighbor_sid, score)
+VALUES (%s, %s, %s, %s);
@@ -0,0 +1,2 @@
+-- Watermark for the typeahead's incremental refresh; read from idx_ufs_favored_at_sid.
+SELECT MAX(favored_at) AS latest FROM user_favorite_song;
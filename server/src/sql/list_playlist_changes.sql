@@ -0,0 +1,11 @@
+SELECT
+  version,
+  op,
+  sid,
+  position,
+  changed_at
+FROM playlist_changes
+WHERE plstid = %s
+  AND version > %s
+ORDER BY version
+LIMIT %s;
@@ -0,0 +1,4 @@
+SELECT hobby
+FROM user_hobbies
+WHERE uid = %s
+ORDER BY hobby ASC;
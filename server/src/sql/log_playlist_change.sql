@@ -0,0 +1,2 @@
+INSERT INTO playlist_changes (plstid, version, op, sid, position, fanned_out)
+VALUES (%s, %s, %s, %s, %s, %s);
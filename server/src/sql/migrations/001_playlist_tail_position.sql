@@ -0,0 +1,10 @@
+-- Highest position handed out per playlist. Appends reserve positions by bumping this
+-- counter in one UPDATE instead of reading MAX(position) from playlist_song.
+ALTER TABLE playlists ADD COLUMN tail_position INT UNSIGNED NOT NULL DEFAULT 0;
+
+UPDATE playlists p
+SET p.tail_position = (
+  SELECT COALESCE(MAX(ps.position), 0)
+  FROM playlist_song ps
+  WHERE ps.plstid = p.plstid
+);
@@ -0,0 +1,28 @@
+-- Every playlist write bumps version and appends one row per changed song to
+-- playlist_changes, so clients can sync with GET /playlists/<id>/changes?since=<version>.
+ALTER TABLE playlists ADD COLUMN version BIGINT UNSIGNED NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS playlist_changes (
+  plstid     BIGINT UNSIGNED NOT NULL,
+  version    BIGINT UNSIGNED NOT NULL,
+  op         ENUM('add','move','remove') NOT NULL,
+  sid        VARCHAR(35) NOT NULL,
+  position   INT UNSIGNED NULL,
+  changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (plstid, version),
+  CONSTRAINT fk_pc_playlist FOREIGN KEY (plstid) REFERENCES playlists(plstid) ON DELETE CASCADE
+);
+
+-- Seed the log with the songs already in each playlist so ?since=0 replays the full list.
+INSERT INTO playlist_changes (plstid, version, op, sid, position, changed_at)
+SELECT
+  plstid,
+  ROW_NUMBER() OVER (PARTITION BY plstid ORDER BY position),
+  'add',
+  sid,
+  position,
+  added_at
+FROM playlist_song;
+
+UPDATE playlists p
+SET p.version = (SELECT COUNT(*) FROM playlist_changes pc WHERE pc.plstid = p.plstid);
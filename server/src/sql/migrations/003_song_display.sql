@@ -0,0 +1,109 @@
+-- Denormalized display row per song (song + primary album + all artist names) so list
+-- endpoints join one table by sid instead of regrouping the album/artist chain per request.
+CREATE TABLE IF NOT EXISTS song_display (
+  sid          VARCHAR(35) NOT NULL PRIMARY KEY,
+  song_name    TEXT NOT NULL,
+  artist_names TEXT NULL,
+  artist_ids   TEXT NULL,
+  album_id     VARCHAR(35) NULL,
+  album_title  VARCHAR(255) NULL,
+  release_date DATE NULL,
+  INDEX idx_song_display_album (album_id),
+  CONSTRAINT fk_sd_song FOREIGN KEY (sid) REFERENCES songs(sid) ON DELETE CASCADE
+);
+
+-- Full rebuild (import, manage.py refresh-song-display).
+DROP PROCEDURE IF EXISTS refresh_song_display_all;
+CREATE PROCEDURE refresh_song_display_all()
+  INSERT INTO song_display (sid, song_name, artist_names, artist_ids, album_id, album_title, release_date)
+  SELECT
+    s.sid,
+    s.name,
+    GROUP_CONCAT(DISTINCT ar.name  ORDER BY ar.name  SEPARATOR ', '),
+    GROUP_CONCAT(DISTINCT ar.artid ORDER BY ar.artid SEPARATOR ','),
+    pa.alid,
+    pa.title,
+    COALESCE(pa.release_date, s.release_date)
+  FROM songs s
+  LEFT JOIN albums pa ON pa.alid = (SELECT MIN(als2.alid) FROM album_song als2 WHERE als2.sid = s.sid)
+  LEFT JOIN album_song als            ON als.sid = s.sid
+  LEFT JOIN album_owned_by_artist aoa ON aoa.alid = als.alid
+  LEFT JOIN artists ar                ON ar.artid = aoa.artid
+  GROUP BY s.sid, s.name, s.release_date, pa.alid, pa.title, pa.release_date
+  ON DUPLICATE KEY UPDATE
+    song_name = VALUES(song_name),
+    artist_names = VALUES(artist_names),
+    artist_ids = VALUES(artist_ids),
+    album_id = VALUES(album_id),
+    album_title = VALUES(album_title),
+    release_date = VALUES(release_date);
+
+-- Targeted refresh for one song, every song on an album, or every song by an artist.
+DROP PROCEDURE IF EXISTS refresh_song_display_for;
+CREATE PROCEDURE refresh_song_display_for(IN in_sid VARCHAR(35), IN in_alid VARCHAR(35), IN in_artid VARCHAR(35))
+  INSERT INTO song_display (sid, song_name, artist_names, artist_ids, album_id, album_title, release_date)
+  SELECT
+    s.sid,
+    s.name,
+    GROUP_CONCAT(DISTINCT ar.name  ORDER BY ar.name  SEPARATOR ', '),
+    GROUP_CONCAT(DISTINCT ar.artid ORDER BY ar.artid SEPARATOR ','),
+    pa.alid,
+    pa.title,
+    COALESCE(pa.release_date, s.release_date)
+  FROM (
+    SELECT in_sid AS sid
+    UNION
+    SELECT t_als.sid FROM album_song t_als WHERE t_als.alid = in_alid
+    UNION
+    SELECT t_als.sid
+    FROM album_owned_by_artist t_aoa
+    JOIN album_song t_als ON t_als.alid = t_aoa.alid
+    WHERE t_aoa.artid = in_artid
+  ) AS target
+  JOIN songs s ON s.sid = target.sid
+  LEFT JOIN albums pa ON pa.alid = (SELECT MIN(als2.alid) FROM album_song als2 WHERE als2.sid = s.sid)
+  LEFT JOIN album_song als            ON als.sid = s.sid
+  LEFT JOIN album_owned_by_artist aoa ON aoa.alid = als.alid
+  LEFT JOIN artists ar                ON ar.artid = aoa.artid
+  GROUP BY s.sid, s.name, s.release_date, pa.alid, pa.title, pa.release_date
+  ON DUPLICATE KEY UPDATE
+    song_name = VALUES(song_name),
+    artist_names = VALUES(artist_names),
+    artist_ids = VALUES(artist_ids),
+    album_id = VALUES(album_id),
+    album_title = VALUES(album_title),
+    release_date = VALUES(release_date);
+
+CALL refresh_song_display_all();
+
+DROP TRIGGER IF EXISTS trg_song_display_song_ins;
+CREATE TRIGGER trg_song_display_song_ins AFTER INSERT ON songs
+FOR EACH ROW CALL refresh_song_display_for(NEW.sid, NULL, NULL);
+
+DROP TRIGGER IF EXISTS trg_song_display_song_upd;
+CREATE TRIGGER trg_song_display_song_upd AFTER UPDATE ON songs
+FOR EACH ROW CALL refresh_song_display_for(NEW.sid, NULL, NULL);
+
+DROP TRIGGER IF EXISTS trg_song_display_album_song_ins;
+CREATE TRIGGER trg_song_display_album_song_ins AFTER INSERT ON album_song
+FOR EACH ROW CALL refresh_song_display_for(NEW.sid, NULL, NULL);
+
+DROP TRIGGER IF EXISTS trg_song_display_album_song_del;
+CREATE TRIGGER trg_song_display_album_song_del AFTER DELETE ON album_song
+FOR EACH ROW CALL refresh_song_display_for(OLD.sid, NULL, NULL);
+
+DROP TRIGGER IF EXISTS trg_song_display_aoba_ins;
+CREATE TRIGGER trg_song_display_aoba_ins AFTER INSERT ON album_owned_by_artist
+FOR EACH ROW CALL refresh_song_display_for(NULL, NEW.alid, NULL);
+
+DROP TRIGGER IF EXISTS trg_song_display_aoba_del;
+CREATE TRIGGER trg_song_display_aoba_del AFTER DELETE ON album_owned_by_artist
+FOR EACH ROW CALL refresh_song_display_for(NULL, OLD.alid, NULL);
+
+DROP TRIGGER IF EXISTS trg_song_display_album_upd;
+CREATE TRIGGER trg_song_display_album_upd AFTER UPDATE ON albums
+FOR EACH ROW CALL refresh_song_display_for(NULL, NEW.alid, NULL);
+
+DROP TRIGGER IF EXISTS trg_song_display_artist_upd;
+CREATE TRIGGER trg_song_display_artist_upd AFTER UPDATE ON artists
+FOR EACH ROW CALL refresh_song_display_for(NULL, NULL, NEW.artid);
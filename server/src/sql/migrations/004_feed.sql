@@ -0,0 +1,17 @@
+-- Materialized per-user feed rows written when a followed playlist gains songs
+-- (fan-out on write). Playlists with more followers than FEED_FANOUT_MAX_FOLLOWERS
+-- leave their changes with fanned_out = 0 and are merged in when a feed is read.
+CREATE TABLE IF NOT EXISTS feed_items (
+  feed_id    BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+  uid        BIGINT UNSIGNED NOT NULL,
+  plstid     BIGINT UNSIGNED NOT NULL,
+  sid        VARCHAR(35) NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_feed_items_uid_created (uid, created_at),
+  CONSTRAINT fk_fi_user     FOREIGN KEY (uid)    REFERENCES users(uid)         ON DELETE CASCADE,
+  CONSTRAINT fk_fi_playlist FOREIGN KEY (plstid) REFERENCES playlists(plstid) ON DELETE CASCADE
+);
+
+ALTER TABLE playlist_changes
+  ADD COLUMN fanned_out TINYINT(1) NOT NULL DEFAULT 1,
+  ADD INDEX idx_playlist_changes_pull (plstid, fanned_out, changed_at);
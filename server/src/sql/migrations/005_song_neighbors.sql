@@ -0,0 +1,10 @@
+-- Top-K item-item neighbours from favorite/rating co-occurrence, written by the
+-- neighbours job (src/neighbors.py). Each rebuild fills song_neighbors_build and swaps
+-- it in with RENAME TABLE, so readers always see one complete build.
+CREATE TABLE IF NOT EXISTS song_neighbors (
+  sid          VARCHAR(35) NOT NULL,
+  rank_no      SMALLINT UNSIGNED NOT NULL,
+  neighbor_sid VARCHAR(35) NOT NULL,
+  score        FLOAT NOT NULL,
+  PRIMARY KEY (sid, rank_no)
+);
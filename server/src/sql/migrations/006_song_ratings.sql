@@ -0,0 +1,15 @@
+-- One row per rating, keyed by who rated what, replacing ratings + user_rates. Filled
+-- by dual writes and `manage backfill-song-ratings`; RATINGS_MODE picks which tables
+-- the app reads and writes during the cutover.
+CREATE TABLE IF NOT EXISTS song_ratings (
+  uid        BIGINT UNSIGNED NOT NULL,
+  sid        VARCHAR(35) NOT NULL,
+  rate_value TINYINT NOT NULL CHECK (rate_value BETWEEN 1 AND 5),
+  comment    TEXT NULL,
+  rated_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (uid, sid),
+  -- Covers per-song aggregates (AVG/COUNT of rate_value) without touching the rows.
+  KEY idx_song_ratings_sid (sid, rate_value),
+  CONSTRAINT fk_song_ratings_user FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE,
+  CONSTRAINT fk_song_ratings_song FOREIGN KEY (sid) REFERENCES songs(sid) ON DELETE CASCADE
+);
@@ -0,0 +1,63 @@
+-- Favorite history partitioned by month of favored_at, so time-window queries (the
+-- weekly ranking, trends) prune to the partitions they need instead of grouping all of
+-- user_favorite_song. Triggers append +1 when a favorite is made and -1, stamped with
+-- the original favored_at, when it is removed or re-stamped: SUM(delta) over a window is
+-- the number of favorites made in it that still stand.
+--
+-- Partitioned InnoDB tables cannot have foreign keys, and every unique key must contain
+-- favored_at. The table starts as one MAXVALUE partition; DB.add_favorite_partitions
+-- (run at startup and daily) splits it into pYYYYMM months, and
+-- `manage archive-favorites` folds expired months into favorite_weekly_counts.
+CREATE TABLE IF NOT EXISTS favorite_events (
+  event_id   BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  uid        BIGINT UNSIGNED NOT NULL,
+  sid        VARCHAR(35) NOT NULL,
+  favored_at TIMESTAMP NOT NULL,
+  delta      TINYINT NOT NULL,
+  PRIMARY KEY (event_id, favored_at),
+  -- Covers the per-window GROUP BY sid.
+  KEY idx_favorite_events_at (favored_at, sid, delta)
+)
+PARTITION BY RANGE (UNIX_TIMESTAMP(favored_at)) (
+  PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- Per ISO week (YEARWEEK mode 3) and song, from archived partitions.
+CREATE TABLE IF NOT EXISTS favorite_weekly_counts (
+  yearweek  INT NOT NULL,
+  sid       VARCHAR(35) NOT NULL,
+  fav_count INT NOT NULL,
+  PRIMARY KEY (yearweek, sid)
+);
+
+-- Partitions already folded into favorite_weekly_counts; makes a rerun after a crash
+-- between the fold and the DROP PARTITION skip straight to the drop.
+CREATE TABLE IF NOT EXISTS favorite_archived_partitions (
+  partition_name VARCHAR(16) NOT NULL PRIMARY KEY,
+  upper_bound    TIMESTAMP NOT NULL,
+  archived_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO favorite_events (uid, sid, favored_at, delta)
+SELECT uid, sid, favored_at, 1
+FROM user_favorite_song;
+
+DROP TRIGGER IF EXISTS trg_favorite_events_ins;
+CREATE TRIGGER trg_favorite_events_ins AFTER INSERT ON user_favorite_song
+FOR EACH ROW
+INSERT INTO favorite_events (uid, sid, favored_at, delta)
+VALUES (NEW.uid, NEW.sid, NEW.favored_at, 1);
+
+DROP TRIGGER IF EXISTS trg_favorite_events_upd;
+CREATE TRIGGER trg_favorite_events_upd AFTER UPDATE ON user_favorite_song
+FOR EACH ROW
+INSERT INTO favorite_events (uid, sid, favored_at, delta)
+SELECT OLD.uid, OLD.sid, OLD.favored_at, -1 FROM DUAL WHERE NEW.favored_at <> OLD.favored_at
+UNION ALL
+SELECT NEW.uid, NEW.sid, NEW.favored_at, 1 FROM DUAL WHERE NEW.favored_at <> OLD.favored_at;
+
+DROP TRIGGER IF EXISTS trg_favorite_events_del;
+CREATE TRIGGER trg_favorite_events_del AFTER DELETE ON user_favorite_song
+FOR EACH ROW
+INSERT INTO favorite_events (uid, sid, favored_at, delta)
+VALUES (OLD.uid, OLD.sid, OLD.favored_at, -1);
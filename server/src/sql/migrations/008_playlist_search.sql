@@ -0,0 +1,36 @@
+-- Playlist search: an n-gram FULLTEXT index over name and description (works for
+-- substrings and for text without spaces), plus follower and song counts kept on the
+-- playlist row by triggers so ranking reads no other table.
+ALTER TABLE playlists
+  ADD COLUMN follower_count INT UNSIGNED NOT NULL DEFAULT 0,
+  ADD COLUMN song_count     INT UNSIGNED NOT NULL DEFAULT 0;
+
+ALTER TABLE playlists
+  ADD FULLTEXT INDEX ft_playlists_search (name, description) WITH PARSER ngram;
+
+-- Full recount (migration, manage.py refresh-playlist-stats). Cascading deletes of
+-- users do not fire the triggers below, so counts can drift until the next recount.
+DROP PROCEDURE IF EXISTS refresh_playlist_stats_all;
+CREATE PROCEDURE refresh_playlist_stats_all()
+  UPDATE playlists p
+  SET p.follower_count = (SELECT COUNT(*) FROM user_follow_playlist ufp WHERE ufp.plstid = p.plstid),
+      p.song_count     = (SELECT COUNT(*) FROM playlist_song ps WHERE ps.plstid = p.plstid);
+
+CALL refresh_playlist_stats_all();
+
+-- GREATEST(..., 1) - 1: never underflow the UNSIGNED count if it has drifted.
+DROP TRIGGER IF EXISTS trg_playlist_stats_follow_ins;
+CREATE TRIGGER trg_playlist_stats_follow_ins AFTER INSERT ON user_follow_playlist
+FOR EACH ROW UPDATE playlists SET follower_count = follower_count + 1 WHERE plstid = NEW.plstid;
+
+DROP TRIGGER IF EXISTS trg_playlist_stats_follow_del;
+CREATE TRIGGER trg_playlist_stats_follow_del AFTER DELETE ON user_follow_playlist
+FOR EACH ROW UPDATE playlists SET follower_count = GREATEST(follower_count, 1) - 1 WHERE plstid = OLD.plstid;
+
+DROP TRIGGER IF EXISTS trg_playlist_stats_song_ins;
+CREATE TRIGGER trg_playlist_stats_song_ins AFTER INSERT ON playlist_song
+FOR EACH ROW UPDATE playlists SET song_count = song_count + 1 WHERE plstid = NEW.plstid;
+
+DROP TRIGGER IF EXISTS trg_playlist_stats_song_del;
+CREATE TRIGGER trg_playlist_stats_song_del AFTER DELETE ON playlist_song
+FOR EACH ROW UPDATE playlists SET song_count = GREATEST(song_count, 1) - 1 WHERE plstid = OLD.plstid;
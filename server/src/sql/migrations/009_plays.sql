@@ -0,0 +1,27 @@
+-- Play counts rolled up from POST /events/plays by the aggregator (src/plays.py). The
+-- raw events live only in segment files until aggregated. No foreign keys: the
+-- aggregator never reads songs or users, and reads join through song_display anyway.
+CREATE TABLE IF NOT EXISTS song_plays_daily (
+  day       DATE NOT NULL,
+  sid       VARCHAR(35) NOT NULL,
+  plays     INT UNSIGNED NOT NULL,
+  ms_played BIGINT UNSIGNED NOT NULL,
+  PRIMARY KEY (day, sid),
+  KEY idx_song_plays_daily_sid (sid, day)
+);
+
+CREATE TABLE IF NOT EXISTS user_song_plays (
+  uid            BIGINT UNSIGNED NOT NULL,
+  sid            VARCHAR(35) NOT NULL,
+  plays          INT UNSIGNED NOT NULL,
+  last_played_at TIMESTAMP NOT NULL,
+  PRIMARY KEY (uid, sid)
+);
+
+-- Segments already counted, written in the same transaction as their counts.
+CREATE TABLE IF NOT EXISTS play_segments (
+  name       VARCHAR(64) NOT NULL PRIMARY KEY,
+  events     INT UNSIGNED NOT NULL,
+  applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  KEY idx_play_segments_applied (applied_at)
+);
@@ -0,0 +1,67 @@
+-- Keep song_display right when an album or artist is deleted. The FK cascade removes
+-- their album_song / album_owned_by_artist rows without firing those tables' triggers,
+-- so the songs involved are noted before the delete, while the links still exist, and
+-- refreshed after it. Rows are keyed by connection so concurrent deletes each refresh
+-- only their own songs.
+CREATE TABLE IF NOT EXISTS song_display_stale (
+  conn_id BIGINT UNSIGNED NOT NULL,
+  sid     VARCHAR(35) NOT NULL,
+  PRIMARY KEY (conn_id, sid)
+);
+
+DELIMITER //
+DROP PROCEDURE IF EXISTS refresh_song_display_stale//
+CREATE PROCEDURE refresh_song_display_stale()
+BEGIN
+  INSERT INTO song_display (sid, song_name, artist_names, artist_ids, album_id, album_title, release_date)
+  SELECT
+    s.sid,
+    s.name,
+    GROUP_CONCAT(DISTINCT ar.name  ORDER BY ar.name  SEPARATOR ', '),
+    GROUP_CONCAT(DISTINCT ar.artid ORDER BY ar.artid SEPARATOR ','),
+    pa.alid,
+    pa.title,
+    COALESCE(pa.release_date, s.release_date)
+  FROM song_display_stale st
+  JOIN songs s ON s.sid = st.sid
+  LEFT JOIN albums pa ON pa.alid = (SELECT MIN(als2.alid) FROM album_song als2 WHERE als2.sid = s.sid)
+  LEFT JOIN album_song als            ON als.sid = s.sid
+  LEFT JOIN album_owned_by_artist aoa ON aoa.alid = als.alid
+  LEFT JOIN artists ar                ON ar.artid = aoa.artid
+  WHERE st.conn_id = CONNECTION_ID()
+  GROUP BY s.sid, s.name, s.release_date, pa.alid, pa.title, pa.release_date
+  ON DUPLICATE KEY UPDATE
+    song_name = VALUES(song_name),
+    artist_names = VALUES(artist_names),
+    artist_ids = VALUES(artist_ids),
+    album_id = VALUES(album_id),
+    album_title = VALUES(album_title),
+    release_date = VALUES(release_date);
+  DELETE FROM song_display_stale WHERE conn_id = CONNECTION_ID();
+END//
+DELIMITER ;
+
+DROP TRIGGER IF EXISTS trg_song_display_album_before_del;
+CREATE TRIGGER trg_song_display_album_before_del BEFORE DELETE ON albums
+FOR EACH ROW
+  INSERT IGNORE INTO song_display_stale (conn_id, sid)
+  SELECT CONNECTION_ID(), als.sid FROM album_song als WHERE als.alid = OLD.alid;
+
+DROP TRIGGER IF EXISTS trg_song_display_album_del;
+CREATE TRIGGER trg_song_display_album_del AFTER DELETE ON albums
+FOR EACH ROW CALL refresh_song_display_stale();
+
+-- fk_aoba_artist is ON DELETE RESTRICT today, so an artist that still owns albums cannot
+-- be deleted; these keep song_display right if that ever becomes a cascade.
+DROP TRIGGER IF EXISTS trg_song_display_artist_before_del;
+CREATE TRIGGER trg_song_display_artist_before_del BEFORE DELETE ON artists
+FOR EACH ROW
+  INSERT IGNORE INTO song_display_stale (conn_id, sid)
+  SELECT CONNECTION_ID(), als.sid
+  FROM album_owned_by_artist aoa
+  JOIN album_song als ON als.alid = aoa.alid
+  WHERE aoa.artid = OLD.artid;
+
+DROP TRIGGER IF EXISTS trg_song_display_artist_del;
+CREATE TRIGGER trg_song_display_artist_del AFTER DELETE ON artists
+FOR EACH ROW CALL refresh_song_display_stale();
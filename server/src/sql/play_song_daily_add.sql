@@ -0,0 +1,3 @@
+INSERT INTO song_plays_daily (day, sid, plays, ms_played)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE plays = plays + VALUES(plays), ms_played = ms_played + VALUES(ms_played);
@@ -0,0 +1,3 @@
+INSERT INTO user_song_plays (uid, sid, plays, last_played_at)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE plays = plays + VALUES(plays), last_played_at = GREATEST(last_played_at, VALUES(last_played_at));
@@ -0,0 +1,3 @@
+UPDATE playlists
+SET version = LAST_INSERT_ID(version + %s)
+WHERE plstid = %s;
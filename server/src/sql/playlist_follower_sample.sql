@@ -0,0 +1,8 @@
+SELECT COUNT(*) AS followers
+FROM (
+  SELECT 1
+  FROM user_follow_playlist ufp
+  JOIN playlists p ON p.plstid = ufp.plstid AND p.visibility = 'public'
+  WHERE ufp.plstid = %s
+  LIMIT %s
+) AS sample;
@@ -0,0 +1,3 @@
+SELECT MIN(position) AS position
+FROM playlist_song
+WHERE plstid = %s AND position > %s AND sid <> %s;
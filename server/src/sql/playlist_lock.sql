@@ -0,0 +1,4 @@
+SELECT plstid, tail_position
+FROM playlists
+WHERE plstid = %s
+FOR UPDATE;
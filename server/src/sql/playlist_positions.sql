@@ -0,0 +1,4 @@
+SELECT sid, position
+FROM playlist_song
+WHERE plstid = %s
+ORDER BY position;
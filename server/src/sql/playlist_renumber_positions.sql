@@ -0,0 +1,8 @@
+UPDATE playlist_song ps
+JOIN (
+  SELECT sid, ROW_NUMBER() OVER (ORDER BY position) AS rn
+  FROM playlist_song
+  WHERE plstid = %s
+) AS ordered ON ordered.sid = ps.sid
+SET ps.position = ordered.rn * %s
+WHERE ps.plstid = %s;
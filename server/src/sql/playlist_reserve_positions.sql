@@ -0,0 +1,3 @@
+UPDATE playlists
+SET tail_position = LAST_INSERT_ID(tail_position + %s)
+WHERE plstid = %s;
@@ -0,0 +1,5 @@
+UPDATE playlists p
+SET p.tail_position = (
+  SELECT COALESCE(MAX(ps.position), 0) FROM playlist_song ps WHERE ps.plstid = p.plstid
+)
+WHERE p.plstid = %s;
@@ -0,0 +1,3 @@
+UPDATE playlist_song
+SET position = position + %s
+WHERE plstid = %s;
@@ -0,0 +1,3 @@
+SELECT position
+FROM playlist_song
+WHERE plstid = %s AND sid = %s;
@@ -0,0 +1,6 @@
+SELECT
+  s.sid,
+  ps.position
+FROM songs s
+LEFT JOIN playlist_song ps ON ps.plstid = %(plstid)s AND ps.sid = s.sid
+WHERE s.sid IN %(sids)s;
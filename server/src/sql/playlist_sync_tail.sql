@@ -0,0 +1,6 @@
+UPDATE playlists p
+SET p.tail_position = GREATEST(
+  p.tail_position,
+  (SELECT COALESCE(MAX(ps.position), 0) FROM playlist_song ps WHERE ps.plstid = p.plstid)
+)
+WHERE p.plstid = %s;
@@ -0,0 +1,3 @@
+DELETE FROM feed_items
+WHERE created_at < NOW() - INTERVAL %s DAY
+LIMIT %s;
@@ -0,0 +1,2 @@
+DELETE FROM play_segments
+WHERE applied_at < NOW() - INTERVAL %s DAY;
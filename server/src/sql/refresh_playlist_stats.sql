@@ -0,0 +1 @@
+CALL refresh_playlist_stats_all();
@@ -0,0 +1 @@
+CALL refresh_song_display_all();
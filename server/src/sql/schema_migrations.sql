@@ -0,0 +1,4 @@
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  name       VARCHAR(255) PRIMARY KEY,
+  applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
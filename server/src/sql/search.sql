@@ -1,23 +1,21 @@
 SELECT
-  s.sid AS sid,
-  s.name AS song_name,
-  GROUP_CONCAT(DISTINCT a.name  ORDER BY a.name  SEPARATOR ', ') AS artist_name,
-  GROUP_CONCAT(DISTINCT a.artid ORDER BY a.artid SEPARATOR ',')   AS artist_ids,
-  al.title AS album_name,
-  MIN(al.alid) AS album_id,
-  al.release_date,
-  GROUP_CONCAT(DISTINCT t.name  ORDER BY t.name  SEPARATOR ', ') AS tags
-FROM songs AS s
-JOIN album_song          AS als ON s.sid  = als.sid
-JOIN albums              AS al  ON als.alid = al.alid
-JOIN album_owned_by_artist AS aoa ON al.alid = aoa.alid
-JOIN artists             AS a   ON aoa.artid = a.artid
-LEFT JOIN virt_song_tag  AS vst ON s.sid = vst.sid
-LEFT JOIN tags           AS t   ON vst.tag = t.tid
-WHERE LOWER(s.name)   LIKE LOWER(%s)
-   OR LOWER(a.name)   LIKE LOWER(%s)
-   OR LOWER(al.title) LIKE LOWER(%s)
-   OR LOWER(t.name)   LIKE LOWER(%s)
-GROUP BY s.sid, s.name, al.title, al.release_date
-ORDER BY s.name
+  sd.sid AS sid,
+  sd.song_name,
+  sd.artist_names AS artist_name,
+  sd.artist_ids,
+  sd.album_title AS album_name,
+  sd.album_id,
+  sd.release_date,
+  t.name AS tags
+FROM song_display       AS sd
+LEFT JOIN virt_song_tag AS vst ON vst.sid = sd.sid
+LEFT JOIN tags          AS t   ON t.tid = vst.tag
+WHERE sd.album_id IS NOT NULL
+  AND (
+       LOWER(sd.song_name)    LIKE LOWER(%s)
+    OR LOWER(sd.artist_names) LIKE LOWER(%s)
+    OR LOWER(sd.album_title)  LIKE LOWER(%s)
+    OR LOWER(t.name)          LIKE LOWER(%s)
+  )
+ORDER BY sd.song_name
 LIMIT %s OFFSET %s;
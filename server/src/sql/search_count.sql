@@ -1,16 +1,11 @@
 SELECT COUNT(*) AS total
-FROM (
-  SELECT s.sid
-  FROM songs AS s
-  JOIN album_song            AS als ON s.sid  = als.sid
-  JOIN albums                AS al  ON als.alid = al.alid
-  JOIN album_owned_by_artist AS aoa ON al.alid = aoa.alid
-  JOIN artists               AS a   ON aoa.artid = a.artid
-  LEFT JOIN virt_song_tag    AS vst ON s.sid = vst.sid
-  LEFT JOIN tags             AS t   ON vst.tag = t.tid
-  WHERE LOWER(s.name)   LIKE LOWER(%s)
-     OR LOWER(a.name)   LIKE LOWER(%s)
-     OR LOWER(al.title) LIKE LOWER(%s)
-     OR LOWER(t.name)   LIKE LOWER(%s)
-  GROUP BY s.sid
-) AS dedup;
+FROM song_display       AS sd
+LEFT JOIN virt_song_tag AS vst ON vst.sid = sd.sid
+LEFT JOIN tags          AS t   ON t.tid = vst.tag
+WHERE sd.album_id IS NOT NULL
+  AND (
+       LOWER(sd.song_name)    LIKE LOWER(%s)
+    OR LOWER(sd.artist_names) LIKE LOWER(%s)
+    OR LOWER(sd.album_title)  LIKE LOWER(%s)
+    OR LOWER(t.name)          LIKE LOWER(%s)
+  );
@@ -1,12 +1,26 @@
+-- Public playlists matching every search term (ngram FULLTEXT, boolean mode), ranked by
+-- relevance boosted by log follower and song counts. Keyset-paged on (score, plstid):
+-- pass the last row's values as before_score/before_id, or NULL for the first page.
 SELECT
-  plstid,
-  uid,
-  name,
-  description,
-  visibility,
-  created_at
-FROM playlists
-WHERE name LIKE %s
-  AND visibility = 'public'
-ORDER BY created_at DESC
-LIMIT 50;
+  p.plstid,
+  p.uid,
+  p.name,
+  p.description,
+  p.visibility,
+  p.created_at,
+  p.follower_count,
+  p.song_count,
+  ROUND(
+    MATCH(p.name, p.description) AGAINST (%(terms)s IN BOOLEAN MODE)
+    * (1 + %(follower_weight)s * LN(1 + p.follower_count) + %(song_weight)s * LN(1 + p.song_count)),
+    6
+  ) AS score
+FROM playlists p
+WHERE MATCH(p.name, p.description) AGAINST (%(terms)s IN BOOLEAN MODE)
+  AND p.visibility = 'public'
+  AND (%(owner)s IS NULL OR p.uid = %(owner)s)
+HAVING %(before_score)s IS NULL
+    OR score < %(before_score)s
+    OR (score = %(before_score)s AND plstid < %(before_id)s)
+ORDER BY score DESC, plstid DESC
+LIMIT %(limit)s;
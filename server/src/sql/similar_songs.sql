@@ -0,0 +1,11 @@
+SELECT
+  sd.sid,
+  sd.song_name AS name,
+  sd.album_title,
+  sd.artist_names,
+  sn.score
+FROM song_neighbors AS sn
+JOIN song_display AS sd ON sd.sid = sn.neighbor_sid
+WHERE sn.sid = %s
+ORDER BY sn.rank_no
+LIMIT %s;
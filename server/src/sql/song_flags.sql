@@ -0,0 +1,10 @@
+SELECT
+  s.sid,
+  MAX(ufs.uid IS NOT NULL) AS is_favorite,
+  MAX(r.rate_value) AS user_rating
+FROM songs s
+LEFT JOIN user_favorite_song ufs ON ufs.sid = s.sid AND ufs.uid = %(uid)s
+LEFT JOIN user_rates ur          ON ur.sid = s.sid AND ur.uid = %(uid)s
+LEFT JOIN ratings r              ON r.rid = ur.rid
+WHERE s.sid IN %(sids)s
+GROUP BY s.sid;
@@ -0,0 +1,17 @@
+-- Copy one rid range of the legacy tables into song_ratings. A user with several
+-- user_rates rows for a song keeps the lowest rid, the row rate_song updates. Re-running
+-- a range is harmless: it rewrites the rows with the legacy values, which dual writes
+-- keep equal to song_ratings.
+INSERT INTO song_ratings (uid, sid, rate_value, comment, rated_at)
+SELECT ur.uid, ur.sid, r.rate_value, r.comment, ur.rated_at
+FROM user_rates ur
+JOIN ratings r ON r.rid = ur.rid
+WHERE ur.rid > %s AND ur.rid <= %s
+  AND ur.rid = (
+    SELECT MIN(ur2.rid) FROM user_rates ur2
+    WHERE ur2.uid = ur.uid AND ur2.sid = ur.sid
+  )
+ON DUPLICATE KEY UPDATE
+  rate_value = VALUES(rate_value),
+  comment = VALUES(comment),
+  rated_at = VALUES(rated_at);
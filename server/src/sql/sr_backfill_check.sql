@@ -0,0 +1,10 @@
+-- Legacy ratings missing from song_ratings or holding a different value.
+SELECT COUNT(*) AS mismatched
+FROM user_rates ur
+JOIN ratings r ON r.rid = ur.rid
+LEFT JOIN song_ratings sr ON sr.uid = ur.uid AND sr.sid = ur.sid
+WHERE ur.rid = (
+    SELECT MIN(ur2.rid) FROM user_rates ur2
+    WHERE ur2.uid = ur.uid AND ur2.sid = ur.sid
+  )
+  AND (sr.uid IS NULL OR sr.rate_value <> r.rate_value OR NOT (sr.comment <=> r.comment));
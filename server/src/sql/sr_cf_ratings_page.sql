@@ -0,0 +1,6 @@
+-- Keyset page over the song_ratings primary key for the neighbours build.
+SELECT uid, sid, rate_value
+FROM song_ratings
+WHERE (uid, sid) > (%s, %s)
+ORDER BY uid, sid
+LIMIT %s;
@@ -0,0 +1,22 @@
+-- get_song_by_id.sql over song_ratings; the rating aggregate is a range of idx_song_ratings_sid.
+SELECT
+    s.sid,
+    s.name,
+    s.release_date,
+    a.title AS album_title,
+    MIN(als.alid) AS album_id,
+    (SELECT ROUND(AVG(sr.rate_value), 2) FROM song_ratings sr WHERE sr.sid = s.sid) AS avg_rating,
+    (SELECT COUNT(*) FROM song_ratings sr WHERE sr.sid = s.sid) AS rating_count,
+    GROUP_CONCAT(DISTINCT t.name ORDER BY t.name SEPARATOR ', ') AS tags
+FROM songs s
+LEFT JOIN album_song als ON s.sid = als.sid
+LEFT JOIN albums a ON als.alid = a.alid
+LEFT JOIN virt_song_tag vst ON vst.sid = s.sid
+LEFT JOIN tags t ON t.tid = vst.tag
+WHERE s.sid = %s
+GROUP BY
+    s.sid,
+    s.name,
+    s.release_date,
+    a.title
+LIMIT 1;
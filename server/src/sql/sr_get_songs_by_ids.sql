@@ -0,0 +1,20 @@
+-- get_songs_by_ids.sql over song_ratings.
+SELECT
+  sd.sid,
+  sd.song_name AS name,
+  sd.release_date,
+  sd.album_id,
+  sd.album_title,
+  sd.artist_names,
+  sd.artist_ids,
+  EXISTS (
+    SELECT 1 FROM user_favorite_song ufs
+    WHERE ufs.uid = %(uid)s AND ufs.sid = sd.sid
+  ) AS is_favorite,
+  (
+    SELECT sr.rate_value
+    FROM song_ratings sr
+    WHERE sr.uid = %(uid)s AND sr.sid = sd.sid
+  ) AS user_rating
+FROM song_display sd
+WHERE sd.sid IN %(sids)s;
@@ -0,0 +1,3 @@
+SELECT uid, sid, rate_value, comment, rated_at
+FROM song_ratings
+WHERE uid = %s AND sid = %s;
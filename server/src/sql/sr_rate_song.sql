@@ -0,0 +1,6 @@
+INSERT INTO song_ratings (uid, sid, rate_value, comment)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+  rate_value = VALUES(rate_value),
+  comment = VALUES(comment),
+  rated_at = CURRENT_TIMESTAMP;
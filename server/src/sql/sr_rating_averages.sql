@@ -0,0 +1,13 @@
+-- rating_averages.sql over song_ratings: one pass over idx_song_ratings_sid.
+SELECT
+  s.name AS song_name,
+  a.name AS artist_name,
+  ROUND(AVG(sr.rate_value), 2) AS avg_rating,
+  COUNT(*) AS rating_count
+FROM song_ratings AS sr
+JOIN songs AS s ON sr.sid = s.sid
+JOIN album_song AS als ON s.sid = als.sid
+JOIN album_owned_by_artist AS aoa ON als.alid = aoa.alid
+JOIN artists AS a ON aoa.artid = a.artid
+GROUP BY s.sid, a.artid, s.name, a.name
+ORDER BY avg_rating DESC, rating_count DESC;
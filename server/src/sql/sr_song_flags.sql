@@ -0,0 +1,10 @@
+-- song_flags.sql over song_ratings: the user's rating is one primary-key lookup per song.
+SELECT
+  s.sid,
+  MAX(ufs.uid IS NOT NULL) AS is_favorite,
+  MAX(sr.rate_value) AS user_rating
+FROM songs s
+LEFT JOIN user_favorite_song ufs ON ufs.sid = s.sid AND ufs.uid = %(uid)s
+LEFT JOIN song_ratings sr        ON sr.uid = %(uid)s AND sr.sid = s.sid
+WHERE s.sid IN %(sids)s
+GROUP BY s.sid;
@@ -0,0 +1,7 @@
+SELECT al.alid, al.title, COALESCE(SUM(f.favorites), 0) AS favorites
+FROM albums AS al
+LEFT JOIN album_song AS als ON als.alid = al.alid
+LEFT JOIN (
+  SELECT sid, COUNT(*) AS favorites FROM user_favorite_song GROUP BY sid
+) AS f ON f.sid = als.sid
+GROUP BY al.alid, al.title;
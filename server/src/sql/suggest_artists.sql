@@ -0,0 +1,8 @@
+SELECT a.artid, a.name, COALESCE(SUM(f.favorites), 0) AS favorites
+FROM artists AS a
+LEFT JOIN album_owned_by_artist AS aoa ON aoa.artid = a.artid
+LEFT JOIN album_song AS als ON als.alid = aoa.alid
+LEFT JOIN (
+  SELECT sid, COUNT(*) AS favorites FROM user_favorite_song GROUP BY sid
+) AS f ON f.sid = als.sid
+GROUP BY a.artid, a.name;
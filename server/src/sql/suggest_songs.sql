@@ -0,0 +1,6 @@
+-- Typeahead entries (src/suggest.py): id, label, popularity.
+SELECT sd.sid, sd.song_name, COALESCE(f.favorites, 0) AS favorites
+FROM song_display AS sd
+LEFT JOIN (
+  SELECT sid, COUNT(*) AS favorites FROM user_favorite_song GROUP BY sid
+) AS f ON f.sid = sd.sid;
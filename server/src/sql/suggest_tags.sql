@@ -0,0 +1,7 @@
+SELECT t.tid, t.name, COALESCE(SUM(f.favorites), 0) AS favorites
+FROM tags AS t
+LEFT JOIN virt_song_tag AS vst ON vst.tag = t.tid
+LEFT JOIN (
+  SELECT sid, COUNT(*) AS favorites FROM user_favorite_song GROUP BY sid
+) AS f ON f.sid = vst.sid
+GROUP BY t.tid, t.name;
@@ -0,0 +1,3 @@
+UPDATE playlist_song
+SET position = %s
+WHERE plstid = %s AND sid = %s;
@@ -0,0 +1,3 @@
+INSERT INTO user_favorite_song (uid, sid, favored_at)
+VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE favored_at = GREATEST(favored_at, VALUES(favored_at));
@@ -0,0 +1,2 @@
+DELETE FROM user_favorite_song
+WHERE uid = %s AND sid = %s AND favored_at <= %s;
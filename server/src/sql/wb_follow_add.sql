@@ -0,0 +1,3 @@
+INSERT INTO user_follow_playlist (uid, plstid, followed_at)
+VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE followed_at = LEAST(followed_at, VALUES(followed_at));
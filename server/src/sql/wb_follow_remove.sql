@@ -0,0 +1,2 @@
+DELETE FROM user_follow_playlist
+WHERE uid = %s AND plstid = %s AND followed_at <= %s;
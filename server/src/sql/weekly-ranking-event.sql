@@ -7,24 +7,8 @@ CREATE TABLE IF NOT EXISTS weekly_fav_rank_snapshot (
   PRIMARY KEY (yearweek, rank_in_week)
 );
 
-DELETE FROM weekly_fav_rank_snapshot WHERE yearweek = YEARWEEK(CURRENT_DATE - INTERVAL 1 WEEK, 3);
-
-INSERT INTO weekly_fav_rank_snapshot (yearweek, rank_in_week, song_title, album_title, fav_count)
-SELECT
-  yearweek,
-  rank_in_week,
-  song_title,
-  album_title,
-  fav_count
-FROM weekly_fav_rank
-WHERE yearweek = YEARWEEK(CURRENT_DATE - INTERVAL 1 WEEK, 3)
-ORDER BY rank_in_week
-LIMIT 10
-ON DUPLICATE KEY UPDATE
-  song_title = VALUES(song_title),
-  album_title = VALUES(album_title),
-  fav_count = VALUES(fav_count);
-
+-- Same statement as weekly-ranking-refresh.sql, which also runs at startup and from the
+-- app scheduler; the event covers deployments without a running app on Monday.
 DROP EVENT IF EXISTS refresh_last_week_fav_rank;
 CREATE EVENT refresh_last_week_fav_rank
 ON SCHEDULE EVERY 1 WEEK
@@ -34,13 +18,20 @@ STARTS (
 DO
   INSERT INTO weekly_fav_rank_snapshot (yearweek, rank_in_week, song_title, album_title, fav_count)
   SELECT
-    yearweek,
-    rank_in_week,
-    song_title,
-    album_title,
-    fav_count
-  FROM weekly_fav_rank
-  WHERE yearweek = YEARWEEK(CURRENT_DATE - INTERVAL 1 WEEK, 3)
+    YEARWEEK(CURRENT_DATE - INTERVAL 1 WEEK, 3) AS yearweek,
+    ROW_NUMBER() OVER (ORDER BY w.fav_count DESC, sd.song_name) AS rank_in_week,
+    sd.song_name AS song_title,
+    sd.album_title,
+    w.fav_count
+  FROM (
+    SELECT fe.sid, SUM(fe.delta) AS fav_count
+    FROM favorite_events fe
+    WHERE fe.favored_at >= CURRENT_DATE - INTERVAL (WEEKDAY(CURRENT_DATE) + 7) DAY
+      AND fe.favored_at <  CURRENT_DATE - INTERVAL WEEKDAY(CURRENT_DATE) DAY
+    GROUP BY fe.sid
+    HAVING fav_count > 0
+  ) AS w
+  JOIN song_display sd ON sd.sid = w.sid
   ORDER BY rank_in_week
   LIMIT 10
   ON DUPLICATE KEY UPDATE
@@ -0,0 +1,31 @@
+-- Last ISO week's top 10 into the snapshot. The favored_at range prunes favorite_events
+-- to the one or two monthly partitions the week touches.
+CREATE TABLE IF NOT EXISTS weekly_fav_rank_snapshot (
+  yearweek INT NOT NULL,
+  rank_in_week INT NOT NULL,
+  song_title VARCHAR(255) NOT NULL,
+  album_title VARCHAR(255) NULL,
+  fav_count INT NOT NULL,
+  PRIMARY KEY (yearweek, rank_in_week)
+);
+
+DELETE FROM weekly_fav_rank_snapshot WHERE yearweek = YEARWEEK(CURRENT_DATE - INTERVAL 1 WEEK, 3);
+
+INSERT INTO weekly_fav_rank_snapshot (yearweek, rank_in_week, song_title, album_title, fav_count)
+SELECT
+  YEARWEEK(CURRENT_DATE - INTERVAL 1 WEEK, 3) AS yearweek,
+  ROW_NUMBER() OVER (ORDER BY w.fav_count DESC, sd.song_name) AS rank_in_week,
+  sd.song_name AS song_title,
+  sd.album_title,
+  w.fav_count
+FROM (
+  SELECT fe.sid, SUM(fe.delta) AS fav_count
+  FROM favorite_events fe
+  WHERE fe.favored_at >= CURRENT_DATE - INTERVAL (WEEKDAY(CURRENT_DATE) + 7) DAY
+    AND fe.favored_at <  CURRENT_DATE - INTERVAL WEEKDAY(CURRENT_DATE) DAY
+  GROUP BY fe.sid
+  HAVING fav_count > 0
+) AS w
+JOIN song_display sd ON sd.sid = w.sid
+ORDER BY rank_in_week
+LIMIT 10;
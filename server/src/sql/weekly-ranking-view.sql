@@ -1,16 +1,20 @@
+-- Every week's ranking from the favorite history plus the archive (migration 007). For
+-- ad-hoc use: YEARWEEK(favored_at) cannot prune partitions, so the weekly refresh
+-- (weekly-ranking-refresh.sql) ranges over favored_at instead.
 CREATE OR REPLACE VIEW weekly_fav_rank AS
 WITH weekly AS (
-  SELECT
-    YEARWEEK(ufs.favored_at, 3) AS yearweek,
-    s.sid,
-    s.name AS song_title,
-    al.title AS album_title,
-    COUNT(*) AS fav_count
-  FROM user_favorite_song ufs
-  JOIN songs s          ON s.sid = ufs.sid
-  LEFT JOIN album_song als ON als.sid = s.sid
-  LEFT JOIN albums al      ON al.alid = als.alid
-  GROUP BY yearweek, s.sid, s.name, al.title
+  SELECT w.yearweek, sd.sid, sd.song_name AS song_title, sd.album_title, SUM(w.fav_count) AS fav_count
+  FROM (
+    SELECT YEARWEEK(fe.favored_at, 3) AS yearweek, fe.sid, SUM(fe.delta) AS fav_count
+    FROM favorite_events fe
+    GROUP BY yearweek, fe.sid
+    UNION ALL
+    SELECT fwc.yearweek, fwc.sid, fwc.fav_count
+    FROM favorite_weekly_counts fwc
+  ) AS w
+  JOIN song_display sd ON sd.sid = w.sid
+  GROUP BY w.yearweek, sd.sid, sd.song_name, sd.album_title
+  HAVING fav_count > 0
 )
 SELECT
   yearweek,
@@ -19,5 +23,3 @@ SELECT
   fav_count,
   ROW_NUMBER() OVER (PARTITION BY yearweek ORDER BY fav_count DESC, song_title) AS rank_in_week
 FROM weekly;
-
-
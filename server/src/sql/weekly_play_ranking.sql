@@ -0,0 +1,18 @@
+-- Last ISO week's most played songs, from the daily roll-up (a range of its primary key).
+SELECT
+  YEARWEEK(CURRENT_DATE - INTERVAL 1 WEEK, 3) AS yearweek,
+  ROW_NUMBER() OVER (ORDER BY w.plays DESC, sd.song_name) AS rank_in_week,
+  sd.sid,
+  sd.song_name AS song_title,
+  sd.album_title,
+  w.plays AS play_count
+FROM (
+  SELECT spd.sid, SUM(spd.plays) AS plays
+  FROM song_plays_daily spd
+  WHERE spd.day >= CURRENT_DATE - INTERVAL (WEEKDAY(CURRENT_DATE) + 7) DAY
+    AND spd.day <  CURRENT_DATE - INTERVAL WEEKDAY(CURRENT_DATE) DAY
+  GROUP BY spd.sid
+) AS w
+JOIN song_display sd ON sd.sid = w.sid
+ORDER BY rank_in_week
+LIMIT %s;
@@ -0,0 +1,243 @@
+"""
+Split and run multi-statement SQL scripts (schema, migrations, seed files).
+
+The splitter follows the mysql client's rules: string and identifier quotes (with
+backslash and doubled-quote escapes), `-- `, `#` and `/* */` comments (`/*! */` and
+`/*+ */` are kept, the server reads them), and `DELIMITER` lines, so procedure and
+trigger bodies written between `DELIMITER //` ... `//` reach the server in one piece.
+
+Statements are sent in batches over a CLIENT.MULTI_STATEMENTS connection, one round trip
+per batch. On a connection without that flag they run one by one, grouped into a
+transaction per batch. Either way a failure raises ScriptError with the statement's
+index, and run_script(..., start=index) picks up from there.
+"""
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional
+
+from pymysql.constants import CLIENT
+
+SCRIPT_BATCH_STATEMENTS = 100
+SCRIPT_BATCH_BYTES = 1 << 20
+
+_DELIMITER_LINE = re.compile(r"[ \t]*DELIMITER[ \t]+(\S+)[ \t]*(?:\r?\n|$)", re.IGNORECASE)
+
+
+@dataclass
+class Statement:
+    index: int
+    sql: str
+    line: int
+    # Written under a custom DELIMITER (a compound body); always sent on its own.
+    compound: bool = False
+
+    def summary(self, width: int = 70) -> str:
+        text = " ".join(self.sql.split())
+        return text if len(text) <= width else text[: width - 3] + "..."
+
+
+@dataclass
+class ScriptResult:
+    executed: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    timings: List[float] = field(default_factory=list)
+
+
+class ScriptError(RuntimeError):
+    def __init__(self, statement: Statement, cause: Exception) -> None:
+        super().__init__(
+            f"statement {statement.index} (line {statement.line}) failed: {cause}\n"
+            f"  {statement.summary()}\n"
+            f"  fix it and resume from statement {statement.index}"
+        )
+        self.statement = statement
+        self.cause = cause
+
+
+def split_statements(text: str) -> List[Statement]:
+    statements: List[Statement] = []
+    delimiter = ";"
+    buf: List[str] = []
+    has_content = False
+    start_line = line = 1
+    i, n = 0, len(text)
+    at_line_start = True
+
+    def flush() -> None:
+        sql = "".join(buf).strip()
+        if sql:
+            statements.append(Statement(len(statements), sql, start_line, compound=delimiter != ";"))
+        buf.clear()
+
+    while i < n:
+        ch = text[i]
+
+        if at_line_start and not has_content:
+            match = _DELIMITER_LINE.match(text, i)
+            if match:
+                flush()
+                delimiter = match.group(1)
+                line += match.group(0).count("\n")
+                i = match.end()
+                continue
+        at_line_start = False
+
+        if ch in "'\"`":
+            j = i + 1
+            while j < n:
+                if text[j] == "\\" and ch != "`":
+                    j += 2
+                    continue
+                if text[j] == ch:
+                    if j + 1 < n and text[j + 1] == ch:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            chunk = text[i : j + 1]
+        elif ch == "#" or (text.startswith("--", i) and (i + 2 == n or text[i + 2] in " \t\r\n")):
+            end = text.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            chunk = text[i:end]
+            if chunk[2:3] not in ("!", "+"):
+                line += chunk.count("\n")
+                buf.append(" ")
+                i = end
+                continue
+        elif text.startswith(delimiter, i):
+            flush()
+            has_content = False
+            i += len(delimiter)
+            continue
+        elif ch.isspace():
+            if ch == "\n":
+                line += 1
+                at_line_start = True
+            buf.append(ch)
+            i += 1
+            continue
+        else:
+            chunk = ch
+
+        if not has_content:
+            has_content = True
+            start_line = line
+        buf.append(chunk)
+        line += chunk.count("\n")
+        i += len(chunk)
+
+    flush()
+    return statements
+
+
+def _batches(statements: List[Statement], max_statements: int, max_bytes: int) -> List[List[Statement]]:
+    batches: List[List[Statement]] = []
+    current: List[Statement] = []
+    size = 0
+    for stmt in statements:
+        length = len(stmt.sql.encode("utf-8"))
+        if current and (stmt.compound or current[-1].compound
+                        or len(current) >= max_statements or size + length > max_bytes):
+            batches.append(current)
+            current, size = [], 0
+        current.append(stmt)
+        size += length
+    if current:
+        batches.append(current)
+    return batches
+
+
+def run_script(
+    conn: Any,
+    text: str,
+    start: int = 0,
+    batch_statements: int = SCRIPT_BATCH_STATEMENTS,
+    batch_bytes: int = SCRIPT_BATCH_BYTES,
+    progress: Optional[Callable[[Statement, int, float], None]] = None,
+    multi: Optional[bool] = None,
+) -> ScriptResult:
+    """
+    Run `text` on `conn` from statement `start`. `progress(statement, total, seconds)` is
+    called after each statement; under multi-statement batching `seconds` is the gap
+    between its result and the previous one. `multi` says whether the connection was
+    opened with multi-statements; by default it is read from a pymysql connection's flags.
+    """
+    statements = split_statements(text)
+    result = ScriptResult(skipped=min(start, len(statements)))
+    total = len(statements)
+    if multi is None:
+        multi = bool(getattr(conn, "client_flag", 0) & CLIENT.MULTI_STATEMENTS)
+    began = time.perf_counter()
+
+    for batch in _batches(statements[start:], batch_statements, batch_bytes):
+        if multi and len(batch) > 1:
+            _run_multi(conn, batch, total, result, progress)
+        else:
+            _run_grouped(conn, batch, total, result, progress)
+    result.seconds = time.perf_counter() - began
+    return result
+
+
+def _run_multi(conn: Any, batch: List[Statement], total: int, result: ScriptResult,
+               progress: Optional[Callable[[Statement, int, float], None]]) -> None:
+    # The server stops at the first failing statement of a multi-statement packet; results
+    # come back in order, so the number read so far says which one failed.
+    done = 0
+    mark = time.perf_counter()
+    with conn.cursor() as cur:
+        try:
+            cur.execute(";\n".join(stmt.sql for stmt in batch))
+            while True:
+                cur.fetchall()
+                now = time.perf_counter()
+                _record(batch[done], total, now - mark, result, progress)
+                mark, done = now, done + 1
+                if not cur.nextset():
+                    break
+        except Exception as e:
+            raise ScriptError(batch[min(done, len(batch) - 1)], e) from e
+
+
+def _run_grouped(conn: Any, batch: List[Statement], total: int, result: ScriptResult,
+                 progress: Optional[Callable[[Statement, int, float], None]]) -> None:
+    # One commit per batch instead of per statement. On failure the statements before the
+    # failing one are still committed, as they would be under autocommit, so resuming from
+    # its index neither skips nor repeats work.
+    autocommit = conn.get_autocommit()
+    if autocommit and len(batch) > 1:
+        conn.autocommit(False)
+    try:
+        with conn.cursor() as cur:
+            for stmt in batch:
+                mark = time.perf_counter()
+                try:
+                    cur.execute(stmt.sql)
+                    cur.fetchall()
+                except Exception as e:
+                    conn.commit()
+                    raise ScriptError(stmt, e) from e
+                _record(stmt, total, time.perf_counter() - mark, result, progress)
+        conn.commit()
+    finally:
+        if autocommit and len(batch) > 1:
+            conn.autocommit(True)
+
+
+def _record(stmt: Statement, total: int, seconds: float, result: ScriptResult,
+            progress: Optional[Callable[[Statement, int, float], None]]) -> None:
+    result.executed += 1
+    result.timings.append(seconds)
+    if progress is not None:
+        progress(stmt, total, seconds)
+
+
+def print_progress(stmt: Statement, total: int, seconds: float) -> None:
+    print(f"[{stmt.index + 1}/{total}] {seconds * 1000:8.1f}ms  {stmt.summary()}")
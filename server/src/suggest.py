@@ -0,0 +1,308 @@
+"""
+In-process typeahead index behind GET /suggest.
+
+Song names, artist names, album titles and tag names are normalized (accents stripped,
+case folded, punctuation collapsed) and indexed under the start of each of their first
+SUGGEST_WORD_STARTS words, so "beat" finds "The Beatles". Each kind's keys live in a
+sorted list: a prefix is a contiguous range found with bisect, and a max segment tree
+over the popularity (favorite count) of each key yields the top-k of any range in
+O(k log n) without scanning it. A query merges the top-k of each requested kind. Keys are cut at SUGGEST_KEY_LENGTH characters, which bounds memory
+at a few slots per entry however long the titles are.
+
+Workers load the index from a pickle snapshot (SUGGEST_SNAPSHOT) when it is recent, or
+build it from MySQL under a named lock and write the snapshot for the others. Between
+full rebuilds, favorite counts of recently favorited songs are applied in place.
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .tool import resolve_path
+
+SUGGEST_SNAPSHOT = resolve_path(os.getenv("SUGGEST_SNAPSHOT", "data/suggest.pickle"))
+SUGGEST_KEY_LENGTH = int(os.getenv("SUGGEST_KEY_LENGTH", "32"))
+SUGGEST_WORD_STARTS = int(os.getenv("SUGGEST_WORD_STARTS", "3"))
+SUGGEST_REBUILD_MINUTES = int(os.getenv("SUGGEST_REBUILD_MINUTES", "60"))
+SUGGEST_REFRESH_SECONDS = int(os.getenv("SUGGEST_REFRESH_SECONDS", "60"))
+
+# kind -> statement returning (id, label, favorites)
+SOURCES = (
+    ("song", "suggest_songs.sql"),
+    ("artist", "suggest_artists.sql"),
+    ("album", "suggest_albums.sql"),
+    ("tag", "suggest_tags.sql"),
+)
+KINDS = tuple(kind for kind, _ in SOURCES)
+SNAPSHOT_VERSION = 2
+_SEPARATORS = re.compile(r"[\W_]+")
+_END = "\U0010ffff"
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _SEPARATORS.sub(" ", text.casefold()).strip()
+
+
+def index_keys(label: str) -> List[str]:
+    words = normalize(label).split()
+    keys = {" ".join(words[i:])[:SUGGEST_KEY_LENGTH] for i in range(min(len(words), SUGGEST_WORD_STARTS))}
+    return sorted(keys)
+
+
+class _KeyTree:
+    """
+    Sorted keys of one kind's entries, with a max segment tree over their weights.
+    `weights` is the owning PrefixIndex's array, shared so updates reach every tree.
+    """
+
+    def __init__(self, records: List[Tuple[str, int]], entry_count: int, weights: array) -> None:
+        self.weights = weights
+        self.keys = [key for key, _ in records]
+        self.refs = array("I", (e for _, e in records))
+
+        # Key positions of each entry (CSR layout), for in-place weight updates.
+        counts = array("I", [0]) * (entry_count + 1)
+        for e in self.refs:
+            counts[e + 1] += 1
+        for e in range(entry_count):
+            counts[e + 1] += counts[e]
+        self.offsets = counts
+        self.positions = array("I", [0]) * len(self.refs)
+        fill = counts[:-1]
+        for pos, e in enumerate(self.refs):
+            self.positions[fill[e]] = pos
+            fill[e] += 1
+
+        # Max segment tree of key positions; leaves at [size, 2 * size).
+        size = 1
+        while size < max(len(self.keys), 1):
+            size *= 2
+        self.size = size
+        self.tree = array("i", [-1]) * (2 * size)
+        self.tree[size:size + len(self.keys)] = array("i", range(len(self.keys)))
+        for node in range(size - 1, 0, -1):
+            self.tree[node] = self._better(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def _weight(self, pos: int) -> float:
+        return self.weights[self.refs[pos]]
+
+    def _better(self, a: int, b: int) -> int:
+        if a < 0:
+            return b
+        if b < 0:
+            return a
+        # Ties go to the earlier (alphabetically smaller) key.
+        return a if self._weight(a) >= self._weight(b) else b
+
+    def _argmax(self, lo: int, hi: int) -> int:
+        best = -1
+        lo += self.size
+        hi += self.size
+        while lo < hi:
+            if lo & 1:
+                best = self._better(best, self.tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = self._better(best, self.tree[hi])
+            lo //= 2
+            hi //= 2
+        return best
+
+    def top(self, prefix: str, k: int) -> List[Tuple[float, str, int]]:
+        """(-weight, matched key, entry) of the top `k` entries under `prefix`, best first."""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + _END, lo)
+        if lo >= hi:
+            return []
+        best = self._argmax(lo, hi)
+        heap = [(-self._weight(best), best, lo, hi)]
+        seen = set()
+        found: List[Tuple[float, str, int]] = []
+        # An entry has at most SUGGEST_WORD_STARTS keys, so this pops at most k times that.
+        while heap and len(found) < k:
+            weight, pos, lo, hi = heapq.heappop(heap)
+            entry = self.refs[pos]
+            if entry not in seen:
+                seen.add(entry)
+                found.append((weight, self.keys[pos], entry))
+            for a, b in ((lo, pos), (pos + 1, hi)):
+                if a < b:
+                    p = self._argmax(a, b)
+                    heapq.heappush(heap, (-self._weight(p), p, a, b))
+        return found
+
+    def update(self, entry: int) -> None:
+        for i in range(self.offsets[entry], self.offsets[entry + 1]):
+            node = (self.size + self.positions[i]) // 2
+            while node:
+                self.tree[node] = self._better(self.tree[2 * node], self.tree[2 * node + 1])
+                node //= 2
+
+
+class PrefixIndex:
+    """
+    Sorted keys over a fixed set of entries, in one _KeyTree per kind so a query for some
+    kinds never walks past the others. Weights can change in place; the entries and keys
+    only change by building a new index.
+    """
+
+    def __init__(self, entries: Sequence[Tuple[str, str, str, float]]) -> None:
+        records: List[List[Tuple[str, int]]] = [[] for _ in KINDS]
+        for e, (kind, _, label, _) in enumerate(entries):
+            for key in index_keys(label):
+                records[KINDS.index(kind)].append((key, e))
+        self.kinds = bytearray(KINDS.index(kind) for kind, _, _, _ in entries)
+        self.ids = [str(eid) for _, eid, _, _ in entries]
+        self.labels = [label for _, _, label, _ in entries]
+        self.weights = array("d", (float(weight) for _, _, _, weight in entries))
+        self.trees = [_KeyTree(sorted(kind_records), len(entries), self.weights) for kind_records in records]
+        # Only song popularity is refreshed between rebuilds.
+        self.songs = {str(eid): e for e, (kind, eid, _, _) in enumerate(entries) if kind == "song"}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def key_count(self) -> int:
+        return sum(len(tree.keys) for tree in self.trees)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def top(self, prefix: str, k: int, kinds: Optional[Iterable[str]] = None) -> List[int]:
+        """Entries with a key starting with `prefix`, most popular first; ties by matched key, then kind."""
+        prefix = prefix[:SUGGEST_KEY_LENGTH]
+        wanted = range(len(KINDS)) if kinds is None else sorted({KINDS.index(kind) for kind in kinds})
+        found = [hit for i in wanted for hit in self.trees[i].top(prefix, k)]
+        found.sort(key=lambda hit: (hit[0], hit[1], self.kinds[hit[2]]))
+        return [entry for _, _, entry in found[:k]]
+
+    def set_song_weight(self, sid: str, weight: float) -> bool:
+        entry = self.songs.get(sid)
+        if entry is None:
+            return False
+        with self._lock:
+            self.weights[entry] = weight
+            self.trees[KINDS.index("song")].update(entry)
+        return True
+
+    def entry(self, e: int) -> Dict[str, Any]:
+        return {"type": KINDS[self.kinds[e]], "id": self.ids[e], "text": self.labels[e], "popularity": int(self.weights[e])}
+
+
+class Suggester:
+    """The process's current PrefixIndex plus how to load, rebuild and refresh it."""
+
+    def __init__(self, db: Any, snapshot: Path = SUGGEST_SNAPSHOT) -> None:
+        self._db = db
+        self._snapshot = snapshot
+        self._index: Optional[PrefixIndex] = None
+        self._watermark: Optional[datetime] = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def suggest(self, query: str, limit: int = 10, kinds: Optional[Iterable[str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Top `limit` entries for a typed prefix, or None while the index is still loading."""
+        index = self._index
+        if index is None:
+            return None
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        return [index.entry(e) for e in index.top(prefix, limit, kinds)]
+
+    def start(self) -> threading.Thread:
+        """Load or build the index in the background so the worker can serve right away."""
+        thread = threading.Thread(target=self.load_or_build, name="suggest-load", daemon=True)
+        thread.start()
+        return thread
+
+    def load_or_build(self, max_age: Optional[float] = None) -> None:
+        """
+        Use the snapshot if it is younger than `max_age` seconds (default
+        SUGGEST_REBUILD_MINUTES), otherwise rebuild it. The named lock makes one worker
+        build while the others wait and then load its file.
+        """
+        max_age = SUGGEST_REBUILD_MINUTES * 60 if max_age is None else max_age
+        try:
+            with self._db.named_lock("resonate:suggest-build", timeout=600):
+                if not self._load_snapshot(max_age):
+                    self.rebuild()
+            self.refresh()
+        except Exception as e:
+            print(f"Suggest index load failed: {e}")
+
+    def _load_snapshot(self, max_age: float) -> bool:
+        try:
+            if time.time() - self._snapshot.stat().st_mtime > max_age:
+                return False
+            with self._snapshot.open("rb") as fh:
+                data = pickle.load(fh)
+        except FileNotFoundError:
+            return False
+        if data.get("version") != SNAPSHOT_VERSION:
+            return False
+        self._index, self._watermark = data["index"], data["watermark"]
+        print(f"Suggest index loaded from {self._snapshot} ({len(self._index)} entries).")
+        return True
+
+    def rebuild(self) -> None:
+        started = time.perf_counter()
+        # Read the watermark first: favorites that land during the build are applied again
+        # by the next refresh, which sets totals and so is safe to repeat.
+        _, rows = self._db.fetch_tuples("latest_favorite_at.sql")
+        watermark = rows[0][0] if rows else None
+        entries: List[Tuple[str, str, str, float]] = []
+        for kind, filename in SOURCES:
+            _, rows = self._db.fetch_tuples(filename)
+            entries.extend((kind, eid, label, float(weight)) for eid, label, weight in rows if label)
+        index = PrefixIndex(entries)
+        self._index, self._watermark = index, watermark
+        print(f"Suggest index built: {len(index)} entries, {index.key_count} keys in {time.perf_counter() - started:.1f}s.")
+        self._save_snapshot(index, watermark)
+
+    def _save_snapshot(self, index: PrefixIndex, watermark: Optional[datetime]) -> None:
+        self._snapshot.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._snapshot.with_name(f".{self._snapshot.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as fh:
+            pickle.dump({"version": SNAPSHOT_VERSION, "index": index, "watermark": watermark}, fh,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._snapshot)
+
+    def refresh(self) -> int:
+        """Apply current favorite counts of songs favorited since the last refresh."""
+        index = self._index
+        if index is None:
+            return 0
+        with self._refresh_lock:
+            since = self._watermark or datetime.min
+            _, rows = self._db.fetch_tuples("favorites_changed_since.sql", (since,))
+            updated = 0
+            for sid, favorites, last_favored_at in rows:
+                updated += index.set_song_weight(sid, float(favorites))
+                if self._watermark is None or last_favored_at > self._watermark:
+                    self._watermark = last_favored_at
+            return updated
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import base64
+import json
 from pathlib import Path
-from typing import Union
+from typing import Any, Dict, Union
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
@@ -26,3 +28,18 @@ def load_sql(path_like: Union[str, Path]) -> str:
     if not path.suffix:
         path = path.with_suffix(".sql")
     return read_text(path)
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Encode a pagination position as an opaque, URL-safe cursor."""
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    if not isinstance(payload, dict):
+        raise ValueError("invalid cursor")
+    return payload
@@ -0,0 +1,223 @@
+"""
+Write-behind for the highest-volume single-row writes: favorite/unfavorite and
+follow/unfollow playlist. Enabled with WRITE_BEHIND=1.
+
+A write is appended to this worker's log segment (one JSON line, fsynced unless
+WRITE_BEHIND_FSYNC=0) and acknowledged. A flusher thread seals the segment every
+WRITE_BEHIND_FLUSH_MS, coalesces its events to the last one per (user, song/playlist),
+and applies them in one transaction of multi-row statements (DB.apply_write_behind).
+The segment file is deleted only after the commit.
+
+Replay is idempotent: adds are upserts stamped with the event time, and removes only
+delete rows stamped at or before the event time, so a segment applied twice, or after a
+newer add from another worker, leaves the same rows. Each worker holds an flock on its
+own segments; any segment older than WRITE_BEHIND_ORPHAN_SECONDS whose lock can be
+taken belongs to a dead process and is applied, at start and then every minute.
+
+Reads in DB (and in AsyncDB, for the routes src/asgi.py serves natively) overlay this
+worker's pending events, so a user sees their own write on
+the worker that took it. Another worker sees it once the segment is flushed, normally
+within WRITE_BEHIND_FLUSH_MS.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+from .tool import resolve_path
+
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_DIR = resolve_path(os.getenv("WRITE_BEHIND_DIR", "data/writebehind"))
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "200"))
+WRITE_BEHIND_FSYNC = os.getenv("WRITE_BEHIND_FSYNC", "1") == "1"
+# Segments are only replayed once they are this old: a worker creates its segment before
+# it takes the lock, and in that gap the empty file must not be taken for a dead one's.
+WRITE_BEHIND_ORPHAN_SECONDS = 60.0
+
+
+@dataclass
+class Event:
+    seq: int
+    kind: str  # "favorite" (key = sid) or "follow" (key = plstid)
+    added: bool
+    uid: int
+    key: Any
+    ts: float
+
+    def to_line(self) -> str:
+        return json.dumps({"seq": self.seq, "kind": self.kind, "added": self.added,
+                           "uid": self.uid, "key": self.key, "ts": self.ts}) + "\n"
+
+    @classmethod
+    def from_line(cls, line: str) -> "Event":
+        return cls(**json.loads(line))
+
+
+def coalesce(events: List[Event]) -> List[Event]:
+    """Last event per (kind, uid, key), in the order those last events were written."""
+    last: Dict[Tuple[str, int, Any], Event] = {}
+    for event in events:
+        last.pop((event.kind, event.uid, event.key), None)
+        last[(event.kind, event.uid, event.key)] = event
+    return list(last.values())
+
+
+def read_segment(path: Path) -> List[Event]:
+    events = []
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                events.append(Event.from_line(line))
+            except (ValueError, TypeError):
+                # A torn final line from a crash mid-append was never acknowledged.
+                break
+    return events
+
+
+class Segment:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.fh: IO[str] = path.open("a", encoding="utf-8")
+        fcntl.flock(self.fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self.events: List[Event] = []
+
+    def append(self, event: Event) -> None:
+        self.fh.write(event.to_line())
+        self.fh.flush()
+        if WRITE_BEHIND_FSYNC:
+            os.fsync(self.fh.fileno())
+        self.events.append(event)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+        self.fh.close()
+
+
+class WriteBehindLog:
+    def __init__(self, db: Any, directory: Path = WRITE_BEHIND_DIR) -> None:
+        self._db = db
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._seq = 0
+        self._segment_no = 0
+        self._active: Optional[Segment] = None
+        self._sealed: List[Segment] = []
+        # (kind, uid) -> {key: (added, seq)} for events not yet committed to MySQL.
+        self._pending: Dict[Tuple[str, int], Dict[Any, Tuple[bool, int]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        replayed = self.replay_orphans()
+        if replayed:
+            print(f"Write-behind: replayed {replayed} event(s) from earlier processes.")
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Write-behind final flush failed; segments stay on disk for replay: {e}")
+
+    def append(self, kind: str, added: bool, uid: int, key: Any) -> None:
+        with self._lock:
+            if self._active is None:
+                self._segment_no += 1
+                # Names sort by creation time, so replay applies older segments first.
+                name = f"seg-{int(time.time()):011d}-{os.getpid()}-{self._segment_no:06d}.log"
+                self._active = Segment(self._directory / name)
+            self._seq += 1
+            event = Event(self._seq, kind, added, uid, key, time.time())
+            self._active.append(event)
+            self._pending.setdefault((kind, uid), {})[key] = (added, event.seq)
+
+    def pending(self, kind: str, uid: int) -> Dict[Any, bool]:
+        """{key: added} for this user's unflushed events of one kind."""
+        with self._lock:
+            return {key: added for key, (added, _) in self._pending.get((kind, uid), {}).items()}
+
+    def flush(self) -> int:
+        """Seal the active segment and apply every sealed segment in order. Returns events applied."""
+        with self._flush_lock:
+            with self._lock:
+                if self._active is not None:
+                    self._sealed.append(self._active)
+                    self._active = None
+            applied = 0
+            while self._sealed:
+                segment = self._sealed[0]
+                self._db.apply_write_behind(coalesce(segment.events))
+                applied += len(segment.events)
+                self._sealed.pop(0)
+                segment.remove()
+                self._forget(segment.events)
+            return applied
+
+    def _forget(self, events: List[Event]) -> None:
+        with self._lock:
+            for event in events:
+                keys = self._pending.get((event.kind, event.uid))
+                if keys is None:
+                    continue
+                current = keys.get(event.key)
+                if current is not None and current[1] <= event.seq:
+                    del keys[event.key]
+                if not keys:
+                    del self._pending[(event.kind, event.uid)]
+
+    def replay_orphans(self) -> int:
+        """Apply and delete segments left by processes that exited before flushing them."""
+        replayed = 0
+        now = time.time()
+        for path in sorted(self._directory.glob("seg-*.log")):
+            if now - _mtime(path) < WRITE_BEHIND_ORPHAN_SECONDS:
+                continue  # possibly created but not yet locked by a live worker
+            try:
+                fh = path.open("a", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            try:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # a live worker owns it
+                if not path.exists():
+                    continue  # flushed and removed while we waited
+                events = read_segment(path)
+                self._db.apply_write_behind(coalesce(events))
+                path.unlink(missing_ok=True)
+                replayed += len(events)
+            finally:
+                fh.close()
+        return replayed
+
+    def _run(self) -> None:
+        # Also pick up segments of workers that died after this one started.
+        orphan_check = time.monotonic() + 60
+        while not self._stop.wait(WRITE_BEHIND_FLUSH_MS / 1000):
+            try:
+                self.flush()
+                if time.monotonic() >= orphan_check:
+                    orphan_check = time.monotonic() + 60
+                    self.replay_orphans()
+            except Exception as e:
+                print(f"Write-behind flush failed, will retry: {e}")
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return float("inf")
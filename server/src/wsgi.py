@@ -0,0 +1,17 @@
+"""
+WSGI entry point for production servers, e.g.
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+
+Schema setup runs once in the gunicorn master (RUN_STARTUP_TASKS, see gunicorn.conf.py).
+Each worker imports this module after forking, so its app, DB pool and scheduler are never
+shared across forks. WORKER_STARTUP_TASKS=1 runs the setup here instead, for a
+single-process server without that master hook; gunicorn.conf.py forces it off.
+"""
+from __future__ import annotations
+
+import os
+
+from .app import create_app
+
+app = create_app(run_startup=os.getenv("WORKER_STARTUP_TASKS", "0") == "1")
@@ -0,0 +1,194 @@
+"""
+Summaries of MySQL `EXPLAIN FORMAT=JSON` output, the budgets they are checked against,
+and the recorded baselines used to show what changed when a budget is blown.
+"""
+from __future__ import annotations
+
+import difflib
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional
+
+BASELINE_DIR = Path(__file__).resolve().parent / "plans"
+
+# A scan of fewer rows than this is a lookup table or a small materialized result, not a
+# problem worth failing on.
+LARGE_TABLE_ROWS = 1_000
+
+
+@dataclass
+class Step:
+    table: str
+    access: str
+    key: Optional[str]
+    rows_per_scan: int
+    rows_examined: float
+
+
+@dataclass
+class Plan:
+    steps: List[Step] = field(default_factory=list)
+    filesort: bool = False
+    temporary: bool = False
+    cost: float = 0.0
+
+    @property
+    def rows_examined(self) -> int:
+        return int(sum(step.rows_examined for step in self.steps))
+
+    def full_scans(self, min_rows: int = LARGE_TABLE_ROWS) -> List[str]:
+        return [
+            step.table
+            for step in self.steps
+            if step.access in ("ALL", "index") and step.rows_per_scan >= min_rows and not step.table.startswith("<")
+        ]
+
+    def lines(self) -> List[str]:
+        flags = [name for name, on in (("filesort", self.filesort), ("temporary", self.temporary)) if on]
+        header = f"rows_examined~{self.rows_examined} cost={self.cost:.1f} {' '.join(flags)}".rstrip()
+        return [header] + [_step_line(step) for step in self.to_json()["steps"]]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "filesort": self.filesort,
+            "temporary": self.temporary,
+            "rows_examined": self.rows_examined,
+            "steps": [
+                {"table": s.table, "access": s.access, "key": s.key, "rows_per_scan": s.rows_per_scan}
+                for s in self.steps
+            ],
+        }
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _walk(node: Any, plan: Plan, prefix: float) -> float:
+    """
+    Collect table accesses under `node`. `prefix` is how many times the current join
+    order has been entered, so rows examined multiply through nested loops; returns the
+    rows this subtree produces.
+    """
+    if isinstance(node, list):
+        produced = prefix
+        for item in node:
+            produced = _walk(item, plan, prefix)
+        return produced
+    if not isinstance(node, dict):
+        return prefix
+
+    if node.get("using_filesort"):
+        plan.filesort = True
+    if node.get("using_temporary_table"):
+        plan.temporary = True
+
+    if "table_name" in node and "access_type" in node:
+        per_scan = int(_float(node.get("rows_examined_per_scan")))
+        plan.steps.append(Step(
+            table=node["table_name"],
+            access=node["access_type"],
+            key=node.get("key"),
+            rows_per_scan=per_scan,
+            rows_examined=prefix * per_scan,
+        ))
+        for nested in ("materialized_from_subquery", "attached_subqueries"):
+            if nested in node:
+                _walk(node[nested], plan, 1.0)
+        return max(_float(node.get("rows_produced_per_join")), 1.0)
+
+    if "nested_loop" in node:
+        rows = prefix
+        for item in node["nested_loop"]:
+            # rows_produced_per_join is already cumulative for the join prefix.
+            rows = _walk(item, plan, rows if rows else prefix)
+        for key, value in node.items():
+            if key != "nested_loop":
+                _walk(value, plan, 1.0)
+        return rows
+
+    produced = prefix
+    for key, value in node.items():
+        if isinstance(value, (dict, list)):
+            produced = _walk(value, plan, prefix)
+    return produced
+
+
+def parse(explain_json: str) -> Plan:
+    doc = json.loads(explain_json)
+    plan = Plan()
+    block = doc.get("query_block", doc)
+    plan.cost = _float(block.get("cost_info", {}).get("query_cost"))
+    _walk(block, plan, 1.0)
+    return plan
+
+
+@dataclass(frozen=True)
+class Budget:
+    """
+    What a statement's plan may cost on the test dataset. `allow_full_scan` names table
+    aliases that are known to be scanned today; shrink it when a fix lands, never grow it
+    without a reason next to the statement.
+    """
+    max_rows: Optional[int] = 2_000
+    allow_full_scan: FrozenSet[str] = frozenset()
+    # Paged queries must return the first page without sorting the whole result.
+    paged: bool = False
+    allow_filesort: bool = False
+
+    def violations(self, plan: Plan) -> List[str]:
+        problems = []
+        scans = [t for t in plan.full_scans() if t not in self.allow_full_scan]
+        if scans:
+            problems.append(f"full scan of {', '.join(scans)}")
+        if self.max_rows is not None and plan.rows_examined > self.max_rows:
+            problems.append(f"examines ~{plan.rows_examined} rows (budget {self.max_rows})")
+        if self.paged and plan.filesort and not self.allow_filesort:
+            problems.append("paged query sorts with filesort")
+        return problems
+
+
+def baseline_path(name: str) -> Path:
+    return BASELINE_DIR / f"{name}.json"
+
+
+def load_baseline(name: str) -> Optional[Dict[str, Any]]:
+    path = baseline_path(name)
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def save_baseline(name: str, plan: Plan) -> None:
+    BASELINE_DIR.mkdir(exist_ok=True)
+    baseline_path(name).write_text(json.dumps(plan.to_json(), indent=2) + "\n")
+
+
+def _step_line(step: Dict[str, Any]) -> str:
+    return f"{step['table']:<24} {step['access']:<16} key={step['key'] or '-':<32} rows/scan={step['rows_per_scan']}"
+
+
+def _baseline_lines(baseline: Dict[str, Any]) -> Iterator[str]:
+    flags = [name for name in ("filesort", "temporary") if baseline.get(name)]
+    yield f"rows_examined~{baseline.get('rows_examined')} {' '.join(flags)}".rstrip()
+    for step in baseline.get("steps", []):
+        yield _step_line(step)
+
+
+def describe(name: str, plan: Plan, problems: List[str]) -> str:
+    """Failure message: what broke, then a diff against the recorded plan (or the plan itself)."""
+    out = [f"{name}: " + "; ".join(problems)]
+    baseline = load_baseline(name)
+    if baseline is None:
+        out.append("plan (no baseline recorded; PLAN_TEST_UPDATE=1 records one):")
+        out.extend("    " + line for line in plan.lines())
+    else:
+        # Render both sides from the recorded fields only; cost isn't stored so it can't be diffed.
+        diff = difflib.unified_diff(
+            list(_baseline_lines(baseline)), list(_baseline_lines(plan.to_json())),
+            "baseline", "current", lineterm="", n=10,
+        )
+        out.extend("    " + line for line in diff)
+    return "\n".join(out)
@@ -0,0 +1,205 @@
+"""
+Every statement under src/sql/ with sample parameters and its plan budget.
+
+Parameters are built from the bench dataset manifest (see bench.datagen), so they hit ids
+that exist. A new .sql file must either be registered here or listed in NOT_EXPLAINED
+with the reason; test_query_plans fails otherwise.
+
+Allowances on the known offenders record today's plans, not good ones: shrink them when
+the statement is fixed.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from .plans import Budget
+
+Manifest = Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class Statement:
+    name: str
+    params: Callable[[Manifest], Any]
+    budget: Budget = field(default_factory=Budget)
+    # Inline text for statements that live inside a script or view; otherwise src/sql/<name>.sql.
+    sql: Optional[str] = None
+
+
+def _uid(m: Manifest) -> int:
+    return m["users"]["cold"][0]
+
+
+def _sid(m: Manifest) -> str:
+    return m["songs"]["cold"][0]
+
+
+def _sids(m: Manifest) -> tuple:
+    return tuple(m["songs"]["cold"][:20])
+
+
+def _plstid(m: Manifest) -> int:
+    return m["playlists"]["hot"][0]
+
+
+def _like(m: Manifest) -> str:
+    return f"%{m['search_terms']['common'][0]}%"
+
+
+def _scan(*aliases: str, paged: bool = False) -> Budget:
+    return Budget(max_rows=None, allow_full_scan=frozenset(aliases), paged=paged, allow_filesort=True)
+
+
+STATEMENTS = [
+    # Point lookups and per-user lists.
+    Statement("get_song_by_id", lambda m: (_sid(m),)),
+    Statement("get_songs_by_ids", lambda m: {"sids": _sids(m), "uid": _uid(m)}),
+    Statement("song_flags", lambda m: {"sids": _sids(m), "uid": _uid(m)}),
+    # The same reads over song_ratings (RATINGS_MODE=cutover/song_ratings).
+    Statement("sr_get_song_by_id", lambda m: (_sid(m),)),
+    Statement("sr_get_songs_by_ids", lambda m: {"sids": _sids(m), "uid": _uid(m)}),
+    Statement("sr_song_flags", lambda m: {"sids": _sids(m), "uid": _uid(m)}),
+    Statement("sr_get_user_song_rating", lambda m: (_uid(m), _sid(m))),
+    Statement("get_album_songs", lambda m: (m["albums"][0],)),
+    Statement("artist_songs", lambda m: (m["artists"]["hot"][0],)),
+    Statement("get_user_by_email", lambda m: (f"user{_uid(m)}@bench.test",)),
+    Statement("get_user_profile", lambda m: (_uid(m),)),
+    Statement("list_user_hobbies", lambda m: (_uid(m),)),
+    Statement("get_vip_status", lambda m: (_uid(m),)),
+    Statement("list_favorites", lambda m: (_uid(m),)),
+    Statement("list_playlists", lambda m: (_uid(m),)),
+    Statement("get_playlist", lambda m: (_plstid(m),)),
+    Statement("get_playlist_version", lambda m: (_plstid(m),)),
+    Statement("list_playlist_songs", lambda m: (_plstid(m),)),
+    Statement("list_playlist_changes", lambda m: (_plstid(m), 0, 100), Budget(paged=True)),
+    Statement("playlist_follower_sample", lambda m: (_plstid(m), 501)),
+    Statement("playlist_lock", lambda m: (_plstid(m),)),
+    Statement("playlist_positions", lambda m: (_plstid(m),)),
+    Statement("playlist_song_position", lambda m: (_plstid(m), _sid(m))),
+    Statement("playlist_prev_position", lambda m: (_plstid(m), 1_000_000, _sid(m))),
+    Statement("playlist_following_position", lambda m: (_plstid(m), 0, _sid(m))),
+    Statement("playlist_song_status", lambda m: {"plstid": _plstid(m), "sids": _sids(m)}),
+    Statement("show-weekly-ranking", lambda m: ()),
+    Statement("similar_songs", lambda m: (m["songs"]["hot"][0], 20)),
+    # Sorts one user's favorites to pick the newest seeds.
+    Statement("because_you_liked", lambda m: {"uid": m["users"]["hot"][0], "seeds": 3, "window": 20},
+              Budget(allow_filesort=True)),
+    # Keyset pages for the neighbours build.
+    Statement("cf_favorites_page", lambda m: (_uid(m), "", 50_000), Budget(max_rows=None, paged=True)),
+    Statement("latest_favorite_at", lambda m: ()),
+    # A refresh window holds about a minute of favorites: range-scan the favored_at index.
+    Statement("favorites_changed_since", lambda m: ("2999-01-01",)),
+    Statement("cf_ratings_page", lambda m: (0, 50_000), Budget(max_rows=None, paged=True)),
+    Statement("sr_cf_ratings_page", lambda m: (_uid(m), "", 50_000), Budget(max_rows=None, paged=True)),
+    Statement("cf_plays_page", lambda m: (_uid(m), "", 50_000), Budget(max_rows=None, paged=True)),
+    # The outer merge sorts at most 3 x window rows from the three indexed branches.
+    Statement("feed", lambda m: {
+        "uid": m["users"]["hot"][0], "limit": 20, "window": 40, "before_ts": "9999-12-31 23:59:59",
+        "before_key": "", "release_days": 30,
+    }, Budget(paged=True, allow_filesort=True)),
+
+    # Writes: EXPLAIN plans them without running them.
+    Statement("fan_out_playlist_adds", lambda m: {"plstid": _plstid(m), "sids": _sids(m)}),
+    Statement("playlist_bump_version", lambda m: (1, _plstid(m))),
+    Statement("playlist_reserve_positions", lambda m: (1024, _plstid(m))),
+    Statement("playlist_shift_positions", lambda m: (1_000_000, _plstid(m))),
+    Statement("playlist_renumber_positions", lambda m: (_plstid(m), 1024, _plstid(m))),
+    Statement("playlist_reset_tail", lambda m: (_plstid(m),)),
+    Statement("playlist_sync_tail", lambda m: (_plstid(m),)),
+    Statement("update_playlist_song_position", lambda m: (1024, _plstid(m), _sid(m))),
+    Statement("delete_playlist", lambda m: (_plstid(m), _uid(m), _uid(m))),
+    Statement("update_user_profile_select_for_update", lambda m: (_uid(m),)),
+    Statement("update_user_profile_update", lambda m: (False, None) * 8 + (_uid(m),)),
+    Statement("update_user_profile_delete_hobbies", lambda m: (_uid(m),)),
+    # One rid range of the song_ratings backfill.
+    Statement("sr_backfill", lambda m: (0, 1000)),
+
+    # FULLTEXT lookup; the matches are sorted by score for the page.
+    Statement("search_playlists", lambda m: {
+        "terms": f"+{m['search_terms']['common'][0]}", "owner": None, "follower_weight": 0.5, "song_weight": 0.1,
+        "before_score": None, "before_id": None, "limit": 50,
+    }, Budget(paged=True, allow_filesort=True)),
+
+    # Known offenders. LIKE '%term%' can't use a B-tree index, so search scans song_display
+    # and sorts every match before applying LIMIT/OFFSET.
+    Statement("search", lambda m: (_like(m),) * 4 + (20, 0), _scan("sd", paged=True)),
+    Statement("search_count", lambda m: (_like(m),) * 4, _scan("sd")),
+    # NOT IN plus the virt_song_tag view expand to scans of songs for the candidate set.
+    Statement("recommendations", lambda m: {"uid": m["users"]["hot"][0], "limit": 10}, _scan("s", "cs")),
+    Statement("sr_recommendations", lambda m: {"uid": m["users"]["hot"][0], "limit": 10}, _scan("s", "cs")),
+    # Whole-catalogue aggregates and admin listings, scanned by design.
+    Statement("rating_averages", lambda m: (), _scan("ur", "rt", "s", "als", "aoa", "a")),
+    Statement("sr_rating_averages", lambda m: (), _scan("sr", "s", "als", "aoa", "a")),
+    # Backfill verification compares every legacy rating once.
+    Statement("sr_backfill_check", lambda m: (), _scan("ur")),
+    Statement("list_users", lambda m: (), _scan("users")),
+    # Admission control (src/admission.py) caches every VIP uid once a minute per worker.
+    Statement("active_vip_uids", lambda m: (), _scan("vip_users")),
+    # The /browse column store loads every song once per worker.
+    Statement("browse_songs", lambda m: (), _scan("s")),
+    Statement("browse_tags", lambda m: ()),
+    # Typeahead index builds (src/suggest.py) read the whole catalogue with favorite counts.
+    Statement("suggest_songs", lambda m: (), _scan("sd", "user_favorite_song")),
+    Statement("suggest_artists", lambda m: (), _scan("a", "user_favorite_song")),
+    Statement("suggest_albums", lambda m: (), _scan("al", "user_favorite_song")),
+    Statement("suggest_tags", lambda m: (), _scan("t", "s", "user_favorite_song")),
+    # Write-behind removes (src/writebehind.py); a far-future stamp matches any existing row.
+    Statement("wb_favorite_remove", lambda m: (_uid(m), _sid(m), "2999-01-01")),
+    Statement("wb_follow_remove", lambda m: (_uid(m), _plstid(m), "2999-01-01")),
+    # No index on created_at alone; the job deletes in LIMIT-ed batches.
+    Statement("prune_feed_items", lambda m: (90, 10_000), _scan("feed_items")),
+    # The weekly refresh: a favored_at range over the one or two partitions of last week.
+    Statement(
+        "weekly_fav_rank",
+        lambda m: (),
+        Budget(max_rows=None, allow_filesort=True),
+        sql="SELECT w.sid, w.fav_count, sd.song_name FROM ("
+            "SELECT fe.sid, SUM(fe.delta) AS fav_count FROM favorite_events fe "
+            "WHERE fe.favored_at >= CURRENT_DATE - INTERVAL (WEEKDAY(CURRENT_DATE) + 7) DAY "
+            "AND fe.favored_at < CURRENT_DATE - INTERVAL WEEKDAY(CURRENT_DATE) DAY "
+            "GROUP BY fe.sid HAVING fav_count > 0) AS w "
+            "JOIN song_display sd ON sd.sid = w.sid ORDER BY w.fav_count DESC, sd.song_name LIMIT 10",
+    ),
+    Statement("favorite_events_oldest", lambda m: ()),
+    # Folds one month of favorite_events; the range stays inside the oldest partition.
+    Statement("archive_favorite_partition", lambda m: ("2000-01-01",), Budget(max_rows=None, allow_filesort=True)),
+    # Play roll-ups (src/plays.py): last week is a day range of the song_plays_daily key.
+    Statement("weekly_play_ranking", lambda m: (10,), Budget(max_rows=None, allow_filesort=True)),
+    # No index on applied_at; the table holds one row per segment for about a week.
+    Statement("prune_play_segments", lambda m: (7,), _scan("play_segments")),
+]
+
+NOT_EXPLAINED = {
+    "authz.sql": "roles and grants",
+    "create_trigger.sql": "trigger DDL",
+    "schema_migrations.sql": "DDL",
+    "tags.sql": "lookup-table seed script",
+    "virtual_tags.sql": "view DDL; exercised through search, get_song_by_id and recommendations",
+    "weekly-ranking-view.sql": "view DDL, ad-hoc only",
+    "weekly-ranking-event.sql": "event DDL; its SELECT is registered as weekly_fav_rank",
+    "weekly-ranking-refresh.sql": "script; its SELECT is registered as weekly_fav_rank",
+    "favorite_partitions.sql": "information_schema lookup",
+    "sample_favorites.sql": "seed data",
+    "testing.sql": "ad-hoc query, not called by the app",
+    "show_tables.sql": "SHOW statement",
+    "refresh_song_display.sql": "CALL",
+    "refresh_playlist_stats.sql": "CALL",
+    "update_user_profile_start.sql": "transaction control",
+    "update_user_profile_commit.sql": "transaction control",
+    # Single-row INSERT ... VALUES have no access path to check.
+    "add_playlist_song.sql": "INSERT VALUES",
+    "add_playlist_songs.sql": "INSERT VALUES",
+    "create_playlist.sql": "INSERT VALUES",
+    "favorite_song.sql": "INSERT VALUES",
+    "insert_user.sql": "INSERT VALUES",
+    "log_playlist_change.sql": "INSERT VALUES",
+    "update_user_profile_insert_hobby.sql": "INSERT VALUES",
+    "upsert_vip.sql": "INSERT VALUES",
+    "insert_song_neighbors.sql": "INSERT VALUES",
+    "wb_favorite_add.sql": "INSERT VALUES",
+    "wb_follow_add.sql": "INSERT VALUES",
+    "sr_rate_song.sql": "INSERT VALUES",
+    "play_song_daily_add.sql": "INSERT VALUES",
+    "play_user_song_add.sql": "INSERT VALUES",
+}
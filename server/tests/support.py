@@ -0,0 +1,38 @@
+"""Helpers shared by the tests that need a live MySQL server."""
+from __future__ import annotations
+
+import unittest
+from typing import Any, Dict
+
+
+def require_mysql() -> Dict[str, Any]:
+    """Primary connection settings, or SkipTest when the app deps or the server are missing."""
+    try:
+        import pymysql
+
+        from src.db import primary_config
+    except ImportError as e:
+        raise unittest.SkipTest(f"app dependencies not installed: {e}")
+
+    config = primary_config()
+    try:
+        pymysql.connect(
+            host=config["host"], port=config["port"], user=config["user"], password=config["password"],
+            connect_timeout=3,
+        ).close()
+    except pymysql.MySQLError as e:
+        raise unittest.SkipTest(f"no MySQL at {config['host']}:{config['port']}: {e}")
+    return config
+
+
+def create_database(config: Dict[str, Any], name: str, reset: bool = False) -> None:
+    import pymysql
+
+    conn = pymysql.connect(host=config["host"], port=config["port"], user=config["user"], password=config["password"])
+    try:
+        with conn.cursor() as cur:
+            if reset:
+                cur.execute(f"DROP DATABASE IF EXISTS `{name}`")
+            cur.execute(f"CREATE DATABASE IF NOT EXISTS `{name}`")
+    finally:
+        conn.close()
@@ -0,0 +1,226 @@
+"""
+Admission control (src/admission.py): token buckets, tier queues, expensive-endpoint
+shedding and the VIP cache. No server needed; time is a fake clock where it can be, and
+the DB is a stub.
+
+    python -m unittest tests.test_admission
+"""
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+from typing import Set
+from unittest import mock
+
+try:
+    from src import admission
+    from src.admission import Admission, Rejected, TokenBuckets, VipCache, parse_tiers, retry_after_header
+except ImportError as e:
+    raise unittest.SkipTest(f"app dependencies not installed: {e}")
+
+EXPENSIVE = "/search"
+CHEAP = "/songs/<song_id>"
+
+
+class StubDB:
+    def __init__(self, vips: Set[int] = frozenset()) -> None:
+        self.vips = set(vips)
+        self.waiting = 0
+        self.loads = 0
+        self.fail = False
+
+    def pool_waiting(self) -> int:
+        return self.waiting
+
+    def get_active_vip_uids(self) -> Set[int]:
+        self.loads += 1
+        if self.fail:
+            raise RuntimeError("replica down")
+        return set(self.vips)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def settings(**overrides):
+    """Patch admission's module-level settings for one test."""
+    values = {
+        "ADMISSION_LIMITS": {"vip": 0, "member": 2, "anonymous": 1},
+        "ADMISSION_RATES": {"vip": (0.0, 0.0), "member": (0.0, 0.0), "anonymous": (0.0, 0.0)},
+        "ADMISSION_QUEUE_MS": 50,
+        "ADMISSION_EXPENSIVE": frozenset({EXPENSIVE}),
+        "ADMISSION_EXPENSIVE_LIMIT": 1,
+        **overrides,
+    }
+    return mock.patch.multiple(admission, **values)
+
+
+class TokenBucketsTest(unittest.TestCase):
+    def test_burst_then_refill(self) -> None:
+        buckets = TokenBuckets()
+        key = ("member", 1)
+        self.assertEqual([buckets.take(key, 2.0, 3.0, now=0.0) for _ in range(3)], [0, 0, 0])
+        # Empty: the next token arrives after 1/rate seconds.
+        self.assertAlmostEqual(buckets.take(key, 2.0, 3.0, now=0.0), 0.5)
+        self.assertAlmostEqual(buckets.take(key, 2.0, 3.0, now=0.25), 0.25)
+        self.assertEqual(buckets.take(key, 2.0, 3.0, now=0.5), 0)
+        # Refill never exceeds the burst.
+        self.assertEqual([buckets.take(key, 2.0, 3.0, now=100.0) for _ in range(3)], [0, 0, 0])
+        self.assertGreater(buckets.take(key, 2.0, 3.0, now=100.0), 0)
+
+    def test_keys_are_independent(self) -> None:
+        buckets = TokenBuckets()
+        self.assertEqual(buckets.take(("anonymous", "a"), 1.0, 1.0, now=0.0), 0)
+        self.assertGreater(buckets.take(("anonymous", "a"), 1.0, 1.0, now=0.0), 0)
+        self.assertEqual(buckets.take(("anonymous", "b"), 1.0, 1.0, now=0.0), 0)
+
+    def test_least_recently_seen_are_forgotten(self) -> None:
+        buckets = TokenBuckets(max_clients=2)
+        for key in ("a", "b", "a", "c"):
+            buckets.take(("anonymous", key), 1.0, 1.0, now=0.0)
+        self.assertEqual(len(buckets), 2)
+        # "a" was seen again after "b", so it is kept (and still empty); "b" starts over full.
+        self.assertGreater(buckets.take(("anonymous", "a"), 1.0, 1.0, now=0.0), 0)
+        self.assertEqual(buckets.take(("anonymous", "b"), 1.0, 1.0, now=0.0), 0)
+
+
+class AdmitTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db = StubDB(vips={7})
+        self.admission = Admission(self.db)
+        self.admission.vips.reload()
+
+    def test_rate_limit(self) -> None:
+        clock = FakeClock()
+        rates = {"vip": (0.0, 0.0), "member": (1.0, 2.0), "anonymous": (0.0, 0.0)}
+        with settings(ADMISSION_RATES=rates), mock.patch.object(admission.time, "monotonic", clock):
+            for _ in range(2):
+                self.admission.release(self.admission.admit("member", 1, CHEAP))
+            with self.assertRaises(Rejected) as caught:
+                self.admission.admit("member", 1, CHEAP)
+            self.assertEqual((caught.exception.status, caught.exception.reason), (429, "rate_limit"))
+            self.assertAlmostEqual(caught.exception.retry_after, 1.0)
+            # VIP has no rate limit.
+            for _ in range(5):
+                self.admission.release(self.admission.admit("vip", 7, CHEAP))
+            clock.now += 1.0
+            self.admission.release(self.admission.admit("member", 1, CHEAP))
+
+    def test_queue_times_out(self) -> None:
+        with settings():
+            ticket = self.admission.admit("anonymous", "a", CHEAP)
+            started = time.monotonic()
+            with self.assertRaises(Rejected) as caught:
+                self.admission.admit("anonymous", "b", CHEAP)
+            self.assertEqual((caught.exception.status, caught.exception.reason), (503, "queue_timeout"))
+            self.assertGreaterEqual(time.monotonic() - started, 0.045)
+            # Other tiers are not held up by a full anonymous tier.
+            self.admission.release(self.admission.admit("member", 1, CHEAP))
+            self.admission.release(ticket)
+            self.assertEqual(self.admission.stats()["queued"]["anonymous"], 0)
+
+    def test_release_wakes_a_waiter(self) -> None:
+        with settings(ADMISSION_QUEUE_MS=5000):
+            first = self.admission.admit("anonymous", "a", CHEAP)
+            tickets = []
+            waiter = threading.Thread(target=lambda: tickets.append(self.admission.admit("anonymous", "b", CHEAP)))
+            waiter.start()
+            while self.admission.stats()["queued"]["anonymous"] == 0:
+                time.sleep(0.001)
+            self.admission.release(first)
+            waiter.join(5)
+            self.assertEqual(len(tickets), 1)
+            self.assertGreater(tickets[0].waited, 0)
+            self.assertEqual(self.admission.stats()["in_flight"]["anonymous"], 1)
+            self.admission.release(tickets[0])
+
+    def test_expensive_shed_for_non_vip(self) -> None:
+        with settings():
+            ticket = self.admission.admit("member", 1, EXPENSIVE)
+            self.assertTrue(ticket.expensive)
+            with self.assertRaises(Rejected) as caught:
+                self.admission.admit("member", 2, EXPENSIVE)
+            self.assertEqual((caught.exception.status, caught.exception.reason), (503, "expensive"))
+            # Cheap requests still get through.
+            self.admission.release(self.admission.admit("member", 2, CHEAP))
+            # A VIP queues for the slot instead of being shed.
+            with self.assertRaises(Rejected) as caught:
+                self.admission.admit("vip", 7, EXPENSIVE)
+            self.assertEqual(caught.exception.reason, "queue_timeout")
+            self.admission.release(ticket)
+            self.admission.release(self.admission.admit("member", 2, EXPENSIVE))
+            self.assertEqual(self.admission.stats()["expensive_in_flight"], 0)
+
+    def test_expensive_shed_while_pool_has_waiters(self) -> None:
+        self.db.waiting = 1
+        with settings():
+            with self.assertRaises(Rejected):
+                self.admission.admit("anonymous", "a", EXPENSIVE)
+            self.admission.release(self.admission.admit("vip", 7, EXPENSIVE))
+            self.admission.release(self.admission.admit("anonymous", "a", CHEAP))
+
+
+class VipCacheTest(unittest.TestCase):
+    def test_reload_and_add(self) -> None:
+        db = StubDB(vips={7})
+        gate = Admission(db)
+        self.assertEqual(gate.tier_of(7), "member")
+        gate.vips.reload()
+        self.assertTrue(gate.vips.loaded)
+        self.assertEqual([gate.tier_of(uid) for uid in (7, 8, None)], ["vip", "member", "anonymous"])
+        gate.vips.add(8)
+        self.assertEqual(gate.tier_of(8), "vip")
+        # A reload replaces the set: 8 stays VIP only if the database says so.
+        db.vips = {9}
+        gate.vips.reload()
+        self.assertEqual([gate.tier_of(uid) for uid in (7, 8, 9)], ["member", "member", "vip"])
+
+    def test_failed_reload_keeps_the_last_set(self) -> None:
+        db = StubDB(vips={7})
+        cache = VipCache(db)
+        cache.reload()
+        db.fail = True
+        with self.assertRaises(RuntimeError):
+            cache.reload()
+        self.assertIn(7, cache)
+
+    def test_background_thread_loads_until_stopped(self) -> None:
+        db = StubDB(vips={7})
+        cache = VipCache(db)
+        cache.stop()
+        cache.start()
+        cache._thread.join(5)
+        self.assertFalse(cache._thread.is_alive())
+        self.assertEqual((db.loads, cache.loaded, 7 in cache), (1, True, True))
+
+    def test_background_thread_survives_failures(self) -> None:
+        db = StubDB()
+        db.fail = True
+        cache = VipCache(db)
+        cache.stop()
+        with mock.patch("builtins.print"):
+            cache.start()
+            cache._thread.join(5)
+        self.assertFalse(cache.loaded)
+
+
+class SettingsTest(unittest.TestCase):
+    def test_parse_tiers(self) -> None:
+        with mock.patch.dict("os.environ", {"X": "vip=1:2, member=3"}):
+            self.assertEqual(parse_tiers("X", ""), {"vip": "1:2", "member": "3"})
+        with mock.patch.dict("os.environ", {"X": "guest=1"}):
+            with self.assertRaisesRegex(ValueError, "X: expected"):
+                parse_tiers("X", "")
+
+    def test_retry_after_header(self) -> None:
+        self.assertEqual([retry_after_header(s) for s in (0.01, 1.0, 1.2)], ["1", "1", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
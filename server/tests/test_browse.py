@@ -0,0 +1,206 @@
+"""
+Column store behind GET /browse (src/browse.py): query parsing, masks, ordering, facets
+and the shared snapshot. No server needed; the DB is a stub.
+
+    python -m unittest tests.test_browse
+"""
+from __future__ import annotations
+
+import tempfile
+import unittest
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+from unittest import mock
+
+try:
+    import numpy as np
+
+    from src.browse import Browser, Query, SongColumns, parse_query
+except ImportError as e:
+    raise unittest.SkipTest(f"app dependencies not installed: {e}")
+
+TAGS = [(1, "chill"), (2, "party")]
+# sid, name, danceability, energy, valence, tempo, loudness, mode, acousticness, speechiness, tag
+ROWS = [
+    ("s1", "Alpha", 0.15, 0.95, 0.5, 120.0, -5.0, 1, 0.15, 0.05, 1),
+    ("s2", "bravo", 0.55, 0.25, 0.5, 100.0, -10.0, 0, 0.25, 0.05, 2),
+    ("s3", "Charlie", 0.95, None, 0.5, 250.0, -7.0, 1, None, 0.05, 1),
+    ("s4", "delta", None, 0.65, 0.5, 20.0, -20.0, None, 0.35, 0.05, None),
+    ("s5", "Echo", 0.75, 0.75, 0.5, None, -3.0, 0, 0.45, 0.05, 2),
+]
+
+
+def query(**kwargs: Any) -> Query:
+    return Query(ranges=kwargs.pop("ranges", {}), limit=kwargs.pop("limit", 100), **kwargs)
+
+
+def counts(facet: List[Dict[str, Any]], key: str = "count") -> List[int]:
+    return [bucket[key] for bucket in facet]
+
+
+class SongColumnsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.columns = SongColumns.from_rows(ROWS, TAGS)
+
+    def sids(self, **kwargs: Any) -> List[str]:
+        return self.columns.query(query(**kwargs)).sids
+
+    def test_name_order_ignores_case(self) -> None:
+        self.assertEqual(self.sids(), ["s1", "s2", "s3", "s4", "s5"])
+        self.assertEqual(self.sids(descending=True), ["s5", "s4", "s3", "s2", "s1"])
+
+    def test_missing_values_sort_last_both_ways(self) -> None:
+        self.assertEqual(self.sids(sort="energy"), ["s2", "s4", "s5", "s1", "s3"])
+        self.assertEqual(self.sids(sort="energy", descending=True), ["s1", "s5", "s4", "s2", "s3"])
+
+    def test_range_masks(self) -> None:
+        self.assertEqual(self.sids(ranges={"energy": (0.5, None)}), ["s1", "s4", "s5"])
+        self.assertEqual(self.sids(ranges={"energy": (0.5, 0.75)}), ["s4", "s5"])
+        self.assertEqual(self.sids(ranges={"energy": (None, 0.3)}), ["s2"])
+        # A song without the feature never matches a range on it, even an open one.
+        self.assertNotIn("s3", self.sids(ranges={"energy": (None, None)}))
+        self.assertEqual(self.sids(ranges={"energy": (0.5, None), "danceability": (0.5, None)}), ["s5"])
+
+    def test_tag_and_mode(self) -> None:
+        self.assertEqual(self.sids(tags=[1]), ["s1", "s3"])
+        self.assertEqual(self.sids(tags=[1, 2]), ["s1", "s2", "s3", "s5"])
+        self.assertEqual(self.sids(mode=0), ["s2", "s5"])
+        self.assertEqual(self.sids(mode=0, tags=[1]), [])
+
+    def test_paging(self) -> None:
+        page = self.columns.query(query(sort="energy", offset=1, limit=2))
+        self.assertEqual((page.sids, page.total), (["s4", "s5"], 5))
+
+    def test_features(self) -> None:
+        features = self.columns.query(query(tags=[], sort="name")).features
+        self.assertEqual(features[3]["danceability"], None)
+        self.assertEqual(features[3]["mode"], None)
+        self.assertEqual(features[3]["tag"], None)
+        self.assertEqual((features[0]["energy"], features[0]["mode"], features[0]["tag"]), (0.95, 1, "chill"))
+
+    def test_range_facet_buckets(self) -> None:
+        facets = self.columns.query(query()).facets
+        self.assertEqual(counts(facets["energy"]), [0, 0, 1, 0, 0, 0, 1, 1, 0, 1])
+        self.assertEqual(facets["energy"][2], {"min": 0.2, "max": 0.3, "count": 1})
+        # Out-of-range tempos count in the end buckets; a missing tempo counts nowhere.
+        tempo = counts(facets["tempo"])
+        self.assertEqual((tempo[0], tempo[-1], sum(tempo)), (1, 1, 4))
+
+    def test_facets_leave_out_their_own_filter(self) -> None:
+        page = self.columns.query(query(tags=[1], mode=0))
+        self.assertEqual(page.total, 0)
+        # tag counts apply only mode=0; mode counts apply only tag=chill.
+        self.assertEqual(counts(page.facets["tag"]), [0, 2])
+        self.assertEqual(counts(page.facets["mode"]), [0, 2])
+        # Other dimensions apply every filter.
+        self.assertEqual(sum(counts(page.facets["energy"])), 0)
+
+        page = self.columns.query(query(ranges={"energy": (0.6, None)}))
+        self.assertEqual(sum(counts(page.facets["energy"])), 4)
+        self.assertEqual(counts(page.facets["tag"]), [1, 1])
+
+    def test_empty_catalogue(self) -> None:
+        columns = SongColumns.from_rows([], TAGS)
+        page = columns.query(query(tags=[1]))
+        self.assertEqual((page.sids, page.total), ([], 0))
+
+    def test_saved_columns_are_mapped(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            self.columns.save(Path(tmp) / "build")
+            loaded = SongColumns.load(Path(tmp) / "build")
+            self.assertIsInstance(loaded.columns["energy"], np.memmap)
+            self.assertEqual(loaded.tag_names, {1: "chill", 2: "party"})
+            for q in (query(), query(sort="tempo", descending=True), query(tags=[2], ranges={"energy": (0.5, 1)})):
+                self.assertEqual(loaded.query(q), self.columns.query(q))
+
+
+class ParseQueryTest(unittest.TestCase):
+    tag_names = {1: "Chill", 2: "party"}
+
+    def parse(self, **args: str) -> Query:
+        return parse_query(args, self.tag_names, max_limit=50)
+
+    def test_defaults(self) -> None:
+        self.assertEqual(self.parse(), Query(ranges={}, sort="name", descending=False, offset=0, limit=20))
+
+    def test_ranges(self) -> None:
+        parsed = self.parse(tempo_min="120", tempo_max="", energy_max="0.5")
+        self.assertEqual(parsed.ranges, {"tempo": (120.0, None), "energy": (None, 0.5)})
+        with self.assertRaisesRegex(ValueError, "tempo_min"):
+            self.parse(tempo_min="fast")
+
+    def test_mode(self) -> None:
+        self.assertEqual(self.parse(mode="1").mode, 1)
+        self.assertIsNone(self.parse(mode="").mode)
+        with self.assertRaisesRegex(ValueError, "mode"):
+            self.parse(mode="2")
+
+    def test_tags_by_name_or_id(self) -> None:
+        self.assertEqual(self.parse(tag="chill, 2").tags, [1, 2])
+        with self.assertRaisesRegex(ValueError, "unknown tag 'jazz'"):
+            self.parse(tag="jazz")
+        with self.assertRaisesRegex(ValueError, "unknown tag"):
+            self.parse(tag="3")
+
+    def test_sort(self) -> None:
+        parsed = self.parse(sort="-energy")
+        self.assertEqual((parsed.sort, parsed.descending), ("energy", True))
+        with self.assertRaisesRegex(ValueError, "sort"):
+            self.parse(sort="popularity")
+
+    def test_paging(self) -> None:
+        parsed = self.parse(page="3", page_size="10")
+        self.assertEqual((parsed.offset, parsed.limit), (20, 10))
+        parsed = self.parse(page="0", page_size="500")
+        self.assertEqual((parsed.offset, parsed.limit), (0, 50))
+        with self.assertRaisesRegex(ValueError, "page"):
+            self.parse(page="x")
+
+
+class StubDB:
+    def __init__(self) -> None:
+        self.fetches = 0
+
+    @contextmanager
+    def named_lock(self, name: str, timeout: int = 0) -> Iterator[bool]:
+        yield True
+
+    def fetch_tuples(self, filename: str, params: Any = None):
+        self.fetches += 1
+        return [], TAGS if filename == "browse_tags.sql" else ROWS
+
+
+class BrowserTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.snapshot = Path(self._tmp.name) / "browse"
+        self.db = StubDB()
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_one_build_shared_by_workers(self) -> None:
+        first, second = Browser(self.db, self.snapshot), Browser(self.db, self.snapshot)
+        first.load_or_build()
+        self.assertEqual(self.db.fetches, 2)
+        second.load_or_build()
+        self.assertEqual(self.db.fetches, 2)
+        self.assertEqual(second.columns.query(query()).sids, ["s1", "s2", "s3", "s4", "s5"])
+
+    def test_stale_snapshot_is_rebuilt_and_old_builds_pruned(self) -> None:
+        browser = Browser(self.db, self.snapshot)
+        for _ in range(4):
+            browser.load_or_build(max_age=-1)
+        self.assertEqual(self.db.fetches, 8)
+        builds = [p for p in self.snapshot.iterdir() if p.is_dir()]
+        self.assertEqual(len(builds), 2)
+        self.assertEqual((self.snapshot / "current").read_text(), max(p.name for p in builds))
+        self.assertEqual(browser.columns.size, len(ROWS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Behaviour every DB_DRIVER must share: row shapes and types, parameter expansion, error
+classes, transactions and multi-statement scripts. Each test runs once per driver that
+is installed; the whole module is skipped without a MySQL server.
+
+    python -m unittest tests.test_drivers
+"""
+from __future__ import annotations
+
+import os
+import unittest
+from contextlib import closing
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict
+
+from .support import create_database, require_mysql
+
+DATABASE = os.getenv("DRIVER_TEST_DB", "resonate_drivertest")
+
+SCHEMA = """
+CREATE TABLE samples (
+  id       BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+  name     VARCHAR(64) NOT NULL UNIQUE,
+  note     TEXT NULL,
+  score    DECIMAL(5, 2) NOT NULL,
+  ratio    DOUBLE NOT NULL,
+  day      DATE NOT NULL,
+  at       DATETIME NOT NULL,
+  kind     ENUM('public', 'private') NOT NULL
+);
+INSERT INTO samples (name, note, score, ratio, day, at, kind) VALUES
+  ('plain', NULL, 4.50, 0.25, '2024-01-31', '2024-01-31 23:59:58', 'public'),
+  ('naïve ☃ 日本', 'it''s; -- not a comment', 1.00, 1.5, '2023-06-01', '2023-06-01 00:00:00', 'private');
+"""
+INSERT_SAMPLE = "INSERT INTO samples (name, score, ratio, day, at, kind) VALUES (%s, 1, 1, CURDATE(), NOW(), 'public')"
+
+
+class DriverContractTest(unittest.TestCase):
+    drivers: Dict[str, Any]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        config = require_mysql()
+        create_database(config, DATABASE, reset=True)
+        from src.drivers import available_drivers
+
+        cls.config = {**config, "database": DATABASE}
+        cls.drivers = available_drivers()
+        from src.sqlscript import run_script
+
+        with closing(cls.drivers["pymysql"].connect(cls.config, multi_statements=True)) as conn:
+            run_script(conn, SCHEMA)
+
+    def connect(self, driver: Any, **options: Any) -> Any:
+        return closing(driver.connect(self.config, **options))
+
+    def test_dict_rows_and_types(self) -> None:
+        for name, driver in self.drivers.items():
+            with self.subTest(driver=name), self.connect(driver) as conn, conn.cursor() as cur:
+                cur.execute("SELECT name, note, score, ratio, day, at, kind FROM samples ORDER BY id")
+                self.assertEqual(list(cur.fetchall()), [
+                    {"name": "plain", "note": None, "score": Decimal("4.50"), "ratio": 0.25,
+                     "day": date(2024, 1, 31), "at": datetime(2024, 1, 31, 23, 59, 58), "kind": "public"},
+                    {"name": "naïve ☃ 日本", "note": "it's; -- not a comment", "score": Decimal("1.00"),
+                     "ratio": 1.5, "day": date(2023, 6, 1), "at": datetime(2023, 6, 1), "kind": "private"},
+                ])
+
+    def test_tuple_cursor(self) -> None:
+        for name, driver in self.drivers.items():
+            with self.subTest(driver=name), self.connect(driver) as conn, conn.cursor(driver.tuple_cursor) as cur:
+                cur.execute("SELECT id, name FROM samples ORDER BY id")
+                self.assertEqual([tuple(r) for r in cur.fetchall()], [(1, "plain"), (2, "naïve ☃ 日本")])
+                self.assertEqual([d[0] for d in cur.description], ["id", "name"])
+
+    def test_parameter_styles(self) -> None:
+        for name, driver in self.drivers.items():
+            with self.subTest(driver=name), self.connect(driver) as conn, conn.cursor() as cur:
+                cur.execute("SELECT id FROM samples WHERE name IN %(names)s ORDER BY id", {"names": ("plain", "x")})
+                self.assertEqual([r["id"] for r in cur.fetchall()], [1])
+                cur.execute("SELECT id FROM samples WHERE name = %s AND score > %s", ("plain", 1))
+                self.assertEqual(cur.fetchone()["id"], 1)
+                cur.execute("SELECT %s AS literal", ("100%",))
+                self.assertEqual(cur.fetchone()["literal"], "100%")
+
+    def test_integrity_error(self) -> None:
+        for name, driver in self.drivers.items():
+            with self.subTest(driver=name), self.connect(driver) as conn, conn.cursor() as cur:
+                with self.assertRaises(driver.IntegrityError) as caught:
+                    cur.execute(INSERT_SAMPLE, ("plain",))
+                self.assertEqual(caught.exception.args[0], 1062)
+                self.assertIsInstance(caught.exception, driver.Error)
+
+    def test_transactions(self) -> None:
+        for name, driver in self.drivers.items():
+            with self.subTest(driver=name), self.connect(driver, autocommit=False) as conn:
+                with conn.cursor() as cur:
+                    cur.executemany(INSERT_SAMPLE, [("tx-1",), ("tx-2",)])
+                    self.assertEqual(cur.rowcount, 2)
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute("SELECT COUNT(*) AS n FROM samples WHERE name LIKE 'tx-%'")
+                    self.assertEqual(cur.fetchone()["n"], 0)
+
+    def test_multi_statement_scripts(self) -> None:
+        from src.sqlscript import ScriptError, run_script
+
+        for name, driver in self.drivers.items():
+            with self.subTest(driver=name), self.connect(driver, multi_statements=True) as conn:
+                result = run_script(conn, "SELECT 1; SELECT 'a;b'; DO SLEEP(0)", multi=True)
+                self.assertEqual(result.executed, 3)
+                with self.assertRaises(ScriptError) as caught:
+                    run_script(conn, "SELECT 1; SELECT * FROM missing_table; SELECT 3", multi=True)
+                self.assertEqual(caught.exception.statement.index, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,277 @@
+"""
+Listening-event ingestion and aggregation (src/plays.py): validation, the binary segment
+format, per-day and per-user counting, and how the aggregator treats segments. No server
+needed; applied counts are collected by a stub DB.
+
+    python -m unittest tests.test_plays
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import unittest
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+from unittest import mock
+
+try:
+    from src import plays as plays_module
+    from src.plays import (
+        PLAYS_MAX_AGE_DAYS,
+        PLAYS_ORPHAN_SECONDS,
+        Play,
+        PlayAggregator,
+        PlayLog,
+        count_segment,
+        encode_plays,
+        parse_plays,
+        read_plays,
+    )
+except ImportError as e:
+    raise unittest.SkipTest(f"app dependencies not installed: {e}")
+
+NOW = 1_700_000_000.0
+
+
+def parse(*items: Any) -> List[Play]:
+    return parse_plays(list(items), now=NOW)
+
+
+def write_segment(path: Path, *batches: Tuple[int, List[Play]]) -> Path:
+    path.write_bytes(b"".join(encode_plays(uid, plays) for uid, plays in batches))
+    return path
+
+
+class ParsePlaysTest(unittest.TestCase):
+    def test_valid_batch(self) -> None:
+        self.assertEqual(
+            parse(
+                {"sid": "s1", "played_at": int(NOW) - 60, "ms_played": 30000},
+                {"sid": "s2", "played_at": NOW - 0.5},
+                {"sid": "s3"},
+            ),
+            [Play("s1", int(NOW) - 60, 30000), Play("s2", int(NOW) - 1, 0), Play("s3", int(NOW), 0)],
+        )
+
+    def test_iso_played_at(self) -> None:
+        at = datetime.fromtimestamp(NOW - 3600).astimezone()
+        utc = datetime.fromtimestamp(NOW - 3600, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for value in (at.isoformat(), utc):
+            with self.subTest(value):
+                self.assertEqual(parse({"sid": "s1", "played_at": value})[0].played_at, int(NOW) - 3600)
+        with self.assertRaisesRegex(ValueError, r"plays\[0\].played_at must be"):
+            parse({"sid": "s1", "played_at": "yesterday"})
+
+    def test_played_at_window(self) -> None:
+        oldest = int(NOW) - PLAYS_MAX_AGE_DAYS * 86400
+        self.assertEqual(parse({"sid": "s1", "played_at": oldest})[0].played_at, oldest)
+        for played_at in (oldest - 1, NOW + 301):
+            with self.subTest(played_at), self.assertRaisesRegex(ValueError, "outside the last"):
+                parse({"sid": "s1", "played_at": played_at})
+        # A little clock skew on the client is allowed.
+        parse({"sid": "s1", "played_at": NOW + 300})
+
+    def test_ms_played(self) -> None:
+        self.assertEqual(parse({"sid": "s1", "ms_played": 2**32 - 1})[0].ms_played, 2**32 - 1)
+        for ms_played in (-1, 2**32, 1.5, "100", None, True, False):
+            with self.subTest(ms_played), self.assertRaisesRegex(ValueError, r"plays\[1\].ms_played"):
+                parse({"sid": "s1"}, {"sid": "s2", "ms_played": ms_played})
+
+    def test_bool_played_at(self) -> None:
+        with self.assertRaisesRegex(ValueError, r"plays\[0\].played_at must be"):
+            parse({"sid": "s1", "played_at": True})
+
+    def test_sid(self) -> None:
+        self.assertEqual(parse({"sid": "x" * 35})[0].sid, "x" * 35)
+        for sid in ("", "x" * 36, 12, None):
+            with self.subTest(sid), self.assertRaisesRegex(ValueError, r"plays\[0\].sid"):
+                parse({"sid": sid})
+
+    def test_batch_shape(self) -> None:
+        for items in ([], {"sid": "s1"}, None):
+            with self.subTest(items), self.assertRaisesRegex(ValueError, "non-empty array"):
+                parse_plays(items, now=NOW)
+        with self.assertRaisesRegex(ValueError, r"plays\[1\] must be an object"):
+            parse({"sid": "s1"}, "s2")
+        with mock.patch.object(plays_module, "PLAYS_MAX_BATCH", 2):
+            parse({"sid": "s1"}, {"sid": "s2"})
+            with self.assertRaisesRegex(ValueError, "at most 2 plays"):
+                parse({"sid": "s1"}, {"sid": "s2"}, {"sid": "s3"})
+
+
+class SegmentFormatTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "plays-1.seg"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_round_trip(self) -> None:
+        write_segment(
+            self.path,
+            (2**64 - 1, [Play("s1", 2**32 - 1, 0), Play("sóng", 1, 2**32 - 1)]),
+            (0, [Play("x" * 35, 7, 8)]),
+        )
+        self.assertEqual(
+            list(read_plays(self.path)),
+            [(2**64 - 1, "s1", 2**32 - 1, 0), (2**64 - 1, "sóng", 1, 2**32 - 1), (0, "x" * 35, 7, 8)],
+        )
+
+    def test_torn_final_record_is_skipped(self) -> None:
+        whole = encode_plays(1, [Play("s1", 10, 20)])
+        torn = encode_plays(1, [Play("s22", 30, 40)])
+        # Cut inside the header and inside the sid.
+        for cut in (5, len(torn) - 1):
+            with self.subTest(cut):
+                self.path.write_bytes(whole + torn[:cut])
+                self.assertEqual(list(read_plays(self.path)), [(1, "s1", 10, 20)])
+
+    def test_uid_out_of_range(self) -> None:
+        for uid in (-1, 2**64):
+            with self.subTest(uid), self.assertRaisesRegex(ValueError, "uid"):
+                encode_plays(uid, [Play("s1", 1, 1)])
+
+
+class CountSegmentTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "plays-1.seg"
+        # A zone with a 23-hour day (DST starts 2024-03-10), so bucketing cannot assume
+        # days are 86400 seconds.
+        self._tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/New_York"
+        time.tzset()
+
+    def tearDown(self) -> None:
+        if self._tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self._tz
+        time.tzset()
+        self._tmp.cleanup()
+
+    def at(self, *local: int) -> int:
+        return int(datetime(*local).timestamp())
+
+    def test_buckets_by_local_day(self) -> None:
+        write_segment(
+            self.path,
+            (1, [
+                Play("s1", self.at(2024, 3, 9, 23, 59, 59), 100),
+                Play("s1", self.at(2024, 3, 10, 0, 0, 0), 200),
+                Play("s1", self.at(2024, 3, 10, 23, 59, 59), 300),
+                Play("s1", self.at(2024, 3, 11, 0, 0, 0), 400),
+                # Out of order: back to a day already counted.
+                Play("s1", self.at(2024, 3, 10, 12, 0, 0), 500),
+            ]),
+            (2, [Play("s2", self.at(2024, 3, 10, 4, 0, 0), 600)]),
+        )
+        counts = count_segment(self.path)
+        self.assertEqual(counts.events, 6)
+        self.assertEqual(
+            counts.song_days,
+            {
+                (date(2024, 3, 9), "s1"): [1, 100],
+                (date(2024, 3, 10), "s1"): [3, 1000],
+                (date(2024, 3, 11), "s1"): [1, 400],
+                (date(2024, 3, 10), "s2"): [1, 600],
+            },
+        )
+
+    def test_per_user_counts_keep_the_latest_play(self) -> None:
+        write_segment(
+            self.path,
+            (1, [Play("s1", 300, 0), Play("s1", 100, 0), Play("s2", 200, 0)]),
+            (2, [Play("s1", 50, 0)]),
+            (1, [Play("s1", 250, 0)]),
+        )
+        self.assertEqual(
+            count_segment(self.path).user_songs,
+            {(1, "s1"): [3, 300], (1, "s2"): [1, 200], (2, "s1"): [1, 50]},
+        )
+
+    def test_empty_segment(self) -> None:
+        self.path.write_bytes(b"")
+        counts = count_segment(self.path)
+        self.assertEqual((counts.events, counts.song_days, counts.user_songs), (0, {}, {}))
+
+
+class StubDB:
+    def __init__(self) -> None:
+        self.applied: List[Tuple[str, int]] = []
+        self.error: Optional[Exception] = None
+
+    def apply_play_counts(self, segment: str, counts: Any) -> bool:
+        if self.error is not None:
+            raise self.error
+        self.applied.append((segment, counts.events))
+        return True
+
+
+def age(path: Path, seconds: float) -> None:
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+class PlayAggregatorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self._tmp.name)
+        self.db = StubDB()
+        self.aggregator = PlayAggregator(self.db, self.directory)
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def segment(self, name: str, events: int = 1) -> Path:
+        return write_segment(self.directory / name, (1, [Play("s1", 1, 1)] * events))
+
+    def test_sealed_segments_are_applied_and_deleted(self) -> None:
+        self.segment("plays-1.seg", 2)
+        self.segment("plays-2.seg", 3)
+        self.assertEqual(self.aggregator.run_once(), (2, 5))
+        self.assertEqual(self.db.applied, [("plays-1", 2), ("plays-2", 3)])
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_open_segments(self) -> None:
+        # A live writer's segment: young, and locked.
+        log = PlayLog(self.directory)
+        log.append(1, [Play("s1", 1, 1)])
+        (live,) = self.directory.glob("*.open")
+        self.assertEqual(self.aggregator.run_once(), (0, 0))
+        age(live, PLAYS_ORPHAN_SECONDS + 1)
+        self.assertEqual(self.aggregator.run_once(), (0, 0))
+        log.seal()
+        self.assertEqual(self.aggregator.run_once(), (1, 1))
+        # A dead writer's segment is taken once it is old enough.
+        orphan = self.segment("plays-3.open")
+        self.assertEqual(self.aggregator.run_once(), (0, 0))
+        age(orphan, PLAYS_ORPHAN_SECONDS + 1)
+        self.assertEqual(self.aggregator.run_once(), (1, 1))
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_rejected_segment_is_moved_aside(self) -> None:
+        self.segment("plays-1.seg")
+        self.db.error = ValueError("Data too long for column 'sid'")
+        self.assertEqual(self.aggregator.run_once(), (0, 0))
+        self.assertEqual([p.name for p in self.directory.iterdir()], ["plays-1.bad"])
+        self.db.error = None
+        self.assertEqual(self.aggregator.run_once(), (0, 0))
+
+    def test_other_failures_leave_the_segment(self) -> None:
+        self.segment("plays-1.seg")
+        self.db.error = ConnectionError("MySQL has gone away")
+        with self.assertRaises(ConnectionError):
+            self.aggregator.run_once()
+        self.db.error = None
+        self.assertEqual(self.aggregator.run_once(), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
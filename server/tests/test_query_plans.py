@@ -0,0 +1,87 @@
+"""
+Query-plan regression tests: EXPLAIN every registered statement against a generated
+dataset and hold it to its budget.
+
+    python -m unittest discover -s tests -t .
+
+Needs a MySQL server reachable with the usual MYSQL_* settings and a user that can create
+databases; without one the plan tests are skipped. The dataset (PLAN_TEST_SCALE, default
+100k, into PLAN_TEST_DB) is generated on first run and reused after that. Set
+PLAN_TEST_UPDATE=1 to record the current plans as baselines in tests/plans/ so later
+failures show a diff against them.
+"""
+from __future__ import annotations
+
+import os
+import unittest
+from pathlib import Path
+from typing import Any, Dict
+
+from .plans import Plan, describe, parse, save_baseline
+from .statements import NOT_EXPLAINED, STATEMENTS, Statement
+from .support import require_mysql
+
+SQL_DIR = Path(__file__).resolve().parent.parent / "src" / "sql"
+DATABASE = os.getenv("PLAN_TEST_DB", "resonate_plantest")
+SCALE = os.getenv("PLAN_TEST_SCALE", "100k")
+UPDATE = os.getenv("PLAN_TEST_UPDATE") == "1"
+
+
+def _dataset() -> Dict[str, Any]:
+    require_mysql()
+    from bench import datagen
+
+    if datagen.manifest_path(DATABASE).exists():
+        return datagen.load_manifest(DATABASE)
+    return datagen.generate(DATABASE, datagen.Plan.for_scale(SCALE, seed=348), reset=True)
+
+
+class QueryPlanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.manifest = _dataset()
+        os.environ["MYSQL_DB"] = DATABASE
+        from src.db import get_db
+
+        cls.conn = get_db().get_connection()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.conn.close()
+
+    def explain(self, statement: Statement) -> Plan:
+        from src.tool import load_sql
+
+        sql = statement.sql or load_sql(SQL_DIR / f"{statement.name}.sql")
+        with self.conn.cursor() as cur:
+            cur.execute("EXPLAIN FORMAT=JSON " + sql.strip().rstrip(";"), statement.params(self.manifest))
+            row = cur.fetchone()
+        return parse(next(iter(row.values())) if isinstance(row, dict) else row[0])
+
+    def test_plans_within_budget(self) -> None:
+        for statement in STATEMENTS:
+            with self.subTest(statement.name):
+                plan = self.explain(statement)
+                if UPDATE:
+                    save_baseline(statement.name, plan)
+                problems = statement.budget.violations(plan)
+                if problems:
+                    self.fail(describe(statement.name, plan, problems))
+
+
+class RegistryTest(unittest.TestCase):
+    def test_every_statement_is_registered(self) -> None:
+        registered = {f"{s.name}.sql" for s in STATEMENTS if s.sql is None}
+        missing = sorted(p.name for p in SQL_DIR.glob("*.sql") if p.name not in registered | set(NOT_EXPLAINED))
+        self.assertEqual(missing, [], "add these to tests/statements.py (or NOT_EXPLAINED with a reason)")
+
+    def test_registered_files_exist(self) -> None:
+        stale = sorted(
+            name for name in {f"{s.name}.sql" for s in STATEMENTS if s.sql is None} | set(NOT_EXPLAINED)
+            if not (SQL_DIR / name).exists()
+        )
+        self.assertEqual(stale, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
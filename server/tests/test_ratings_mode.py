@@ -0,0 +1,56 @@
+"""
+The sync (DB) and async (AsyncDB) data layers read ratings from the same tables in every
+RATINGS_MODE. No server needed; the async queries are captured instead of run.
+
+    python -m unittest tests.test_ratings_mode
+"""
+from __future__ import annotations
+
+import asyncio
+import unittest
+from typing import Any, List, Tuple
+
+try:
+    from src.async_db import AsyncDB
+    from src.db import DB, RATINGS_MODES
+except ImportError as e:
+    raise unittest.SkipTest(f"app dependencies not installed: {e}")
+
+
+class CapturingAsyncDB(AsyncDB):
+    def __init__(self, ratings_mode: str) -> None:
+        super().__init__(ratings_mode)
+        self.queries: List[Tuple[str, Any]] = []
+
+    async def _fetchall(self, sql: str, args: Any = None) -> List[Any]:
+        self.queries.append((sql, args))
+        return []
+
+
+class RatingsModeTest(unittest.TestCase):
+    def test_async_reads_match_db(self) -> None:
+        for mode in RATINGS_MODES:
+            with self.subTest(mode):
+                db, adb = DB(ratings_mode=mode), CapturingAsyncDB(mode)
+                self.assertEqual(adb.reads_song_ratings, db.reads_song_ratings)
+                asyncio.run(adb.get_song_by_id("s1"))
+                asyncio.run(adb.get_song_flags(1, ["s1"]))
+                self.assertEqual(
+                    [sql for sql, _ in adb.queries],
+                    [db._ratings_sql("get_song_by_id.sql"), db._ratings_sql("song_flags.sql")],
+                )
+
+    def test_song_ratings_statements_after_cutover(self) -> None:
+        for mode, prefix in (("dual", ""), ("cutover", "sr_")):
+            with self.subTest(mode):
+                adb = CapturingAsyncDB(mode)
+                asyncio.run(adb.get_song_by_id("s1"))
+                self.assertEqual(adb.queries[0][0], adb._sql(prefix + "get_song_by_id.sql"))
+
+    def test_unknown_mode(self) -> None:
+        with self.assertRaises(ValueError):
+            AsyncDB("ratings_only")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Script splitting and batching (src/sqlscript.py). No server needed; multi-statement
+execution runs against a scripted cursor.
+
+    python -m unittest tests.test_sqlscript
+"""
+from __future__ import annotations
+
+import unittest
+from typing import Any, List, Optional
+
+try:
+    from src.sqlscript import ScriptError, Statement, _batches, run_script, split_statements
+except ImportError as e:
+    raise unittest.SkipTest(f"app dependencies not installed: {e}")
+
+
+def sqls(text: str) -> List[str]:
+    return [stmt.sql for stmt in split_statements(text)]
+
+
+class SplitStatementsTest(unittest.TestCase):
+    def test_delimiters_inside_quotes(self) -> None:
+        self.assertEqual(sqls("SELECT 'a;b--c'; SELECT 2"), ["SELECT 'a;b--c'", "SELECT 2"])
+        self.assertEqual(sqls('SELECT "x;y", `c;d` FROM t'), ['SELECT "x;y", `c;d` FROM t'])
+
+    def test_escaped_quotes(self) -> None:
+        self.assertEqual(
+            sqls("SELECT 'it''s; fine'; SELECT \"say \"\"hi;\"\"\"; SELECT 'back\\';slash'"),
+            ["SELECT 'it''s; fine'", "SELECT \"say \"\"hi;\"\"\"", "SELECT 'back\\';slash'"],
+        )
+
+    def test_comments(self) -> None:
+        self.assertEqual(
+            sqls("SELECT 1; # a; b\nSELECT 2 -- c; d\n;\n-- e;\nSELECT 3--4"),
+            ["SELECT 1", "SELECT 2", "SELECT 3--4"],
+        )
+        self.assertEqual(sqls("SELECT /* a; b */ 1"), ["SELECT   1"])
+
+    def test_hints_are_kept(self) -> None:
+        self.assertEqual(
+            sqls("/*!40101 SET NAMES utf8mb4 */;\nSELECT /*+ MAX_EXECUTION_TIME(1000) */ 1;"),
+            ["/*!40101 SET NAMES utf8mb4 */", "SELECT /*+ MAX_EXECUTION_TIME(1000) */ 1"],
+        )
+
+    def test_delimiter_block(self) -> None:
+        body = (
+            "CREATE TRIGGER t_bi BEFORE INSERT ON t FOR EACH ROW BEGIN\n"
+            "  SET NEW.a = 1;\n"
+            "  SET NEW.b = 'x;y';\n"
+            "END"
+        )
+        statements = split_statements(
+            "CREATE TABLE t (a INT, b TEXT);\n"
+            "DELIMITER //\n"
+            f"{body}//\n"
+            "DELIMITER ;\n"
+            "INSERT INTO t (a) VALUES (1);\n"
+        )
+        self.assertEqual(
+            [(s.index, s.sql, s.line, s.compound) for s in statements],
+            [
+                (0, "CREATE TABLE t (a INT, b TEXT)", 1, False),
+                (1, body, 3, True),
+                (2, "INSERT INTO t (a) VALUES (1)", 8, False),
+            ],
+        )
+
+    def test_trailing_statement_without_terminator(self) -> None:
+        self.assertEqual(sqls("SELECT 1;\nSELECT 2"), ["SELECT 1", "SELECT 2"])
+        self.assertEqual(sqls("SELECT 1;\n\n-- done\n"), ["SELECT 1"])
+        self.assertEqual(sqls(""), [])
+
+
+def statement(index: int, compound: bool = False, sql: Optional[str] = None) -> Statement:
+    return Statement(index, sql or f"SELECT {index}", 1, compound=compound)
+
+
+class BatchesTest(unittest.TestCase):
+    def indexes(self, batches: List[List[Statement]]) -> List[List[int]]:
+        return [[s.index for s in batch] for batch in batches]
+
+    def test_compound_statements_go_alone(self) -> None:
+        statements = [statement(0), statement(1), statement(2, compound=True),
+                      statement(3, compound=True), statement(4), statement(5)]
+        self.assertEqual(self.indexes(_batches(statements, 100, 1 << 20)), [[0, 1], [2], [3], [4, 5]])
+
+    def test_limits(self) -> None:
+        statements = [statement(i) for i in range(5)]
+        self.assertEqual(self.indexes(_batches(statements, 2, 1 << 20)), [[0, 1], [2, 3], [4]])
+        # "SELECT n" is 8 bytes: two fit in 16.
+        self.assertEqual(self.indexes(_batches(statements, 100, 16)), [[0, 1], [2, 3], [4]])
+        # A statement larger than the byte limit still gets a batch of its own.
+        big = statement(0, sql="SELECT '" + "x" * 32 + "'")
+        self.assertEqual(self.indexes(_batches([big, statement(1)], 100, 16)), [[0], [1]])
+
+
+class ScriptedCursor:
+    """Answers a multi-statement packet like the server: one result per statement, stopping at `fail_at`."""
+
+    def __init__(self, conn: "ScriptedConnection") -> None:
+        self.conn = conn
+        self.remaining = 0
+
+    def __enter__(self) -> "ScriptedCursor":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def execute(self, sql: str) -> None:
+        self.conn.packets.append(sql)
+        self.remaining = sql.count(";\n") + 1
+        self.result()
+
+    def result(self) -> None:
+        if self.conn.fail_at is not None and self.conn.results == self.conn.fail_at:
+            raise RuntimeError("1146 table missing")
+        self.conn.results += 1
+        self.remaining -= 1
+
+    def fetchall(self) -> list:
+        return []
+
+    def nextset(self) -> bool:
+        if not self.remaining:
+            return False
+        self.result()
+        return True
+
+
+class ScriptedConnection:
+    def __init__(self, fail_at: Optional[int] = None) -> None:
+        self.fail_at = fail_at
+        self.results = 0
+        self.packets: List[str] = []
+
+    def cursor(self) -> ScriptedCursor:
+        return ScriptedCursor(self)
+
+
+class RunMultiTest(unittest.TestCase):
+    def test_one_packet_per_batch(self) -> None:
+        conn = ScriptedConnection()
+        result = run_script(conn, "SELECT 1; SELECT 2; SELECT 3", multi=True)
+        self.assertEqual(conn.packets, ["SELECT 1;\nSELECT 2;\nSELECT 3"])
+        self.assertEqual((result.executed, len(result.timings)), (3, 3))
+
+    def test_failure_names_the_statement(self) -> None:
+        conn = ScriptedConnection(fail_at=1)
+        with self.assertRaises(ScriptError) as caught:
+            run_script(conn, "SELECT 1; SELECT * FROM missing; SELECT 3", multi=True)
+        self.assertEqual(caught.exception.statement.index, 1)
+
+        conn = ScriptedConnection(fail_at=0)
+        with self.assertRaises(ScriptError) as caught:
+            run_script(conn, "SELECT 1; SELECT 2", multi=True)
+        self.assertEqual(caught.exception.statement.index, 0)
+
+    def test_resume_from_start(self) -> None:
+        conn = ScriptedConnection()
+        result = run_script(conn, "SELECT 1; SELECT 2; SELECT 3", start=1, multi=True)
+        self.assertEqual(conn.packets, ["SELECT 2;\nSELECT 3"])
+        self.assertEqual((result.executed, result.skipped), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Typeahead index (src/suggest.py): key normalization, top-k ordering, in-place weight
+updates and kind filters. No server needed.
+
+    python -m unittest tests.test_suggest
+"""
+from __future__ import annotations
+
+import pickle
+import unittest
+from typing import List, Optional, Sequence
+
+try:
+    from src.suggest import PrefixIndex, index_keys, normalize
+except ImportError as e:
+    raise unittest.SkipTest(f"app dependencies not installed: {e}")
+
+
+def texts(index: PrefixIndex, prefix: str, k: int = 10, kinds: Optional[Sequence[str]] = None) -> List[str]:
+    return [index.labels[e] for e in index.top(prefix, k, kinds)]
+
+
+class KeysTest(unittest.TestCase):
+    def test_normalize(self) -> None:
+        self.assertEqual(normalize("  Beyoncé — Déjà_Vu! "), "beyonce deja vu")
+
+    def test_word_starts(self) -> None:
+        self.assertEqual(index_keys("The Beatles"), ["beatles", "the beatles"])
+        self.assertEqual(index_keys("a b c d"), ["a b c d", "b c d", "c d"])
+
+
+class PrefixIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = PrefixIndex([
+            ("song", "s1", "Beat It", 50),
+            ("artist", "a1", "The Beatles", 90),
+            ("song", "s2", "Beautiful Day", 50),
+            ("album", "b1", "Abbey Road", 70),
+            ("tag", "t1", "beats", 50),
+            ("song", "s3", "Heartbeat", 99),
+        ])
+
+    def test_most_popular_first(self) -> None:
+        self.assertEqual(texts(self.index, "bea"), ["The Beatles", "Beat It", "beats", "Beautiful Day"])
+        self.assertEqual(texts(self.index, "bea", k=2), ["The Beatles", "Beat It"])
+        # Only word starts match: "Heartbeat" has no word starting with "bea".
+        self.assertNotIn("Heartbeat", texts(self.index, "b"))
+
+    def test_ties_by_matched_key(self) -> None:
+        # Equal weights: "beat it" < "beats" < "beautiful day", whatever the kind.
+        self.assertEqual(texts(self.index, "bea")[1:], ["Beat It", "beats", "Beautiful Day"])
+
+    def test_no_match(self) -> None:
+        self.assertEqual(self.index.top("zz", 5), [])
+        self.assertEqual(self.index.top("bea", 5, ["album"]), [])
+
+    def test_entry_listed_once(self) -> None:
+        index = PrefixIndex([("song", "s1", "Love Love Love", 10), ("song", "s2", "Love Me Do", 5)])
+        self.assertEqual(texts(index, "love"), ["Love Love Love", "Love Me Do"])
+
+    def test_kind_filter(self) -> None:
+        self.assertEqual(texts(self.index, "bea", kinds=["song"]), ["Beat It", "Beautiful Day"])
+        self.assertEqual(texts(self.index, "bea", kinds=["tag", "artist"]), ["The Beatles", "beats"])
+
+    def test_rare_kind_under_popular_prefix(self) -> None:
+        entries = [("song", f"s{i}", f"alpha {i}", 100 + i % 7) for i in range(2000)]
+        index = PrefixIndex(entries + [("tag", "t1", "alpine", 1)])
+        self.assertEqual([index.entry(e)["id"] for e in index.top("al", 5, ["tag"])], ["t1"])
+        self.assertEqual(len(index.top("al", 5)), 5)
+        self.assertNotIn("alpine", texts(index, "al", k=5))
+
+    def test_set_song_weight(self) -> None:
+        self.assertTrue(self.index.set_song_weight("s2", 95))
+        self.assertEqual(texts(self.index, "bea"), ["Beautiful Day", "The Beatles", "Beat It", "beats"])
+        self.assertEqual(texts(self.index, "day"), ["Beautiful Day"])
+        self.assertEqual(self.index.entry(self.index.top("day", 1)[0])["popularity"], 95)
+        self.assertTrue(self.index.set_song_weight("s2", 0))
+        self.assertEqual(texts(self.index, "bea")[-1], "Beautiful Day")
+        # Only songs are refreshed in place.
+        self.assertFalse(self.index.set_song_weight("a1", 1))
+        self.assertFalse(self.index.set_song_weight("missing", 1))
+
+    def test_many_updates_match_a_rebuild(self) -> None:
+        entries = [("song", f"s{i}", f"track {i % 13} mix {i}", float(i % 11)) for i in range(300)]
+        index = PrefixIndex(entries)
+        for i in range(0, 300, 7):
+            index.set_song_weight(f"s{i}", float(500 - i))
+        rebuilt = PrefixIndex([(kind, eid, label, index.weights[e]) for e, (kind, eid, label, _) in enumerate(entries)])
+        for prefix in ("track", "track 1", "mix", "mix 2", "t"):
+            self.assertEqual(index.top(prefix, 20), rebuilt.top(prefix, 20), prefix)
+
+    def test_snapshot_round_trip(self) -> None:
+        index = pickle.loads(pickle.dumps(self.index))
+        self.assertEqual(texts(index, "bea"), texts(self.index, "bea"))
+        self.assertTrue(index.set_song_weight("s1", 100))
+        self.assertEqual(texts(index, "bea")[0], "Beat It")
+
+
+if __name__ == "__main__":
+    unittest.main()
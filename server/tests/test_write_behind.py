@@ -0,0 +1,133 @@
+"""
+Write-behind log (src/writebehind.py): coalescing, orphan replay and the pending overlay
+seen by the native ASGI reads. No server needed; applied events are collected by a stub DB.
+
+    python -m unittest tests.test_write_behind
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Any, Dict, List
+
+try:
+    from src.async_db import AsyncDB
+    from src.writebehind import WRITE_BEHIND_ORPHAN_SECONDS, Event, Segment, WriteBehindLog, coalesce
+except ImportError as e:
+    raise unittest.SkipTest(f"app dependencies not installed: {e}")
+
+
+class StubDB:
+    def __init__(self) -> None:
+        self.applied: List[List[Any]] = []
+
+    def apply_write_behind(self, events: List[Any]) -> None:
+        self.applied.append(events)
+
+
+def event(seq: int, added: bool, key: str = "s1", uid: int = 1) -> Event:
+    return Event(seq, "favorite", added, uid, key, 1000.0 + seq)
+
+
+def age(path: Path, seconds: float) -> None:
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+class CoalesceTest(unittest.TestCase):
+    def test_last_event_per_key(self) -> None:
+        events = [event(1, True, "a"), event(2, True, "b"), event(3, False, "a"), event(4, True, "a", uid=2)]
+        self.assertEqual([e.seq for e in coalesce(events)], [2, 3, 4])
+
+
+class ReplayOrphansTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self._tmp.name)
+        self.db = StubDB()
+        self.log = WriteBehindLog(self.db, self.directory)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def write(self, name: str, *events: Event) -> Path:
+        path = self.directory / name
+        path.write_text("".join(e.to_line() for e in events), encoding="utf-8")
+        return path
+
+    def test_old_unlocked_segment_is_applied(self) -> None:
+        path = self.write("seg-1-1-000001.log", event(1, True), event(2, False), event(3, True, "s2"))
+        age(path, WRITE_BEHIND_ORPHAN_SECONDS + 1)
+        self.assertEqual(self.log.replay_orphans(), 3)
+        self.assertEqual([[e.seq for e in batch] for batch in self.db.applied], [[2, 3]])
+        self.assertFalse(path.exists())
+
+    def test_new_segment_is_left_alone(self) -> None:
+        # Created by a live worker that has not taken its lock yet.
+        path = self.write("seg-1-1-000001.log")
+        self.assertEqual(self.log.replay_orphans(), 0)
+        self.assertTrue(path.exists())
+        segment = Segment(path)
+        segment.append(event(1, True))
+        segment.remove()
+
+    def test_locked_segment_is_left_alone(self) -> None:
+        path = self.directory / "seg-1-1-000001.log"
+        segment = Segment(path)
+        segment.append(event(1, True))
+        age(path, WRITE_BEHIND_ORPHAN_SECONDS + 1)
+        self.assertEqual(self.log.replay_orphans(), 0)
+        self.assertTrue(path.exists())
+        segment.remove()
+
+    def test_torn_final_line_is_dropped(self) -> None:
+        path = self.write("seg-1-1-000001.log", event(1, True))
+        with path.open("a", encoding="utf-8") as fh:
+            fh.write('{"seq": 2, "kind": "fav')
+        age(path, WRITE_BEHIND_ORPHAN_SECONDS + 1)
+        self.assertEqual(self.log.replay_orphans(), 1)
+
+
+class FlagsAsyncDB(AsyncDB):
+    """Every song is stored as not favorited; queries are counted instead of run."""
+
+    def __init__(self, log: WriteBehindLog) -> None:
+        super().__init__("legacy", pending=log.pending)
+        self.queries = 0
+
+    async def _fetchall(self, sql: str, args: Any = None) -> List[Dict[str, Any]]:
+        self.queries += 1
+        if isinstance(args, dict):
+            return [{"sid": sid, "is_favorite": 0, "user_rating": None} for sid in args["sids"]]
+        return []
+
+
+class AsyncOverlayTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.log = WriteBehindLog(StubDB(), Path(self._tmp.name))
+        self.adb = FlagsAsyncDB(self.log)
+
+    def tearDown(self) -> None:
+        self.log.flush()
+        self._tmp.cleanup()
+
+    def test_native_reads_see_unflushed_favorites(self) -> None:
+        self.log.append("favorite", True, 1, "s1")
+        self.assertTrue(asyncio.run(self.adb.is_song_favorite(1, "s1")))
+        self.assertEqual(self.adb.queries, 0)
+        flags = asyncio.run(self.adb.get_song_flags(1, ["s1", "s2"]))
+        self.assertEqual({sid: f["is_favorite"] for sid, f in flags.items()}, {"s1": True, "s2": False})
+        self.assertFalse(asyncio.run(self.adb.get_song_flags(2, ["s1"]))["s1"]["is_favorite"])
+
+    def test_unflushed_unfavorite(self) -> None:
+        self.log.append("favorite", False, 1, "s1")
+        self.assertFalse(asyncio.run(self.adb.is_song_favorite(1, "s1")))
+
+
+if __name__ == "__main__":
+    unittest.main()